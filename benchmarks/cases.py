@@ -0,0 +1,181 @@
+"""
+The benchmarked operations.
+
+Each case builds the cog it exercises against a BenchBot and returns a Case
+whose `run` coroutine is timed. `setup` runs before every iteration, outside
+the timing, to put the data back into the state the command expects.
+"""
+import dataclasses
+import itertools
+from typing import Awaitable, Callable, Dict, Optional
+
+from benchmarks.clan import TIMEZONES, application_message_content
+from benchmarks.fakes import BenchBot, FakeChannel, FakeGuild, FakeHTTP, FakeInteraction, FakeMember, FakeMessage, FakeRole
+from cogs.admin import Admin
+from cogs.applications import Applications
+from cogs.competition import Competition, CompetitionType
+from cogs.lotto import Lotto
+from cogs.user_lookup import UserLookup
+from util.render_cache import RenderCache
+from util.role_grants import RoleGrantQueue
+from util.timezones import TimezoneMatcher
+
+TRIAL_MEMBER_ROLE_ID = 5000
+APPLICATION_CHANNEL_ID = 6000
+# Applications accepted at once by the accept_applications case
+BATCH_SIZE = 20
+
+
+@dataclasses.dataclass
+class Case:
+    run: Callable[[], Awaitable]
+    setup: Optional[Callable[[], None]] = None
+    # Cases that don't depend on the clan only need to run once
+    sized: bool = True
+    # Awaited once the case has finished, e.g. to stop background tasks it started
+    teardown: Optional[Callable[[], Awaitable]] = None
+
+
+CASES: Dict[str, Callable[[BenchBot, FakeHTTP], Case]] = {}
+
+
+def case(name):
+    def register(factory):
+        CASES[name] = factory
+        return factory
+    return register
+
+
+def make_interaction(bot: BenchBot, http: FakeHTTP, category: Optional[str] = None, channel_id: Optional[int] = None) -> FakeInteraction:
+    # The first clan member runs every command, so log_command finds them
+    member = bot.db.clan.members[0]
+    user = FakeMember(member["discord_id_num"], member["discord_id"])
+    return FakeInteraction(http, user, FakeGuild(), FakeChannel(category, channel_id))
+
+
+@case("format_money")
+def format_money(bot: BenchBot, http: FakeHTTP) -> Case:
+    base_cog = bot.get_cog("BaseCog")
+    amounts = [5, 999, 1000, 10009, 999500, 2000400, 755200080, 4000000000]
+
+    async def run():
+        for amount in amounts:
+            base_cog.format_money(amount, "gp")
+    return Case(run, sized=False)
+
+
+@case("list_members")
+def list_members(bot: BenchBot, http: FakeHTTP) -> Case:
+    cog = bot.add_cog(UserLookup(bot))
+
+    async def run():
+        await cog.list_members.callback(cog, make_interaction(bot, http))
+    return Case(run)
+
+
+@case("comp_leaderboard")
+def comp_leaderboard(bot: BenchBot, http: FakeHTTP) -> Case:
+    cog = bot.add_cog(Competition(bot))
+
+    async def run():
+        await cog.comp_leaderboard.callback(cog, make_interaction(bot, http, "EVENTS & COMPETITIONS"), CompetitionType.SKILL)
+    return Case(run)
+
+
+@case("comp_leaderboard_cached")
+def comp_leaderboard_cached(bot: BenchBot, http: FakeHTTP) -> Case:
+    # The same leaderboard again and again, answered from the render cache after the first
+    bot.render_cache = RenderCache()
+    cog = bot.add_cog(Competition(bot))
+
+    async def run():
+        await cog.comp_leaderboard.callback(cog, make_interaction(bot, http, "EVENTS & COMPETITIONS"), CompetitionType.SKILL)
+    return Case(run)
+
+
+@case("lottery_status")
+def lottery_status(bot: BenchBot, http: FakeHTTP) -> Case:
+    cog = bot.add_cog(Lotto(bot))
+
+    async def run():
+        await cog.lottery_status.callback(cog, make_interaction(bot, http))
+    return Case(run)
+
+
+@case("select_winner")
+def select_winner(bot: BenchBot, http: FakeHTTP) -> Case:
+    cog = bot.add_cog(Lotto(bot))
+
+    def setup():
+        # Lottery 1 has finished, clear its winner so one is drawn every time
+        bot.execute_query("UPDATE lottery SET winner_id = %s WHERE lottery_id = %s", (None, 1))
+
+    async def run():
+        await cog.select_winner.callback(cog, make_interaction(bot, http), 1)
+    return Case(run, setup)
+
+
+@case("promotions_due")
+def promotions_due(bot: BenchBot, http: FakeHTTP) -> Case:
+    cog = bot.add_cog(Admin(bot))
+    bot.configs.setdefault("mem_level_names", ["Trial", "Junior", "Member", "Senior", "Tenured", "Esteemed", "Moderator", "Captain", "Owner"])
+
+    async def run():
+        await cog.promotions_due.callback(cog, make_interaction(bot, http, "LEADERS"), 7)
+    return Case(run)
+
+
+@case("process_application")
+def process_application(bot: BenchBot, http: FakeHTTP) -> Case:
+    cog = bot.add_cog(Applications(bot))
+    cog.application_channel_id = APPLICATION_CHANNEL_ID
+    cog.trial_member_role_id = TRIAL_MEMBER_ROLE_ID
+    cog.timezone_matcher = TimezoneMatcher.from_config(TIMEZONES)
+    # The role is granted through the queue, unpaced so the case measures the bot's own work
+    cog.role_grants = RoleGrantQueue(rate_per_second=1e9, burst=BATCH_SIZE)
+    guild = FakeGuild(roles=[FakeRole(TRIAL_MEMBER_ROLE_ID, "Trial Member")])
+    channel = FakeChannel(channel_id=APPLICATION_CHANNEL_ID)
+    numbers = itertools.count(1)
+    pending = []
+
+    def setup():
+        # A new applicant every time, so the duplicate check passes
+        number = next(numbers)
+        applicant = FakeMember(900000000000000000 + number, f"applicant_{number}")
+        guild.add_member(applicant)
+        pending[:] = [FakeMessage(application_message_content(number), applicant, guild, channel)]
+
+    async def run():
+        interaction = make_interaction(bot, http, channel_id=APPLICATION_CHANNEL_ID)
+        await cog._process_application(pending[0], interaction)
+    return Case(run, setup, teardown=cog.role_grants.stop)
+
+
+@case("accept_applications")
+def accept_applications(bot: BenchBot, http: FakeHTTP) -> Case:
+    cog = bot.add_cog(Applications(bot))
+    cog.application_channel_id = APPLICATION_CHANNEL_ID
+    cog.trial_member_role_id = TRIAL_MEMBER_ROLE_ID
+    cog.timezone_matcher = TimezoneMatcher.from_config(TIMEZONES)
+    # Unpaced, the case measures the bot's own work rather than the rate the queue is set to
+    cog.role_grants = RoleGrantQueue(rate_per_second=1e9, burst=BATCH_SIZE)
+    guild = FakeGuild(roles=[FakeRole(TRIAL_MEMBER_ROLE_ID, "Trial Member")])
+    channel = FakeChannel(channel_id=APPLICATION_CHANNEL_ID)
+    # Well clear of process_application's applicants
+    numbers = itertools.count(5000000)
+    batch = []
+
+    def setup():
+        batch.clear()
+        for _ in range(BATCH_SIZE):
+            number = next(numbers)
+            applicant = FakeMember(900000000000000000 + number, f"applicant_{number}")
+            guild.add_member(applicant)
+            batch.append(FakeMessage(application_message_content(number), applicant, guild, channel))
+
+    async def run():
+        interaction = make_interaction(bot, http, channel_id=APPLICATION_CHANNEL_ID)
+        interaction.guild = guild
+        await cog._accept_applications(interaction, batch)
+    return Case(run, setup, teardown=cog.role_grants.stop)
+
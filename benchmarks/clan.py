@@ -0,0 +1,131 @@
+"""
+Synthetic clan data for the benchmarks.
+
+Everything is generated from a seeded random number generator, so the same size
+always gives the same clan and runs are comparable.
+"""
+import dataclasses
+import datetime
+import random
+from typing import Dict, List
+
+from util.promotions import PromotionSchedule
+
+# Columns of the member table, in sql/create-db.sql order
+MEMBER_COLUMNS = (
+    "_id", "rsn", "discord_id_num", "discord_id", "membership_level", "join_date", "special_status",
+    "previous_rsn", "alt_rsn", "on_leave", "on_leave_notes", "active", "skill_comp_pts",
+    "skill_comp_pts_life", "boss_comp_pts", "boss_comp_pts_life", "loc", "timezone", "notes",
+    "how_found_clan", "favorite_activities", "play_frequency", "coffee_preference",
+)
+
+TIMEZONES = ["EST", "CST", "MST", "PST", "GMT", "CET", "AEST", "UTC+8"]
+LOCATIONS = ["Ohio", "Texas", "London", "Berlin", "Sydney", "Toronto", "Manila", "Oslo"]
+
+APPLICATION_TEMPLATE = """What is your RSN?
+{rsn}
+How did you find out about the clan?
+A friend recommended it
+What are your favorite activities to do on Runescape?
+Bossing, skilling and clue scrolls
+Where do you live and what timezone are you in?
+{location} {timezone}
+How often do you play?
+Most evenings
+Have you read our #rules and do you agree to abide by these rules?
+Yes
+Are you currently in another clan?
+No
+How do you drink your Coffee?
+Black"""
+
+
+@dataclasses.dataclass
+class Clan:
+    """A synthetic clan: members, an active lottery with entries and a finished one."""
+    members: List[Dict]
+    lotteries: List[Dict]
+    lottery_entries: List[Dict]
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+    def member_rows(self):
+        """Get the members as member table rows."""
+        return [tuple(member[column] for column in MEMBER_COLUMNS) for member in self.members]
+
+
+def build_clan(size: int, seed: int = 1) -> Clan:
+    """
+    Build a clan of `size` members.
+
+    Roughly 1 in 5 members have alts, 1 in 3 have previous names, half have competition
+    points and 40% have entered the lotteries. Levels follow the promotion schedule, with
+    1 in 20 members a promotion behind and some long-standing members promoted by hand.
+    """
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    schedule = PromotionSchedule()
+    members = []
+    for i in range(1, size + 1):
+        join_date = today - datetime.timedelta(days=rng.randint(0, 2000))
+        level = schedule.expected_level(join_date, today)
+        if rng.random() < 0.05:
+            level = max(0, level - 1)
+        elif level == schedule.auto_promotion_max_level and rng.random() < 0.3:
+            level = rng.randint(4, 6)
+        members.append({
+            "_id": i,
+            "rsn": f"Bench{i:05d}",
+            "discord_id_num": 100000000000000000 + i,
+            "discord_id": f"bench_user_{i}",
+            "membership_level": level,
+            "join_date": join_date,
+            "special_status": None,
+            "previous_rsn": [f"Old{i:05d}"] if rng.random() < 0.33 else None,
+            "alt_rsn": [f"Alt{i:05d}", f"Iron{i:05d}"] if rng.random() < 0.2 else None,
+            "on_leave": rng.random() < 0.05,
+            "on_leave_notes": None,
+            "active": rng.random() < 0.9,
+            "skill_comp_pts": rng.randint(1, 30) if rng.random() < 0.5 else 0,
+            "skill_comp_pts_life": rng.randint(0, 100),
+            "boss_comp_pts": rng.randint(1, 30) if rng.random() < 0.5 else 0,
+            "boss_comp_pts_life": rng.randint(0, 100),
+            "loc": rng.choice(LOCATIONS),
+            "timezone": rng.choice(TIMEZONES),
+            "notes": None,
+            "how_found_clan": None,
+            "favorite_activities": None,
+            "play_frequency": None,
+            "coffee_preference": None,
+        })
+
+    now = datetime.datetime.now().replace(microsecond=0)
+    lotteries = [
+        # Finished, waiting for a winner to be selected
+        {"lottery_id": 1, "start_date": now - datetime.timedelta(days=14), "end_date": now - datetime.timedelta(days=7),
+         "entry_fee": 1000000, "max_entries": 10, "winner_id": None},
+        # Active
+        {"lottery_id": 2, "start_date": now - datetime.timedelta(days=1), "end_date": now + datetime.timedelta(days=6),
+         "entry_fee": 2500000, "max_entries": 10, "winner_id": None},
+    ]
+    lottery_entries = []
+    for lottery in lotteries:
+        for member in members:
+            if rng.random() < 0.4:
+                lottery_entries.append({
+                    "lottery_id": lottery["lottery_id"],
+                    "member_id": member["_id"],
+                    "entries_purchased": rng.randint(1, lottery["max_entries"]),
+                })
+    return Clan(members, lotteries, lottery_entries)
+
+
+def application_message_content(number: int) -> str:
+    """Get the text of a new, valid application. Each number gives a different RSN."""
+    return APPLICATION_TEMPLATE.format(
+        rsn=f"App{number:07d}",
+        location=LOCATIONS[number % len(LOCATIONS)],
+        timezone=TIMEZONES[number % len(TIMEZONES)],
+    )
@@ -0,0 +1,187 @@
+"""
+Fake Discord objects for driving cog commands outside of Discord.
+
+Only the parts of the discord.py API the cogs use are implemented. Responses are
+recorded instead of sent, optionally after a simulated HTTP round trip.
+"""
+import asyncio
+import itertools
+from typing import Dict, List, Optional
+
+import discord
+
+from cogs.base_cog import BaseCog
+from util.command_timing import CommandMetrics
+
+_ids = itertools.count(1)
+
+
+class FakeHTTP:
+    """
+    Stands in for Discord's HTTP API: records every call and can add latency to it.
+
+    Args:
+        latency: Seconds every call takes
+        keep_messages: Keep every message sent, turn off for long load runs
+    """
+    def __init__(self, latency: float = 0.0, keep_messages: bool = True):
+        self.latency = latency
+        self.keep_messages = keep_messages
+        self.calls = 0
+        # Responses telling the user something went wrong
+        self.error_responses = 0
+        self.messages: List[Dict] = []
+
+    async def request(self, kind: str, **payload):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if "error" in (payload.get("content") or "").lower():
+            self.error_responses += 1
+        if self.keep_messages:
+            self.messages.append({"kind": kind, **payload})
+
+
+class FakeResponse:
+    """Stands in for discord.InteractionResponse."""
+    def __init__(self, http: FakeHTTP):
+        self._http = http
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    def _respond(self):
+        if self._done:
+            raise discord.InteractionResponded(None)
+        self._done = True
+
+    async def defer(self, ephemeral: bool = False, thinking: bool = False):
+        self._respond()
+        await self._http.request("defer", ephemeral=ephemeral)
+
+    async def send_message(self, content: Optional[str] = None, *, embed: Optional[discord.Embed] = None, ephemeral: bool = False, **kwargs):
+        self._respond()
+        await self._http.request("send", content=content, embed=embed, ephemeral=ephemeral)
+
+    async def send_modal(self, modal):
+        self._respond()
+        await self._http.request("modal", modal=modal)
+
+
+class FakeFollowup:
+    """Stands in for the interaction's followup webhook."""
+    def __init__(self, http: FakeHTTP):
+        self._http = http
+
+    async def send(self, content: Optional[str] = None, *, embed: Optional[discord.Embed] = None, ephemeral: bool = False, **kwargs):
+        await self._http.request("followup", content=content, embed=embed, ephemeral=ephemeral)
+
+
+class FakeCategory:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class FakeChannel:
+    def __init__(self, category: Optional[str] = None, channel_id: Optional[int] = None):
+        self.id = channel_id or next(_ids)
+        self.category = FakeCategory(category) if category else None
+
+
+class FakePermissions:
+    def __init__(self, administrator: bool = True):
+        self.administrator = administrator
+
+
+class FakeRole:
+    def __init__(self, role_id: int, name: str):
+        self.id = role_id
+        self.name = name
+
+
+class FakeMember:
+    """A guild member, also used as an interaction or message author."""
+    def __init__(self, member_id: int, name: str, administrator: bool = True):
+        self.id = member_id
+        self.name = name
+        self.guild_permissions = FakePermissions(administrator)
+        self.roles: List[FakeRole] = []
+
+    async def add_roles(self, *roles, reason=None):
+        self.roles.extend(roles)
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int = 1, roles: Optional[List[FakeRole]] = None):
+        self.id = guild_id
+        self._roles = {role.id: role for role in roles or []}
+        self._members: Dict[int, FakeMember] = {}
+
+    def add_member(self, member: FakeMember):
+        self._members[member.id] = member
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self._members.get(member_id)
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self._roles.get(role_id)
+
+
+class FakeMessage:
+    def __init__(self, content: str, author: FakeMember, guild: FakeGuild, channel: FakeChannel):
+        self.id = next(_ids)
+        self.content = content
+        self.author = author
+        self.guild = guild
+        self.channel = channel
+
+
+class FakeInteraction:
+    """Stands in for discord.Interaction for slash command callbacks."""
+    def __init__(self, http: FakeHTTP, user: FakeMember, guild: FakeGuild, channel: FakeChannel):
+        self.id = next(_ids)
+        self.user = user
+        # BaseCog's checks treat anything that isn't a discord.Interaction as a Context
+        self.author = user
+        self.guild = guild
+        self.guild_id = guild.id
+        self.channel = channel
+        self.channel_id = channel.id
+        self.response = FakeResponse(http)
+        self.followup = FakeFollowup(http)
+
+
+class BenchBot:
+    """
+    The parts of CoffeeHouseBot the cogs use, backed by a benchmark DB.
+
+    Args:
+        db: An InMemoryDB or PostgresDB
+        configs: Config values returned by getConfigValue
+    """
+    def __init__(self, db, configs: Optional[Dict] = None):
+        self.db = db
+        self.configs = configs or {}
+        self.command_metrics = CommandMetrics()
+        self._cogs = {}
+        self.add_cog(BaseCog(self))
+
+    def selectOne(self, query, params=None):
+        return self.db.selectOne(query, params)
+
+    def selectMany(self, query, params=None, row_factory=None):
+        return self.db.selectMany(query, params, row_factory)
+
+    def execute_query(self, query, params=None):
+        return self.db.execute_query(query, params)
+
+    def getConfigValue(self, key):
+        return self.configs[key]
+
+    def add_cog(self, cog):
+        self._cogs[cog.__class__.__name__] = cog
+        return cog
+
+    def get_cog(self, name):
+        return self._cogs.get(name)
@@ -0,0 +1,101 @@
+"""
+Runs a benchmark Case and measures it.
+
+Every case is warmed up first, then timed one iteration at a time with
+perf_counter until it has run for `min_time` seconds (and at least
+`min_iterations` times). A separate, shorter pass runs under tracemalloc to
+measure allocations, since tracing slows everything down and would skew the
+timings.
+"""
+import dataclasses
+import time
+import tracemalloc
+from typing import Optional
+
+from benchmarks.cases import Case
+from util.metrics import percentile
+
+
+@dataclasses.dataclass
+class BenchmarkResult:
+    name: str
+    size: Optional[int]
+    iterations: int
+    ops_per_sec: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    peak_kb: float
+    queries_per_op: float
+
+    @property
+    def key(self) -> str:
+        """Get the key the result is stored under in a baseline file."""
+        return self.name if self.size is None else f"{self.name}[{self.size}]"
+
+
+async def _run_once(case: Case):
+    if case.setup:
+        case.setup()
+    started = time.perf_counter()
+    await case.run()
+    return time.perf_counter() - started
+
+
+async def _measure_allocations(case: Case, iterations: int) -> float:
+    """Get the median peak allocation of an iteration, in KB."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            if case.setup:
+                case.setup()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await case.run()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return percentile(peaks, 50) / 1024
+
+
+async def run_case(name: str, size: Optional[int], case: Case, db, min_time: float = 1.0,
+                   min_iterations: int = 5, max_iterations: int = 10000, warmup: int = 3,
+                   allocation_iterations: int = 5) -> BenchmarkResult:
+    """
+    Benchmark a case.
+
+    Args:
+        name: Name of the case
+        size: Clan size, None for cases that don't depend on it
+        case: The case to run
+        db: The DB the case runs against, used to count queries per op if it can
+        min_time: Keep iterating until this many seconds have been timed
+    """
+    try:
+        for _ in range(warmup):
+            await _run_once(case)
+
+        queries_before = getattr(db, "queries", 0)
+        timings = []
+        while len(timings) < max_iterations and (len(timings) < min_iterations or sum(timings) < min_time):
+            timings.append(await _run_once(case))
+        queries = getattr(db, "queries", 0) - queries_before
+
+        peak_kb = await _measure_allocations(case, allocation_iterations)
+    finally:
+        if case.teardown:
+            await case.teardown()
+    timings_ms = [timing * 1000 for timing in timings]
+    return BenchmarkResult(
+        name=name,
+        size=size,
+        iterations=len(timings),
+        ops_per_sec=len(timings) / sum(timings),
+        p50_ms=percentile(timings_ms, 50),
+        p95_ms=percentile(timings_ms, 95),
+        p99_ms=percentile(timings_ms, 99),
+        peak_kb=peak_kb,
+        # setup queries are counted too, it only matters that the number doesn't grow
+        queries_per_op=queries / len(timings),
+    )
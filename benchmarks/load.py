@@ -0,0 +1,277 @@
+"""
+Synthetic load generator.
+
+Replays a weighted mix of commands at a target rate against a BenchBot, the
+same way evening peaks hit the real bot: requests arrive on their own schedule
+(a Poisson process) whether or not earlier ones have finished. Every request
+records how long it waited before it started running (queueing delay, which is
+where a blocked event loop shows up) and how long the command then took.
+
+    python -m benchmarks.load --rate 50 --duration 30
+    python -m benchmarks.load --dsn postgresql://localhost/bench --history-dsn postgresql://localhost/coffeehouse
+    python -m benchmarks.load --mix lottery_status=5,list_members=1 --http-latency 0.08
+
+With --dsn the commands run through the bot's own DB helpers against a local
+Postgres, so this is the way to check a change to the DB layer in bot.py holds
+up under concurrent traffic.
+"""
+import argparse
+import asyncio
+import dataclasses
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.cases import CASES
+from benchmarks.fakes import BenchBot, FakeHTTP
+from benchmarks.run import make_db
+from util.loop_monitor import LoopMonitor
+from util.metrics import percentile
+
+# command_usage.command_name for commands whose case has a different name
+COMMAND_CASES = {
+    "accept_app": "process_application",
+    "accept_app_context_menu": "process_application",
+}
+
+HISTORY_SQL = """
+    SELECT command_name, COUNT(*)
+    FROM command_usage
+    WHERE timestamp >= CURRENT_DATE - %s * INTERVAL '1 day'
+    AND EXTRACT(HOUR FROM timestamp) BETWEEN %s AND %s
+    GROUP BY command_name
+"""
+
+
+@dataclasses.dataclass
+class CaseLoad:
+    """What happened to the requests for one case."""
+    requests: int = 0
+    exceptions: int = 0
+    error_responses: int = 0
+    latency_ms: List[float] = dataclasses.field(default_factory=list)
+    queue_delay_ms: List[float] = dataclasses.field(default_factory=list)
+
+    def summary(self, elapsed: float) -> Dict:
+        completed = len(self.latency_ms)
+        errors = self.exceptions + self.error_responses
+        return {
+            "requests": self.requests,
+            "completed": completed,
+            "throughput": completed / elapsed if elapsed else 0.0,
+            "error_rate": errors / self.requests if self.requests else 0.0,
+            "latency_p50_ms": percentile(self.latency_ms, 50),
+            "latency_p99_ms": percentile(self.latency_ms, 99),
+            "queue_p50_ms": percentile(self.queue_delay_ms, 50),
+            "queue_p99_ms": percentile(self.queue_delay_ms, 99),
+        }
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse weights given as `case=weight,case=weight`."""
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def mix_from_history(dsn: str, days: int = 30, hours: str = "0-23") -> Dict[str, float]:
+    """
+    Weight the cases by how often their commands were used.
+
+    Args:
+        dsn: The bot's database
+        days: How many days of command_usage to look at
+        hours: Only count commands run between these hours, e.g. 18-23 for the evening peak
+    """
+    import psycopg2
+
+    first_hour, _, last_hour = hours.partition("-")
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cursor:
+        cursor.execute(HISTORY_SQL, (days, int(first_hour), int(last_hour or first_hour)))
+        usage = cursor.fetchall()
+
+    weights: Dict[str, float] = {}
+    skipped = []
+    for command_name, count in usage:
+        case_name = COMMAND_CASES.get(command_name, command_name)
+        if case_name in CASES:
+            weights[case_name] = weights.get(case_name, 0) + count
+        else:
+            skipped.append(command_name)
+    if skipped:
+        print(f"No case for {', '.join(sorted(skipped))}, leaving them out of the mix")
+    return weights
+
+
+class LoadGenerator:
+    """
+    Sends a weighted mix of commands to a bot at a target rate.
+
+    Args:
+        bot: The bot to run commands against
+        weights: Relative weight of each case
+        rate: Requests per second to send
+        http_latency: Seconds every simulated Discord API call takes
+        seed: Seed for arrival times and the command mix, so runs are repeatable
+    """
+    def __init__(self, bot: BenchBot, weights: Dict[str, float], rate: float, http_latency: float = 0.0, seed: int = 1):
+        unknown = set(weights) - set(CASES)
+        if unknown:
+            raise ValueError(f"Unknown cases: {', '.join(sorted(unknown))}")
+        self.rate = rate
+        self.rng = random.Random(seed)
+        self.names = [name for name, weight in weights.items() if weight > 0]
+        if not self.names:
+            raise ValueError("The mix has no cases with a positive weight")
+        self.weights = [weights[name] for name in self.names]
+        self.http = {name: FakeHTTP(http_latency, keep_messages=False) for name in self.names}
+        self.cases = {name: CASES[name](bot, self.http[name]) for name in self.names}
+        self.loads = {name: CaseLoad() for name in self.names}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.elapsed = 0.0
+        self.send_elapsed = 0.0
+
+    async def _request(self, name: str, scheduled: float):
+        load = self.loads[name]
+        case = self.cases[name]
+        started = time.perf_counter()
+        load.queue_delay_ms.append((started - scheduled) * 1000)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if case.setup:
+                case.setup()
+            await case.run()
+            load.latency_ms.append((time.perf_counter() - started) * 1000)
+        except Exception:
+            load.exceptions += 1
+        finally:
+            self.in_flight -= 1
+
+    async def run(self, duration: float, drain_timeout: float = 30.0) -> Dict:
+        """Send requests for `duration` seconds, wait for them to finish and get the report."""
+        monitor = LoopMonitor(interval_ms=50)
+        monitor.start()
+        tasks = set()
+        started = time.perf_counter()
+        next_at = started
+        try:
+            while next_at - started < duration:
+                next_at += self.rng.expovariate(self.rate)
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                name = self.rng.choices(self.names, self.weights)[0]
+                self.loads[name].requests += 1
+                task = asyncio.create_task(self._request(name, next_at))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            self.send_elapsed = time.perf_counter() - started
+            if tasks:
+                await asyncio.wait(tasks, timeout=drain_timeout)
+        finally:
+            self.elapsed = time.perf_counter() - started
+            await monitor.stop()
+        for name, http in self.http.items():
+            self.loads[name].error_responses = http.error_responses
+        return self.report(monitor)
+
+    def report(self, monitor: Optional[LoopMonitor] = None) -> Dict:
+        cases = {name: load.summary(self.elapsed) for name, load in self.loads.items()}
+        queue_delays = [delay for load in self.loads.values() for delay in load.queue_delay_ms]
+        requests = sum(load.requests for load in self.loads.values())
+        errors = sum(load.exceptions + load.error_responses for load in self.loads.values())
+        return {
+            "target_rate": self.rate,
+            "elapsed": self.elapsed,
+            "requests": requests,
+            "sent_rate": requests / self.send_elapsed if self.send_elapsed else 0.0,
+            "throughput": sum(summary["completed"] for summary in cases.values()) / self.elapsed if self.elapsed else 0.0,
+            "error_rate": errors / requests if requests else 0.0,
+            "queue_p50_ms": percentile(queue_delays, 50),
+            "queue_p99_ms": percentile(queue_delays, 99),
+            "max_in_flight": self.max_in_flight,
+            "loop_lag": monitor.lag.summary() if monitor else None,
+            "cases": cases,
+        }
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}ms"
+
+
+def format_report(report: Dict) -> str:
+    lines = [
+        f"Sent {report['requests']} requests at {report['sent_rate']:.1f}/s (target {report['target_rate']:.1f}/s), "
+        f"completed {report['throughput']:.1f}/s over {report['elapsed']:.1f}s",
+        f"Errors: {report['error_rate']:.2%}   Queueing delay p50 {_ms(report['queue_p50_ms'])} "
+        f"p99 {_ms(report['queue_p99_ms'])}   Max in flight: {report['max_in_flight']}",
+    ]
+    if report["loop_lag"]:
+        lines.append(f"Event loop lag p99 {_ms(report['loop_lag']['p99_ms'])} max {_ms(report['loop_lag']['max_ms'])}")
+    lines.append("")
+    lines.append(f"{'case':<22}{'requests':>10}{'done/s':>10}{'errors':>9}{'latency p50':>13}{'p99':>10}{'queue p50':>11}{'p99':>10}")
+    for name, case in sorted(report["cases"].items()):
+        lines.append(
+            f"{name:<22}{case['requests']:>10}{case['throughput']:>10.1f}{case['error_rate']:>9.1%}"
+            f"{_ms(case['latency_p50_ms']):>13}{_ms(case['latency_p99_ms']):>10}"
+            f"{_ms(case['queue_p50_ms']):>11}{_ms(case['queue_p99_ms']):>10}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Send a weighted mix of commands to the bot at a target rate.")
+    parser.add_argument("--rate", type=float, default=20.0, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to send requests for")
+    parser.add_argument("--size", type=int, default=1000, help="Clan size")
+    parser.add_argument("--mix", help="Weights as case=weight,..., defaults to an even mix")
+    parser.add_argument("--history-dsn", help="Weight the mix by command_usage in this database")
+    parser.add_argument("--history-days", type=int, default=30, help="Days of command_usage to weight by")
+    parser.add_argument("--history-hours", default="0-23", help="Only weight by commands run in these hours, e.g. 18-23")
+    parser.add_argument("--dsn", help="Run against this Postgres instead of the in-memory DB")
+    parser.add_argument("--http-latency", type=float, default=0.05, help="Seconds every Discord API call takes")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args(argv)
+
+
+async def run_load(args) -> Dict:
+    if args.history_dsn:
+        weights = mix_from_history(args.history_dsn, args.history_days, args.history_hours)
+    elif args.mix:
+        weights = parse_mix(args.mix)
+    else:
+        weights = dict.fromkeys(CASES, 1.0)
+
+    db = make_db(args.size, args.dsn)
+    try:
+        generator = LoadGenerator(BenchBot(db), weights, args.rate, args.http_latency, args.seed)
+        report = await generator.run(args.duration)
+        query_stats = getattr(db, "query_stats", None)
+        if query_stats is not None:
+            report["top_queries"] = query_stats.top(5)
+        return report
+    finally:
+        if hasattr(db, "close"):
+            db.close()
+
+
+def main(argv=None) -> int:
+    try:
+        report = asyncio.run(run_load(parse_args(argv)))
+    except ValueError as e:
+        # An empty or unknown mix, e.g. no matching command_usage in --history-dsn
+        print(f"Can't run the load: {e}", file=sys.stderr)
+        return 1
+    print(format_report(report))
+    for query in report.get("top_queries", []):
+        print(f"  {query['total_ms']:>10.1f}ms  x{query['count']:<6} {query['fingerprint'][:90]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Memory footprint of the member roster as dicts, psycopg2 tuples and MemberRecords.
+
+    python -m benchmarks.memory                    # 10,000 members
+    python -m benchmarks.memory --sizes 1000,10000
+
+Every representation is built from a fresh copy of the roster rows, the way
+psycopg2 decodes new objects on every fetch, and measured with tracemalloc once
+the rows it was built from are gone. "refetch" is what a second fetch adds while
+the first is still held, as when a cached roster is refreshed.
+"""
+import argparse
+import dataclasses
+import datetime
+import gc
+import sys
+import tracemalloc
+from typing import Callable, Dict, List, Sequence
+
+from benchmarks.clan import Clan, build_clan
+from util.member_record import COLUMNS, member_records
+
+# Every column a MemberRecord has a field for
+ROSTER_COLUMNS = tuple(COLUMNS)
+
+REPRESENTATIONS: Dict[str, Callable[[List[tuple]], List]] = {
+    "tuple": lambda rows: rows,
+    "dict": lambda rows: [dict(zip(ROSTER_COLUMNS, row)) for row in rows],
+    "record": lambda rows: member_records(rows, ROSTER_COLUMNS),
+}
+
+
+@dataclasses.dataclass
+class MemoryResult:
+    name: str
+    size: int
+    bytes: int
+    refetch_bytes: int
+
+    @property
+    def bytes_per_member(self) -> float:
+        return self.bytes / self.size
+
+
+def _copy(value):
+    """A new object equal to value, like the one psycopg2 would decode."""
+    if isinstance(value, str):
+        return value.encode().decode()
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    if isinstance(value, datetime.date):
+        return datetime.date.fromordinal(value.toordinal())
+    return value
+
+
+def fetch(clan: Clan, columns: Sequence[str] = ROSTER_COLUMNS) -> List[tuple]:
+    """Get the clan's rows for the columns, as new objects."""
+    return [tuple(_copy(member[column]) for column in columns) for member in clan.members]
+
+
+def measure(clan: Clan, name: str) -> MemoryResult:
+    """Measure the memory one representation of the roster holds."""
+    build = REPRESENTATIONS[name]
+    # A full collection empties the free lists, otherwise rows freed while building a
+    # representation can sit on the tuple free list and still be counted against it
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        first = build(fetch(clan))
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0]
+        second = build(fetch(clan))
+        gc.collect()
+        refetched = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del first, second
+    return MemoryResult(name, clan.size, held - start, refetched - held)
+
+
+def format_result(result: MemoryResult) -> str:
+    return (f"{result.name + f'[{result.size}]':<16} {result.bytes / 1024:>10.1f}KB  "
+            f"{result.bytes_per_member:>7.1f} bytes/member  refetch {result.refetch_bytes / 1024:>10.1f}KB")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the memory the member roster takes in each representation.")
+    parser.add_argument("--sizes", default="10000", help="Comma separated clan sizes")
+    args = parser.parse_args(argv)
+    for size in (int(size) for size in args.sizes.split(",")):
+        clan = build_clan(size)
+        for name in REPRESENTATIONS:
+            print(format_result(measure(clan, name)), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+In-memory stand-in for the bot's DB helpers.
+
+Answers the queries the benchmarked commands run from a synthetic Clan, so the
+benchmarks measure the Python side of each command without needing Postgres.
+Lookups the real schema has an index for are served from dicts, everything else
+is a scan, roughly matching what Postgres would do.
+
+Any query it doesn't recognise raises UnsupportedQuery, so a change to a
+command's SQL shows up here instead of silently benchmarking an error path.
+"""
+import bisect
+import datetime
+import re
+from typing import Callable, List, Optional, Tuple
+
+from benchmarks.clan import Clan, MEMBER_COLUMNS
+from util.promotions import PromotionSchedule, coerce_date
+
+_WHITESPACE = re.compile(r"\s+")
+_SELECT_COLUMNS = re.compile(r"^SELECT (.*?) FROM ")
+
+
+class UnsupportedQuery(Exception):
+    pass
+
+
+def _normalise(query: str) -> str:
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def _parse_insert_value(token, params):
+    token = token.strip()
+    if token == "%s":
+        return next(params)
+    if token.lower() in ("true", "false"):
+        return token.lower() == "true"
+    if token.upper() == "NULL":
+        return None
+    if token.startswith("'") and token.endswith("'"):
+        return token[1:-1]
+    return int(token)
+
+
+class InMemoryDB:
+    """Implements selectOne, selectMany and execute_query over a Clan."""
+    def __init__(self, clan: Clan):
+        self.clan = clan
+        self.members = [dict(member) for member in clan.members]
+        self.lotteries = {lottery["lottery_id"]: dict(lottery) for lottery in clan.lotteries}
+        self.lottery_entries = [dict(entry) for entry in clan.lottery_entries]
+        self.command_usage = []
+        self.queries = 0
+        self.schedule = PromotionSchedule()
+        self._reindex()
+        self._routes: List[Tuple[re.Pattern, Callable]] = [
+            (re.compile(pattern), handler) for pattern, handler in [
+                (r"^SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member$", self._list_members),
+                (r"^SELECT rsn, (\w+) FROM member WHERE \1 > 0 ORDER BY \1 DESC$", self._leaderboard),
+                (r"^SELECT _id FROM member WHERE discord_id_num = %s$", self._member_id_by_discord),
+                (r"^INSERT INTO command_usage ", self._insert_command_usage),
+                (r"^SELECT lottery_id, start_date, end_date, entry_fee, max_entries, winner_id FROM lottery "
+                 r"WHERE start_date <= CURRENT_TIMESTAMP AND end_date >= CURRENT_TIMESTAMP ORDER BY start_date DESC LIMIT 1$",
+                 self._active_lottery),
+                (r"^SELECT le.member_id, le.entries_purchased, m.rsn FROM lottery_entries le JOIN member m ON le.member_id = m._id "
+                 r"WHERE le.lottery_id = (\d+) ORDER BY le.entries_purchased DESC$", self._lottery_entries_with_rsn),
+                (r"^SELECT start_date, end_date, winner_id FROM lottery WHERE lottery_id = %s$", self._lottery),
+                (r"^SELECT member_id, entries_purchased FROM lottery_entries WHERE lottery_id = %s$", self._lottery_entries),
+                (r"^UPDATE lottery SET winner_id = %s WHERE lottery_id = %s$", self._set_lottery_winner),
+                (r"^SELECT rsn, discord_id FROM member WHERE _id = %s$", self._member_name_by_id),
+                (r"^SELECT _id, rsn, discord_id_num, alt_rsn, previous_rsn FROM member WHERE lower\(rsn\) = ANY\(%\(rsns\)s\) "
+                 r"OR discord_id_num = ANY\(%\(discord_ids\)s\) OR member_alias_rsns\(alt_rsn, previous_rsn\) && %\(rsns\)s::text\[\]$",
+                 self._conflicting_members),
+                (r"^INSERT INTO member \((.*?)\) VALUES \((.*)\)$", self._insert_member),
+                (r"^INSERT INTO member \((.*?)\) SELECT (.*?) FROM unnest\(.*?\) AS applicant\((.*?)\)$", self._insert_members),
+                (r"^SELECT _id, rsn, discord_id, membership_level, join_date FROM member "
+                 r"WHERE next_promotion_date <= %\(until\)s AND active IS NOT FALSE ORDER BY next_promotion_date$",
+                 self._promotions_due),
+            ]
+        ]
+
+    def _reindex(self):
+        # Indexes the real schema has: _id (primary key), lower(rsn), discord_id_num (unique),
+        # the lowercased alt and previous names (GIN) and next_promotion_date for active
+        # members, which a trigger keeps up to date
+        self.members_by_id = {member["_id"]: member for member in self.members}
+        self.members_by_rsn = {member["rsn"].lower(): member for member in self.members}
+        self.members_by_discord = {member["discord_id_num"]: member for member in self.members}
+        self.members_by_alias = {}
+        self.promotion_index = []
+        for member in self.members:
+            self._index_aliases(member)
+            self._index_promotion(member)
+
+    def _index_aliases(self, member):
+        for name in (member["alt_rsn"] or []) + (member["previous_rsn"] or []):
+            self.members_by_alias.setdefault(name.lower(), []).append(member)
+
+    def _index_promotion(self, member):
+        if member["active"] is False or member["join_date"] is None or member["membership_level"] is None:
+            return
+        due = self.schedule.due_date(member["membership_level"], member["join_date"])
+        if due is not None:
+            bisect.insort(self.promotion_index, (due, member["_id"]))
+
+    def _run(self, query: str, params) -> Optional[List[tuple]]:
+        self.queries += 1
+        query = _normalise(query)
+        for pattern, handler in self._routes:
+            match = pattern.match(query)
+            if match:
+                return handler(match, params if isinstance(params, dict) else tuple(params or ()))
+        raise UnsupportedQuery(query)
+
+    def selectOne(self, query, params=None):
+        rows = self._run(query, params)
+        return rows[0] if rows else None
+
+    def selectMany(self, query, params=None, row_factory=None):
+        rows = self._run(query, params)
+        if row_factory is None or rows is None:
+            return rows
+        make = row_factory(tuple(column.strip() for column in _SELECT_COLUMNS.match(_normalise(query)).group(1).split(",")))
+        return list(map(make, rows))
+
+    def execute_query(self, query, params=None):
+        self._run(query, params)
+        return True
+
+    # Queries
+
+    def _list_members(self, match, params):
+        return [(m["rsn"], m["discord_id"], m["alt_rsn"], m["previous_rsn"]) for m in self.members]
+
+    def _leaderboard(self, match, params):
+        column = match.group(1)
+        rows = [(m["rsn"], m[column]) for m in self.members if m[column] > 0]
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def _member_id_by_discord(self, match, params):
+        member = self.members_by_discord.get(params[0])
+        return [(member["_id"],)] if member else []
+
+    def _insert_command_usage(self, match, params):
+        self.command_usage.append(params)
+        return []
+
+    def _active_lottery(self, match, params):
+        now = datetime.datetime.now()
+        active = [l for l in self.lotteries.values() if l["start_date"] <= now <= l["end_date"]]
+        active.sort(key=lambda l: l["start_date"], reverse=True)
+        return [tuple(l[c] for c in ("lottery_id", "start_date", "end_date", "entry_fee", "max_entries", "winner_id")) for l in active[:1]]
+
+    def _lottery_entries_with_rsn(self, match, params):
+        lottery_id = int(match.group(1))
+        rows = [(e["member_id"], e["entries_purchased"], self.members_by_id[e["member_id"]]["rsn"])
+                for e in self.lottery_entries if e["lottery_id"] == lottery_id]
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def _lottery(self, match, params):
+        lottery = self.lotteries.get(params[0])
+        return [(lottery["start_date"], lottery["end_date"], lottery["winner_id"])] if lottery else []
+
+    def _lottery_entries(self, match, params):
+        return [(e["member_id"], e["entries_purchased"]) for e in self.lottery_entries if e["lottery_id"] == params[0]]
+
+    def _set_lottery_winner(self, match, params):
+        winner_id, lottery_id = params
+        self.lotteries[lottery_id]["winner_id"] = winner_id
+        return []
+
+    def _member_name_by_id(self, match, params):
+        member = self.members_by_id.get(params[0])
+        return [(member["rsn"], member["discord_id"])] if member else []
+
+    def _insert_member(self, match, params):
+        columns = [column.strip() for column in match.group(1).split(",")]
+        param_iter = iter(params)
+        values = [_parse_insert_value(token, param_iter) for token in match.group(2).split(",")]
+        member = dict.fromkeys(MEMBER_COLUMNS)
+        member.update(zip(columns, values))
+        self._add_member(member)
+        return []
+
+    def _insert_members(self, match, params):
+        columns = [column.strip() for column in match.group(1).split(",")]
+        selected = [token.strip() for token in match.group(2).split(",")]
+        names = [name.strip() for name in match.group(3).split(",")]
+        # params are parallel arrays, one per unnest column
+        for row in zip(*params):
+            values = dict(zip(names, row))
+            member = dict.fromkeys(MEMBER_COLUMNS)
+            for column, token in zip(columns, selected):
+                member[column] = values[token] if token in values else _parse_insert_value(token, iter(()))
+            self._add_member(member)
+        return []
+
+    def _add_member(self, member):
+        # Postgres casts an inserted string to a date
+        member["join_date"] = coerce_date(member["join_date"])
+        member["_id"] = len(self.members) + 1
+        self.members.append(member)
+        self.members_by_id[member["_id"]] = member
+        self.members_by_rsn[member["rsn"].lower()] = member
+        self.members_by_discord[member["discord_id_num"]] = member
+        self._index_aliases(member)
+        self._index_promotion(member)
+
+    def _conflicting_members(self, match, params):
+        found = {}
+        for rsn in params["rsns"]:
+            for member in [self.members_by_rsn.get(rsn)] + self.members_by_alias.get(rsn, []):
+                if member is not None:
+                    found[member["_id"]] = member
+        for discord_id_num in params["discord_ids"]:
+            member = self.members_by_discord.get(discord_id_num)
+            if member is not None:
+                found[member["_id"]] = member
+        return [(m["_id"], m["rsn"], m["discord_id_num"], m["alt_rsn"], m["previous_rsn"]) for m in found.values()]
+
+    def _promotions_due(self, match, params):
+        end = bisect.bisect_right(self.promotion_index, (params["until"], float("inf")))
+        members = (self.members_by_id[member_id] for _, member_id in self.promotion_index[:end])
+        return [(m["_id"], m["rsn"], m["discord_id"], m["membership_level"], m["join_date"]) for m in members]
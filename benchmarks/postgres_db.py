@@ -0,0 +1,81 @@
+"""
+Local Postgres backend for the benchmarks.
+
+Creates a scratch schema, builds the real tables from sql/create-db.sql, loads
+a synthetic Clan into it and runs queries through the bot's own DB helpers, so
+benchmarks include real query planning, network round trips and row decoding.
+The schema is dropped again on close().
+"""
+import os
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from bot import CoffeeHouseBot
+from benchmarks.clan import Clan, MEMBER_COLUMNS
+from util.query_stats import QueryStats
+
+CREATE_DB_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql", "create-db.sql")
+
+
+class PostgresDB:
+    """
+    The bot's DB helpers running against a scratch schema.
+
+    Args:
+        dsn: Connection string for a Postgres the benchmarks may create schemas in
+        clan: The clan to load
+        schema: Name of the scratch schema, dropped and recreated
+    """
+    # Borrow the real helpers so the benchmarks time exactly what the bot runs
+    selectOne = CoffeeHouseBot.selectOne
+    selectMany = CoffeeHouseBot.selectMany
+    execute_query = CoffeeHouseBot.execute_query
+    check_database_connection = CoffeeHouseBot.check_database_connection
+    _record_query = CoffeeHouseBot._record_query
+    invalidate_render_cache = CoffeeHouseBot.invalidate_render_cache
+
+    def __init__(self, dsn: str, clan: Clan, schema: str = "coffeehouse_bench"):
+        self.dsn = dsn
+        self.schema = schema
+        self.query_stats = QueryStats(slow_threshold_ms=float("inf"))
+        self.conn = psycopg2.connect(dsn)
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {schema}")
+            cursor.execute(f"SET search_path TO {schema}")
+            with open(CREATE_DB_SQL) as sql_file:
+                cursor.execute(sql_file.read())
+        self.conn.commit()
+        self.load(clan)
+
+    def getDatabaseConnection(self):
+        self.conn = psycopg2.connect(self.dsn)
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"SET search_path TO {self.schema}")
+        self.conn.commit()
+        return True
+
+    def load(self, clan: Clan):
+        with self.conn.cursor() as cursor:
+            execute_values(cursor, f"INSERT INTO member ({', '.join(MEMBER_COLUMNS)}) VALUES %s", clan.member_rows())
+            cursor.execute("SELECT setval(pg_get_serial_sequence('member', '_id'), (SELECT MAX(_id) FROM member))")
+            lottery_columns = ("lottery_id", "start_date", "end_date", "entry_fee", "max_entries", "winner_id")
+            execute_values(
+                cursor,
+                f"INSERT INTO lottery ({', '.join(lottery_columns)}) VALUES %s",
+                [tuple(lottery[column] for column in lottery_columns) for lottery in clan.lotteries],
+            )
+            execute_values(
+                cursor,
+                "INSERT INTO lottery_entries (lottery_id, member_id, entries_purchased) VALUES %s",
+                [(entry["lottery_id"], entry["member_id"], entry["entries_purchased"]) for entry in clan.lottery_entries],
+            )
+            cursor.execute("ANALYZE")
+        self.conn.commit()
+
+    def close(self):
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {self.schema} CASCADE")
+        self.conn.commit()
+        self.conn.close()
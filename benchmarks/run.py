@@ -0,0 +1,158 @@
+"""
+Command line entry point for the benchmarks.
+
+    python -m benchmarks.run                          # every case at 100, 1000 and 10000 members
+    python -m benchmarks.run --cases list_members --sizes 10000
+    python -m benchmarks.run --save-baseline          # record the current numbers
+    python -m benchmarks.run --dsn postgresql://...   # run against a local Postgres instead
+
+Results are compared with benchmarks/baselines.json. A case whose p50 latency is
+more than --threshold slower than its baseline is reported as a regression and
+the run exits with status 1. Baselines are only compared with runs on the same
+backend, since Postgres and the in-memory DB time nothing alike. Saving a
+baseline replaces the entries for the cases and sizes that were run and keeps
+the rest.
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import os
+import platform
+import sys
+from typing import Dict, List
+
+from benchmarks.cases import CASES
+from benchmarks.clan import build_clan
+from benchmarks.fakes import BenchBot, FakeHTTP
+from benchmarks.harness import BenchmarkResult, run_case
+from benchmarks.memory_db import InMemoryDB
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+# Differences smaller than this are timer noise, whatever the percentage
+NOISE_FLOOR_MS = 0.05
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bot's commands against a synthetic clan.")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma separated clan sizes")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma separated cases to run")
+    parser.add_argument("--dsn", help="Run against this Postgres instead of the in-memory DB")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to time each case for")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file to compare with or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed p50 slowdown before failing, 0.25 = 25%%")
+    args = parser.parse_args(argv)
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+    args.cases = args.cases.split(",")
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error(f"Unknown cases: {', '.join(sorted(unknown))}. Choose from {', '.join(CASES)}")
+    return args
+
+
+def make_db(size: int, dsn=None):
+    clan = build_clan(size)
+    if dsn:
+        from benchmarks.postgres_db import PostgresDB
+        return PostgresDB(dsn, clan)
+    return InMemoryDB(clan)
+
+
+async def run_benchmarks(case_names: List[str], sizes: List[int], dsn=None, min_time: float = 1.0) -> List[BenchmarkResult]:
+    results = []
+    unsized_done = set()
+    for size in sizes:
+        db = make_db(size, dsn)
+        try:
+            for name in case_names:
+                if name in unsized_done:
+                    continue
+                bot = BenchBot(db)
+                case = CASES[name](bot, FakeHTTP())
+                if not case.sized:
+                    unsized_done.add(name)
+                result = await run_case(name, size if case.sized else None, case, db, min_time=min_time)
+                print(format_result(result), flush=True)
+                results.append(result)
+        finally:
+            if hasattr(db, "close"):
+                db.close()
+    return results
+
+
+def format_result(result: BenchmarkResult) -> str:
+    return (f"{result.key:<32} {result.ops_per_sec:>10.1f} ops/s  p50 {result.p50_ms:>9.3f}ms  "
+            f"p95 {result.p95_ms:>9.3f}ms  p99 {result.p99_ms:>9.3f}ms  peak {result.peak_kb:>9.1f}KB  "
+            f"{result.queries_per_op:.1f} queries/op")
+
+
+def backend_name(dsn=None) -> str:
+    return "postgres" if dsn else "memory"
+
+
+def load_baseline(path: str) -> Dict:
+    """Get the whole baseline file, its backend and results, or an empty dict if there isn't one."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path: str, results: List[BenchmarkResult], backend: str):
+    """Save results over the baseline's entries for them, keeping the rest if it's for the same backend."""
+    previous = load_baseline(path)
+    saved = previous.get("results", {}) if previous.get("backend") == backend else {}
+    saved.update({result.key: dataclasses.asdict(result) for result in results})
+    baseline = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "backend": backend,
+        "results": saved,
+    }
+    with open(path, "w") as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+
+def find_regressions(results: List[BenchmarkResult], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Get a line for every result whose p50 is more than `threshold` slower than its baseline."""
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.key)
+        if previous is None:
+            continue
+        allowed = previous["p50_ms"] * (1 + threshold)
+        if result.p50_ms > allowed and result.p50_ms - previous["p50_ms"] > NOISE_FLOOR_MS:
+            change = (result.p50_ms / previous["p50_ms"] - 1) * 100
+            regressions.append(f"{result.key}: p50 {previous['p50_ms']:.3f}ms -> {result.p50_ms:.3f}ms (+{change:.0f}%)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    backend = backend_name(args.dsn)
+    results = asyncio.run(run_benchmarks(args.cases, args.sizes, args.dsn, args.min_time))
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, backend)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline and baseline.get("backend") != backend:
+        print(f"\nNot comparing with {args.baseline}, it was recorded on the {baseline.get('backend')} backend "
+              f"and this run used {backend}. Run with --save-baseline to record one for {backend}.")
+        return 0
+
+    regressions = find_regressions(results, baseline.get("results", {}), args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
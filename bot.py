@@ -16,11 +16,18 @@
 # - notify of comp lead change
 # - database connection restart on failure
 #######
+import asyncio
+import contextvars
+import dataclasses
 import json
 import os
 import pprint
 import ssl
+import sys
 import datetime
+import itertools
+import math
+import time
 import discord
 import logging
 import urllib.parse 
@@ -29,54 +36,196 @@ from discord import app_commands
 from dotenv import load_dotenv
 import psycopg2
 import wom
+from util.startup import StartupReport, CogLoadTiming, plan_cog_load_stages, DEFAULT_COG_DEPENDENCIES
+from util.command_sync import CommandSyncState, command_tree_fingerprint, sync_scope
+from util.message_dispatch import MessageDispatcher
+from util.loop_monitor import LoopMonitor
+from util.role_grants import RoleGrantQueue
+from util.confirmations import ConfirmationButton, Confirmations
+from util.cluster import ClusterClient, ClusterLauncher, cluster_path, recommended_shard_count
+from util.member_cache import CacheProfile, MemberCacheTrimmer, cache_report, resident_memory_bytes
+from util.render_cache import RenderCache, get_render_cache
+from util.query_stats import QueryStats, slow_query_log
+from util.command_timing import CommandMetrics
+from util.logging_setup import setup_logging, stop_logging
+from util.promotions import PROMOTION_THRESHOLDS_SQL, REPLACE_PROMOTION_THRESHOLDS_SQL, PromotionSchedule, coerce_date, get_schedule
 
 __version__ = '0.1.0'
 
-log = logging.getLogger('discord')
-logging.basicConfig(level=os.getenv('LOGLEVEL', 'INFO'))
-log = logging.getLogger('discord')
-log.propagate = False  # Prevent propagation to root logger to avoid duplicate logs
+log = logging.getLogger('bot')
+
+# The cog currently being loaded, used to attribute add_cog time to its extension
+_loading_cog = contextvars.ContextVar('_loading_cog', default=None)
 
 class CoffeeHouseBot(commands.AutoShardedBot):
-    def __init__(self):
-        intents = discord.Intents.default()
-        intents.presences = True
-        intents.members = True
-        intents.message_content = True
-        intents.guilds = True
-        
+    def __init__(self, cluster: ClusterClient = None):
+        self.startup_report = StartupReport()
+
+        # Set when this process runs one cluster of the bot's shards, see util/cluster.py
+        self.cluster = cluster
+
         # read in configs
         with open("config.json") as json_data_file:
             self.configs = json.load(json_data_file)
 
+        # Log through a queue so writing logs never blocks the event loop.
+        # Each cluster writes its own files, so they don't clobber each other's.
+        logging_settings = dict(self.configs.get("logging") or {})
+        logging_settings["file"] = cluster_path(logging_settings.get("file"), cluster)
+        # The slow query log is written by the same listener, as its own file for discord.slow_query
+        files = dict(logging_settings.get("files") or {})
+        if self.configs.get("slow_query_log_path"):
+            files[slow_query_log.name] = self.configs["slow_query_log_path"]
+        logging_settings["files"] = {name: cluster_path(path, cluster) for name, path in files.items()}
+        setup_logging(logging_settings)
+
+        # Fingerprints of the last command sync, so restarts don't resync unchanged commands
+        self.command_sync_state = CommandSyncState(cluster_path(self.configs.get("command_sync_state_path", ".command_sync.json"), cluster))
+
+        # Cog on_message handlers, rebuilt whenever a cog is added or removed
+        self.message_dispatcher = MessageDispatcher(
+            timeout=float(self.configs.get("message_handler_timeout", 10)),
+            concurrency=int(self.configs.get("message_handler_concurrency", 32)),
+        )
+        # Only log one in every N messages at debug level
+        self.message_log_sample_rate = max(1, int(self.configs.get("message_log_sample_rate", 100)))
+        self._message_log_counter = itertools.count()
+
+        # Promotion thresholds, from config so they can change without a release
+        self.promotion_schedule = PromotionSchedule.from_config(self.configs)
+
+        # Watches for blocking calls stalling the event loop
+        self.loop_monitor = LoopMonitor(**self.configs.get("loop_monitor", {}))
+
+        # Role grants from cogs share Discord's rate limits, so they go through one paced queue
+        self.role_grants = RoleGrantQueue(**self.configs.get("role_grants", {}))
+
+        # Yes/no prompts kept in the DB, so their buttons still work after a restart
+        self.confirmations = Confirmations(self)
+
+        # Gateway intents and caching, presences are off and only managed or active members are kept by default
+        self.cache_profile = CacheProfile.from_config(self.configs.get("gateway"))
+        self.member_cache_trimmer = None
+        if self.cache_profile.member_cache == "managed":
+            self.member_cache_trimmer = MemberCacheTrimmer(self.cache_profile, self.configs.get("discord_role_names", []))
+
+        # Rendered responses of read-only commands, dropped when the tables they read are written to
+        self.render_cache = RenderCache.from_config(self.configs.get("render_cache"))
+
+        # Timings for every query run through the DB helpers
+        self.query_stats = QueryStats(slow_threshold_ms=float(self.configs.get("slow_query_threshold_ms", 200)))
+
+        # Latency of each command run through log_command
+        self.command_metrics = CommandMetrics()
+
         # Connect to db
         self.getDatabaseConnection()
 
-        super().__init__(command_prefix=self.configs["command_prefix"], intents=intents)
+        super().__init__(
+            command_prefix=self.configs["command_prefix"],
+            **self.cache_profile.client_options(),
+            shard_ids=cluster.shard_ids if cluster else None,
+            shard_count=cluster.shard_count if cluster else None,
+        )
+
+    @property
+    def is_primary_cluster(self):
+        """Whether this process should run the jobs that only need to run once for the whole bot."""
+        return self.cluster is None or self.cluster.is_primary
 
     async def setup_hook(self):
         """This is called when the bot starts up"""
+        self.loop_monitor.start()
+
+        if self.member_cache_trimmer is not None:
+            self.member_cache_trimmer.start(self)
+
+        if self.cluster is not None:
+            self.cluster.add_command("stats", self.cluster_stats)
+            self.cluster.add_command("cache_stats", self.cache_stats)
+            self.cluster.on("extension", self.on_cluster_extension)
+            self.cluster.on("render_cache", self.on_cluster_render_cache)
+            self.cluster.on("shutdown", lambda _: self.close())
+            self.cluster.start()
+
+        # Make sure member.next_promotion_date follows the configured thresholds
+        if self.is_primary_cluster:
+            self.sync_promotion_thresholds()
+
+        # Route confirmation buttons from any message, including ones sent before this start
+        self.add_dynamic_items(ConfirmationButton)
+        self.confirmations.purge_expired()
+
         # Load all cogs
-        for cog in self.configs["cogs"]:
-            try:
-                print(f'Loading cog {cog}')
-                await self.load_extension(cog)
-            except Exception as e:
-                log.warning(f'Couldn\'t load cog {cog}: {str(e)}')
+        await self.load_cogs()
         
-        # Sync commands globally
-        try:
-            print('Syncing commands globally...')
-            synced = await self.tree.sync()
-            print(f'Synced {len(synced)} commands globally!')
-        except Exception as error:
-            log.error(f'Failed to sync commands: {error}')
+        # Sync commands globally, once for the whole bot
+        if self.is_primary_cluster:
+            try:
+                synced = await self.sync_app_commands()
+                if synced is not None:
+                    log.info('Synced %d commands globally', len(synced))
+            except Exception as error:
+                log.error(f'Failed to sync commands: {error}')
 
         # Initialize WOM client
         self.wom_client = wom.Client(
             api_base_url="https://api.wiseoldman.net/v2",
         )
 
+    async def load_cogs(self):
+        """
+        Load every cog in configs["cogs"].
+        Cogs are grouped into stages using configs["cog_dependencies"] and each stage is loaded concurrently.
+        """
+        dependencies = self.configs.get("cog_dependencies", DEFAULT_COG_DEPENDENCIES)
+        stages = plan_cog_load_stages(self.configs["cogs"], dependencies)
+        
+        started = time.perf_counter()
+        for stage_num, stage in enumerate(stages):
+            timings = await asyncio.gather(*(self._load_cog_timed(cog, stage_num) for cog in stage))
+            self.startup_report.cogs.extend(timings)
+        self.startup_report.cog_load_ms = (time.perf_counter() - started) * 1000
+        
+        for line in self.startup_report.summary_lines():
+            log.info(line)
+        return self.startup_report.cogs
+
+    async def _load_cog_timed(self, cog, stage_num):
+        """Load a single cog, recording import and setup time."""
+        timing = CogLoadTiming(name=cog, stage=stage_num)
+        token = _loading_cog.set(timing)
+        started = time.perf_counter()
+        try:
+            await self.load_extension(cog)
+        except Exception as e:
+            timing.error = str(e)
+            log.warning(f'Couldn\'t load cog {cog}: {str(e)}')
+        finally:
+            _loading_cog.reset(token)
+        # Everything that isn't add_cog is module import
+        timing.import_ms = max((time.perf_counter() - started) * 1000 - timing.setup_ms, 0.0)
+        return timing
+
+    async def add_cog(self, cog, /, **kwargs):
+        timing = _loading_cog.get()
+        started = time.perf_counter()
+        try:
+            await super().add_cog(cog, **kwargs)
+        finally:
+            if timing is not None:
+                timing.setup_ms += (time.perf_counter() - started) * 1000
+        self.rebuild_message_handlers()
+
+    async def remove_cog(self, name, /, **kwargs):
+        cog = await super().remove_cog(name, **kwargs)
+        self.rebuild_message_handlers()
+        return cog
+
+    def rebuild_message_handlers(self):
+        """Rebuild the table of cog on_message handlers that non-command messages are forwarded to."""
+        self.message_dispatcher.rebuild(self.cogs.values(), self.getConfigValue)
+
     async def close(self):
         """Cleanup when the bot shuts down"""
         # Close the WOM client if it exists
@@ -85,58 +234,158 @@ class CoffeeHouseBot(commands.AutoShardedBot):
                 await self.wom_client.close()
             except Exception as e:
                 log.error(f'Error closing WOM client: {e}')
+
+        await self.message_dispatcher.close()
+        await self.loop_monitor.stop()
+        await self.role_grants.stop()
+        if self.member_cache_trimmer is not None:
+            await self.member_cache_trimmer.stop()
         
         # Call the parent class's close method
         await super().close()
+        
+        # Flush any logs still waiting to be written
+        stop_logging()
 
     async def on_ready(self):
-        print(f'{self.user} has connected to Discord!')
         log.info('Logged in as')
         log.info(f'Bot-Name: {self.user.name} | ID: {self.user.id}')
         log.info(f'Discord Version: {discord.__version__}')
         log.info(f'Bot Version: {__version__}')
         
-        # Sync to test server if specified
-        if "test_server_guild_id" in self.configs:
+        # Only the first on_ready counts towards the startup report
+        if self.startup_report.ready_ms is None:
+            self.startup_report.mark_ready()
+            log.info(f'Time to ready: {self.startup_report.ready_ms:.1f}ms')
+            log.info(f'Startup report: {json.dumps(self.startup_report.to_dict())}')
+            # Let the launcher start the next cluster
+            if self.cluster is not None:
+                self.cluster.ready()
+        
+        # Sync to test server if specified, from the cluster running its shard
+        if "test_server_guild_id" in self.configs and (self.cluster is None or self.cluster.owns_guild(self.configs["test_server_guild_id"])):
             try:
-                print(f'Syncing commands to test server...')
+                log.info('Syncing commands to test server...')
                 guild_id = self.configs["test_server_guild_id"]
-                print(f'Looking for guild with ID: {guild_id}')
                 
                 # List all guilds the bot is in for debugging
-                print(f'Bot is in {len(self.guilds)} guilds:')
-                for g in self.guilds:
-                    print(f'  - {g.name} (ID: {g.id})')
-                    # print(f'Permissions:')
-                    # for permission in g.me.guild_permissions:
-                    #     print(f'  - {permission}')
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug('Bot is in %d guilds: %s', len(self.guilds), ', '.join(f'{g.name} (ID: {g.id})' for g in self.guilds))
                 
                 guild = self.get_guild(guild_id)
                 if guild is None:
-                    log.error(f'Could not find guild with ID {guild_id}')
-                    print(f'ERROR: Guild with ID {guild_id} not found. Make sure the bot is in this server.')
+                    log.error('Could not find guild with ID %s. Make sure the bot is in this server.', guild_id)
                     return
                 
-                print(f'Found guild: {guild.name}')
-                synced = await self.tree.sync(guild=guild)
-                print(f'Synced {len(synced)} commands to test server!')
-                
-                # List the synced commands
-                print('Synced commands:')
-                for cmd in synced:
-                    print(f'  - {cmd.name}')
+                synced = await self.sync_app_commands(guild=guild)
+                if synced is not None:
+                    log.info('Synced %d commands to test server %s: %s', len(synced), guild.name, ', '.join(cmd.name for cmd in synced))
             except Exception as error:
                 log.error(f'Failed to sync commands to test server: {error}')
-                print(f'ERROR: {error}')
+
+    def cluster_stats(self, data=None):
+        """Stats for this process's shards, what each cluster answers a stats request with."""
+        latency = self.latency
+        return {
+            "cluster_id": self.cluster.cluster_id if self.cluster is not None else 0,
+            "shard_ids": sorted(self.shards),
+            "guilds": len(self.guilds),
+            "members": sum(guild.member_count or 0 for guild in self.guilds),
+            "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+            "pid": os.getpid(),
+        }
+
+    def cache_stats(self, data=None):
+        """Estimated memory used by each of this process's caches, and its resident memory."""
+        return {
+            "rss_bytes": resident_memory_bytes(),
+            "caches": [dataclasses.asdict(usage) for usage in cache_report(self)],
+            "trimmed": self.member_cache_trimmer.trimmed if self.member_cache_trimmer is not None else None,
+            "render_cache": self.render_cache.report(),
+        }
+
+    async def gather_cluster_stats(self):
+        """Stats from every cluster by cluster ID, or just this process when it isn't clustered."""
+        if self.cluster is None:
+            return {0: self.cluster_stats()}
+        return await self.cluster.request("stats")
+
+    async def gather_cache_stats(self):
+        """Cache memory from every cluster by cluster ID, or just this process when it isn't clustered."""
+        if self.cluster is None:
+            return {0: self.cache_stats()}
+        return await self.cluster.request("cache_stats")
+
+    def invalidate_render_cache(self, query):
+        """Drop cached responses a statement may have changed, here and on the other clusters."""
+        cache = get_render_cache(self)
+        if cache is None:
+            return
+        tables = cache.invalidate_query(query)
+        if tables != set() and self.cluster is not None:
+            # None means the statement couldn't be matched to a table and everything was dropped
+            self.cluster.broadcast("render_cache", {"tables": sorted(tables) if tables is not None else None})
+
+    def on_cluster_render_cache(self, data):
+        """Drop cached responses because another cluster wrote to their tables."""
+        if data["tables"] is None:
+            self.render_cache.invalidate_all()
+        else:
+            self.render_cache.invalidate(*data["tables"])
+
+    async def on_cluster_extension(self, data):
+        """Load, unload or reload an extension because another cluster did."""
+        action = {
+            "load": self.load_extension,
+            "unload": self.unload_extension,
+            "reload": self.reload_extension,
+        }[data["action"]]
+        try:
+            await action(data["name"])
+            log.info('%sed %s to match another cluster', data["action"].capitalize(), data["name"])
+        except commands.ExtensionError as error:
+            log.error(f'Failed to {data["action"]} {data["name"]} to match another cluster: {error}')
+
+    async def sync_app_commands(self, guild=None, force=False):
+        """
+        Sync app commands for a scope, skipping the sync if the command tree hasn't changed since the last one.
+        
+        Args:
+            guild: The guild to sync, or None to sync global commands
+            force: Sync even if the fingerprint is unchanged
+            
+        Returns:
+            list: The synced commands, or None if the sync was skipped
+        """
+        scope = sync_scope(guild)
+        fingerprint = command_tree_fingerprint(self.tree, guild)
+        if not force and self.command_sync_state.get(self.application_id, scope) == fingerprint:
+            log.info(f'Commands for {scope} are unchanged, skipping sync')
+            return None
+        
+        log.info(f'Syncing commands for {scope}...')
+        synced = await self.tree.sync(guild=guild)
+        self.command_sync_state.set(self.application_id, scope, fingerprint)
+        return synced
 
     async def on_command(self, ctx):
         log.info(f'recieved command: {ctx.message}')
         msg = ctx.message
 
+    async def on_interaction(self, interaction):
+        # Keep people using commands in the member cache
+        if self.member_cache_trimmer is not None:
+            self.member_cache_trimmer.seen(interaction.guild_id, interaction.user.id)
+
     async def on_message(self, message):
         # if message.author.bot or message.author.id in loadconfig.__blacklist__:
         #     return
-        log.info(f'recieved message: {message}')
+        if log.isEnabledFor(logging.DEBUG) and next(self._message_log_counter) % self.message_log_sample_rate == 0:
+            log.debug(f'recieved message {message.id} in channel {message.channel.id} from {message.author.id}')
+        
+        # Keep people talking in the member cache
+        if self.member_cache_trimmer is not None and message.guild is not None:
+            self.member_cache_trimmer.seen(message.guild.id, message.author.id)
         
         # Process commands first
         await self.process_commands(message)
@@ -145,65 +394,38 @@ class CoffeeHouseBot(commands.AutoShardedBot):
         if message.content.startswith(self.command_prefix):
             return
             
-        # Forward non-command messages to cogs for event handling
-        for cog in self.cogs.values():
-            if hasattr(cog, 'on_message'):
-                try:
-                    await cog.on_message(message)
-                except Exception as e:
-                    log.error(f"Error in {cog.__class__.__name__}.on_message: {e}")
+        # Forward non-command messages to the cogs that handle them, without waiting for them to finish
+        self.message_dispatcher.dispatch(message)
 
-    # Use the current membership level to find when the next promotion is due
+    # The date the member's next level is due, the same date member.next_promotion_date holds
     def getNextMemLvlDate(self, mem_lvl, join_date):
-        next_lvl = int(mem_lvl) + 1
-        if (next_lvl < 5):
-            today = datetime.date.today()
-            
-            # Ensure join_date is a datetime.date object
-            if isinstance(join_date, str):
-                try:
-                    # Try to parse the date string
-                    join_date = datetime.datetime.strptime(join_date, "%Y-%m-%d").date()
-                except ValueError:
-                    # If parsing fails, return None
-                    return None
-            elif isinstance(join_date, datetime.datetime):
-                # Convert datetime to date if needed
-                join_date = join_date.date()
-            elif not isinstance(join_date, datetime.date):
-                # If it's not a date, datetime, or string, return None
-                return None
-                
-            days_as_member = today - join_date
-            days_as_member_int = days_as_member.days  # Convert timedelta to integer
-            print(f'days_as_member_int: {days_as_member_int}')
-            if days_as_member_int < 14: # 2 weeks
-                return join_date + datetime.timedelta(days=14)
-            elif days_as_member_int < 84: # 12 weeks
-                return join_date + datetime.timedelta(days=84)
-            elif days_as_member_int < 182: # 26 weeks
-                return join_date + datetime.timedelta(days=182)
-            elif days_as_member_int < 365: # 52 weeks
-                return join_date + datetime.timedelta(days=365)
-            else:
-                return None
-        else:
+        join_date = coerce_date(join_date)
+        if join_date is None:
             return None
+        return get_schedule(self).due_date(int(mem_lvl), join_date)
 
-    # Use the current membership level to find when the next promotion is due
+    # Use the member's time served to find the level they should have reached
     def getExpectedMemLvlByJoinDate(self, join_date):
-        today = datetime.date.today()
-        days_as_member = today - join_date
-        if days_as_member < datetime.timedelta(days = 14): # Under 2 weeks
-            return 0
-        elif days_as_member > datetime.timedelta(days = 14) and days_as_member < datetime.timedelta(days = 84): # Between 2 weeks and 12 weeks
-            return 1
-        elif days_as_member > datetime.timedelta(days = 84) and days_as_member < datetime.timedelta(days = 182): #  Between 12 weeks and 26 weeks
-            return 2
-        # elif days_as_member > datetime.timedelta(days = 182) and days_as_member < datetime.timedelta(days = 365): # Between 26 weeks and 52 weeks
-        #     return 3
-        else:
-            return 3
+        return get_schedule(self).expected_level(join_date)
+
+    def sync_promotion_thresholds(self):
+        """
+        Make the promotion_threshold table match promotion_days from config.
+        If it changes, every member's next_promotion_date is recalculated.
+        
+        Returns:
+            bool: True if the thresholds changed, False if they were already up to date
+            or couldn't be replaced
+        """
+        wanted = get_schedule(self).thresholds()
+        current = self.selectMany(PROMOTION_THRESHOLDS_SQL)
+        if current is None or [tuple(row) for row in current] == wanted:
+            return False
+        
+        log.info('Promotion thresholds changed from %s to %s, recalculating next promotion dates', current, wanted)
+        levels = [level for level, _ in wanted]
+        days = [days for _, days in wanted]
+        return bool(self.execute_query(REPLACE_PROMOTION_THRESHOLDS_SQL, (levels, days)))
 
     # Get the name of the next membership level
     def getNextMemLvl(self, current):
@@ -240,22 +462,22 @@ class CoffeeHouseBot(commands.AutoShardedBot):
                     # Roll back the aborted transaction
                     try:
                         self.conn.rollback()
-                        print("Rolled back aborted transaction")
+                        log.info("Rolled back aborted transaction")
                     except Exception as rollback_error:
-                        print(f"Error rolling back transaction: {rollback_error}")
+                        log.error(f"Error rolling back transaction: {rollback_error}")
                 # Close the connection
                 try:
                     self.conn.close()
-                    print("Closed existing connection with issues")
+                    log.info("Closed existing connection with issues")
                 except Exception as close_error:
-                    print(f"Error closing connection: {close_error}")
+                    log.error(f"Error closing connection: {close_error}")
             except Exception as e:
                 # For any other error, try to close the connection
                 try:
                     self.conn.close()
-                    print("Closed existing connection due to error")
+                    log.info("Closed existing connection due to error")
                 except Exception as close_error:
-                    print(f"Error closing connection: {close_error}")
+                    log.error(f"Error closing connection: {close_error}")
         
         # Get database connection parameters
         db_name = self.getConfigValue("db_name")
@@ -267,10 +489,10 @@ class CoffeeHouseBot(commands.AutoShardedBot):
         # Establish a new connection
         try:
             self.conn = psycopg2.connect(f'postgres://{db_user}:{db_pw}@{db_host}:{db_port}/{db_name}?sslmode=require')
-            print(f'Successful connection to database - {self.conn.get_dsn_parameters()}')
+            log.info('Successful connection to database - %s', self.conn.get_dsn_parameters())
             return True
         except Exception as e:
-            print(f"Failed to connect to database: {e}")
+            log.error(f"Failed to connect to database: {e}")
             self.conn = None
             return False
 
@@ -284,80 +506,163 @@ class CoffeeHouseBot(commands.AutoShardedBot):
             return True
         except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
             # Connection is not active, attempt to reconnect
-            print(f"Database connection issue detected: {e}")
+            log.warning(f"Database connection issue detected: {e}")
             try:
                 return self.getDatabaseConnection()
             except Exception as reconnect_error:
-                print(f"Failed to reconnect to database: {reconnect_error}")
+                log.error(f"Failed to reconnect to database: {reconnect_error}")
                 return False
         except Exception as e:
-            print(f"Error checking database connection: {e}")
+            log.warning(f"Error checking database connection: {e}")
             # Try to reconnect as a fallback
             try:
                 return self.getDatabaseConnection()
             except Exception as reconnect_error:
-                print(f"Failed to reconnect to database: {reconnect_error}")
+                log.error(f"Failed to reconnect to database: {reconnect_error}")
                 return False
 
-    def selectMany(self, query, params=None):
+    def _record_query(self, query, started, rows=0, error=False):
+        """Record how long a query took, tagged with the module that called the DB helper."""
+        caller = sys._getframe(2).f_globals.get('__name__')
+        self.query_stats.record(query, (time.perf_counter() - started) * 1000, rows, tag=caller, error=error)
+
+    def selectMany(self, query, params=None, row_factory=None):
+        """
+        Fetch every row of a query.
+        
+        Args:
+            row_factory: Optional function taking the query's column names and returning a function
+                that converts a row, e.g. record_factory to get MemberRecord namedtuples
+        """
         if not self.check_database_connection():
-            print("Cannot execute query: No database connection")
+            log.error("Cannot execute query: No database connection")
             return None
+        started = time.perf_counter()
         try:
             cursor = self.conn.cursor()
             cursor.execute(query, params)
             result = cursor.fetchall()
+            columns = tuple(column.name for column in cursor.description) if row_factory is not None else None
             cursor.close()
-            return result
+            self._record_query(query, started, len(result))
         except (Exception, psycopg2.Error) as error:
             cursor.close()
-            print(f"Error while fetching data from PostgreSQL: {error}")
+            self._record_query(query, started, error=True)
+            log.error(f"Error while fetching data from PostgreSQL: {error}")
             # If there's a transaction issue, try to reconnect
             if "current transaction is aborted" in str(error):
-                print("Transaction aborted, attempting to reconnect...")
+                log.warning("Transaction aborted, attempting to reconnect...")
                 self.getDatabaseConnection()
             return None
+        # Outside the try, so a row_factory refusing the columns isn't reported as a DB error
+        if row_factory is not None:
+            result = list(map(row_factory(columns), result))
+        return result
     
     def selectOne(self, query, params=None):
         if not self.check_database_connection():
-            print("Cannot execute query: No database connection")
+            log.error("Cannot execute query: No database connection")
             return None
+        started = time.perf_counter()
         try:
             cursor = self.conn.cursor()
             cursor.execute(query, params)
             result = cursor.fetchone()
             cursor.close()
+            self._record_query(query, started, 0 if result is None else 1)
             return result
         except (Exception, psycopg2.Error) as error:
             cursor.close()
-            print(f"Error while fetching data from PostgreSQL: {error}")
+            self._record_query(query, started, error=True)
+            log.error(f"Error while fetching data from PostgreSQL: {error}")
             # If there's a transaction issue, try to reconnect
             if "current transaction is aborted" in str(error):
-                print("Transaction aborted, attempting to reconnect...")
+                log.warning("Transaction aborted, attempting to reconnect...")
                 self.getDatabaseConnection()
             return None
-            
+
     def execute_query(self, query, params=None):
         if not self.check_database_connection():
-            print("Cannot execute query: No database connection")
+            log.error("Cannot execute query: No database connection")
             return None
+        started = time.perf_counter()
         try:
             cursor = self.conn.cursor()
             cursor.execute(query, params)
             self.conn.commit()
+            rows = cursor.rowcount
             cursor.close()
+            self._record_query(query, started, rows if isinstance(rows, int) and rows > 0 else 0)
+            self.invalidate_render_cache(query)
             return True
         except (Exception, psycopg2.Error) as error:
             cursor.close()
-            print(f"Error while executing query in PostgreSQL: {error}")
+            self._record_query(query, started, error=True)
+            log.error(f"Error while executing query in PostgreSQL: {error}")
+            # Undo whatever the failed statement did before it failed
+            try:
+                self.conn.rollback()
+            except Exception as rollback_error:
+                log.error(f"Error rolling back transaction: {rollback_error}")
             # If there's a transaction issue, try to reconnect
             if "current transaction is aborted" in str(error):
-                print("Transaction aborted, attempting to reconnect...")
+                log.warning("Transaction aborted, attempting to reconnect...")
                 self.getDatabaseConnection()
             return None
 
+    def execute_returning(self, query, params=None):
+        """Run a write with a RETURNING clause and commit it, returning the first row it gave back or None."""
+        if not self.check_database_connection():
+            log.error("Cannot execute query: No database connection")
+            return None
+        started = time.perf_counter()
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(query, params)
+            result = cursor.fetchone()
+            self.conn.commit()
+            cursor.close()
+            self._record_query(query, started, 0 if result is None else 1)
+            self.invalidate_render_cache(query)
+            return result
+        except (Exception, psycopg2.Error) as error:
+            cursor.close()
+            self._record_query(query, started, error=True)
+            log.error(f"Error while executing query in PostgreSQL: {error}")
+            try:
+                self.conn.rollback()
+            except Exception as rollback_error:
+                log.error(f"Error rolling back transaction: {rollback_error}")
+            if "current transaction is aborted" in str(error):
+                log.warning("Transaction aborted, attempting to reconnect...")
+                self.getDatabaseConnection()
+            return None
+
+def run_cluster(cluster_id, cluster_count, shard_ids, shard_count, conn):
+    """Run one cluster of the bot's shards, the target of each ClusterLauncher worker process."""
+    load_dotenv()
+    bot = CoffeeHouseBot(cluster=ClusterClient(cluster_id, cluster_count, shard_ids, shard_count, conn))
+    bot.run(os.getenv('DISCORD_TOKEN'), log_handler=None)
+
 if __name__ == '__main__':
     load_dotenv()
     TOKEN = os.getenv('DISCORD_TOKEN')
-    bot = CoffeeHouseBot()
-    bot.run(TOKEN)
\ No newline at end of file
+    with open("config.json") as json_data_file:
+        configs = json.load(json_data_file)
+    cluster_config = configs.get("cluster", {})
+    
+    if int(cluster_config.get("clusters", 1)) > 1:
+        # Split the shards between worker processes so the bot can use more than one core
+        setup_logging(configs.get("logging"))
+        shard_count = cluster_config.get("shard_count") or recommended_shard_count(TOKEN)
+        ClusterLauncher(
+            run_cluster,
+            shard_count=int(shard_count),
+            cluster_count=int(cluster_config["clusters"]),
+            restart_delay=float(cluster_config.get("restart_delay", 5)),
+        ).run()
+        stop_logging()
+    else:
+        bot = CoffeeHouseBot()
+        # Logging is set up by the bot from config.json, stop discord.py adding its own handler
+        bot.run(TOKEN, log_handler=None)
\ No newline at end of file
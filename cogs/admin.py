@@ -1,18 +1,39 @@
 import datetime
+import logging
 import sys
 from discord.ext import commands
 from discord.ext.tasks import loop
 from discord import app_commands
 import discord
 from cogs.base_cog import log_command
+from util.command_rollup import ROLLUP_SQL, STATS_SQL, USAGE_TIMEZONE, summarise_stats_row, usage_now, usage_today
+from util.command_partitions import LIST_PARTITIONS_SQL, add_months, create_partition_sql, expired_partitions, months_to_create, partition_name
+from util.member_record import record_factory
+from util.promotions import PROMOTIONS_DUE_SQL, get_schedule
 from enum import Enum
 
+log = logging.getLogger(__name__)
+
 class TimePeriod(Enum):
     WEEK = "Week"
     MONTH = "Month"
     YEAR = "Year"
     ALL_TIME = "All-Time"
 
+class QueryOrder(Enum):
+    TOTAL_TIME = "Total Time"
+    P95 = "p95"
+    CALLS = "Calls"
+    ROWS = "Rows"
+
+# The query summary field each QueryOrder sorts by
+QUERY_ORDER_FIELDS = {
+    QueryOrder.TOTAL_TIME: "total_ms",
+    QueryOrder.P95: "p95_ms",
+    QueryOrder.CALLS: "count",
+    QueryOrder.ROWS: "max_rows",
+}
+
 class Admin(commands.Cog):
     """
     Logic for all admin command handling
@@ -20,6 +41,90 @@ class Admin(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_load(self):
+        # The tables are shared, so with several clusters only the first one maintains them
+        if self.bot.is_primary_cluster:
+            self.command_usage_maintenance.start()
+
+    async def cog_unload(self):
+        self.command_usage_maintenance.cancel()
+
+    @loop(time=datetime.time(hour=0, minute=5, tzinfo=USAGE_TIMEZONE))
+    async def command_usage_maintenance(self):
+        """Roll up yesterday's command usage and manage the command_usage partitions every night."""
+        self.roll_up_finished_days()
+        self.maintain_command_usage_partitions()
+
+    @command_usage_maintenance.before_loop
+    async def before_command_usage_maintenance(self):
+        # Catch up on anything missed while the bot was offline
+        await self.bot.wait_until_ready()
+        self.roll_up_finished_days()
+        self.maintain_command_usage_partitions()
+
+    def roll_up_finished_days(self, today=None):
+        """
+        Roll up every finished day of command_usage that isn't in command_usage_daily yet.
+        The last rolled up day is redone in case it was rolled up before the day had finished.
+        """
+        today = today or usage_today()
+        last_day = self.bot.selectOne("SELECT MAX(day) FROM command_usage_daily")
+        if last_day and last_day[0]:
+            start = last_day[0]
+        else:
+            first_day = self.bot.selectOne("SELECT MIN(timestamp)::date FROM command_usage")
+            if not first_day or not first_day[0]:
+                return False
+            start = first_day[0]
+        return self.bot.execute_query(ROLLUP_SQL, (start, today))
+
+    def get_config_int(self, key, default):
+        try:
+            return int(self.bot.getConfigValue(key))
+        except (KeyError, TypeError, ValueError):
+            return default
+
+    def maintain_command_usage_partitions(self, today=None):
+        """
+        Create the command_usage partitions for this month and the next few, and drop partitions
+        older than the retention period once they have been rolled up into command_usage_daily.
+
+        Returns:
+            list: The names of the partitions that were dropped
+        """
+        today = today or usage_today()
+        partitions = self.bot.selectMany(LIST_PARTITIONS_SQL)
+        if partitions is None:
+            log.error("Couldn't list the command_usage partitions, not maintaining them")
+            return []
+        existing = {row[0] for row in partitions}
+        # Only months without a partition, creating one moves rows out of the default partition
+        for month in months_to_create(today, self.get_config_int("command_usage_partitions_ahead", 2)):
+            if partition_name(month) not in existing:
+                self.bot.execute_query(create_partition_sql(month))
+
+        # A retention of 0 or less keeps everything
+        retention_months = self.get_config_int("command_usage_retention_months", 0)
+        if retention_months <= 0:
+            return []
+
+        expired = expired_partitions(existing, today, retention_months)
+        if not expired:
+            return []
+
+        last_day = self.bot.selectOne("SELECT MAX(day) FROM command_usage_daily")
+        rolled_through = last_day[0] if last_day else None
+        dropped = []
+        for name, month in expired:
+            # Never drop raw usage that hasn't made it into the rollups
+            if rolled_through is None or rolled_through < add_months(month, 1) - datetime.timedelta(days=1):
+                log.warning(f"Not dropping {name}, it hasn't been fully rolled up yet")
+                break
+            if self.bot.execute_query(f"DROP TABLE IF EXISTS {name}"):
+                log.info(f"Dropped expired command usage partition {name}")
+                dropped.append(name)
+        return dropped
+
     async def check_leaders_category(self, interaction: discord.Interaction) -> bool:
         """
         Check if the command is being used in a channel within the LEADERS category
@@ -38,7 +143,7 @@ class Admin(commands.Cog):
         histogram += f"Command Usage Statistics ({period_name})\n"
         histogram += "=" * 50 + "\n\n"
         
-        for command_name, usage_count, success_count, failure_count in results:
+        for command_name, usage_count, success_count, failure_count, *latency in results:
             # Calculate success and failure percentages
             success_percent = (success_count / usage_count) * 100
             failure_percent = (failure_count / usage_count) * 100
@@ -54,11 +159,19 @@ class Admin(commands.Cog):
             # Format the line
             histogram += f"{command_name:<20} {usage_count:>5} uses\n"
             histogram += f"  Success: {success_percent:>5.1f}% {success_bar}\n"
-            histogram += f"  Failure: {failure_percent:>5.1f}% {failure_bar}\n\n"
+            histogram += f"  Failure: {failure_percent:>5.1f}% {failure_bar}\n"
+            histogram += self.format_command_latency(latency) + "\n"
         
         histogram += "```"
         return histogram
 
+    def format_command_latency(self, latency):
+        """Format the p50/p95/p99 durations of a command, if they were recorded."""
+        if not latency or all(value is None for value in latency):
+            return ""
+        p50, p95, p99 = (f"{value:.0f}ms" if value is not None else "-" for value in latency)
+        return f"  Latency: p50 {p50}  p95 {p95}  p99 {p99}\n"
+
     def split_command_stats(self, results, period_name):
         """Split command statistics into pages that fit within Discord's character limit."""
         pages = []
@@ -74,7 +187,7 @@ class Admin(commands.Cog):
         
         for result in results:
             # Format the command stats
-            command_name, usage_count, success_count, failure_count = result
+            command_name, usage_count, success_count, failure_count, *latency = result
             success_percent = (success_count / usage_count) * 100
             failure_percent = (failure_count / usage_count) * 100
             
@@ -82,7 +195,8 @@ class Admin(commands.Cog):
             command_entry = (
                 f"{command_name:<20} {usage_count:>5} uses\n"
                 f"  Success: {success_percent:>5.1f}% {'█' * 30}\n"
-                f"  Failure: {failure_percent:>5.1f}% {'░' * 30}\n\n"
+                f"  Failure: {failure_percent:>5.1f}% {'░' * 30}\n"
+                f"{self.format_command_latency(latency)}\n"
             )
             entry_length = len(command_entry)
             
@@ -121,7 +235,7 @@ class Admin(commands.Cog):
         
         try:
             # Calculate the date range based on the selected period
-            end_date = datetime.datetime.now()
+            end_date = usage_now()
             if duration == TimePeriod.WEEK:
                 start_date = end_date - datetime.timedelta(days=7)
                 period_name = "Last Week"
@@ -135,19 +249,9 @@ class Admin(commands.Cog):
                 start_date = datetime.datetime.min
                 period_name = "All Time"
             
-            # Query command usage statistics
-            query = """
-                SELECT 
-                    command_name,
-                    COUNT(*) as usage_count,
-                    SUM(CASE WHEN success THEN 1 ELSE 0 END) as success_count,
-                    SUM(CASE WHEN NOT success THEN 1 ELSE 0 END) as failure_count
-                FROM command_usage
-                WHERE timestamp >= %s
-                GROUP BY command_name
-                ORDER BY usage_count DESC
-            """
-            stats = self.bot.selectMany(query, (start_date,))
+            # Query command usage statistics from the daily rollups plus anything not rolled up yet
+            rows = self.bot.selectMany(STATS_SQL, {"start": start_date})
+            stats = [summarise_stats_row(row) for row in rows] if rows else None
             
             if not stats:
                 await interaction.followup.send(f"No command usage data found for the {period_name.lower()}.")
@@ -167,6 +271,232 @@ class Admin(commands.Cog):
         except Exception as e:
             await interaction.followup.send(f"Error generating command statistics: {str(e)}", ephemeral=True)
 
+    def format_loop_stats(self, summary, handler_stats, max_stack_lines=8):
+        """Format event loop lag and message handler latency into a code block."""
+        lag = summary["lag"]
+        text = "```\n"
+        text += "Event Loop Lag\n"
+        text += "=" * 50 + "\n\n"
+        if not summary["running"]:
+            text += "Monitor is not running\n\n"
+        text += f"Samples: {lag['count']}\n"
+        if lag["count"]:
+            text += f"p50: {lag['p50_ms']}ms  p95: {lag['p95_ms']}ms  p99: {lag['p99_ms']}ms  max: {lag['max_ms']}ms\n"
+
+        text += f"\nStalls (>= {summary['stall_threshold_ms']}ms)\n"
+        for bucket, count in summary["stalls"].items():
+            text += f"  {bucket:<10} {count:>5}\n"
+
+        if handler_stats:
+            text += "\nMessage Handlers\n"
+            for name, stats in handler_stats.items():
+                text += f"  {name:<30} {stats['count']:>5} runs  p95: {stats['p95_ms']}ms  errors: {stats['errors']}  timeouts: {stats['timeouts']}\n"
+
+        # Show where the loop was stuck for the most recent stall with a stack
+        with_stack = [stall for stall in summary["recent_stalls"] if stall.stack]
+        if with_stack:
+            stall = with_stack[-1]
+            stack = stall.stack.strip().splitlines()[-max_stack_lines:]
+            text += f"\nLast captured stall: {stall.duration_ms:.0f}ms at {stall.at:%Y-%m-%d %H:%M:%S}\n"
+            text += "\n".join(stack) + "\n"
+
+        # Leave room for the closing code block marker
+        if len(text) > 1990:
+            text = text[:1990]
+        text += "```"
+        return text
+
+    @app_commands.command(name="loop-stats", description="Display event loop lag and stalls (admin only)")
+    @log_command
+    async def loop_stats(self, interaction: discord.Interaction):
+        if not await self.check_leaders_category(interaction):
+            return
+            
+        # Check if user has admin permissions
+        if not await self.bot.get_cog("BaseCog").check_permissions(
+            interaction,
+            required_permissions=['administrator']
+        ):
+            return
+
+        await interaction.response.send_message(
+            self.format_loop_stats(self.bot.loop_monitor.summary(), self.bot.message_dispatcher.summary())
+        )
+
+    def format_cluster_stats(self, stats):
+        """Format each cluster's shards, guilds and latency into a code block."""
+        text = "```\n"
+        text += "Clusters\n"
+        text += "=" * 50 + "\n\n"
+        text += f"{'Cluster':<8} {'Shards':<10} {'Guilds':>7} {'Members':>9} {'Latency':>9}\n"
+        for cluster_id, cluster in stats.items():
+            if not cluster or "error" in cluster:
+                text += f"{cluster_id:<8} {'error: ' + str((cluster or {}).get('error', 'no reply'))}\n"
+                continue
+            shard_ids = cluster["shard_ids"]
+            shards = f"{shard_ids[0]}-{shard_ids[-1]}" if shard_ids else "-"
+            latency = f"{cluster['latency_ms']}ms" if cluster["latency_ms"] is not None else "-"
+            text += f"{cluster_id:<8} {shards:<10} {cluster['guilds']:>7} {cluster['members']:>9} {latency:>9}\n"
+        answered = [cluster for cluster in stats.values() if cluster and "error" not in cluster]
+        text += f"\nTotal: {sum(cluster['guilds'] for cluster in answered)} guilds, {sum(cluster['members'] for cluster in answered)} members\n"
+        text += "```"
+        return text
+
+    @app_commands.command(name="cluster-stats", description="Display shards, guilds and latency for each cluster (admin only)")
+    @log_command
+    async def cluster_stats(self, interaction: discord.Interaction):
+        if not await self.check_leaders_category(interaction):
+            return
+            
+        # Check if user has admin permissions
+        if not await self.bot.get_cog("BaseCog").check_permissions(
+            interaction,
+            required_permissions=['administrator']
+        ):
+            return
+
+        await interaction.response.defer()
+        await interaction.followup.send(self.format_cluster_stats(await self.bot.gather_cluster_stats()))
+
+    def format_cache_stats(self, stats, max_length=1990):
+        """Format each cluster's resident memory, estimated cache sizes and cached response hit rates into a code block."""
+        text = "```\n"
+        text += "Cache Memory (estimated)\n"
+        text += "=" * 50 + "\n"
+        for cluster_id, cluster in stats.items():
+            if not cluster or "error" in cluster:
+                text += f"\nCluster {cluster_id}: error: {(cluster or {}).get('error', 'no reply')}\n"
+                continue
+            rss = f"{cluster['rss_bytes'] / 2**20:.1f}MB" if cluster["rss_bytes"] is not None else "unknown"
+            text += f"\nCluster {cluster_id}  RSS: {rss}"
+            if cluster["trimmed"] is not None:
+                text += f"  Members trimmed: {cluster['trimmed']}"
+            text += "\n"
+            for cache in cluster["caches"]:
+                text += f"  {cache['name']:<10} {cache['count']:>9}  {cache['bytes'] / 2**20:>8.2f}MB\n"
+            if cluster.get("render_cache"):
+                text += f"  {'Cached responses':<24} {'hits':>6}  {'misses':>6}\n"
+                for command, counts in cluster["render_cache"].items():
+                    text += f"  {command:<24} {counts['hits']:>6}  {counts['misses']:>6}\n"
+        # Leave room for the closing code block marker
+        if len(text) > max_length - 3:
+            text = text[:max_length - 3]
+        text += "```"
+        return text
+
+    @app_commands.command(name="cache-stats", description="Display memory used by the bot's caches (admin only)")
+    @log_command
+    async def cache_stats(self, interaction: discord.Interaction):
+        if not await self.check_leaders_category(interaction):
+            return
+            
+        # Check if user has admin permissions
+        if not await self.bot.get_cog("BaseCog").check_permissions(
+            interaction,
+            required_permissions=['administrator']
+        ):
+            return
+
+        await interaction.response.defer()
+        await interaction.followup.send(self.format_cache_stats(await self.bot.gather_cache_stats()))
+
+    def format_db_stats(self, queries, order_name, max_query_length=150, max_length=1900):
+        """Format query statistics into pages of code blocks that fit within Discord's character limit."""
+        header = f"Query Statistics (by {order_name})\n" + "=" * 50 + "\n\n"
+        pages = []
+        current = header
+        for i, query in enumerate(queries, 1):
+            statement = query["fingerprint"]
+            if len(statement) > max_query_length:
+                statement = statement[:max_query_length - 3] + "..."
+            tags = ", ".join(f"{tag} ({count})" for tag, count in query["tags"].items())
+            entry = (
+                f"{i}. {statement}\n"
+                f"   calls: {query['count']}  total: {query['total_ms']}ms  errors: {query['errors']}\n"
+                f"   p50: {query['p50_ms']}ms  p95: {query['p95_ms']}ms  p99: {query['p99_ms']}ms\n"
+                f"   rows: {query['mean_rows']} avg / {query['max_rows']} max\n"
+                f"   from: {tags}\n\n"
+            )
+            if len(current) + len(entry) > max_length and current != header:
+                pages.append(current)
+                current = ""
+            current += entry
+        pages.append(current)
+        return [f"```\n{page}```" for page in pages]
+
+    @app_commands.command(name="db-stats", description="Display the most expensive database queries (admin only)")
+    @app_commands.describe(
+        order="What to rank queries by (Total Time, p95, Calls, Rows)",
+        limit="How many queries to show"
+    )
+    @log_command
+    async def db_stats(self, interaction: discord.Interaction, order: QueryOrder = QueryOrder.TOTAL_TIME, limit: app_commands.Range[int, 1, 25] = 10):
+        if not await self.check_leaders_category(interaction):
+            return
+            
+        # Check if user has admin permissions
+        if not await self.bot.get_cog("BaseCog").check_permissions(
+            interaction,
+            required_permissions=['administrator']
+        ):
+            return
+
+        queries = self.bot.query_stats.top(limit, QUERY_ORDER_FIELDS[order])
+        if not queries:
+            await interaction.response.send_message("No queries have been recorded yet.")
+            return
+
+        pages = self.format_db_stats(queries, order.value)
+        await interaction.response.send_message(pages[0])
+        for page in pages[1:]:
+            await interaction.followup.send(page)
+
+    def format_promotions_due(self, due, days, max_length=1900):
+        """Format the members due a promotion into pages of code blocks that fit within Discord's character limit."""
+        level_names = self.bot.getConfigValue("mem_level_names")
+        header = f"Promotions due in the next {days} days\n" + "=" * 50 + "\n\n"
+        pages = []
+        current = header
+        for promotion in due:
+            status = "OVERDUE" if promotion.overdue else ""
+            entry = (
+                f"{status:<8}{promotion.due_date.strftime('%Y-%m-%d')}  {promotion.rsn:<12}  "
+                f"{level_names[promotion.level]} -> {level_names[promotion.level + 1]}\n"
+            )
+            if len(current) + len(entry) > max_length:
+                pages.append(current)
+                current = ""
+            current += entry
+        pages.append(current)
+        return [f"```\n{page}```" for page in pages]
+
+    @app_commands.command(name="promotions-due", description="List members due a promotion soon, or overdue one (admin only)")
+    @app_commands.describe(days="How many days ahead to look")
+    @log_command
+    async def promotions_due(self, interaction: discord.Interaction, days: app_commands.Range[int, 1, 60] = 7):
+        if not await self.check_leaders_category(interaction):
+            return
+            
+        # Check if user has admin permissions
+        if not await self.bot.get_cog("BaseCog").check_permissions(
+            interaction,
+            required_permissions=['administrator']
+        ):
+            return
+
+        # Only members due by the end of the window are loaded, so this doesn't grow with the roster
+        today = datetime.date.today()
+        members = self.bot.selectMany(PROMOTIONS_DUE_SQL, {"until": today + datetime.timedelta(days=days)})
+        due = get_schedule(self.bot).promotions_due(members or [], days, today)
+        if not due:
+            await interaction.response.send_message(f"No promotions are due in the next {days} days.")
+            return
+
+        pages = self.format_promotions_due(due, days)
+        await interaction.response.send_message(pages[0])
+        for page in pages[1:]:
+            await interaction.followup.send(page)
+
     @app_commands.command(name="shutdown", description="Shutdown the bot (admin only)")
     @log_command
     async def shutdown(self, interaction):
@@ -199,29 +529,31 @@ class Admin(commands.Cog):
         #
         # Do we want to store list in database and require confirmation to remove?
         # print('hello')
-        all_members = self.bot.selectMany("SELECT rsn, discord_id_num, membership_level, join_date FROM member")
+        all_members = self.bot.selectMany("SELECT rsn, discord_id_num, membership_level, join_date FROM member", row_factory=record_factory)
         # print(f'{all_members}')
         if (all_members is not None):
+            # Work out everyone's expected level in one pass
+            schedule = get_schedule(self.bot)
+            expected_levels, _ = schedule.roster((mem.membership_level for mem in all_members), (mem.join_date for mem in all_members))
             discord_roles = self.bot.getConfigValue("discord_role_names")            
             for guild in self.bot.guilds:
-                if guild.id == self.bot.getConfigValue("test_server_guild_id"):
+                if guild.id == int(self.bot.getConfigValue("test_server_guild_id")):
                     this_guild = guild
-                    print(f"Roles: {this_guild.roles}")
-            for mem in all_members:
-                if int(mem[2]) < 3:
+                    log.debug("Roles: %s", this_guild.roles)
+            for mem, expected_lvl_min in zip(all_members, expected_levels):
+                if mem.membership_level < schedule.auto_promotion_max_level:
                     # has room to still be promoted
-                    expected_lvl_min = self.bot.getExpectedMemLvlByJoinDate(mem[3])
                     try:
-                        usr = await this_guild.fetch_member(mem[1])
+                        usr = await this_guild.fetch_member(mem.discord_id_num)
                     except:
-                        print(f'Unable to find {mem[0]} on server using id {mem[1]}')
-                    print(f'{usr}\'s roles: {usr.roles}')
+                        log.warning('Unable to find %s on server using id %s', mem.rsn, mem.discord_id_num)
+                    log.debug("%s's roles: %s", usr, usr.roles)
                     role_ok = False
                     for role in usr.roles:
                         if role.name.lower() == discord_roles[expected_lvl_min].lower():
                             role_ok = True
                     if not role_ok:
-                        print(f"{usr} is currently role {discord_roles[mem[2]]}({mem[2]}) and will be promoted to role {discord_roles[expected_lvl_min]}({expected_lvl_min})")
+                        log.info("%s is currently role %s(%s) and will be promoted to role %s(%s)", usr, discord_roles[mem.membership_level], mem.membership_level, discord_roles[expected_lvl_min], expected_lvl_min)
                         # await usr.add_roles(this_guild.)
 
 async def setup(bot):
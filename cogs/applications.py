@@ -1,50 +1,326 @@
 import discord
 from discord.ext import commands
-import re
+import asyncio
 import datetime
 import logging
 from discord import app_commands
+from cogs.base_cog import log_command
+from util.application_form import DEFAULT_APPLICATION_QUESTIONS, ApplicationForm, ApplicationParser
+from util.application_scanner import ApplicationScanner
+from util.confirmations import Confirmations, get_confirmations
+from util.member_conflicts import find_conflicts
+from util.message_dispatch import message_filter
+from util.role_grants import RoleGrantQueue, get_role_grants
+from util.timezones import TimezoneMatcher
 
 # Set up logging
-log = logging.getLogger('discord')
-log.setLevel(logging.INFO)
+log = logging.getLogger(__name__)
+
+# Confirmation kind for accepting every pending application at once
+ACCEPT_PENDING_CONFIRMATION = "accept_pending_applications"
+
+# Accepting an application grants a role, so only people who can manage roles may do it
+LEADER_PERMISSION = "manage_roles"
+
+# RSN column width in the member table
+MAX_RSN_LENGTH = 12
+
+# Add a batch of new trial members in one statement, parameters are parallel arrays
+INSERT_MEMBERS_SQL = """
+    INSERT INTO member (
+        rsn, loc, timezone, discord_id, discord_id_num, join_date,
+        membership_level, active, on_leave, skill_comp_pts,
+        skill_comp_pts_life, boss_comp_pts, boss_comp_pts_life,
+        how_found_clan, favorite_activities, play_frequency, coffee_preference
+    )
+    SELECT
+        rsn, loc, timezone, discord_id, discord_id_num, join_date,
+        0, true, false, 0, 0, 0, 0,
+        how_found_clan, favorite_activities, play_frequency, coffee_preference
+    FROM unnest(
+        %s::varchar[], %s::varchar[], %s::varchar[], %s::varchar[], %s::bigint[], %s::date[],
+        %s::varchar[], %s::varchar[], %s::varchar[], %s::varchar[]
+    ) AS applicant(
+        rsn, loc, timezone, discord_id, discord_id_num, join_date,
+        how_found_clan, favorite_activities, play_frequency, coffee_preference
+    )
+"""
+
+def embed_lines(lines, limit=3900):
+    """Join lines for an embed description, cutting them off before Discord's 4096 character limit."""
+    description = ""
+    for i, line in enumerate(lines):
+        if len(description) + len(line) > limit:
+            return description + f"...and {len(lines) - i} more"
+        description += line + "\n"
+    return description
 
 class Applications(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.application_channel_id = None  # Will be set from config
         self.trial_member_role_id = None    # Will be set from config
-        self.timezones = []                 # Will be set from config
+        self.timezone_matcher = TimezoneMatcher()  # Aliases replaced from config
+        self.parser = ApplicationParser()   # Questions replaced from config
+        self.ctx_menu = None                # Registered in cog_load
+        self.ctx_menu_guild_id = None
+        self.scanner = ApplicationScanner(bot, self._detect_application)
+        self.scan_task = None               # Backlog scan started on_ready
+        self.role_grants = get_role_grants(bot) or RoleGrantQueue()
+        self.confirmations = get_confirmations(bot) or Confirmations(bot)
         log.info("Applications cog initialized")
         
-    @commands.Cog.listener()
-    async def on_ready(self):
-        """Set up the application channel ID and trial member role ID from config when the cog is ready."""
+    async def cog_load(self):
+        """Register the Accept Application context menu before the bot syncs its commands."""
+        self.confirmations.register(ACCEPT_PENDING_CONFIRMATION, self._confirm_accept_pending)
         try:
-            self.application_channel_id = int(self.bot.getConfigValue("application_channel_id"))
-            self.trial_member_role_id = int(self.bot.getConfigValue("trial_member_role_id"))
-            self.timezones = self.bot.getConfigValue("timezones")
-            
-            # Register the context menu command
+            self.ctx_menu_guild_id = int(self.bot.getConfigValue("test_server_guild_id"))
             self.ctx_menu = app_commands.ContextMenu(
                 name='Accept Application',
                 callback=self.accept_app_context_menu, 
                 type=discord.AppCommandType.message,
-                guild_ids=[int(self.bot.getConfigValue("test_server_guild_id"))]
+                guild_ids=[self.ctx_menu_guild_id]
             )
             self.bot.tree.add_command(self.ctx_menu)
-            await self.bot.tree.sync(guild=self.bot.get_guild(int(self.bot.getConfigValue("test_server_guild_id"))))
-            print(f"2: Synced commands to test server!")
+        except (KeyError, ValueError) as e:
+            log.error(f"Error registering Accept Application context menu: {e}. Please ensure 'test_server_guild_id' is set in config.json")
+
+    async def cog_unload(self):
+        """Remove the context menu so reloading the cog doesn't register it twice."""
+        if self.ctx_menu is not None:
+            self.bot.tree.remove_command(self.ctx_menu.name, type=self.ctx_menu.type, guild=discord.Object(id=self.ctx_menu_guild_id))
+        self.confirmations.unregister(ACCEPT_PENDING_CONFIRMATION)
+        if self.scan_task is not None:
+            self.scan_task.cancel()
+        if self.role_grants is not get_role_grants(self.bot):
+            await self.role_grants.stop()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Set up the application channel ID and trial member role ID from config when the cog is ready."""
+        try:
+            self.application_channel_id = int(self.bot.getConfigValue("application_channel_id"))
+            self.trial_member_role_id = int(self.bot.getConfigValue("trial_member_role_id"))
+            self.timezone_matcher = TimezoneMatcher.from_config(self.bot.getConfigValue("timezones"))
+            try:
+                questions = self.bot.getConfigValue("application_questions")
+            except KeyError:
+                questions = DEFAULT_APPLICATION_QUESTIONS
+            self.parser = ApplicationParser(questions)
             
             log.info(f"Applications cog ready. Application channel ID: {self.application_channel_id}")
-            print(f"Applications cog ready. Application channel ID: {self.application_channel_id}")
-            for cmd in self.bot.tree.walk_commands():
-                print(f"Command: {cmd.name}")
                 
         except (KeyError, ValueError) as e:
-            log.error(f"Error setting up Applications cog: {e}")
-            print(f"Error setting up Applications cog: {e}")
-            print("Please ensure 'application_channel_id' and 'trial_member_role_id' are set in config.json")
+            log.error(f"Error setting up Applications cog: {e}. Please ensure 'application_channel_id' and 'trial_member_role_id' are set in config.json")
+            return
+        
+        # on_ready fires again after reconnects, only one scan runs at a time
+        if self.scan_task is None or self.scan_task.done():
+            self.scan_task = asyncio.create_task(self._scan_backlog(), name="application-backlog-scan")
+    
+    async def _scan_backlog(self, channel=None):
+        """Queue the applications posted since the last scan, e.g. while the bot was offline."""
+        channel = channel or self.bot.get_channel(self.application_channel_id)
+        if channel is None:
+            if await self._other_cluster_has_channel():
+                log.debug(f"Application channel {self.application_channel_id} is in another cluster's guild, not scanning here")
+                return
+            log.error(f"Application channel {self.application_channel_id} not found, not scanning for applications")
+            return
+        try:
+            await self.scanner.scan(channel)
+        except Exception as e:
+            log.error(f"Error scanning for applications: {e}")
+    
+    async def _other_cluster_has_channel(self) -> bool:
+        """Check whether the application channel is in a guild another cluster is connected to, and scans."""
+        cluster = getattr(self.bot, "cluster", None)
+        if cluster is None:
+            return False
+        try:
+            channel = await self.bot.fetch_channel(self.application_channel_id)
+        except discord.HTTPException:
+            return False
+        guild = getattr(channel, "guild", None)
+        return guild is not None and not cluster.owns_guild(guild.id)
+    
+    @message_filter(channels=["application_channel_id"])
+    async def on_message(self, message):
+        """Queue applications as they're posted."""
+        self.scanner.add(message)
+    
+    async def _check_leader(self, interaction: discord.Interaction) -> bool:
+        """Check the user can accept applications, telling them if they can't."""
+        # Outside a guild the user is a discord.User, with no guild permissions
+        permissions = getattr(interaction.user, "guild_permissions", None)
+        if permissions is not None and getattr(permissions, LEADER_PERMISSION, False):
+            return True
+        message = "❌ Only leaders can accept applications."
+        if interaction.response.is_done():
+            await interaction.followup.send(message, ephemeral=True)
+        else:
+            await interaction.response.send_message(message, ephemeral=True)
+        return False
+    
+    def _detect_application(self, content):
+        """Get the ApplicationForm of a message if it's a valid application, otherwise None."""
+        form = self.parser.parse(content)
+        return form if self._validate_application(form) is None else None
+    
+    @app_commands.command(name="pending-applications", description="List applications waiting to be accepted")
+    @log_command
+    async def pending_applications(self, interaction: discord.Interaction):
+        """List the queued applications, with a button to accept them all."""
+        if interaction.channel_id != self.application_channel_id:
+            await interaction.response.send_message("This command can only be used in the application channel.", ephemeral=True)
+            return
+        if not await self._check_leader(interaction):
+            return
+        
+        await interaction.response.defer(ephemeral=True)
+        # Catch up on anything posted since the last scan first, this only reads past the checkpoint
+        if self.scan_task is None or self.scan_task.done():
+            self.scan_task = asyncio.create_task(self._scan_backlog(interaction.channel), name="application-backlog-scan")
+        await self.scan_task
+        
+        pending = self.scanner.pending(interaction.channel_id)
+        if not pending:
+            await interaction.followup.send("There are no applications waiting to be accepted.", ephemeral=True)
+            return
+        
+        embed = discord.Embed(
+            title=f"{len(pending)} Pending Applications",
+            color=discord.Color.blue()
+        )
+        embed.description = embed_lines([
+            f"[{application.rsn or 'Unknown RSN'}](https://discord.com/channels/{interaction.guild_id}/{interaction.channel_id}/{application.message_id}) <@{application.author_id}>"
+            for application in pending
+        ])
+        view = self.confirmations.create(
+            ACCEPT_PENDING_CONFIRMATION,
+            interaction.user.id,
+            {"message_ids": [application.message_id for application in pending]},
+            ttl=600,
+            confirm_label="Accept all",
+            cancel_label=None
+        )
+        await interaction.followup.send(embed=embed, view=view or discord.utils.MISSING, ephemeral=True)
+    
+    async def _confirm_accept_pending(self, interaction: discord.Interaction, payload, confirmed: bool):
+        """Accept all the applications listed by /pending-applications."""
+        # Checked again, the button can be clicked long after the list was asked for
+        if confirmed and await self._check_leader(interaction):
+            await self._accept_pending(interaction, payload["message_ids"])
+    
+    async def _accept_pending(self, interaction: discord.Interaction, message_ids):
+        """Accept queued applications as one batch, taking the handled ones off the queue."""
+        messages = []
+        deleted = []
+        for message_id in message_ids:
+            try:
+                messages.append(await self.scanner.get_message(interaction.channel, message_id))
+            except discord.NotFound:
+                log.warning(f"Pending application {message_id} was deleted, removing it")
+                deleted.append(message_id)
+        self.scanner.remove(deleted)
+        
+        handled = await self._accept_applications(interaction, messages)
+        self.scanner.remove(handled)
+    
+    async def _get_member(self, guild, user_id):
+        """Get a member from the cache, or from Discord if they've been trimmed from it. None if they've left."""
+        member = guild.get_member(user_id)
+        if member is None:
+            try:
+                member = await guild.fetch_member(user_id)
+            except discord.NotFound:
+                return None
+        return member
+    
+    async def _accept_applications(self, interaction: discord.Interaction, messages):
+        """
+        Accept a batch of applications: one duplicate check, one insert, and Trial Member roles
+        granted through the role grant queue. The results are reported in a single embed.
+        
+        Returns:
+            list: IDs of the messages that were handled, accepted or turned down
+        """
+        results = {}
+        candidates = []
+        for message in messages:
+            form = self.parser.parse(message.content)
+            if not form.rsn:
+                results[message.id] = f"❌ <@{message.author.id}>: no RSN found in the application"
+            elif len(form.rsn) > MAX_RSN_LENGTH:
+                results[message.id] = f"❌ {form.rsn}: RSNs can't be longer than {MAX_RSN_LENGTH} characters"
+            else:
+                candidates.append((message, form))
+        
+        accepted = []
+        conflicts = find_conflicts(self.bot, [(form.rsn, message.author.id) for message, form in candidates])
+        # The same person or RSN twice in one batch
+        batch_rsns = set()
+        batch_ids = set()
+        for (message, form), member_conflicts in zip(candidates, conflicts):
+            if member_conflicts:
+                results[message.id] = f"❌ {form.rsn}: " + " ".join(conflict.describe(form.rsn, message.author.id) for conflict in member_conflicts)
+            elif form.rsn.lower() in batch_rsns:
+                results[message.id] = f"❌ {form.rsn}: RSN is in another application in this batch"
+            elif message.author.id in batch_ids:
+                results[message.id] = f"❌ {form.rsn}: <@{message.author.id}> has another application in this batch"
+            else:
+                batch_rsns.add(form.rsn.lower())
+                batch_ids.add(message.author.id)
+                accepted.append((message, form, *self._parse_location_timezone(form.location_timezone)))
+        
+        join_date = datetime.date.today()
+        not_added = set()
+        if accepted:
+            inserted = self.bot.execute_query(INSERT_MEMBERS_SQL, (
+                [form.rsn for _, form, _, _ in accepted],
+                [location for _, _, location, _ in accepted],
+                [timezone for _, _, _, timezone in accepted],
+                [message.author.name for message, _, _, _ in accepted],
+                [message.author.id for message, _, _, _ in accepted],
+                [join_date] * len(accepted),
+                [form.how_found_clan for _, form, _, _ in accepted],
+                [form.favorite_activities for _, form, _, _ in accepted],
+                [form.play_frequency for _, form, _, _ in accepted],
+                [form.coffee_preference for _, form, _, _ in accepted],
+            ))
+            if not inserted:
+                # Nothing was added, so these stay pending
+                for message, form, _, _ in accepted:
+                    results[message.id] = f"❌ {form.rsn}: database error, not added"
+                    not_added.add(message.id)
+                accepted = []
+            else:
+                log.info(f"Added {len(accepted)} members from a batch of {len(messages)} applications")
+        
+        # Grants go through the queue, so a big batch doesn't run into Discord's rate limits
+        role = interaction.guild.get_role(self.trial_member_role_id) if accepted else None
+        grants = []
+        for message, form, _, _ in accepted:
+            member = await self._get_member(interaction.guild, message.author.id)
+            if role is None or member is None:
+                results[message.id] = f"⚠️ {form.rsn}: added, but the Trial Member role couldn't be granted"
+                continue
+            grants.append((message, form, self.role_grants.submit(member, role, reason="Application accepted")))
+        outcomes = await asyncio.gather(*(future for _, _, future in grants), return_exceptions=True)
+        for (message, form, _), outcome in zip(grants, outcomes):
+            if isinstance(outcome, Exception):
+                log.error(f"Error granting Trial Member role to {form.rsn}: {outcome}")
+                results[message.id] = f"⚠️ {form.rsn}: added, but granting the Trial Member role failed"
+            else:
+                results[message.id] = f"✅ {form.rsn}: welcome to the clan!"
+        
+        embed = discord.Embed(
+            title=f"Accepted {len(accepted)} of {len(messages)} Applications",
+            description=embed_lines([results[message.id] for message in messages]),
+            color=discord.Color.green() if len(accepted) == len(messages) else discord.Color.orange()
+        )
+        await interaction.followup.send(embed=embed, ephemeral=False)
+        return [message.id for message in messages if message.id not in not_added]
     
     async def accept_app_context_menu(self, interaction: discord.Interaction, message: discord.Message):
         """Accept an application using the context menu."""
@@ -53,17 +329,23 @@ class Applications(commands.Cog):
             if interaction.channel_id != self.application_channel_id:
                 await interaction.response.send_message("This command can only be used in the application channel.", ephemeral=True)
                 return
+            if not await self._check_leader(interaction):
+                return
                 
             # Check if the message matches the application template
-            if not self._is_application_message(message.content):
-                await interaction.response.send_message("The message does not appear to be a valid application.", ephemeral=True)
+            form = self.parser.parse(message.content)
+            problem = self._validate_application(form)
+            if problem:
+                await interaction.response.send_message(f"The message does not appear to be a valid application. {problem}", ephemeral=True)
                 return
                 
             # Acknowledge the interaction immediately to prevent timeout
             await interaction.response.defer(ephemeral=False)
             
             # Process the application
-            await self._process_application(message, interaction)
+            # Failures stay pending so they can be accepted again
+            if await self._process_application(message, interaction, form):
+                self.scanner.remove([message.id])
             
         except Exception as e:
             log.error(f"Error in accept-app context menu: {e}")
@@ -81,6 +363,8 @@ class Applications(commands.Cog):
             if interaction.channel_id != self.application_channel_id:
                 await interaction.response.send_message("This command can only be used in the application channel.", ephemeral=True)
                 return
+            if not await self._check_leader(interaction):
+                return
                 
             # Convert message_id to integer
             try:
@@ -104,15 +388,19 @@ class Applications(commands.Cog):
                 return
                 
             # Check if the message matches the application template
-            if not self._is_application_message(application_message.content):
-                await interaction.response.send_message("The message does not appear to be a valid application.", ephemeral=True)
+            form = self.parser.parse(application_message.content)
+            problem = self._validate_application(form)
+            if problem:
+                await interaction.response.send_message(f"The message does not appear to be a valid application. {problem}", ephemeral=True)
                 return
                 
             # Acknowledge the interaction immediately to prevent timeout
             await interaction.response.defer(ephemeral=False)
             
             # Process the application using the discord.Message object
-            await self._process_application(application_message, interaction)
+            # Failures stay pending so they can be accepted again
+            if await self._process_application(application_message, interaction, form):
+                self.scanner.remove([application_message.id])
             
         except Exception as e:
             log.error(f"Error in accept-app command: {e}")
@@ -125,142 +413,63 @@ class Applications(commands.Cog):
     
     def _is_application_message(self, content):
         """Check if a message matches the application template."""
-        # Define the expected questions in the application
-        expected_questions = [
-            "What is your RSN?",
-            "How did you find out about the clan?",
-            "What are your favorite activities to do on Runescape?",
-            "Where do you live and what timezone are you in?",
-            "How often do you play?",
-            "Have you read our",
-            "and do you agree to abide by these rules?",
-            "Are you currently in another clan?",
-            "How do you drink your Coffee?"
-        ]
-        
-        # Check if all expected questions are in the message
-        for question in expected_questions:
-            if question not in content:
-                log.debug(f"Missing question in application: {question}")
-                return False
-                
-        # Special check for the rules question with special characters
-        if "Have you read our" in content and "and do you agree to abide by these rules?" in content:
-            # Check if there's some form of "rules" between these two parts
-            rules_part = content[content.find("Have you read our") + len("Have you read our"):content.find("and do you agree to abide by these rules?")]
-            if "rules" not in rules_part.lower():
-                log.debug("Rules question found but 'rules' keyword missing")
-                return False
+        return self._validate_application(self.parser.parse(content)) is None
+    
+    def _validate_application(self, form: ApplicationForm):
+        """Get why a parsed application doesn't match the template, or None if it does."""
+        if form.missing:
+            log.debug("Missing questions in application: %s", form.missing)
+            return "Missing questions: " + ", ".join(f'"{question}"' for question in form.missing)
+            
+        # The rules channel link sits between the two halves of the rules question
+        if "rules_link" in self.parser.questions and "rules" not in (form.rules_link or "").lower():
+            log.debug("Rules question found but 'rules' keyword missing")
+            return "The rules question doesn't mention the rules."
         
         log.debug("All expected questions found in message")
-        return True
+        return None
     
-    def _parse_location_timezone(self, content):
-        """Parse the location and timezone from the answer to the location/timezone question."""
-        # Extract the answer to the location/timezone question
-        answer = self._extract_answer(content, "Where do you live and what timezone are you in?")
+    def _parse_location_timezone(self, answer):
+        """Parse the location and IANA timezone from the answer to the location/timezone question."""
         if not answer:
             return None, None
             
-        # Try to find a timezone in the answer
-        timezone = None
-        location = answer
-        
-        # Check if any of the timezone strings are in the answer
-        for tz in self.timezones:
-            # Look for the timezone with word boundaries to avoid partial matches
-            pattern = r'\b' + re.escape(tz) + r'\b'
-            match = re.search(pattern, answer, re.IGNORECASE)
-            if match:
-                timezone = tz
-                # Remove the timezone from the answer to get the location
-                location = answer[:match.start()].strip() + answer[match.end():].strip()
-                # Clean up any remaining punctuation or conjunctions
-                location = re.sub(r'\s*[,/]\s*$', '', location)
-                location = re.sub(r'\s+and\s+$', '', location)
-                break
-                
-        # If no timezone was found, try to extract it using common patterns
-        if not timezone:
-            # Look for UTC/GMT +/- X patterns
-            utc_match = re.search(r'(UTC|GMT)\s*([+-]\d+)', answer, re.IGNORECASE)
-            if utc_match:
-                timezone = f"{utc_match.group(1)}{utc_match.group(2)}"
-                location = answer[:utc_match.start()].strip() + answer[utc_match.end():].strip()
-                location = re.sub(r'\s*[,/]\s*$', '', location)
-                location = re.sub(r'\s+and\s+$', '', location)
-            else:
-                # Look for timezone abbreviations
-                tz_match = re.search(r'\b(EST|CST|MST|PST|EDT|CDT|MDT|PDT)\b', answer, re.IGNORECASE)
-                if tz_match:
-                    timezone = tz_match.group(1)
-                    location = answer[:tz_match.start()].strip() + answer[tz_match.end():].strip()
-                    location = re.sub(r'\s*[,/]\s*$', '', location)
-                    location = re.sub(r'\s+and\s+$', '', location)
-        
-        # If still no timezone, try to extract it from common phrases
-        if not timezone:
-            # Look for phrases like "in [timezone]" or "timezone is [timezone]"
-            tz_phrase_match = re.search(r'(?:in|timezone is|timezone of|timezone)\s+([A-Za-z\s+]+)(?:\s+time)?', answer, re.IGNORECASE)
-            if tz_phrase_match:
-                potential_tz = tz_phrase_match.group(1).strip()
-                # Check if this potential timezone is in our list
-                for tz in self.timezones:
-                    if potential_tz.lower() == tz.lower():
-                        timezone = tz
-                        location = answer[:tz_phrase_match.start()].strip() + answer[tz_phrase_match.end():].strip()
-                        location = re.sub(r'\s*[,/]\s*$', '', location)
-                        location = re.sub(r'\s+and\s+$', '', location)
-                        break
-        
-        # If we still don't have a timezone, use a default
-        if not timezone:
-            timezone = "Unknown"
-            
-        # If location is empty after removing timezone, use a default
-        if not location.strip():
-            location = "Unknown"
-            
+        location, timezone = self.timezone_matcher.split_location(answer)
         log.debug(f"Parsed location: '{location}', timezone: '{timezone}'")
         return location, timezone
     
     def _check_existing_member(self, rsn: str, discord_id_num: int) -> tuple[bool, str]:
-        """Check if a member with the given RSN or Discord ID already exists in the database."""
-        # Check for existing RSN
-        rsn_query = "SELECT rsn FROM member WHERE rsn ILIKE %s"
-        rsn_result = self.bot.selectOne(rsn_query, (rsn,))
-        print(f"RSN Result: {rsn_result}")
-        
-        # Check for existing Discord ID
-        discord_query = "SELECT discord_id_num FROM member WHERE discord_id_num = %s"
-        discord_result = self.bot.selectOne(discord_query, (discord_id_num,))
-        print(f"Discord Result: {discord_result}")
-        
-        if rsn_result and discord_result:
-            return True, f"Both RSN '{rsn}' and Discord ID {discord_id_num} are already registered in the clan."
-        elif rsn_result:
-            return True, f"RSN '{rsn}' is already registered in the clan."
-        elif discord_result:
-            return True, f"Discord ID {discord_id_num} is already registered in the clan."
-        
-        return False, ""
+        """Check if the RSN (as a main, alt or previous name) or Discord ID already belongs to a member."""
+        conflicts = find_conflicts(self.bot, [(rsn, discord_id_num)])[0]
+        log.debug("Existing members for %s / %s: %s", rsn, discord_id_num, conflicts)
+        if not conflicts:
+            return False, ""
+        return True, " ".join(conflict.describe(rsn, discord_id_num) for conflict in conflicts)
     
-    async def _process_application(self, message: discord.Message, interaction: discord.Interaction):
-        """Process an application message and add the user to the database."""
+    async def _process_application(self, message: discord.Message, interaction: discord.Interaction, form: ApplicationForm = None):
+        """
+        Process an application message and add the user to the database.
+        
+        Returns:
+            bool: True if the application was handled, accepted or turned down, and False if
+            it couldn't be added to the database and should stay pending
+        """
         try:
             log.info(f"Processing application from {message.author.name}")
             
-            # Extract RSN from the message
-            rsn = self._extract_answer(message.content, "What is your RSN?")
+            # Split the message into its answers, unless the caller already has
+            if form is None:
+                form = self.parser.parse(message.content)
+            rsn = form.rsn
             
             # Parse location and timezone
-            location, timezone = self._parse_location_timezone(message.content)
+            location, timezone = self._parse_location_timezone(form.location_timezone)
             
-            # Extract additional application questions
-            how_found_clan = self._extract_answer(message.content, "How did you find out about the clan?")
-            favorite_activities = self._extract_answer(message.content, "What are your favorite activities to do on Runescape?")
-            play_frequency = self._extract_answer(message.content, "How often do you play?")
-            coffee_preference = self._extract_answer(message.content, "How do you drink your Coffee?")
+            # Additional application questions
+            how_found_clan = form.how_found_clan
+            favorite_activities = form.favorite_activities
+            play_frequency = form.play_frequency
+            coffee_preference = form.coffee_preference
             
             log.debug(f"Extracted RSN: {rsn}")
             log.debug(f"Extracted location: {location}, timezone: {timezone}")
@@ -269,7 +478,7 @@ class Applications(commands.Cog):
             if not rsn:
                 log.warning(f"No RSN found in application from {message.author.name}")
                 await interaction.followup.send(f"I couldn't find the RSN in the application. Please make sure it's clearly stated.", ephemeral=False)
-                return
+                return True
                 
             # Get the user's Discord username and ID number
             discord_id = message.author.name  # Use username instead of ID string
@@ -280,7 +489,7 @@ class Applications(commands.Cog):
             if exists:
                 log.warning(f"Attempted to add existing member: {error_message}")
                 await interaction.followup.send(error_message, ephemeral=True)
-                return
+                return True
             
             # Get the current date for join date
             join_date = datetime.datetime.now().strftime("%Y-%m-%d")
@@ -302,18 +511,22 @@ class Applications(commands.Cog):
             )
             
             log.debug(f"Executing database query with params: {params}")
-            self.bot.execute_query(query, params)
+            if not self.bot.execute_query(query, params):
+                log.error(f"Failed to add {rsn} to database")
+                await interaction.followup.send(f"There was an error adding the application to the database. Please contact an admin.", ephemeral=True)
+                return False
             
             log.info(f"Successfully added {rsn} to database")
             
             # Grant the Trial Member role
             try:
-                member = message.guild.get_member(message.author.id)
+                member = await self._get_member(message.guild, message.author.id)
                 if member:
                     role = message.guild.get_role(self.trial_member_role_id)
                     if role:
                         log.debug(f"Adding role {role.name} to {member.name}")
-                        await member.add_roles(role)
+                        # Through the queue, so single accepts are paced along with batches
+                        await self.role_grants.submit(member, role, reason="Application accepted")
                         
                         # Send confirmation message
                         embed = discord.Embed(
@@ -339,51 +552,23 @@ class Applications(commands.Cog):
             except Exception as e:
                 log.error(f"Error granting Trial Member role: {e}")
                 await interaction.followup.send(f"The application was processed, but there was an error granting the role. Please contact an admin.", ephemeral=True)
+            # The member was added, so the application isn't pending any more even if the role wasn't granted
+            return True
         except Exception as e:
             log.error(f"Error processing application: {e}")
             try:
                 await interaction.followup.send(f"There was an error processing the application. Please contact an admin.", ephemeral=True)
             except discord.errors.NotFound:
                 log.error("Could not send error message: Interaction no longer valid")
+            return False
     
     def _extract_answer(self, content, question):
         """Extract the answer to a specific question from the application message."""
-        # Find the question in the content
-        question_index = content.find(question)
-        if question_index == -1:
-            log.debug(f"Question not found in content: {question}")
+        field = self.parser.field_for(question)
+        if field is None:
+            log.debug(f"Not an application question: {question}")
             return None
-            
-        # Find the next question or the end of the content
-        next_question_index = -1
-        for q in ["What is your RSN?", "How did you find out about the clan?", 
-                 "What are your favorite activities to do on Runescape?", 
-                 "Where do you live and what timezone are you in?",
-                 "How often do you play?",
-                 "Have you read our",  
-                 "and do you agree to abide by these rules?",
-                 "Are you currently in another clan?",
-                 "How do you drink your Coffee?"]:
-            if q != question:
-                index = content.find(q, question_index + len(question))
-                if index != -1 and (next_question_index == -1 or index < next_question_index):
-                    next_question_index = index
-        
-        # Special handling for the rules question
-        if question == "Have you read our":
-            # Find the end of the rules question
-            rules_end = content.find("and do you agree to abide by these rules?")
-            if rules_end != -1:
-                next_question_index = rules_end
-        
-        # Extract the answer
-        if next_question_index == -1:
-            # No next question found, take until the end
-            answer = content[question_index + len(question):].strip()
-        else:
-            # Take until the next question
-            answer = content[question_index + len(question):next_question_index].strip()
-            
+        answer = getattr(self.parser.parse(content), field)
         log.debug(f"Extracted answer for '{question}': {answer}")
         return answer
 
@@ -18,15 +18,27 @@ import logging
 from typing import Union, Literal, Optional, List, Any
 import re
 import datetime
+from util.command_timing import CommandMetrics, CommandTiming, current_command, time_responses
 
-log = logging.getLogger('discord')
+log = logging.getLogger(__name__)
 
 def log_command(func):
     @wraps(func)
     async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
+        # Time the command, its first response and the queries it runs. It's named the same as in
+        # command_usage, so /command-stats and the live metrics agree
+        command_name = func.__name__
+        timing = CommandTiming(command_name)
+        time_responses(interaction)
+        timing_token = current_command.set(timing)
         try:
             # Execute the command
-            result = await func(self, interaction, *args, **kwargs)
+            try:
+                result = await func(self, interaction, *args, **kwargs)
+            finally:
+                current_command.reset(timing_token)
+                timing.finish()
+                record_command_timing(self.bot, timing)
             
             # Get the member's _id from the database
             member = self.bot.selectOne(
@@ -39,10 +51,12 @@ def log_command(func):
             self.bot.execute_query(
                 """
                 INSERT INTO command_usage 
-                (command_name, member_id, channel_id, guild_id, success, error_message)
-                VALUES (%s, %s, %s, %s, true, NULL)
+                (command_name, member_id, channel_id, guild_id, success, error_message,
+                 duration_ms, first_response_ms, first_response_type, db_ms)
+                VALUES (%s, %s, %s, %s, true, NULL, %s, %s, %s, %s)
                 """,
-                (func.__name__, member_id, interaction.channel_id, interaction.guild_id)
+                (command_name, member_id, interaction.channel_id, interaction.guild_id,
+                 timing.duration_ms, timing.first_response_ms, timing.first_response_type, timing.db_ms)
             )
             
             return result
@@ -59,14 +73,22 @@ def log_command(func):
             self.bot.execute_query(
                 """
                 INSERT INTO command_usage 
-                (command_name, member_id, channel_id, guild_id, success, error_message)
-                VALUES (%s, %s, %s, %s, false, %s)
+                (command_name, member_id, channel_id, guild_id, success, error_message,
+                 duration_ms, first_response_ms, first_response_type, db_ms)
+                VALUES (%s, %s, %s, %s, false, %s, %s, %s, %s, %s)
                 """,
-                (func.__name__, member_id, interaction.channel_id, interaction.guild_id, error_message)
+                (command_name, member_id, interaction.channel_id, interaction.guild_id, error_message,
+                 timing.duration_ms, timing.first_response_ms, timing.first_response_type, timing.db_ms)
             )
             raise
     return wrapper
 
+def record_command_timing(bot, timing: CommandTiming):
+    """Add a command's timings to the bot's in-memory command metrics, if it has them."""
+    metrics = getattr(bot, "command_metrics", None)
+    if isinstance(metrics, CommandMetrics):
+        metrics.record(timing)
+
 class BaseCog(commands.Cog):
     """
     Base cog class that provides common functionality for all cogs
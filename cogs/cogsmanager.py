@@ -18,6 +18,7 @@ import traceback
 
 from typing import Literal, Optional, List
 from discord.ext import commands
+from util.cluster import get_cluster
 
 class Cogsmanager(commands.Cog, name="cogsmanager"):
     """
@@ -51,6 +52,22 @@ class Cogsmanager(commands.Cog, name="cogsmanager"):
         else:
             return [cog_name]
 
+    def share_with_clusters(self, action: str, cogs: list, results: list):
+        """
+        Have the bot's other clusters load, unload or reload the same cogs.
+        
+        Args:
+            action: "load", "unload" or "reload"
+            cogs: The cogs that were changed in this cluster
+            results: Lines to report back, a note is added if anything was sent
+        """
+        cluster = get_cluster(self.bot)
+        if cluster is None or not cogs:
+            return
+        for cog in cogs:
+            cluster.broadcast("extension", {"action": action, "name": f"cogs.{cog}"})
+        results.append(f"📡 Sent to the other {cluster.cluster_count - 1} clusters.")
+
     @commands.command()
     @commands.is_owner()
     async def load(self, ctx: commands.Context, cog_name: str):
@@ -69,14 +86,17 @@ class Cogsmanager(commands.Cog, name="cogsmanager"):
         """
         cogs_to_load = self.get_cog_list(cog_name)
         results = []
+        changed = []
         
         for cog in cogs_to_load:
             try:
                 await self.bot.load_extension(f"cogs.{cog}")
                 results.append(f"✅ {cog} cog has been loaded.")
+                changed.append(cog)
             except commands.ExtensionFailed as extension_failed:
                 results.append(f"❌ Error loading {cog} cog: {extension_failed}")
         
+        self.share_with_clusters("load", changed, results)
         await ctx.send("\n".join(results))
 
     @commands.command()
@@ -98,14 +118,17 @@ class Cogsmanager(commands.Cog, name="cogsmanager"):
         """
         cogs_to_unload = self.get_cog_list(cog_name)
         results = []
+        changed = []
         
         for cog in cogs_to_unload:
             try:
                 await self.bot.unload_extension(f"cogs.{cog}")
                 results.append(f"✅ {cog} cog has been unloaded.")
+                changed.append(cog)
             except commands.ExtensionFailed as extension_failed:
                 results.append(f"❌ Error unloading {cog} cog: {extension_failed}")
         
+        self.share_with_clusters("unload", changed, results)
         await ctx.send("\n".join(results))
 
     @commands.command()
@@ -127,31 +150,53 @@ class Cogsmanager(commands.Cog, name="cogsmanager"):
         """
         cogs_to_reload = self.get_cog_list(cog_name)
         results = []
+        changed = []
         
         for cog in cogs_to_reload:
             try:
                 await self.bot.reload_extension(f"cogs.{cog}")
                 results.append(f"✅ {cog} cog has been reloaded.")
+                changed.append(cog)
             except commands.ExtensionFailed as extension_failed:
                 results.append(f"❌ Error reloading {cog} cog: {extension_failed}")
         
+        self.share_with_clusters("reload", changed, results)
         await ctx.send("\n".join(results))
 
     @commands.command()
     @commands.is_owner()
-    async def sync(self, ctx: commands.Context):
+    async def sync(self, ctx: commands.Context, *flags: str):
         if not await self.check_leaders_category(ctx):
             return
             
         """
         Syncs the bot's commands with Discord.
+        Scopes whose commands haven't changed since the last sync are skipped.
 
         Args:
             ctx as commands.Context
+            flags: Pass --force to sync even if nothing has changed
         """
+        force = "--force" in flags
         try:
-            await self.bot.tree.sync()
-            await ctx.send("✅ Commands have been synced.")
+            results = []
+            synced = await self.bot.sync_app_commands(force=force)
+            if synced is None:
+                results.append("⏭️ Global commands are unchanged.")
+            else:
+                results.append(f"✅ Synced {len(synced)} global commands.")
+            
+            # Also sync the test server if this is it
+            if ctx.guild and ctx.guild.id == int(self.bot.getConfigValue("test_server_guild_id")):
+                synced = await self.bot.sync_app_commands(guild=ctx.guild, force=force)
+                if synced is None:
+                    results.append("⏭️ Test server commands are unchanged.")
+                else:
+                    results.append(f"✅ Synced {len(synced)} test server commands.")
+            
+            if not force:
+                results.append("Use `!sync --force` to sync unchanged commands anyway.")
+            await ctx.send("\n".join(results))
         except Exception as e:
             await self.bot.get_cog("BaseCog").handle_error(ctx, e)
 
@@ -9,8 +9,9 @@ import discord
 from typing import Optional, Union, Literal, List, Any
 import logging
 from cogs.base_cog import log_command
+from util.render_cache import cache_tables, render_cached, send_messages
 
-log = logging.getLogger('discord')
+log = logging.getLogger(__name__)
 
 class CompetitionType(Enum):
     SKILL = "skill"
@@ -116,6 +117,8 @@ class Competition(commands.Cog):
     """
     def __init__(self, bot):
         self.bot = bot
+        # The tables the cached leaderboards and histories read
+        cache_tables(bot, "competition", "member")
         super().__init__()
     
     async def check_events_category(self, interaction: discord.Interaction) -> bool:
@@ -168,17 +171,26 @@ class Competition(commands.Cog):
             return
         await interaction.response.defer()
         
+        messages = render_cached(self.bot, "comp-leaderboard", (comp_type.value,), ("member",),
+                                 lambda: self.render_leaderboard(comp_type))
+        await send_messages(interaction, messages)
+
+    def render_leaderboard(self, comp_type: CompetitionType):
+        """
+        Render the leaderboard's messages, None if the query failed
+        """
         points_column = self.get_points_column(comp_type)
         # Get all members ordered by points in descending order
         members = self.bot.selectMany(f"SELECT rsn, {points_column} FROM member WHERE {points_column} > 0 ORDER BY {points_column} DESC")
         
+        if members is None:
+            return None
         if not members:
-            await interaction.followup.send(f"No members have any {self.get_comp_name(comp_type)} competition points yet.")
-            return
+            return [{"content": f"No members have any {self.get_comp_name(comp_type)} competition points yet."}]
             
         # Format the leaderboard
         leaderboard = self.format_leaderboard(members)
-        await interaction.followup.send(f"```\n{leaderboard}```")
+        return [{"content": f"```\n{leaderboard}```"}]
 
     def format_leaderboard(self, members):
         if not members:
@@ -223,24 +235,32 @@ class Competition(commands.Cog):
             return
         await interaction.response.defer()
         
+        messages = render_cached(self.bot, "comp-wins", (interaction.user.id, interaction.user.name, comp_type.value),
+                                 ("member", "competition"), lambda: self.render_comp_wins(interaction.user, comp_type))
+        await send_messages(interaction, messages)
+
+    def render_comp_wins(self, user, comp_type: CompetitionType):
+        """
+        Render a user's competition wins, None if a query failed
+        """
         # Get the user's _id from the member table
-        user = self.bot.selectOne(f"SELECT _id FROM member WHERE discord_id_num={interaction.user.id}")
-        if user is None:
-            await interaction.followup.send(f"**{interaction.user.name}** you are not registered in our database.", ephemeral=True)
-            return
+        member = self.bot.selectOne(f"SELECT _id FROM member WHERE discord_id_num={user.id}")
+        if member is None:
+            return [{"content": f"**{user.name}** you are not registered in our database.", "ephemeral": True}]
             
         # Get the user's competition wins using the foreign key relationship
         wins = self.bot.selectMany(
-            f"SELECT comp_name FROM competition WHERE winner = {user[0]} AND comp_type = '{comp_type.value}' ORDER BY comp_id DESC"
+            f"SELECT comp_name FROM competition WHERE winner = {member[0]} AND comp_type = '{comp_type.value}' ORDER BY comp_id DESC"
         )
         
+        if wins is None:
+            return None
         if not wins:
-            await interaction.followup.send(f"**{interaction.user.name}** you have not won any {self.get_comp_name(comp_type)} competitions yet.")
-            return
+            return [{"content": f"**{user.name}** you have not won any {self.get_comp_name(comp_type)} competitions yet."}]
             
-        await interaction.followup.send(f"**{interaction.user.name}** you have won **{len(wins)}** {self.get_comp_name(comp_type)} competitions:")
-        for win in wins:
-            await interaction.followup.send(f" - {win[0]}")
+        messages = [{"content": f"**{user.name}** you have won **{len(wins)}** {self.get_comp_name(comp_type)} competitions:"}]
+        messages.extend({"content": f" - {win[0]}"} for win in wins)
+        return messages
             
     @app_commands.command(name="comp-add", description="Add a new competition")
     @app_commands.describe(comp_type="The type of competition (skill or boss)")
@@ -368,21 +388,30 @@ class Competition(commands.Cog):
             return
         await interaction.response.defer()
         
+        messages = render_cached(self.bot, "comp-history", (comp_type.value,), ("competition", "member"),
+                                 lambda: self.render_comp_history(comp_type))
+        await send_messages(interaction, messages)
+
+    def render_comp_history(self, comp_type: CompetitionType):
+        """
+        Render the recent competition history, None if the query failed
+        """
         competitions = self.get_competitions(comp_type)
         
+        if competitions is None:
+            return None
         if not competitions:
-            await interaction.followup.send(f"No {self.get_comp_name(comp_type)} competitions have been recorded yet.")
-            return
+            return [{"content": f"No {self.get_comp_name(comp_type)} competitions have been recorded yet."}]
             
         # Format the competition history
         history = f"**Recent {self.get_comp_name(comp_type)} Competitions**\n\n"
         
-        for comp_id, comp_name, winner_rsn, comp_type, end_date in competitions:
+        for comp_id, comp_name, winner_rsn, _, end_date in competitions:
             # Format the date in dd-mm-yyyy notation in UTC
             formatted_date = end_date.strftime("%d-%m-%Y %H:%M UTC") if end_date else "Unknown"
             history += f"**{comp_name}**  [{formatted_date}] - Won by **{winner_rsn}**\n"
             
-        await interaction.followup.send(history)
+        return [{"content": history}]
 
     @app_commands.command(name="comp-status", description="Check the status of the current competition")
     @log_command
@@ -426,7 +455,7 @@ class Competition(commands.Cog):
                     active_competition = comp
                     break
 
-            print(f"active competition: {active_competition}")
+            log.debug("active competition: %s", active_competition)
             
             if not active_competition:
                 embed = discord.Embed(
@@ -443,7 +472,7 @@ class Competition(commands.Cog):
             
             # Get the competition details
             participants_result = await self.bot.wom_client.competitions.get_details(active_competition.id)
-            print(f"participants result: {participants_result}")
+            log.debug("participants result: %s", participants_result)
 
             if not participants_result.is_ok:
                 await interaction.followup.send("❌ Failed to fetch competition participants.", ephemeral=True)
@@ -499,6 +528,14 @@ class Competition(commands.Cog):
         """
         await interaction.response.defer()
         
+        messages = render_cached(self.bot, "get-recent-comp-metrics", (comp_type.value,), ("competition",),
+                                 lambda: self.render_recent_comp_metrics(comp_type))
+        await send_messages(interaction, messages)
+
+    def render_recent_comp_metrics(self, comp_type: CompetitionType):
+        """
+        Render the metrics of recent competitions, None if the query failed
+        """
         # Set the limit based on competition type
         limit = 5 if comp_type == CompetitionType.SKILL else 3
         
@@ -509,9 +546,10 @@ class Competition(commands.Cog):
             f"ORDER BY comp_id DESC LIMIT {limit}"
         )
         
+        if competitions is None:
+            return None
         if not competitions:
-            await interaction.followup.send(f"No {self.get_comp_name(comp_type)} competitions have been recorded yet.")
-            return
+            return [{"content": f"No {self.get_comp_name(comp_type)} competitions have been recorded yet."}]
             
         # Create an embed to display the metrics
         embed = discord.Embed(
@@ -529,7 +567,7 @@ class Competition(commands.Cog):
                 inline=False
             )
             
-        await interaction.followup.send(embed=embed)
+        return [{"embed": embed}]
 
 async def setup(bot):
     await bot.add_cog(Competition(bot)) 
\ No newline at end of file
@@ -16,6 +16,13 @@ from googleapiclient.errors import HttpError
 import pickle
 import asyncio
 from cogs.base_cog import log_command
+from util.confirmations import Confirmations, get_confirmations
+import logging
+
+log = logging.getLogger(__name__)
+
+# Confirmation kind for importing members from a Google Sheet
+MEMBER_IMPORT_CONFIRMATION = "member_import"
 
 class Dev(commands.Cog):
     """
@@ -29,6 +36,14 @@ class Dev(commands.Cog):
         self.TOKEN_PATH = 'token.json'
         # Path to credentials file
         self.CREDENTIALS_PATH = 'credentials.json'
+        self.confirmations = get_confirmations(bot) or Confirmations(bot)
+
+    async def cog_load(self):
+        """Answer import confirmations, including ones sent before a restart."""
+        self.confirmations.register(MEMBER_IMPORT_CONFIRMATION, self._confirm_member_import)
+
+    async def cog_unload(self):
+        self.confirmations.unregister(MEMBER_IMPORT_CONFIRMATION)
 
     async def check_leaders_category(self, interaction: discord.Interaction) -> bool:
         """
@@ -122,7 +137,7 @@ class Dev(commands.Cog):
                 
             # Debug information
             debug_info = f"Attempting to access sheet ID: {sheet_id}\nSheet name: {sheet_name}\nRange: {range}"
-            print(debug_info)
+            log.debug(debug_info)
             
             try:
                 # Read data from the sheet
@@ -181,151 +196,20 @@ class Dev(commands.Cog):
                     inline=False
                 )
                 
-                confirm_message = await interaction.followup.send(embed=confirm_embed, ephemeral=True)
-                
-                # Add confirmation buttons
-                confirm_button = discord.ui.Button(label="Yes, Insert Data", style=discord.ButtonStyle.green, custom_id="confirm_insert")
-                cancel_button = discord.ui.Button(label="No, Cancel", style=discord.ButtonStyle.red, custom_id="cancel_insert")
+                # The sheet rows are kept with the confirmation so the buttons still work after a restart
+                view = self.confirmations.create(
+                    MEMBER_IMPORT_CONFIRMATION,
+                    interaction.user.id,
+                    {"rows": values[1:]},
+                    confirm_label="Yes, Insert Data",
+                    cancel_label="No, Cancel"
+                )
+                if view is None:
+                    await interaction.followup.send("❌ Couldn't save the confirmation. Check the logs for details.", ephemeral=True)
+                    return
                 
-                view = discord.ui.View()
-                view.add_item(confirm_button)
-                view.add_item(cancel_button)
+                await interaction.followup.send(embed=confirm_embed, view=view, ephemeral=True)
                 
-                await confirm_message.edit(view=view)
-                
-                # Wait for button interaction
-                try:
-                    button_interaction = await self.bot.wait_for(
-                        "interaction",
-                        check=lambda i: i.user.id == interaction.user.id and i.data.get("custom_id") in ["confirm_insert", "cancel_insert"],
-                        timeout=60.0
-                    )
-                    
-                    if button_interaction.data.get("custom_id") == "cancel_insert":
-                        await button_interaction.response.send_message("❌ Data insertion cancelled.", ephemeral=True)
-                        return
-                    
-                    # Process the data insertion
-                    await button_interaction.response.defer(ephemeral=True)
-                    
-                    # Get membership level mapping from config
-                    membership_levels = self.bot.getConfigValue("mem_level_names")
-                    
-                    # Insert data into member table
-                    inserted_count = 0
-                    updated_count = 0
-                    skipped_count = 0
-                    error_count = 0
-                    
-                    for _, row in df.iterrows():
-                        try:
-                            # Extract data from row
-                            rsn = row[0] if len(row) > 0 else None
-                            membership_level = row[3] if len(row) > 3 else None
-                            previous_rsn = row[4] if len(row) > 4 else None
-                            alt_rsn = row[5] if len(row) > 5 else None
-                            discord_id = row[6] if len(row) > 6 else None
-                            join_date_str = row[7] if len(row) > 7 else None
-                            
-                            # Skip if RSN is missing
-                            if not rsn:
-                                skipped_count += 1
-                                continue
-                                
-                            # Convert join date string to datetime
-                            join_date = None
-                            if join_date_str and join_date_str.strip().upper() != "N/A":
-                                try:
-                                    # Use the specific date format %d/%m/%Y
-                                    join_date = datetime.datetime.strptime(join_date_str, "%d/%m/%Y")
-                                except Exception as e:
-                                    print(f"Error parsing date {join_date_str}: {e}")
-                            
-                            # Map membership level to role ID
-                            role_id = None
-                            if membership_level and membership_level.strip().upper() != "N/A":
-                                # If it's a list, try to find a matching role ID
-                                if isinstance(membership_levels, list):
-                                    # Assuming the list contains role IDs in order
-                                    try:
-                                        # Try to use the membership level as an index
-                                        role_id = membership_levels.index(membership_level)
-                                    except (ValueError, IndexError):
-                                        print(f"Could not map membership level '{membership_level}' to a role ID")
-                            
-                            # Handle "N/A" values
-                            if previous_rsn and previous_rsn.strip().upper() == "N/A":
-                                previous_rsn = None
-                                
-                            if alt_rsn and alt_rsn.strip().upper() == "N/A":
-                                alt_rsn = None
-                                
-                            if discord_id and discord_id.strip().upper() == "N/A":
-                                discord_id = None
-                            
-                            # Format arrays for PostgreSQL using the common function
-                            previous_rsn_array = self.bot.get_cog("BaseCog").format_sql_array(previous_rsn)
-                            alt_rsn_array = self.bot.get_cog("BaseCog").format_sql_array(alt_rsn)
-                            
-                            # Debug output for array formatting
-                            print(f"RSN: {rsn}, Previous RSN: {previous_rsn}, Formatted: {previous_rsn_array}")
-                            print(f"RSN: {rsn}, Alt RSN: {alt_rsn}, Formatted: {alt_rsn_array}")
-                            
-                            # Check if member already exists
-                            existing_member = self.bot.selectOne(
-                                f"SELECT _id FROM member WHERE rsn = '{rsn}'"
-                            )
-                            
-                            if existing_member:
-                                # Update existing member
-                                update_sql = f"""
-                                UPDATE member 
-                                SET membership_level = {role_id if role_id is not None else 'NULL'}, 
-                                    previous_rsn = {previous_rsn_array}, 
-                                    alt_rsn = {alt_rsn_array}, 
-                                    discord_id = {f"'{discord_id}'" if discord_id else 'NULL'}, 
-                                    join_date = {f"'{join_date.strftime('%Y-%m-%d')}'" if join_date else 'NULL'}
-                                WHERE rsn = '{rsn}'
-                                """
-                                # print(f"Executing SQL: {update_sql}")
-                                self.bot.execute_query(update_sql)
-                                updated_count += 1
-                            else:
-                                # Insert new member
-                                insert_sql = f"""
-                                INSERT INTO member (rsn, membership_level, previous_rsn, alt_rsn, discord_id, join_date)
-                                VALUES (
-                                    '{rsn}', 
-                                    {role_id if role_id is not None else 'NULL'}, 
-                                    {previous_rsn_array}, 
-                                    {alt_rsn_array}, 
-                                    {f"'{discord_id}'" if discord_id else 'NULL'}, 
-                                    {f"'{join_date.strftime('%Y-%m-%d')}'" if join_date else 'NULL'}
-                                )
-                                """
-                                # print(f"Executing SQL: {insert_sql}")
-                                self.bot.execute_query(insert_sql)
-                                inserted_count += 1
-                                
-                        except Exception as e:
-                            print(f"Error processing row {row}: {e}")
-                            error_count += 1
-                    
-                    # Send summary of database operations
-                    result_embed = discord.Embed(
-                        title="✅ Database Update Complete",
-                        description=f"Successfully processed data from Google Sheet.",
-                        color=discord.Color.green()
-                    )
-                    result_embed.add_field(name="Inserted", value=str(inserted_count), inline=True)
-                    result_embed.add_field(name="Updated", value=str(updated_count), inline=True)
-                    result_embed.add_field(name="Skipped", value=str(skipped_count), inline=True)
-                    result_embed.add_field(name="Errors", value=str(error_count), inline=True)
-                    
-                    await button_interaction.followup.send(embed=result_embed, ephemeral=True)
-                    
-                except asyncio.TimeoutError:
-                    await confirm_message.edit(content="⏱️ Confirmation timed out. Data insertion cancelled.", view=None)
                 
             except HttpError as e:
                 error_details = e.error_details if hasattr(e, 'error_details') else str(e)
@@ -338,7 +222,7 @@ class Dev(commands.Cog):
                 error_message += f"Debug info: {debug_info}"
                 
                 await interaction.followup.send(error_message, ephemeral=True)
-                print(f"Google Sheets API error: {error_details}")
+                log.error("Google Sheets API error: %s", error_details)
             
         except Exception as e:
             error_traceback = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
@@ -347,6 +231,128 @@ class Dev(commands.Cog):
                 ephemeral=True
             )
             
+    async def _confirm_member_import(self, interaction: discord.Interaction, payload, confirmed: bool):
+        """Insert or update the members from a Google Sheet once the import is confirmed."""
+        if not confirmed:
+            await interaction.followup.send("❌ Data insertion cancelled.", ephemeral=True)
+            return
+        
+        # Get membership level mapping from config
+        membership_levels = self.bot.getConfigValue("mem_level_names")
+        
+        # Insert data into member table
+        inserted_count = 0
+        updated_count = 0
+        skipped_count = 0
+        error_count = 0
+        
+        for row in payload["rows"]:
+            try:
+                # Extract data from row
+                rsn = row[0] if len(row) > 0 else None
+                membership_level = row[3] if len(row) > 3 else None
+                previous_rsn = row[4] if len(row) > 4 else None
+                alt_rsn = row[5] if len(row) > 5 else None
+                discord_id = row[6] if len(row) > 6 else None
+                join_date_str = row[7] if len(row) > 7 else None
+                
+                # Skip if RSN is missing
+                if not rsn:
+                    skipped_count += 1
+                    continue
+                    
+                # Convert join date string to datetime
+                join_date = None
+                if join_date_str and join_date_str.strip().upper() != "N/A":
+                    try:
+                        # Use the specific date format %d/%m/%Y
+                        join_date = datetime.datetime.strptime(join_date_str, "%d/%m/%Y")
+                    except Exception as e:
+                        log.warning("Error parsing date %s: %s", join_date_str, e)
+                
+                # Map membership level to role ID
+                role_id = None
+                if membership_level and membership_level.strip().upper() != "N/A":
+                    # If it's a list, try to find a matching role ID
+                    if isinstance(membership_levels, list):
+                        # Assuming the list contains role IDs in order
+                        try:
+                            # Try to use the membership level as an index
+                            role_id = membership_levels.index(membership_level)
+                        except (ValueError, IndexError):
+                            log.warning("Could not map membership level '%s' to a role ID", membership_level)
+                
+                # Handle "N/A" values
+                if previous_rsn and previous_rsn.strip().upper() == "N/A":
+                    previous_rsn = None
+                    
+                if alt_rsn and alt_rsn.strip().upper() == "N/A":
+                    alt_rsn = None
+                    
+                if discord_id and discord_id.strip().upper() == "N/A":
+                    discord_id = None
+                
+                # Format arrays for PostgreSQL using the common function
+                previous_rsn_array = self.bot.get_cog("BaseCog").format_sql_array(previous_rsn)
+                alt_rsn_array = self.bot.get_cog("BaseCog").format_sql_array(alt_rsn)
+                
+                # Debug output for array formatting
+                log.debug("RSN: %s, Previous RSN: %s, Formatted: %s", rsn, previous_rsn, previous_rsn_array)
+                log.debug("RSN: %s, Alt RSN: %s, Formatted: %s", rsn, alt_rsn, alt_rsn_array)
+                
+                # Check if member already exists
+                existing_member = self.bot.selectOne(
+                    f"SELECT _id FROM member WHERE rsn = '{rsn}'"
+                )
+                
+                if existing_member:
+                    # Update existing member
+                    update_sql = f"""
+                    UPDATE member 
+                    SET membership_level = {role_id if role_id is not None else 'NULL'}, 
+                        previous_rsn = {previous_rsn_array}, 
+                        alt_rsn = {alt_rsn_array}, 
+                        discord_id = {f"'{discord_id}'" if discord_id else 'NULL'}, 
+                        join_date = {f"'{join_date.strftime('%Y-%m-%d')}'" if join_date else 'NULL'}
+                    WHERE rsn = '{rsn}'
+                    """
+                    # print(f"Executing SQL: {update_sql}")
+                    self.bot.execute_query(update_sql)
+                    updated_count += 1
+                else:
+                    # Insert new member
+                    insert_sql = f"""
+                    INSERT INTO member (rsn, membership_level, previous_rsn, alt_rsn, discord_id, join_date)
+                    VALUES (
+                        '{rsn}', 
+                        {role_id if role_id is not None else 'NULL'}, 
+                        {previous_rsn_array}, 
+                        {alt_rsn_array}, 
+                        {f"'{discord_id}'" if discord_id else 'NULL'}, 
+                        {f"'{join_date.strftime('%Y-%m-%d')}'" if join_date else 'NULL'}
+                    )
+                    """
+                    # print(f"Executing SQL: {insert_sql}")
+                    self.bot.execute_query(insert_sql)
+                    inserted_count += 1
+                    
+            except Exception as e:
+                log.error("Error processing row %s: %s", row, e)
+                error_count += 1
+        
+        # Send summary of database operations
+        result_embed = discord.Embed(
+            title="✅ Database Update Complete",
+            description=f"Successfully processed data from Google Sheet.",
+            color=discord.Color.green()
+        )
+        result_embed.add_field(name="Inserted", value=str(inserted_count), inline=True)
+        result_embed.add_field(name="Updated", value=str(updated_count), inline=True)
+        result_embed.add_field(name="Skipped", value=str(skipped_count), inline=True)
+        result_embed.add_field(name="Errors", value=str(error_count), inline=True)
+        
+        await interaction.followup.send(embed=result_embed, ephemeral=True)
+            
     def get_google_sheets_service(self):
         """Get an authenticated Google Sheets service."""
         creds = None
@@ -359,7 +365,7 @@ class Dev(commands.Cog):
             try:
                 creds = Credentials.from_authorized_user_file(token_path, self.SCOPES)
             except Exception as e:
-                print(f"Error loading token file: {e}")
+                log.warning(f"Error loading token file: {e}")
                 # If there's an error loading the token, we'll try to get new credentials
                 
         # If credentials are not valid or don't exist, get new ones
@@ -368,7 +374,7 @@ class Dev(commands.Cog):
                 try:
                     creds.refresh(Request())
                 except Exception as e:
-                    print(f"Error refreshing token: {e}")
+                    log.warning(f"Error refreshing token: {e}")
                     # If refresh fails, we'll try to get new credentials
             else:
                 try:
@@ -377,7 +383,7 @@ class Dev(commands.Cog):
                         self.CREDENTIALS_PATH, self.SCOPES)
                     creds = flow.run_local_server(port=0)
                 except Exception as e:
-                    print(f"Browser authentication failed: {e}")
+                    log.warning(f"Browser authentication failed: {e}")
                     # Fall back to console-based authentication
                     flow = InstalledAppFlow.from_client_secrets_file(
                         self.CREDENTIALS_PATH, self.SCOPES)
@@ -387,18 +393,18 @@ class Dev(commands.Cog):
             try:
                 with open(token_path, "w") as token:
                     token.write(creds.to_json())
-                print(f"Token saved to {token_path}")
+                log.info(f"Token saved to {token_path}")
             except PermissionError:
-                print(f"Permission denied when writing to {token_path}. Token will not be saved.")
+                log.warning(f"Permission denied when writing to {token_path}. Token will not be saved.")
             except Exception as e:
-                print(f"Error saving token: {e}")
+                log.error(f"Error saving token: {e}")
                 
         # Build and return the service
         try:
             service = build('sheets', 'v4', credentials=creds)
             return service
         except Exception as e:
-            print(f"Error building Google Sheets service: {e}")
+            log.error(f"Error building Google Sheets service: {e}")
             return None
 
     @commands.command(name="match_disc_id_numbers")
@@ -426,7 +432,7 @@ class Dev(commands.Cog):
                 AND discord_id_num IS NULL
             """)
             
-            print(f"members: {members}")
+            log.debug("members: %s", members)
             if not members:
                 await ctx.send("✅ No members found needing Discord ID updates.")
                 return
@@ -435,26 +441,24 @@ class Dev(commands.Cog):
             not_found_count = 0
             error_count = 0
             
-            # Get all members in the server
+            # Get all members in the server, from Discord since the cache only keeps managed and active members
             guild = ctx.guild
-            guild_members = guild.members
+            guild_members = [guild_member async for guild_member in guild.fetch_members(limit=None)]
             
             for member in members:
                 try:
-                    print(f"member: {member}")
+                    log.debug("member: %s", member)
                     discord_id = member[2]
                     
                     # Find matching member in the guild
                     matching_member = None
                     for guild_member in guild_members:
-                        print(f"guild_member: {guild_member}")
-                        print(f"guild_member.id: {guild_member.id}")
                         if str(guild_member) == discord_id:
                             matching_member = guild_member
                             break
                     
                     if not matching_member:
-                        print(f"Could not find Discord user with ID {discord_id} in the server")
+                        log.warning("Could not find Discord user with ID %s in the server", discord_id)
                         not_found_count += 1
                         continue
                     
@@ -466,10 +470,10 @@ class Dev(commands.Cog):
                     """)
                     
                     updated_count += 1
-                    print(f"Updated member {member[1]} with Discord ID {matching_member.id}")
+                    log.info("Updated member %s with Discord ID %s", member[1], matching_member.id)
                     
                 except Exception as e:
-                    print(f"Error processing member {member[1]}: {e}")
+                    log.error("Error processing member %s: %s", member[1], e)
                     error_count += 1
             
             # Send summary
@@ -4,6 +4,9 @@ from discord import app_commands
 import datetime
 import random
 from datetime import timedelta
+import logging
+
+log = logging.getLogger(__name__)
 
 class Lotto(commands.Cog):
     """
@@ -137,7 +140,7 @@ class Lotto(commands.Cog):
                 """,
                 (lottery_id,)
             )
-            print(f"entries: {entries}")
+            log.debug("entries: %s", entries)
             if not entries:
                 await interaction.response.send_message(
                     "No entries found for this lottery.",
@@ -151,7 +154,7 @@ class Lotto(commands.Cog):
             for entry in entries:
                 weighted_entries.extend([entry[0]] * entry[1])  # member_id, entries_purchased
                 entries_by_member[entry[0]] = entry[1]
-            print(f"weighted_entries: {weighted_entries}")
+            log.debug("weighted_entries: %d tickets", len(weighted_entries))
             # Select winner
             winner_id = random.choice(weighted_entries)
             
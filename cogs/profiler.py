@@ -0,0 +1,208 @@
+# profiler.py
+"""
+Owner commands for profiling the running bot.
+
+Starts a sampling profiler or cProfile for a number of seconds, or takes a
+tracemalloc snapshot, and uploads the report as a file. Nothing is running
+unless one of these commands started it. Reports too big for the server's upload
+limit are gzipped, and cut short if they still don't fit.
+"""
+import asyncio
+import datetime
+import gzip
+import io
+import logging
+import tracemalloc
+
+import discord
+from discord.ext import commands
+
+from util.profiling import PROFILE_MODES, format_allocations, make_profiler
+
+log = logging.getLogger(__name__)
+
+MAX_SECONDS = 600
+# Discord's upload limit outside servers, and for servers without boosts
+DEFAULT_UPLOAD_LIMIT = 10 * 1024 * 1024
+TRUNCATED_NOTE = "\n... report truncated to fit Discord's upload limit\n"
+
+class Profiler(commands.Cog, name="profiler"):
+    """
+    Logic for profiling the bot without restarting it
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.profiler = None
+        self.profile_task = None
+        self.profile_ctx = None
+        # True while a memtop command has tracemalloc tracing
+        self.tracing = False
+
+    async def cog_unload(self):
+        if self.profile_task is not None:
+            self.profile_task.cancel()
+        if self.profiler is not None:
+            self.profiler.stop()
+            self.profiler = None
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+
+    async def check_leaders_category(self, ctx: commands.Context) -> bool:
+        """
+        Check if the command is being used in a channel within the LEADERS category
+        """
+        return await self.bot.get_cog("BaseCog").check_category(
+            ctx,
+            "LEADERS"
+        )
+
+    def report_file(self, name: str, report: str, limit: int = DEFAULT_UPLOAD_LIMIT) -> discord.File:
+        """
+        Get a report as a file attachment no bigger than limit bytes.
+
+        Reports over the limit are gzipped, and if that still doesn't fit the report
+        is cut short, keeping its top lines, which is where the costliest entries are.
+        """
+        filename = f"{name}-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}.txt"
+        data = report.encode()
+        if len(data) > limit:
+            compressed = gzip.compress(data)
+            if len(compressed) <= limit:
+                return discord.File(io.BytesIO(compressed), filename=f"{filename}.gz")
+            note = TRUNCATED_NOTE.encode()
+            data = data[:limit - len(note)].rsplit(b"\n", 1)[0] + note
+        return discord.File(io.BytesIO(data), filename=filename)
+
+    def upload_limit(self, ctx: commands.Context) -> int:
+        """The biggest file ctx's channel takes."""
+        return ctx.guild.filesize_limit if ctx.guild is not None else DEFAULT_UPLOAD_LIMIT
+
+    @commands.group(invoke_without_command=True)
+    @commands.is_owner()
+    async def profile(self, ctx: commands.Context):
+        if not await self.check_leaders_category(ctx):
+            return
+            
+        """
+        Shows whether a profile is running.
+
+        Args:
+            ctx as commands.Context
+        """
+        if self.profiler is None:
+            await ctx.send(f"No profile is running. Use `!profile start [{'|'.join(PROFILE_MODES)}] [seconds]`.")
+        else:
+            await ctx.send(f"A {self.profiler.mode} profile is running. Use `!profile stop` to finish it early.")
+
+    @profile.command(name="start")
+    @commands.is_owner()
+    async def profile_start(self, ctx: commands.Context, mode: str = "sampling", seconds: int = 30):
+        if not await self.check_leaders_category(ctx):
+            return
+            
+        """
+        Starts a profile and uploads the report when it finishes.
+
+        Args:
+            ctx as commands.Context
+            mode (str): sampling (low overhead) or cprofile (exact, but slows the bot down)
+            seconds (int): How long to profile for, up to 600
+        """
+        if self.profiler is not None:
+            await ctx.send(f"❌ A {self.profiler.mode} profile is already running.")
+            return
+        if mode not in PROFILE_MODES:
+            await ctx.send(f"❌ Unknown mode {mode}, choose from {', '.join(PROFILE_MODES)}.")
+            return
+        seconds = max(1, min(seconds, MAX_SECONDS))
+
+        self.profiler = make_profiler(mode)
+        self.profiler.start()
+        self.profile_ctx = ctx
+        self.profile_task = asyncio.create_task(self._finish_profile_after(seconds))
+        log.info(f"{ctx.author} started a {mode} profile for {seconds}s")
+        await ctx.send(f"✅ Started a {mode} profile for {seconds}s.")
+
+    @profile.command(name="stop")
+    @commands.is_owner()
+    async def profile_stop(self, ctx: commands.Context):
+        if not await self.check_leaders_category(ctx):
+            return
+            
+        """
+        Stops the running profile early and uploads the report.
+
+        Args:
+            ctx as commands.Context
+        """
+        if self.profiler is None:
+            await ctx.send("❌ No profile is running.")
+            return
+        self.profile_task.cancel()
+        self.profile_task = None
+        await self._finish_profile(ctx)
+
+    async def _finish_profile_after(self, seconds: int):
+        await asyncio.sleep(seconds)
+        self.profile_task = None
+        ctx = self.profile_ctx
+        # Nothing awaits this task, so an error would otherwise go unseen
+        try:
+            await self._finish_profile(ctx)
+        except Exception as e:
+            log.error(f"Error finishing the profile: {e}", exc_info=True)
+            try:
+                await ctx.send("❌ The profile finished but its report couldn't be uploaded. Check the logs for more information.")
+            except Exception as e:
+                log.error(f"Error reporting the failed profile: {e}")
+
+    async def _finish_profile(self, ctx: commands.Context):
+        profiler, self.profiler = self.profiler, None
+        profiler.stop()
+        # Formatting a big profile takes a while, keep it off the event loop
+        report = await asyncio.to_thread(profiler.report)
+        upload = self.report_file(f"profile-{profiler.mode}", report, self.upload_limit(ctx))
+        await ctx.send(f"📊 {profiler.mode} profile finished.", file=upload)
+
+    @commands.command()
+    @commands.is_owner()
+    async def memtop(self, ctx: commands.Context, seconds: int = 30, limit: int = 25):
+        if not await self.check_leaders_category(ctx):
+            return
+            
+        """
+        Uploads the lines allocating the most memory, and what grew over a number of seconds.
+        tracemalloc is only tracing for the length of the command unless the bot was started with it on.
+
+        Args:
+            ctx as commands.Context
+            seconds (int): How long to trace for, up to 600
+            limit (int): How many lines to list
+        """
+        if self.tracing:
+            await ctx.send("❌ A memtop is already running.")
+            return
+        seconds = max(0, min(seconds, MAX_SECONDS))
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+            self.tracing = True
+            await ctx.send(f"✅ Tracing allocations for {seconds}s.")
+        try:
+            previous = tracemalloc.take_snapshot()
+            await asyncio.sleep(seconds)
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if started_tracing and self.tracing:
+                tracemalloc.stop()
+                self.tracing = False
+
+        report = await asyncio.to_thread(format_allocations, snapshot, previous, limit)
+        await ctx.send("📊 Memory allocations", file=self.report_file("memtop", report, self.upload_limit(ctx)))
+
+async def setup(bot):
+    """
+    Loads the cog on start.
+    """
+    await bot.add_cog(Profiler(bot))
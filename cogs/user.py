@@ -4,7 +4,11 @@ from discord.ext import commands
 from typing import Optional
 from enum import Enum
 from cogs.base_cog import log_command
+from util.timezones import TimezoneMatcher
 import datetime
+import logging
+
+log = logging.getLogger(__name__)
 
 class ProfileField(Enum):
     PREVIOUS_RSN = "previous_rsn"
@@ -15,6 +19,15 @@ class ProfileField(Enum):
 class User(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.timezone_matcher = TimezoneMatcher()  # Aliases replaced from config
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Use the timezone aliases from config, like the Applications cog does for applications."""
+        try:
+            self.timezone_matcher = TimezoneMatcher.from_config(self.bot.getConfigValue("timezones"))
+        except KeyError:
+            log.warning("No 'timezones' in config.json, using the default timezone aliases")
 
     @app_commands.command(name="update_profile", description="Update your member profile information")
     @app_commands.describe(
@@ -57,7 +70,15 @@ class User(commands.Cog):
                     return
 
             elif field == ProfileField.TIMEZONE:
-                value = value.upper()
+                # Stored as the IANA zone, the same as accepted applications
+                match = self.timezone_matcher.find(value)
+                if match is None:
+                    await interaction.response.send_message(
+                        "Timezone not recognised. Use a zone like America/New_York, an abbreviation like EST or an offset like UTC+5",
+                        ephemeral=True
+                    )
+                    return
+                value = match.zone
 
             # Check if user exists in member table
             user = self.bot.selectOne(
@@ -111,7 +132,7 @@ class User(commands.Cog):
         await interaction.response.defer()
         
         # Only allow updates on certain keys, this prevents new keys from being added
-        print(f'Updating user {user_rsn}. Key {update_key} will be set to value {update_value}.')
+        log.info('Updating user %s. Key %s will be set to value %s.', user_rsn, update_key, update_value)
         if update_key == "join_date":
             update_value = datetime.datetime.strptime(update_value, self.bot.getConfigValue("datetime_fmt"))
         self.bot.execute_query(
@@ -5,6 +5,11 @@ import datetime
 import sys
 import os
 from cogs.base_cog import log_command
+from util.member_record import record_factory
+from util.render_cache import cache_tables, render_cached, send_messages
+import logging
+
+log = logging.getLogger(__name__)
 
 # Add the parent directory to the path so we can import the cogs
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -15,14 +20,16 @@ class UserLookup(commands.Cog):
     """
     def __init__(self, bot):
         self.bot = bot
+        # The table the cached yellowpages reads
+        cache_tables(bot, "member")
 
     @app_commands.command(name="list-members", description="Print out a list of all members")
     async def list_members(self, interaction):
         await interaction.response.defer()
         
-        print("list_members")
+        log.debug("list_members")
         all_members = self.bot.selectMany(
-            "SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member"
+            "SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member", row_factory=record_factory
         )        
         
         # Check if we have any members
@@ -75,7 +82,7 @@ class UserLookup(commands.Cog):
             
         # Create a dictionary mapping column names to values
         user = dict(zip(column_names, user_data))
-        print(f"user: {user}")
+        log.debug("user: %s", user)
         # Create an embed for the member information
         embed = discord.Embed(
             title=f"Member Information: {user['rsn']}",
@@ -146,7 +153,7 @@ class UserLookup(commands.Cog):
     async def list_inactive(self, interaction):
         await interaction.response.defer()
         
-        inactive_members = self.bot.selectMany("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member WHERE active=false")
+        inactive_members = self.bot.selectMany("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member WHERE active=false", row_factory=record_factory)
         
         # Check if we have any members
         if not inactive_members:
@@ -176,7 +183,7 @@ class UserLookup(commands.Cog):
         await interaction.response.defer()
         
         on_leave_members = self.bot.selectMany(
-            "SELECT rsn, discord_id, alt_rsn, previous_rsn, on_leave_notes FROM member WHERE on_leave=true"
+            "SELECT rsn, discord_id, alt_rsn, previous_rsn, on_leave_notes FROM member WHERE on_leave=true", row_factory=record_factory
         )
         
         # Check if we have any members
@@ -206,13 +213,19 @@ class UserLookup(commands.Cog):
     async def yellowpages(self, interaction):
         await interaction.response.defer()
         
-        print("yellowpages")
-        all_members = self.bot.selectMany("SELECT rsn, discord_id FROM member ORDER BY rsn")
+        log.debug("yellowpages")
+        messages = render_cached(self.bot, "yellowpages", (), ("member",), self.render_yellowpages)
+        await send_messages(interaction, messages)
+
+    def render_yellowpages(self):
+        """Render the yellowpages' messages, None if the query failed."""
+        all_members = self.bot.selectMany("SELECT rsn, discord_id FROM member ORDER BY rsn", row_factory=record_factory)
         
+        if all_members is None:
+            return None
         # Check if we have any members
         if not all_members:
-            await interaction.followup.send("No members found in the database.")
-            return
+            return [{"content": "No members found in the database."}]
             
         # Format the yellowpages
         formatted_output = self.format_yellowpages(all_members)
@@ -220,17 +233,9 @@ class UserLookup(commands.Cog):
         # Check if the output is too long for Discord (2000 character limit)
         if len(formatted_output) > 1900:  # Leave some room for the code block markers
             # Split the output into chunks
-            chunks = self.split_yellowpages(all_members)
-            
-            # Send the first chunk
-            await interaction.followup.send(f'```\n{chunks[0]}```')
-            
-            # Send additional chunks if needed
-            for i, chunk in enumerate(chunks[1:], 2):
-                await interaction.followup.send(f'```\n{chunk}```')
-        else:
-            # Send the complete output
-            await interaction.followup.send(f'```\n{formatted_output}```')
+            return [{"content": f'```\n{chunk}```'} for chunk in self.split_yellowpages(all_members)]
+        # Send the complete output
+        return [{"content": f'```\n{formatted_output}```'}]
             
     def format_user_list(self, list):
         if not list:
@@ -240,25 +245,25 @@ class UserLookup(commands.Cog):
         output = "**Member List**\n\n"
         
         for i, mem in enumerate(list, 1):
-            rsn = mem[0]
-            discord_id = mem[1] or "Not linked"
+            rsn = mem.rsn
+            discord_id = mem.discord_id or "Not linked"
             
             # Format alt_rsn array
-            alt_rsn = mem[2]
+            alt_rsn = mem.alt_rsn
             if alt_rsn and len(alt_rsn) > 0:
                 alt_rsn_str = ", ".join(alt_rsn)
             else:
                 alt_rsn_str = "None"
             
             # Format previous_rsn array
-            prev_rsn = mem[3]
+            prev_rsn = mem.previous_rsn
             if prev_rsn and len(prev_rsn) > 0:
                 prev_rsn_str = ", ".join(prev_rsn)
             else:
                 prev_rsn_str = "None"
             
             # Get leave notes if they exist
-            leave_notes = mem[4] if len(mem) > 4 else None
+            leave_notes = getattr(mem, "on_leave_notes", None)
             
             # Format each member as a card-like entry
             output += f"** {rsn} **\n"
@@ -296,8 +301,8 @@ class UserLookup(commands.Cog):
         # Create rows
         rows = ""
         for mem in list:
-            rsn = str(mem[0]).center(rsn_width)
-            discord_id = str(mem[1] or "Not linked").center(discord_width)
+            rsn = str(mem.rsn).center(rsn_width)
+            discord_id = str(mem.discord_id or "Not linked").center(discord_width)
             rows += f"║{rsn}║{discord_id}║\n"
         
         # Create footer
@@ -342,8 +347,8 @@ class UserLookup(commands.Cog):
             # Create rows for this chunk
             rows = ""
             for mem in chunk_members:
-                rsn = str(mem[0]).center(rsn_width)
-                discord_id = str(mem[1] or "Not linked").center(discord_width)
+                rsn = str(mem.rsn).center(rsn_width)
+                discord_id = str(mem.discord_id or "Not linked").center(discord_width)
                 rows += f"║{rsn}║{discord_id}║\n"
             
             # Add count for this chunk
@@ -368,25 +373,25 @@ class UserLookup(commands.Cog):
         current_count = 0
         
         for i, mem in enumerate(list, 1):
-            rsn = mem[0]
-            discord_id = mem[1] or "Not linked"
+            rsn = mem.rsn
+            discord_id = mem.discord_id or "Not linked"
             
             # Format alt_rsn array
-            alt_rsn = mem[2]
+            alt_rsn = mem.alt_rsn
             if alt_rsn and len(alt_rsn) > 0:
                 alt_rsn_str = ", ".join(alt_rsn)
             else:
                 alt_rsn_str = "None"
             
             # Format previous_rsn array
-            prev_rsn = mem[3]
+            prev_rsn = mem.previous_rsn
             if prev_rsn and len(prev_rsn) > 0:
                 prev_rsn_str = ", ".join(prev_rsn)
             else:
                 prev_rsn_str = "None"
             
             # Get leave notes if they exist
-            leave_notes = mem[4] if len(mem) > 4 else None
+            leave_notes = getattr(mem, "on_leave_notes", None)
             
             # Format each member as a card-like entry
             member_entry = f"** {rsn} **\n"
@@ -1,8 +1,14 @@
 -- Drop existing tables if they exist
+DROP TABLE IF EXISTS pending_confirmation;
+DROP TABLE IF EXISTS pending_application;
+DROP TABLE IF EXISTS application_scan_checkpoint;
+DROP TABLE IF EXISTS command_usage_daily;
+DROP TABLE IF EXISTS command_usage;
 DROP TABLE IF EXISTS lottery_entries;
 DROP TABLE IF EXISTS lottery;
 DROP TABLE IF EXISTS competition;
 DROP TABLE IF EXISTS member;
+DROP TABLE IF EXISTS promotion_threshold;
 
 CREATE TABLE member
 ( _id SERIAL PRIMARY KEY,
@@ -22,14 +28,53 @@ CREATE TABLE member
   boss_comp_pts integer,
   boss_comp_pts_life integer,
   loc varchar(256),
-  timezone varchar(10),
+  timezone varchar(64),
   notes varchar(512),
   how_found_clan varchar(256),
   favorite_activities varchar(256),
   play_frequency varchar(256),
-  coffee_preference varchar(256)
+  coffee_preference varchar(256),
+  -- Maintained by the member_next_promotion_date trigger
+  next_promotion_date date
 );
 
+-- Days after joining each membership level's next promotion is due,
+-- kept in line with promotion_days in config.json by the bot on startup
+CREATE TABLE promotion_threshold
+(
+    membership_level integer PRIMARY KEY,
+    days integer NOT NULL
+);
+
+INSERT INTO promotion_threshold (membership_level, days) VALUES (0, 14), (1, 84), (2, 182), (3, 365);
+
+CREATE OR REPLACE FUNCTION set_next_promotion_date() RETURNS trigger AS $$
+BEGIN
+    NEW.next_promotion_date := NEW.join_date + (
+        SELECT days FROM promotion_threshold WHERE membership_level = NEW.membership_level
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER member_next_promotion_date
+    BEFORE INSERT OR UPDATE OF join_date, membership_level ON member
+    FOR EACH ROW EXECUTE FUNCTION set_next_promotion_date();
+
+-- Who is due a promotion before a date is a range scan on this
+CREATE INDEX idx_member_next_promotion_date ON member(next_promotion_date) WHERE active IS NOT FALSE;
+
+-- Lowercased alts and previous names of a member, for the applicant duplicate check.
+-- Immutable so it can be indexed.
+CREATE OR REPLACE FUNCTION member_alias_rsns(alt_rsn text[], previous_rsn text[]) RETURNS text[] AS $$
+    SELECT COALESCE(array_agg(lower(name)), '{}')
+    FROM unnest(COALESCE(alt_rsn, '{}') || COALESCE(previous_rsn, '{}')) AS name
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+-- The duplicate check matches RSNs ignoring case, and names against the alias arrays with &&
+CREATE INDEX idx_member_rsn_lower ON member(lower(rsn));
+CREATE INDEX idx_member_alias_rsns ON member USING gin (member_alias_rsns(alt_rsn, previous_rsn));
+
 CREATE TABLE competition
 ( 
     comp_id SERIAL PRIMARY KEY,
@@ -82,21 +127,98 @@ CREATE TABLE lottery_entries
         REFERENCES member(_id)
 );
 
+-- Partitioned by month so old usage can be dropped a partition at a time.
+-- The Admin cog creates upcoming partitions and drops expired ones every night.
 CREATE TABLE command_usage
 (
-    usage_id SERIAL PRIMARY KEY,
+    usage_id SERIAL,
     command_name varchar(50) NOT NULL,
     member_id bigint,
     channel_id bigint NOT NULL,
     guild_id bigint NOT NULL,
-    timestamp timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    timestamp timestamp NOT NULL DEFAULT (NOW() AT TIME ZONE 'UTC'),
     success boolean NOT NULL DEFAULT true,
     error_message text,
+    duration_ms real,
+    first_response_ms real,
+    first_response_type varchar(10),
+    db_ms real,
+    PRIMARY KEY (usage_id, timestamp),
     CONSTRAINT fk_member_id
         FOREIGN KEY(member_id)
         REFERENCES member(_id)
-);
+) PARTITION BY RANGE (timestamp);
+
+-- Catches usage for months without a partition yet, e.g. if the nightly job hasn't run.
+-- Its rows are moved into a month's partition when the partition is created.
+CREATE TABLE command_usage_default PARTITION OF command_usage DEFAULT;
+
+-- Partitions for this month and the next two
+DO $$
+DECLARE
+    month date;
+BEGIN
+    FOR month IN SELECT generate_series(date_trunc('month', CURRENT_DATE), date_trunc('month', CURRENT_DATE) + interval '2 months', interval '1 month')::date LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF command_usage FOR VALUES FROM (%L) TO (%L)',
+            'command_usage_' || to_char(month, 'YYYY_MM'), month, (month + interval '1 month')::date
+        );
+    END LOOP;
+END $$;
 
 CREATE INDEX idx_command_usage_timestamp ON command_usage(timestamp);
 CREATE INDEX idx_command_usage_command ON command_usage(command_name);
-CREATE INDEX idx_command_usage_member ON command_usage(member_id);
\ No newline at end of file
+CREATE INDEX idx_command_usage_member ON command_usage(member_id);
+
+-- Per-day totals of command_usage, filled in by the Admin cog every night
+CREATE TABLE command_usage_daily
+(
+    day date NOT NULL,
+    command_name varchar(50) NOT NULL,
+    usage_count integer NOT NULL DEFAULT 0,
+    success_count integer NOT NULL DEFAULT 0,
+    failure_count integer NOT NULL DEFAULT 0,
+    le_100ms integer NOT NULL DEFAULT 0,
+    le_250ms integer NOT NULL DEFAULT 0,
+    le_500ms integer NOT NULL DEFAULT 0,
+    le_1000ms integer NOT NULL DEFAULT 0,
+    le_2500ms integer NOT NULL DEFAULT 0,
+    le_5000ms integer NOT NULL DEFAULT 0,
+    gt_5000ms integer NOT NULL DEFAULT 0,
+    duration_max_ms real,
+    PRIMARY KEY (day, command_name)
+);
+
+-- Last message the Applications cog scanned in each application channel
+CREATE TABLE application_scan_checkpoint
+(
+    channel_id bigint PRIMARY KEY,
+    last_message_id bigint NOT NULL,
+    scanned_at timestamp NOT NULL DEFAULT NOW()
+);
+
+-- Applications found by the scan that haven't been accepted yet
+CREATE TABLE pending_application
+(
+    message_id bigint PRIMARY KEY,
+    channel_id bigint NOT NULL,
+    author_id bigint NOT NULL,
+    rsn varchar(64),
+    posted_at timestamp,
+    found_at timestamp NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX idx_pending_application_channel ON pending_application(channel_id);
+
+-- Confirmation prompts waiting for an answer, see util/confirmations.py
+CREATE TABLE pending_confirmation
+(
+    confirmation_id varchar(32) PRIMARY KEY,
+    kind varchar(64) NOT NULL,
+    user_id bigint NOT NULL,
+    payload jsonb,
+    created_at timestamp NOT NULL DEFAULT NOW(),
+    expires_at timestamp NOT NULL
+);
+
+CREATE INDEX idx_pending_confirmation_expires ON pending_confirmation(expires_at);
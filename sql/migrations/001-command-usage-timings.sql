@@ -0,0 +1,5 @@
+-- Add command latency columns to an existing command_usage table
+ALTER TABLE command_usage ADD COLUMN IF NOT EXISTS duration_ms real;
+ALTER TABLE command_usage ADD COLUMN IF NOT EXISTS first_response_ms real;
+ALTER TABLE command_usage ADD COLUMN IF NOT EXISTS first_response_type varchar(10);
+ALTER TABLE command_usage ADD COLUMN IF NOT EXISTS db_ms real;
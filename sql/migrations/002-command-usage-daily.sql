@@ -0,0 +1,18 @@
+-- Add the daily command_usage rollup table
+CREATE TABLE IF NOT EXISTS command_usage_daily
+(
+    day date NOT NULL,
+    command_name varchar(50) NOT NULL,
+    usage_count integer NOT NULL DEFAULT 0,
+    success_count integer NOT NULL DEFAULT 0,
+    failure_count integer NOT NULL DEFAULT 0,
+    le_100ms integer NOT NULL DEFAULT 0,
+    le_250ms integer NOT NULL DEFAULT 0,
+    le_500ms integer NOT NULL DEFAULT 0,
+    le_1000ms integer NOT NULL DEFAULT 0,
+    le_2500ms integer NOT NULL DEFAULT 0,
+    le_5000ms integer NOT NULL DEFAULT 0,
+    gt_5000ms integer NOT NULL DEFAULT 0,
+    duration_max_ms real,
+    PRIMARY KEY (day, command_name)
+);
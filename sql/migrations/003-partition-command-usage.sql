@@ -0,0 +1,64 @@
+-- Convert an existing command_usage table to monthly partitions.
+-- Run sql/migrations/002-command-usage-daily.sql first.
+BEGIN;
+
+ALTER TABLE command_usage RENAME TO command_usage_old;
+ALTER SEQUENCE command_usage_usage_id_seq RENAME TO command_usage_old_usage_id_seq;
+DROP INDEX IF EXISTS idx_command_usage_timestamp;
+DROP INDEX IF EXISTS idx_command_usage_command;
+DROP INDEX IF EXISTS idx_command_usage_member;
+
+CREATE TABLE command_usage
+(
+    usage_id SERIAL,
+    command_name varchar(50) NOT NULL,
+    member_id bigint,
+    channel_id bigint NOT NULL,
+    guild_id bigint NOT NULL,
+    timestamp timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    success boolean NOT NULL DEFAULT true,
+    error_message text,
+    duration_ms real,
+    first_response_ms real,
+    first_response_type varchar(10),
+    db_ms real,
+    PRIMARY KEY (usage_id, timestamp),
+    CONSTRAINT fk_member_id
+        FOREIGN KEY(member_id)
+        REFERENCES member(_id)
+) PARTITION BY RANGE (timestamp);
+
+CREATE INDEX idx_command_usage_timestamp ON command_usage(timestamp);
+CREATE INDEX idx_command_usage_command ON command_usage(command_name);
+CREATE INDEX idx_command_usage_member ON command_usage(member_id);
+
+-- Partitions for every month with existing usage, up to two months from now
+DO $$
+DECLARE
+    month date;
+BEGIN
+    FOR month IN SELECT generate_series(
+        date_trunc('month', COALESCE((SELECT MIN(timestamp) FROM command_usage_old), CURRENT_DATE)),
+        date_trunc('month', CURRENT_DATE) + interval '2 months',
+        interval '1 month'
+    )::date LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF command_usage FOR VALUES FROM (%L) TO (%L)',
+            'command_usage_' || to_char(month, 'YYYY_MM'), month, (month + interval '1 month')::date
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO command_usage
+    (usage_id, command_name, member_id, channel_id, guild_id, timestamp, success, error_message,
+     duration_ms, first_response_ms, first_response_type, db_ms)
+SELECT
+    usage_id, command_name, member_id, channel_id, guild_id, timestamp, success, error_message,
+    duration_ms, first_response_ms, first_response_type, db_ms
+FROM command_usage_old;
+
+SELECT setval(pg_get_serial_sequence('command_usage', 'usage_id'), COALESCE((SELECT MAX(usage_id) FROM command_usage), 0) + 1, false);
+
+DROP TABLE command_usage_old;
+
+COMMIT;
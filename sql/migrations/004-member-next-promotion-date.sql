@@ -0,0 +1,37 @@
+-- Keep each member's next promotion date in the database so finding who is due is an index range scan
+
+-- Days after joining each membership level's next promotion is due,
+-- kept in line with promotion_days in config.json by the bot on startup
+CREATE TABLE IF NOT EXISTS promotion_threshold
+(
+    membership_level integer PRIMARY KEY,
+    days integer NOT NULL
+);
+
+INSERT INTO promotion_threshold (membership_level, days)
+VALUES (0, 14), (1, 84), (2, 182), (3, 365)
+ON CONFLICT (membership_level) DO NOTHING;
+
+ALTER TABLE member ADD COLUMN IF NOT EXISTS next_promotion_date date;
+
+CREATE OR REPLACE FUNCTION set_next_promotion_date() RETURNS trigger AS $$
+BEGIN
+    NEW.next_promotion_date := NEW.join_date + (
+        SELECT days FROM promotion_threshold WHERE membership_level = NEW.membership_level
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS member_next_promotion_date ON member;
+CREATE TRIGGER member_next_promotion_date
+    BEFORE INSERT OR UPDATE OF join_date, membership_level ON member
+    FOR EACH ROW EXECUTE FUNCTION set_next_promotion_date();
+
+-- Fill in existing members
+UPDATE member
+SET next_promotion_date = join_date + (
+    SELECT days FROM promotion_threshold WHERE promotion_threshold.membership_level = member.membership_level
+);
+
+CREATE INDEX IF NOT EXISTS idx_member_next_promotion_date ON member(next_promotion_date) WHERE active IS NOT FALSE;
@@ -0,0 +1,56 @@
+-- Store members' timezones as IANA zone names, which need more than 10 characters
+ALTER TABLE member ALTER COLUMN timezone TYPE varchar(64);
+
+-- Convert the abbreviations and names stored before to the zones the bot now maps them to
+UPDATE member SET timezone = CASE lower(trim(timezone))
+    WHEN 'utc' THEN 'UTC'
+    WHEN 'gmt' THEN 'Etc/GMT'
+    WHEN 'est' THEN 'America/New_York'
+    WHEN 'edt' THEN 'America/New_York'
+    WHEN 'eastern time' THEN 'America/New_York'
+    WHEN 'cst' THEN 'America/Chicago'
+    WHEN 'cdt' THEN 'America/Chicago'
+    WHEN 'central time' THEN 'America/Chicago'
+    WHEN 'mst' THEN 'America/Denver'
+    WHEN 'mdt' THEN 'America/Denver'
+    WHEN 'mountain time' THEN 'America/Denver'
+    WHEN 'pst' THEN 'America/Los_Angeles'
+    WHEN 'pdt' THEN 'America/Los_Angeles'
+    WHEN 'pacific time' THEN 'America/Los_Angeles'
+    WHEN 'akst' THEN 'America/Anchorage'
+    WHEN 'alaska time' THEN 'America/Anchorage'
+    WHEN 'hst' THEN 'Pacific/Honolulu'
+    WHEN 'hawaii time' THEN 'Pacific/Honolulu'
+    WHEN 'ast' THEN 'America/Halifax'
+    WHEN 'atlantic time' THEN 'America/Halifax'
+    WHEN 'wet' THEN 'Europe/Lisbon'
+    WHEN 'western european time' THEN 'Europe/Lisbon'
+    WHEN 'cet' THEN 'Europe/Paris'
+    WHEN 'central european time' THEN 'Europe/Paris'
+    WHEN 'european time' THEN 'Europe/Paris'
+    WHEN 'eet' THEN 'Europe/Helsinki'
+    WHEN 'jst' THEN 'Asia/Tokyo'
+    WHEN 'japan time' THEN 'Asia/Tokyo'
+    WHEN 'aest' THEN 'Australia/Sydney'
+    WHEN 'australian eastern time' THEN 'Australia/Sydney'
+    WHEN 'acst' THEN 'Australia/Adelaide'
+    WHEN 'australian central time' THEN 'Australia/Adelaide'
+    WHEN 'awst' THEN 'Australia/Perth'
+    WHEN 'australian western time' THEN 'Australia/Perth'
+    ELSE timezone
+END
+WHERE timezone IS NOT NULL;
+
+-- UTC/GMT offsets become Etc zones, whose signs are inverted: UTC+5 is Etc/GMT-5
+UPDATE member
+SET timezone = CASE
+    WHEN offsets.parts[2]::int = 0 THEN 'UTC'
+    ELSE 'Etc/GMT' || translate(offsets.parts[1], '+-', '-+') || offsets.parts[2]::int
+END
+FROM (
+    SELECT _id, regexp_match(timezone, '^(?:UTC|GMT)\s*([+-])\s*(\d{1,2})$', 'i') AS parts
+    FROM member
+) offsets
+WHERE offsets._id = member._id
+AND offsets.parts IS NOT NULL
+AND offsets.parts[2]::int <= CASE offsets.parts[1] WHEN '+' THEN 14 ELSE 12 END;
@@ -0,0 +1,21 @@
+-- Add the application backlog scanner's checkpoint and queue
+-- Last message the Applications cog scanned in each application channel
+CREATE TABLE IF NOT EXISTS application_scan_checkpoint
+(
+    channel_id bigint PRIMARY KEY,
+    last_message_id bigint NOT NULL,
+    scanned_at timestamp NOT NULL DEFAULT NOW()
+);
+
+-- Applications found by the scan that haven't been accepted yet
+CREATE TABLE IF NOT EXISTS pending_application
+(
+    message_id bigint PRIMARY KEY,
+    channel_id bigint NOT NULL,
+    author_id bigint NOT NULL,
+    rsn varchar(64),
+    posted_at timestamp,
+    found_at timestamp NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_pending_application_channel ON pending_application(channel_id);
@@ -0,0 +1,10 @@
+-- Lowercased alts and previous names of a member, for the applicant duplicate check.
+-- Immutable so it can be indexed.
+CREATE OR REPLACE FUNCTION member_alias_rsns(alt_rsn text[], previous_rsn text[]) RETURNS text[] AS $$
+    SELECT COALESCE(array_agg(lower(name)), '{}')
+    FROM unnest(COALESCE(alt_rsn, '{}') || COALESCE(previous_rsn, '{}')) AS name
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+-- The duplicate check matches RSNs ignoring case, and names against the alias arrays with &&
+CREATE INDEX IF NOT EXISTS idx_member_rsn_lower ON member(lower(rsn));
+CREATE INDEX IF NOT EXISTS idx_member_alias_rsns ON member USING gin (member_alias_rsns(alt_rsn, previous_rsn));
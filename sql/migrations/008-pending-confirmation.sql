@@ -0,0 +1,12 @@
+-- Keep confirmation prompts in the DB so their buttons still work after a restart
+CREATE TABLE IF NOT EXISTS pending_confirmation
+(
+    confirmation_id varchar(32) PRIMARY KEY,
+    kind varchar(64) NOT NULL,
+    user_id bigint NOT NULL,
+    payload jsonb,
+    created_at timestamp NOT NULL DEFAULT NOW(),
+    expires_at timestamp NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_pending_confirmation_expires ON pending_confirmation(expires_at);
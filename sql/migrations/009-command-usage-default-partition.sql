@@ -0,0 +1,3 @@
+-- Catch command usage for months that don't have a partition yet, so logging a command never fails.
+-- The Admin cog moves these rows into a month's partition when it creates it.
+CREATE TABLE IF NOT EXISTS command_usage_default PARTITION OF command_usage DEFAULT;
@@ -0,0 +1,3 @@
+-- command_usage.timestamp is stored in UTC so the nightly rollup's days don't depend on the
+-- server's TimeZone setting. Rows logged before this keep the zone they were written in.
+ALTER TABLE command_usage ALTER COLUMN timestamp SET DEFAULT (NOW() AT TIME ZONE 'UTC');
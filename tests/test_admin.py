@@ -141,5 +141,243 @@ async def test_shutdown_admin(mock_bot, mock_interaction):
         mock_bot.close.assert_called_once()
         mock_exit.assert_called_once_with(0)
 
+# Test the loop-stats command in Admin cog
+@pytest.mark.asyncio
+async def test_loop_stats_admin(mock_bot, mock_interaction):
+    from util.loop_monitor import LoopMonitor, Stall
+    admin_cog = Admin(mock_bot)
+
+    mock_bot.loop_monitor = LoopMonitor()
+    mock_bot.loop_monitor.record_lag(2.0)
+    mock_bot.loop_monitor.record_lag(700.0)
+    mock_bot.loop_monitor.stalls.append(Stall(datetime.datetime.now(), 1200.0, 'File "bot.py", line 1, in selectMany\n    cursor.execute(query)'))
+    mock_bot.message_dispatcher.summary.return_value = {
+        "Applications.on_message": {"count": 3, "p95_ms": 12.0, "errors": 0, "timeouts": 1}
+    }
+
+    mock_basecog = AsyncMock()
+    mock_basecog.check_category.return_value = True
+    mock_basecog.check_permissions.return_value = True
+    mock_bot.get_cog.return_value = mock_basecog
+
+    await admin_cog.loop_stats.callback(admin_cog, mock_interaction)
+
+    text = mock_interaction.response.send_message.call_args[0][0]
+    assert "Samples: 2" in text
+    assert "<1000ms        1" in text
+    assert "Applications.on_message" in text
+    assert "cursor.execute(query)" in text
+    assert len(text) <= 2000
+
+# Test the db-stats command in Admin cog
+@pytest.mark.asyncio
+async def test_db_stats_admin(mock_bot, mock_interaction):
+    from cogs.admin import QueryOrder
+    from util.query_stats import QueryStats
+    admin_cog = Admin(mock_bot)
+
+    mock_bot.query_stats = QueryStats()
+    mock_bot.query_stats.record("SELECT * FROM member WHERE rsn = %s", 12.0, rows=1, tag="User.lookup")
+    for i in range(60):
+        mock_bot.query_stats.record(f"SELECT * FROM table_{i}", 1.0)
+
+    mock_basecog = AsyncMock()
+    mock_basecog.check_category.return_value = True
+    mock_basecog.check_permissions.return_value = True
+    mock_bot.get_cog.return_value = mock_basecog
+
+    await admin_cog.db_stats.callback(admin_cog, mock_interaction, QueryOrder.TOTAL_TIME, 25)
+
+    first_page = mock_interaction.response.send_message.call_args[0][0]
+    assert first_page.startswith("```\nQuery Statistics (by Total Time)")
+    assert "1. SELECT * FROM member WHERE rsn = ?" in first_page
+    assert "from: User.lookup (1)" in first_page
+    # The rest of the queries are sent as followups
+    pages = [first_page] + [call[0][0] for call in mock_interaction.followup.send.call_args_list]
+    assert len(pages) > 1
+    assert all(len(page) <= 2000 for page in pages)
+    assert sum(page.count(" calls: ") for page in pages) == 25
+
+# Test the command-stats command shows latency percentiles
+@pytest.mark.asyncio
+async def test_command_stats_latency(mock_bot, mock_interaction):
+    from cogs.admin import TimePeriod
+    admin_cog = Admin(mock_bot)
+    # Usage counts, duration bucket counts and the slowest duration for each command
+    mock_bot.selectMany = MagicMock(return_value=[
+        ("lookup", 10, 9, 1, 2, 4, 2, 1, 1, 0, 0, 2210.0),
+        ("old-command", 2, 2, 0, 0, 0, 0, 0, 0, 0, 0, None),
+    ])
+
+    mock_basecog = AsyncMock()
+    mock_basecog.check_category.return_value = True
+    mock_basecog.check_permissions.return_value = True
+    mock_bot.get_cog.return_value = mock_basecog
+
+    await admin_cog.command_stats.callback(admin_cog, mock_interaction, TimePeriod.WEEK)
+
+    query, params = mock_bot.selectMany.call_args[0]
+    assert "FROM command_usage_daily" in query
+    assert params["start"] <= datetime.datetime.now() - datetime.timedelta(days=7)
+    text = mock_interaction.followup.send.call_args[0][0]
+    assert "lookup                  10 uses" in text
+    assert "Latency: p50 250ms  p95 2210ms  p99 2210ms" in text
+    # Commands logged before timings were recorded have no latency line
+    assert text.count("Latency:") == 1
+
+# Test rolling up command usage
+def test_roll_up_finished_days(mock_bot):
+    from util.command_rollup import ROLLUP_SQL
+    admin_cog = Admin(mock_bot)
+    mock_bot.execute_query = MagicMock(return_value=True)
+
+    # Carries on from the last rolled up day
+    mock_bot.selectOne = MagicMock(return_value=(datetime.date(2024, 3, 1),))
+    assert admin_cog.roll_up_finished_days(datetime.date(2024, 3, 4))
+    mock_bot.execute_query.assert_called_once_with(ROLLUP_SQL, (datetime.date(2024, 3, 1), datetime.date(2024, 3, 4)))
+
+    # Starts from the first usage when nothing has been rolled up
+    mock_bot.execute_query.reset_mock()
+    mock_bot.selectOne = MagicMock(side_effect=[(None,), (datetime.date(2023, 1, 5),)])
+    admin_cog.roll_up_finished_days(datetime.date(2024, 3, 4))
+    mock_bot.execute_query.assert_called_once_with(ROLLUP_SQL, (datetime.date(2023, 1, 5), datetime.date(2024, 3, 4)))
+
+    # Nothing to do without any usage
+    mock_bot.execute_query.reset_mock()
+    mock_bot.selectOne = MagicMock(side_effect=[(None,), (None,)])
+    assert admin_cog.roll_up_finished_days() is False
+    mock_bot.execute_query.assert_not_called()
+
+# Test creating and dropping command_usage partitions
+def test_maintain_command_usage_partitions(mock_bot):
+    admin_cog = Admin(mock_bot)
+    config = {"command_usage_partitions_ahead": 1, "command_usage_retention_months": 2}
+    mock_bot.getConfigValue = MagicMock(side_effect=lambda key: config[key])
+    mock_bot.execute_query = MagicMock(return_value=True)
+    mock_bot.selectMany = MagicMock(return_value=[
+        ("command_usage_2024_03",), ("command_usage_2024_04",), ("command_usage_2024_05",), ("command_usage_2024_06",),
+    ])
+    # Rolled up to the middle of April
+    mock_bot.selectOne = MagicMock(return_value=(datetime.date(2024, 4, 15),))
+
+    dropped = admin_cog.maintain_command_usage_partitions(datetime.date(2024, 6, 10))
+
+    statements = [call[0][0] for call in mock_bot.execute_query.call_args_list]
+    # June already has a partition, so only July's is created
+    assert "CREATE TABLE IF NOT EXISTS command_usage_2024_07 PARTITION OF command_usage" in statements[0]
+    assert not any("command_usage_2024_06 PARTITION OF" in statement for statement in statements)
+    # March is fully rolled up so it is dropped, April isn't so it's kept
+    assert dropped == ["command_usage_2024_03"]
+    assert statements[1:] == ["DROP TABLE IF EXISTS command_usage_2024_03"]
+
+# Test that nothing is dropped without a retention period
+def test_maintain_command_usage_partitions_no_retention(mock_bot):
+    admin_cog = Admin(mock_bot)
+    mock_bot.getConfigValue = MagicMock(side_effect=KeyError)
+    mock_bot.execute_query = MagicMock(return_value=True)
+    mock_bot.selectMany = MagicMock(return_value=[])
+
+    assert admin_cog.maintain_command_usage_partitions(datetime.date(2024, 6, 10)) == []
+    # Defaults to this month and the next two
+    assert mock_bot.execute_query.call_count == 3
+
+# Test that partitions aren't touched when they can't be listed
+def test_maintain_command_usage_partitions_list_failed(mock_bot):
+    admin_cog = Admin(mock_bot)
+    mock_bot.getConfigValue = MagicMock(side_effect=KeyError)
+    mock_bot.execute_query = MagicMock(return_value=True)
+    mock_bot.selectMany = MagicMock(return_value=None)
+
+    assert admin_cog.maintain_command_usage_partitions(datetime.date(2024, 6, 10)) == []
+    mock_bot.execute_query.assert_not_called()
+
 if __name__ == "__main__":
-    pytest.main([__file__]) 
\ No newline at end of file
+    pytest.main([__file__]) 
+# Test the promotions-due command in Admin cog
+@pytest.mark.asyncio
+async def test_promotions_due_admin(mock_bot, mock_interaction):
+    admin_cog = Admin(mock_bot)
+    today = datetime.date.today()
+    mock_bot.selectMany.return_value = [
+        (1, "Overdue", "overdue_user", 1, today - datetime.timedelta(days=90)),
+        (2, "DueSoon", "soon_user", 0, today - datetime.timedelta(days=10)),
+        (3, "NotYet", "later_user", 2, today - datetime.timedelta(days=100)),
+        (4, "Tenured", "tenured_user", 4, today - datetime.timedelta(days=900)),
+    ]
+    mock_bot.getConfigValue.return_value = ["Trial", "Junior", "Member", "Senior", "Tenured", "Esteemed"]
+
+    mock_basecog = AsyncMock()
+    mock_basecog.check_category.return_value = True
+    mock_basecog.check_permissions.return_value = True
+    mock_bot.get_cog.return_value = mock_basecog
+
+    await admin_cog.promotions_due.callback(admin_cog, mock_interaction, 7)
+
+    # Only members due by the end of the week are loaded
+    assert mock_bot.selectMany.call_args[0][1] == {"until": today + datetime.timedelta(days=7)}
+
+    text = mock_interaction.response.send_message.call_args[0][0]
+    assert "Promotions due in the next 7 days" in text
+    assert "OVERDUE" in text and "Overdue" in text and "Junior -> Member" in text
+    assert "DueSoon" in text and "Trial -> Junior" in text
+    assert "NotYet" not in text
+    assert "Tenured " not in text
+    # Overdue members come first
+    assert text.index("Overdue") < text.index("DueSoon")
+
+# Test the cluster-stats command in Admin cog
+@pytest.mark.asyncio
+async def test_cluster_stats_admin(mock_bot, mock_interaction):
+    admin_cog = Admin(mock_bot)
+    mock_bot.gather_cluster_stats = AsyncMock(return_value={
+        0: {"cluster_id": 0, "shard_ids": [0, 1, 2], "guilds": 40, "members": 5000, "latency_ms": 41.5, "pid": 10},
+        1: {"error": "boom"},
+    })
+
+    mock_basecog = AsyncMock()
+    mock_basecog.check_category.return_value = True
+    mock_basecog.check_permissions.return_value = True
+    mock_bot.get_cog.return_value = mock_basecog
+
+    await admin_cog.cluster_stats.callback(admin_cog, mock_interaction)
+
+    text = mock_interaction.followup.send.call_args[0][0]
+    assert "0-2" in text and "41.5ms" in text
+    assert "error: boom" in text
+    assert "Total: 40 guilds, 5000 members" in text
+
+# Test the cache-stats command in Admin cog
+@pytest.mark.asyncio
+async def test_cache_stats_admin(mock_bot, mock_interaction):
+    admin_cog = Admin(mock_bot)
+    mock_bot.gather_cache_stats = AsyncMock(return_value={
+        0: {"rss_bytes": 150 * 2**20, "trimmed": 1200, "caches": [
+            {"name": "members", "count": 350, "bytes": 3 * 2**20},
+            {"name": "roles", "count": 40, "bytes": 2**19},
+        ]},
+    })
+
+    mock_basecog = AsyncMock()
+    mock_basecog.check_category.return_value = True
+    mock_basecog.check_permissions.return_value = True
+    mock_bot.get_cog.return_value = mock_basecog
+
+    await admin_cog.cache_stats.callback(admin_cog, mock_interaction)
+
+    text = mock_interaction.followup.send.call_args[0][0]
+    assert "RSS: 150.0MB" in text
+    assert "Members trimmed: 1200" in text
+    assert "members          350      3.00MB" in text
+    assert text.endswith("```")
+
+# Test the cache-stats command shows hits and misses for cached responses
+def test_format_cache_stats_render_cache():
+    admin_cog = Admin(MagicMock())
+    text = admin_cog.format_cache_stats({
+        0: {"rss_bytes": None, "trimmed": None, "caches": [],
+            "render_cache": {"comp-history": {"hits": 12, "misses": 3}, "yellowpages": {"hits": 0, "misses": 1}}},
+    })
+
+    assert "RSS: unknown" in text
+    assert "comp-history                 12       3" in text
+    assert "yellowpages                   0       1" in text
@@ -0,0 +1,72 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.application_form import ApplicationForm, ApplicationParser
+
+APPLICATION = """
+What is your RSN? TestUser123
+How did you find out about the clan? Through a friend
+What are your favorite activities to do on Runescape? Skilling and PvM
+Where do you live and what timezone are you in? USA, EST
+How often do you play? Daily
+Have you read our ✅rules  and do you agree to abide by these rules? Yes
+Are you currently in another clan? No
+How do you drink your Coffee? Black
+"""
+
+# Test every answer is sliced out in one parse
+def test_parse_application():
+    form = ApplicationParser().parse(APPLICATION)
+    assert form == ApplicationForm(
+        rsn="TestUser123",
+        how_found_clan="Through a friend",
+        favorite_activities="Skilling and PvM",
+        location_timezone="USA, EST",
+        play_frequency="Daily",
+        rules_link="✅rules",
+        agrees_to_rules="Yes",
+        other_clan="No",
+        coffee_preference="Black",
+    )
+    assert form.complete
+
+# Test missing questions are reported and their answers left empty
+def test_parse_missing_questions():
+    content = APPLICATION.replace("How do you drink your Coffee? Black\n", "").replace("How often do you play?", "")
+    form = ApplicationParser().parse(content)
+    assert not form.complete
+    assert form.missing == ("How often do you play?", "How do you drink your Coffee?")
+    assert form.play_frequency is None
+    assert form.coffee_preference is None
+    # The answer to the question before a missing one runs on to the next question found
+    assert form.location_timezone == "USA, EST\n Daily"
+
+# Test answers written on the line after the question, and an empty answer
+def test_parse_multiline_answers():
+    content = "What is your RSN?\n\nHow did you find out about the clan?\nReddit\nand a friend\n"
+    form = ApplicationParser().parse(content)
+    assert form.rsn == ""
+    assert form.how_found_clan == "Reddit\nand a friend"
+
+# Test a question repeated inside an answer doesn't replace the first answer
+def test_parse_repeated_question():
+    form = ApplicationParser().parse("What is your RSN? Abc What is your RSN? Def")
+    assert form.rsn == "Abc"
+
+# Test questions from config, including one that starts with another
+def test_parse_configured_questions():
+    parser = ApplicationParser({"rsn": "RSN:", "other_clan": "RSN: previous clan?"})
+    form = parser.parse("RSN: Abc\nRSN: previous clan? None")
+    assert form.rsn == "Abc"
+    assert form.other_clan == "None"
+    assert parser.field_for("RSN:") == "rsn"
+    assert parser.field_for("Favorite color?") is None
+
+# Test config can't name fields the form doesn't have
+def test_unknown_field():
+    with pytest.raises(ValueError, match="favorite_color"):
+        ApplicationParser({"favorite_color": "What is your favorite color?"})
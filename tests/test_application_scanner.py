@@ -0,0 +1,173 @@
+import pytest
+import datetime
+import sys
+import os
+from unittest.mock import MagicMock, AsyncMock
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.application_form import ApplicationParser
+from util.application_scanner import (
+    ApplicationScanner, CHECKPOINT_SQL, PENDING_SQL, QUEUE_PENDING_SQL, REGISTERED_AUTHORS_SQL,
+    REMOVE_PENDING_SQL, SAVE_CHECKPOINT_SQL,
+)
+
+POSTED = datetime.datetime(2025, 6, 1, 12, 0, tzinfo=datetime.timezone.utc)
+
+
+def application(rsn):
+    return f"What is your RSN? {rsn}\nHow do you drink your Coffee? Black"
+
+
+def make_message(message_id, content, author_id=None, bot=False):
+    message = MagicMock()
+    message.id = message_id
+    message.content = content
+    message.author.id = author_id or message_id + 1000
+    message.author.bot = bot
+    message.channel.id = 1
+    message.created_at = POSTED
+    return message
+
+
+class FakeChannel:
+    """An application channel whose history honours after= like Discord's."""
+    def __init__(self, messages):
+        self.id = 1
+        self.messages = messages
+        self.history_calls = []
+        self.fetch_message = AsyncMock(side_effect=lambda message_id: next(m for m in messages if m.id == message_id))
+
+    async def history(self, limit=None, after=None, oldest_first=None):
+        self.history_calls.append(after.id if after else None)
+        for message in self.messages:
+            if after is None or message.id > after.id:
+                yield message
+
+
+def detect(content):
+    form = ApplicationParser({"rsn": "What is your RSN?", "coffee_preference": "How do you drink your Coffee?"}).parse(content)
+    return form if form.complete else None
+
+
+@pytest.fixture
+def bot():
+    bot = MagicMock()
+    bot.selectOne = MagicMock(return_value=None)
+    bot.selectMany = MagicMock(return_value=[])
+    bot.execute_query = MagicMock()
+    return bot
+
+
+# Test a first scan reads the whole channel, queues the applications in one insert per page and checkpoints each page
+@pytest.mark.asyncio
+async def test_scan_queues_applications(bot):
+    channel = FakeChannel([
+        make_message(1, application("Alpha")),
+        make_message(2, "Hi, how do I apply?"),
+        make_message(3, application("Bot"), bot=True),
+        make_message(4, application("Bravo")),
+        make_message(5, "Welcome!"),
+    ])
+    scanner = ApplicationScanner(bot, detect, page_size=3)
+
+    result = await scanner.scan(channel)
+
+    assert (result.scanned, result.queued) == (5, 2)
+    assert channel.history_calls == [None]
+    bot.selectOne.assert_called_once_with(CHECKPOINT_SQL, (1,))
+    queued = [c.args[1] for c in bot.execute_query.call_args_list if c.args[0] == QUEUE_PENDING_SQL]
+    assert [q[0] for q in queued] == [[1], [4]]
+    assert queued[0][3] == ["Alpha"]
+    assert queued[0][4] == [POSTED.replace(tzinfo=None)]
+    checkpoints = [c.args[1] for c in bot.execute_query.call_args_list if c.args[0] == SAVE_CHECKPOINT_SQL]
+    assert checkpoints == [(1, 3), (1, 5)]
+    # Messages found are kept, so accepting them doesn't fetch them again
+    assert await scanner.get_message(channel, 4) is channel.messages[3]
+    channel.fetch_message.assert_not_called()
+
+# Test a scan resumes after the checkpoint
+@pytest.mark.asyncio
+async def test_scan_resumes_from_checkpoint(bot):
+    bot.selectOne.return_value = (4,)
+    channel = FakeChannel([make_message(i, application(f"Rsn{i}")) for i in range(1, 7)])
+    scanner = ApplicationScanner(bot, detect)
+
+    result = await scanner.scan(channel)
+
+    assert channel.history_calls == [4]
+    assert (result.scanned, result.queued) == (2, 2)
+
+# Test applications from people who are already members aren't queued
+def test_queue_skips_registered_authors(bot):
+    bot.selectMany.return_value = [(1002,)]
+    scanner = ApplicationScanner(bot, detect)
+
+    queued = scanner.queue([make_message(1, application("Alpha")), make_message(2, application("Bravo"))])
+
+    assert queued == 1
+    bot.selectMany.assert_called_once_with(REGISTERED_AUTHORS_SQL, ([1001, 1002],))
+    bot.execute_query.assert_called_once()
+    assert bot.execute_query.call_args.args[1][0] == [1]
+
+# Test nothing is queried when no messages are applications
+def test_queue_without_applications(bot):
+    scanner = ApplicationScanner(bot, detect)
+    assert scanner.queue([make_message(1, "Hello")]) == 0
+    bot.selectMany.assert_not_called()
+    bot.execute_query.assert_not_called()
+
+# Test reading and removing the queue
+@pytest.mark.asyncio
+async def test_pending_and_remove(bot):
+    bot.selectMany.return_value = [(4, 1004, "Bravo", POSTED)]
+    channel = FakeChannel([make_message(4, application("Bravo"))])
+    scanner = ApplicationScanner(bot, detect)
+
+    pending = scanner.pending(1)
+    assert [(p.message_id, p.author_id, p.rsn) for p in pending] == [(4, 1004, "Bravo")]
+    bot.selectMany.assert_called_once_with(PENDING_SQL, (1,))
+
+    # Queued before a restart, so it has to be fetched
+    assert (await scanner.get_message(channel, 4)).id == 4
+    channel.fetch_message.assert_awaited_once_with(4)
+
+    scanner.remove([4])
+    bot.execute_query.assert_called_once_with(REMOVE_PENDING_SQL, ([4],))
+    assert 4 not in scanner.messages
+
+# Test applications posted after the backlog scan are queued and move the checkpoint, but not before it finishes
+@pytest.mark.asyncio
+async def test_add_moves_checkpoint_after_scan(bot):
+    scanner = ApplicationScanner(bot, detect)
+
+    assert scanner.add(make_message(7, application("Early"))) == 1
+    assert not [c for c in bot.execute_query.call_args_list if c.args[0] == SAVE_CHECKPOINT_SQL]
+
+    await scanner.scan(FakeChannel([]))
+    assert scanner.add(make_message(8, application("Live"))) == 1
+    checkpoints = [c.args[1] for c in bot.execute_query.call_args_list if c.args[0] == SAVE_CHECKPOINT_SQL]
+    assert checkpoints == [(1, 8)]
+
+# Test a page that couldn't be queued stops the scan without moving the checkpoint past it
+@pytest.mark.asyncio
+async def test_scan_stops_when_queueing_fails(bot):
+    bot.execute_query.return_value = None
+    channel = FakeChannel([make_message(i, application(f"Rsn{i}")) for i in range(1, 5)])
+    scanner = ApplicationScanner(bot, detect, page_size=2)
+
+    result = await scanner.scan(channel)
+
+    assert (result.scanned, result.queued) == (0, 0)
+    assert [c.args[0] for c in bot.execute_query.call_args_list] == [QUEUE_PENDING_SQL]
+    assert scanner.messages == {}
+    assert 1 not in scanner.scanned_channels
+
+# Test only the most recent queued messages are kept in memory
+def test_messages_are_bounded(bot):
+    scanner = ApplicationScanner(bot, detect, max_messages=2)
+
+    scanner.queue([make_message(i, application(f"Rsn{i}")) for i in range(1, 5)])
+
+    assert list(scanner.messages) == [3, 4]
@@ -127,9 +127,10 @@ async def test_process_application_success(applications_cog, mock_message, mock_
     mock_role = MagicMock()
     mock_role.name = "Trial Member"
     mock_guild.get_role.return_value = mock_role
+    applications_cog.role_grants.submit = AsyncMock(return_value=True)
     
-    # Mock the selectOne to return None (user not found)
-    applications_cog.bot.selectOne = MagicMock(return_value=None)
+    # Mock the duplicate check to find nobody (user not found)
+    applications_cog.bot.selectMany = MagicMock(return_value=[])
     
     # Process the application
     await applications_cog._process_application(mock_message, mock_interaction)
@@ -161,8 +162,8 @@ async def test_process_application_success(applications_cog, mock_message, mock_
     assert "Daily" in query  # Play frequency
     assert "Black" in query  # Coffee preference
     
-    # Verify role was added
-    mock_member.add_roles.assert_called_once_with(mock_role)
+    # Verify role was granted through the role grant queue
+    applications_cog.role_grants.submit.assert_called_once_with(mock_member, mock_role, reason="Application accepted")
     
     # Verify confirmation message was sent
     mock_interaction.followup.send.assert_called_once()
@@ -177,10 +178,10 @@ async def test_process_application_db_error(applications_cog, mock_message, mock
     """Test application processing when database query fails."""
     # Set up mocks
     applications_cog.bot.execute_query = MagicMock(return_value=False)
-    applications_cog.bot.selectOne = MagicMock(return_value=None)  # User not found
+    applications_cog.bot.selectMany = MagicMock(return_value=[])  # User not found
     
-    # Process the application
-    await applications_cog._process_application(mock_message, mock_interaction)
+    # Process the application, it failed so it stays pending
+    assert await applications_cog._process_application(mock_message, mock_interaction) is False
     
     # Verify error message was sent
     mock_interaction.followup.send.assert_called_once()
@@ -188,6 +189,21 @@ async def test_process_application_db_error(applications_cog, mock_message, mock
     assert "error" in call_args[0].lower()
     assert "contact an admin" in call_args[0].lower()
 
+@pytest.mark.asyncio
+async def test_accept_app_context_menu_keeps_failed_application_pending(applications_cog, mock_message, mock_interaction):
+    """Test that an application that couldn't be added stays queued, and a handled one is taken off the queue."""
+    applications_cog.application_channel_id = 42
+    mock_interaction.channel_id = 42
+    applications_cog._process_application = AsyncMock(return_value=False)
+    applications_cog.scanner.remove = MagicMock()
+    
+    await applications_cog.accept_app_context_menu(mock_interaction, mock_message)
+    applications_cog.scanner.remove.assert_not_called()
+    
+    applications_cog._process_application.return_value = True
+    await applications_cog.accept_app_context_menu(mock_interaction, mock_message)
+    applications_cog.scanner.remove.assert_called_once_with([mock_message.id])
+
 @pytest.mark.asyncio
 async def test_process_application_missing_rsn(applications_cog, mock_message, mock_interaction):
     """Test application processing when RSN is missing."""
@@ -218,7 +234,7 @@ async def test_process_application_missing_rsn(applications_cog, mock_message, m
 async def test_process_application_duplicate_user(applications_cog, mock_message, mock_interaction):
     """Test application processing when user is already registered."""
     # Set up mocks
-    applications_cog.bot.selectOne = MagicMock(return_value=("TestUser123", 123456789))  # User already exists
+    applications_cog.bot.selectMany = MagicMock(return_value=[(1, "TestUser123", 123456789, None, None)])  # User already exists
     
     # Process the application
     await applications_cog._process_application(mock_message, mock_interaction)
@@ -229,4 +245,214 @@ async def test_process_application_duplicate_user(applications_cog, mock_message
     assert "both rsn 'testuser123' and discord id 123456789 are already registered in the clan" in call_args[0].lower()
     
     # Verify database query was not executed
-    applications_cog.bot.execute_query.assert_not_called() 
\ No newline at end of file
+    applications_cog.bot.execute_query.assert_not_called()
+
+def test_validate_application_reports_missing_questions(applications_cog):
+    """Test that an invalid application says which questions are missing or wrong."""
+    form = applications_cog.parser.parse("What is your RSN? TestUser123")
+    problem = applications_cog._validate_application(form)
+    assert problem.startswith("Missing questions:")
+    assert '"How do you drink your Coffee?"' in problem
+    assert '"What is your RSN?"' not in problem
+
+    no_rules = """
+    What is your RSN? TestUser123
+    How did you find out about the clan? Through a friend
+    What are your favorite activities to do on Runescape? Skilling and PvM
+    Where do you live and what timezone are you in? USA, EST
+    How often do you play? Daily
+    Have you read our  and do you agree to abide by these rules? Yes
+    Are you currently in another clan? No
+    How do you drink your Coffee? Black
+    """
+    assert "rules" in applications_cog._validate_application(applications_cog.parser.parse(no_rules))
+    assert applications_cog._is_application_message(no_rules) is False
+
+@pytest.mark.asyncio
+async def test_accept_pending_removes_handled_applications(applications_cog, mock_message, mock_interaction):
+    """Test that accepting the pending queue accepts the applications as one batch and takes them off the queue."""
+    applications_cog.scanner.messages[mock_message.id] = mock_message
+    applications_cog._accept_applications = AsyncMock(return_value=[mock_message.id])
+    mock_interaction.channel.fetch_message = AsyncMock(side_effect=discord.NotFound(MagicMock(status=404), "Unknown Message"))
+
+    await applications_cog._accept_pending(mock_interaction, [mock_message.id, 42])
+
+    applications_cog._accept_applications.assert_awaited_once_with(mock_interaction, [mock_message])
+    removed = [c.args[1][0] for c in applications_cog.bot.execute_query.call_args_list if "DELETE FROM pending_application" in c.args[0]]
+    # The deleted message is dropped from the queue as well
+    assert removed == [[42], [mock_message.id]]
+
+@pytest.mark.asyncio
+async def test_accept_pending_confirmation(applications_cog, mock_interaction):
+    """Test that the Accept all button accepts the message IDs stored with its confirmation."""
+    applications_cog._accept_pending = AsyncMock()
+
+    await applications_cog._confirm_accept_pending(mock_interaction, {"message_ids": [1, 2]}, True)
+
+    applications_cog._accept_pending.assert_awaited_once_with(mock_interaction, [1, 2])
+
+@pytest.mark.asyncio
+async def test_scan_backlog_other_cluster(applications_cog, mock_bot, caplog):
+    """Test that a cluster without the application guild skips the scan without logging an error."""
+    applications_cog.application_channel_id = 42
+    applications_cog.scanner = MagicMock()
+    applications_cog.scanner.scan = AsyncMock()
+    mock_bot.get_channel = MagicMock(return_value=None)
+    mock_bot.fetch_channel = AsyncMock(return_value=MagicMock(guild=MagicMock(id=7)))
+    mock_bot.cluster.owns_guild = MagicMock(return_value=False)
+
+    await applications_cog._scan_backlog()
+    mock_bot.cluster.owns_guild.assert_called_once_with(7)
+    assert "not found" not in caplog.text
+
+    # The guild is this cluster's, so the channel really is missing
+    mock_bot.cluster.owns_guild.return_value = True
+    await applications_cog._scan_backlog()
+    assert "not found" in caplog.text
+
+    # Without clustering there's nobody else to scan it
+    caplog.clear()
+    mock_bot.cluster = None
+    await applications_cog._scan_backlog()
+    assert "not found" in caplog.text
+    applications_cog.scanner.scan.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_accept_pending_needs_leader(applications_cog, mock_interaction):
+    """Test that only leaders can list the pending applications or click Accept all."""
+    applications_cog.application_channel_id = 42
+    mock_interaction.channel_id = 42
+    mock_interaction.user.guild_permissions.manage_roles = False
+    mock_interaction.response.send_message = AsyncMock()
+    mock_interaction.response.is_done = MagicMock(return_value=False)
+    applications_cog.confirmations.create = MagicMock()
+
+    await applications_cog.pending_applications.callback(applications_cog, mock_interaction)
+    assert "Only leaders" in mock_interaction.response.send_message.call_args[0][0]
+    mock_interaction.response.defer.assert_not_called()
+    applications_cog.confirmations.create.assert_not_called()
+
+    # The button's response has already been used to remove it
+    applications_cog._accept_pending = AsyncMock()
+    mock_interaction.response.is_done.return_value = True
+    await applications_cog._confirm_accept_pending(mock_interaction, {"message_ids": [1, 2]}, True)
+    applications_cog._accept_pending.assert_not_called()
+    assert "Only leaders" in mock_interaction.followup.send.call_args[0][0]
+
+@pytest.mark.asyncio
+async def test_accept_app_context_menu_needs_leader(applications_cog, mock_message, mock_interaction):
+    """Test that only leaders can accept a single application."""
+    applications_cog.application_channel_id = 42
+    mock_interaction.channel_id = 42
+    mock_interaction.user.guild_permissions.manage_roles = False
+    mock_interaction.response.send_message = AsyncMock()
+    mock_interaction.response.is_done = MagicMock(return_value=False)
+    applications_cog._process_application = AsyncMock()
+
+    await applications_cog.accept_app_context_menu(mock_interaction, mock_message)
+
+    applications_cog._process_application.assert_not_called()
+    assert "Only leaders" in mock_interaction.response.send_message.call_args[0][0]
+
+def make_application_message(message_id, author_id, rsn):
+    message = MagicMock(spec=discord.Message)
+    message.id = message_id
+    message.author = MagicMock(spec=discord.Member)
+    message.author.id = author_id
+    message.author.name = f"user{author_id}"
+    message.content = f"""
+    What is your RSN? {rsn}
+    How did you find out about the clan? Through a friend
+    What are your favorite activities to do on Runescape? Skilling and PvM
+    Where do you live and what timezone are you in? Ohio, EST
+    How often do you play? Daily
+    Have you read our ✅rules  and do you agree to abide by these rules? Yes
+    Are you currently in another clan? No
+    How do you drink your Coffee? Black
+    """
+    return message
+
+@pytest.mark.asyncio
+async def test_accept_applications_batch(applications_cog, mock_interaction):
+    """Test that a batch of applications is checked with one query, inserted with one statement and reported in one embed."""
+    messages = [
+        make_application_message(1, 101, "NewGuy"),
+        make_application_message(2, 102, "Taken"),
+        make_application_message(3, 103, "newguy"),
+        make_application_message(4, 104, ""),
+        make_application_message(5, 105, "FarTooLongName"),
+        make_application_message(6, 106, "Second"),
+    ]
+    applications_cog.trial_member_role_id = 5000
+    applications_cog.bot.selectMany = MagicMock(return_value=[(7, "Taken", 999, [], [])])
+    applications_cog.bot.execute_query = MagicMock(return_value=True)
+    role = MagicMock(spec=discord.Role)
+    role.id = 5000
+    members = {}
+    def get_member(member_id):
+        member = members.setdefault(member_id, MagicMock(spec=discord.Member))
+        member.roles = []
+        member.add_roles = AsyncMock()
+        return member
+    mock_interaction.guild = MagicMock(spec=discord.Guild)
+    mock_interaction.guild.get_role = MagicMock(return_value=role)
+    mock_interaction.guild.get_member = MagicMock(side_effect=get_member)
+
+    handled = await applications_cog._accept_applications(mock_interaction, messages)
+
+    assert handled == [1, 2, 3, 4, 5, 6]
+    # One duplicate check for the whole batch
+    applications_cog.bot.selectMany.assert_called_once()
+    params = applications_cog.bot.selectMany.call_args.args[1]
+    assert sorted(params["rsns"]) == ["newguy", "second", "taken"]
+    assert sorted(params["discord_ids"]) == [101, 102, 103, 106]
+    # One insert for the new members
+    applications_cog.bot.execute_query.assert_called_once()
+    params = applications_cog.bot.execute_query.call_args.args[1]
+    assert params[0] == ["NewGuy", "Second"]
+    assert params[1] == ["Ohio", "Ohio"]
+    assert params[2] == ["America/New_York", "America/New_York"]
+    assert params[4] == [101, 106]
+    members[101].add_roles.assert_awaited_once_with(role, reason="Application accepted")
+    members[106].add_roles.assert_awaited_once_with(role, reason="Application accepted")
+
+    mock_interaction.followup.send.assert_called_once()
+    embed = mock_interaction.followup.send.call_args.kwargs["embed"]
+    assert embed.title == "Accepted 2 of 6 Applications"
+    lines = embed.description.splitlines()
+    assert lines[0] == "✅ NewGuy: welcome to the clan!"
+    assert lines[1] == "❌ Taken: RSN 'Taken' is already registered in the clan."
+    assert lines[2] == "❌ newguy: RSN is in another application in this batch"
+    assert "no RSN found" in lines[3]
+    assert "can't be longer than 12 characters" in lines[4]
+    assert lines[5] == "✅ Second: welcome to the clan!"
+    await applications_cog.role_grants.stop()
+
+@pytest.mark.asyncio
+async def test_accept_applications_database_error(applications_cog, mock_interaction):
+    """Test that applications stay pending when the batch insert fails."""
+    applications_cog.bot.selectMany = MagicMock(return_value=[])
+    applications_cog.bot.execute_query = MagicMock(return_value=None)
+    mock_interaction.guild = MagicMock(spec=discord.Guild)
+
+    handled = await applications_cog._accept_applications(mock_interaction, [make_application_message(1, 101, "NewGuy")])
+
+    assert handled == []
+    mock_interaction.guild.get_member.assert_not_called()
+    embed = mock_interaction.followup.send.call_args.kwargs["embed"]
+    assert embed.title == "Accepted 0 of 1 Applications"
+    assert "database error" in embed.description
+
+def test_check_existing_member_aliases(applications_cog):
+    """Test that applicants re-joining under an alt or previous name are caught, and told who owns it."""
+    applications_cog.bot.selectMany = MagicMock(return_value=[
+        (1, "MainName", 555, ["altname"], ["OldName"]),
+    ])
+
+    assert applications_cog._check_existing_member("oldname", 123) == (True, "RSN 'oldname' is a previous name of MainName.")
+    assert applications_cog._check_existing_member("AltName", 123) == (True, "RSN 'AltName' is registered as an alt of MainName.")
+    assert applications_cog._check_existing_member("Fresh", 555) == (True, "Discord ID 555 is already registered in the clan as MainName.")
+    assert applications_cog._check_existing_member("Fresh", 123) == (False, "")
+    # One query per check
+    assert applications_cog.bot.selectMany.call_count == 4
+
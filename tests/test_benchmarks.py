@@ -0,0 +1,140 @@
+import asyncio
+import pytest
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+# Add the parent directory to the path so we can import the benchmarks
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.cases import CASES
+from benchmarks.clan import build_clan
+from benchmarks.fakes import BenchBot, FakeHTTP
+from benchmarks.harness import BenchmarkResult, run_case
+from benchmarks.load import LoadGenerator, main as load_main, mix_from_history, parse_mix
+from benchmarks.memory import measure
+from benchmarks.memory_db import InMemoryDB, UnsupportedQuery
+from benchmarks.run import find_regressions, load_baseline, main as run_main, save_baseline
+from util.member_record import record_factory
+
+# Test that every case still runs against the in-memory DB, so a changed query is caught here
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", list(CASES))
+async def test_benchmark_case_runs(name):
+    db = InMemoryDB(build_clan(20))
+    http = FakeHTTP()
+    case = CASES[name](BenchBot(db), http)
+
+    result = await run_case(name, 20, case, db, min_time=0, min_iterations=2, warmup=1, allocation_iterations=1)
+
+    assert result.iterations == 2
+    assert result.ops_per_sec > 0
+    assert result.p50_ms <= result.p99_ms
+    # None of the commands should have ended up on an error path
+    for message in http.messages:
+        assert "error" not in (message.get("content") or "").lower()
+
+# Test that the in-memory DB refuses queries it doesn't know
+def test_in_memory_db_unsupported_query():
+    db = InMemoryDB(build_clan(5))
+    with pytest.raises(UnsupportedQuery):
+        db.selectMany("SELECT * FROM member")
+
+# Test that the in-memory DB hands member rows back as records
+def test_in_memory_db_select_members():
+    db = InMemoryDB(build_clan(5))
+    members = db.selectMany("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member", row_factory=record_factory)
+    assert [member.rsn for member in members] == [row[0] for row in db.selectMany("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member")]
+    assert members[0].discord_id == "bench_user_1"
+
+# Test that the roster takes less memory as records than as dicts, and about what it does as tuples
+def test_member_record_memory():
+    clan = build_clan(2000)
+    # Tuples first, so the one-off cost of tracing anything at all isn't put down to records
+    tuples, dicts, records = measure(clan, "tuple"), measure(clan, "dict"), measure(clan, "record")
+    assert records.bytes < dicts.bytes
+    assert records.bytes < tuples.bytes * 1.1
+
+# Test that the same size always builds the same clan
+def test_build_clan_is_deterministic():
+    assert build_clan(50).member_rows() == build_clan(50).member_rows()
+
+# Test that only slowdowns over the threshold and the noise floor are regressions
+def test_find_regressions():
+    def result(key_size, p50_ms):
+        return BenchmarkResult("list_members", key_size, 10, 1.0, p50_ms, p50_ms, p50_ms, 1.0, 1.0)
+    baseline = {
+        "list_members[100]": {"p50_ms": 1.0},
+        "list_members[1000]": {"p50_ms": 10.0},
+        "list_members[10000]": {"p50_ms": 0.01},
+    }
+    regressions = find_regressions([result(100, 1.1), result(1000, 15.0), result(10000, 0.03)], baseline, 0.25)
+    assert regressions == ["list_members[1000]: p50 10.000ms -> 15.000ms (+50%)"]
+
+# Test that saving a baseline only replaces the entries that were run, unless it was for another backend
+def test_save_baseline_merges(tmp_path):
+    path = str(tmp_path / "baselines.json")
+    save_baseline(path, [BenchmarkResult("list_members", 100, 10, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0),
+                         BenchmarkResult("list_members", 1000, 10, 1.0, 5.0, 5.0, 5.0, 1.0, 1.0)], "memory")
+    save_baseline(path, [BenchmarkResult("list_members", 100, 10, 1.0, 2.0, 2.0, 2.0, 1.0, 1.0)], "memory")
+    baseline = load_baseline(path)
+    assert baseline["results"]["list_members[100]"]["p50_ms"] == 2.0
+    assert baseline["results"]["list_members[1000]"]["p50_ms"] == 5.0
+
+    save_baseline(path, [BenchmarkResult("list_members", 100, 10, 1.0, 3.0, 3.0, 3.0, 1.0, 1.0)], "postgres")
+    assert list(load_baseline(path)["results"]) == ["list_members[100]"]
+
+# Test that a run isn't compared with a baseline recorded on another backend
+def test_baseline_backend_mismatch(tmp_path, capsys):
+    path = str(tmp_path / "baselines.json")
+    slow = BenchmarkResult("list_members", 100, 10, 1.0, 50.0, 50.0, 50.0, 1.0, 1.0)
+    save_baseline(path, [BenchmarkResult("list_members", 100, 10, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0)], "postgres")
+    with patch("benchmarks.run.run_benchmarks", new=MagicMock(return_value=asyncio.sleep(0, [slow]))):
+        assert run_main(["--cases", "list_members", "--sizes", "100", "--baseline", path]) == 0
+    assert "recorded on the postgres backend" in capsys.readouterr().out
+    with patch("benchmarks.run.run_benchmarks", new=MagicMock(return_value=asyncio.sleep(0, [slow]))):
+        assert run_main(["--cases", "list_members", "--sizes", "100", "--baseline", path, "--dsn", "postgresql://bench"]) == 1
+
+# Test that the load generator sends the mix and reports every request
+@pytest.mark.asyncio
+async def test_load_generator():
+    db = InMemoryDB(build_clan(20))
+    generator = LoadGenerator(BenchBot(db), {"lottery_status": 3, "list_members": 1}, rate=200)
+
+    report = await generator.run(0.2)
+
+    assert report["requests"] == sum(case["requests"] for case in report["cases"].values())
+    assert report["requests"] > 0
+    assert report["error_rate"] == 0
+    assert report["queue_p99_ms"] is not None
+    assert set(report["cases"]) == {"lottery_status", "list_members"}
+
+# Test that unknown cases in a mix are rejected
+def test_load_generator_unknown_case():
+    with pytest.raises(ValueError):
+        LoadGenerator(BenchBot(InMemoryDB(build_clan(5))), {"not_a_case": 1}, rate=1)
+
+# Test that a mix with nothing to send is rejected, and the load run exits with an error
+def test_load_generator_empty_mix(capsys):
+    with pytest.raises(ValueError):
+        LoadGenerator(BenchBot(InMemoryDB(build_clan(5))), {"lottery_status": 0}, rate=1)
+    with patch("benchmarks.load.mix_from_history", return_value={}):
+        assert load_main(["--history-dsn", "postgres://history", "--size", "5"]) == 1
+    assert "no cases" in capsys.readouterr().err
+
+# Test parsing a mix from the command line
+def test_parse_mix():
+    assert parse_mix("lottery_status=5,list_members") == {"lottery_status": 5.0, "list_members": 1.0}
+
+# Test that command_usage history is mapped onto cases
+def test_mix_from_history():
+    cursor = MagicMock()
+    cursor.fetchall.return_value = [("accept_app", 3), ("accept_app_context_menu", 2), ("lottery_status", 10), ("ping", 50)]
+    conn = MagicMock()
+    conn.__enter__.return_value = conn
+    conn.cursor.return_value.__enter__.return_value = cursor
+    with patch("psycopg2.connect", return_value=conn):
+        weights = mix_from_history("dbname=test", days=7, hours="18-23")
+
+    assert weights == {"process_application": 5, "lottery_status": 10}
+    assert cursor.execute.call_args[0][1] == (7, 18, 23)
@@ -28,9 +28,13 @@ def test_getNextMemLvlDate():
     result = CoffeeHouseBot.getNextMemLvlDate(mock_bot, 0, thirteen_days_ago)
     assert result == thirteen_days_ago + datetime.timedelta(days=14)
     
-    # Test with mem_lvl 0 and a join date of 15 days ago
+    # Test with mem_lvl 0 and a join date of 15 days ago, overdue for level 1
     fifteen_days_ago = today - datetime.timedelta(days=15)
     result = CoffeeHouseBot.getNextMemLvlDate(mock_bot, 0, fifteen_days_ago)
+    assert result == fifteen_days_ago + datetime.timedelta(days=14)
+    
+    # Test with mem_lvl 1 and a join date of 15 days ago
+    result = CoffeeHouseBot.getNextMemLvlDate(mock_bot, 1, fifteen_days_ago)
     assert result == fifteen_days_ago + datetime.timedelta(days=84)
     
     # Test with mem_lvl 1 and a join date of 83 days ago
@@ -38,30 +42,30 @@ def test_getNextMemLvlDate():
     result = CoffeeHouseBot.getNextMemLvlDate(mock_bot, 1, eighty_three_days_ago)
     assert result == eighty_three_days_ago + datetime.timedelta(days=84)
     
-    # Test with mem_lvl 1 and a join date of 85 days ago
+    # Test with mem_lvl 1 and a join date of 85 days ago, overdue for level 2
     eighty_five_days_ago = today - datetime.timedelta(days=85)
     result = CoffeeHouseBot.getNextMemLvlDate(mock_bot, 1, eighty_five_days_ago)
-    assert result == eighty_five_days_ago + datetime.timedelta(days=182)
+    assert result == eighty_five_days_ago + datetime.timedelta(days=84)
     
     # Test with mem_lvl 2 and a join date of 181 days ago
     one_eighty_one_days_ago = today - datetime.timedelta(days=181)
     result = CoffeeHouseBot.getNextMemLvlDate(mock_bot, 2, one_eighty_one_days_ago)
     assert result == one_eighty_one_days_ago + datetime.timedelta(days=182)
     
-    # Test with mem_lvl 2 and a join date of 183 days ago
+    # Test with mem_lvl 2 and a join date of 183 days ago, overdue for level 3
     one_eighty_three_days_ago = today - datetime.timedelta(days=183)
     result = CoffeeHouseBot.getNextMemLvlDate(mock_bot, 2, one_eighty_three_days_ago)
-    assert result == one_eighty_three_days_ago + datetime.timedelta(days=365)
+    assert result == one_eighty_three_days_ago + datetime.timedelta(days=182)
     
     # Test with mem_lvl 3 and a join date of 364 days ago
     three_sixty_four_days_ago = today - datetime.timedelta(days=364)
     result = CoffeeHouseBot.getNextMemLvlDate(mock_bot, 3, three_sixty_four_days_ago)
     assert result == three_sixty_four_days_ago + datetime.timedelta(days=365)
     
-    # Test with mem_lvl 3 and a join date of 366 days ago
+    # Test with mem_lvl 3 and a join date of 366 days ago, overdue for level 4
     three_sixty_six_days_ago = today - datetime.timedelta(days=366)
     result = CoffeeHouseBot.getNextMemLvlDate(mock_bot, 3, three_sixty_six_days_ago)
-    assert result is None
+    assert result == three_sixty_six_days_ago + datetime.timedelta(days=365)
     
     # Test with mem_lvl 4 (Tenured - no automatic progression)
     result = CoffeeHouseBot.getNextMemLvlDate(mock_bot, 4, today)
@@ -558,4 +562,89 @@ def test_execute_query_error():
     mock_cursor.close.assert_called_once()
     
     # Verify that the result is False
-    assert result is None
\ No newline at end of file
+    assert result is None
+
+# Test that the DB helpers record query timings
+def test_select_many_records_query():
+    mock_bot = MagicMock(spec=CoffeeHouseBot)
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = [(1,), (2,)]
+    mock_conn.cursor.return_value = mock_cursor
+    mock_bot.conn = mock_conn
+    mock_bot.check_database_connection = MagicMock(return_value=True)
+
+    CoffeeHouseBot.selectMany(mock_bot, "SELECT _id FROM member")
+    mock_bot._record_query.assert_called_once()
+    args = mock_bot._record_query.call_args[0]
+    assert args[0] == "SELECT _id FROM member"
+    assert args[2] == 2
+
+    # Failed queries are recorded as errors
+    mock_bot._record_query.reset_mock()
+    mock_cursor.execute.side_effect = psycopg2.Error()
+    CoffeeHouseBot.selectOne(mock_bot, "SELECT _id FROM member")
+    assert mock_bot._record_query.call_args[1] == {"error": True}
+
+# Test that selectMany converts rows with a row factory, and a factory refusing the columns isn't a DB error
+def test_select_many_row_factory():
+    from util.member_record import record_factory
+    mock_bot = MagicMock(spec=CoffeeHouseBot)
+    mock_cursor = MagicMock()
+    mock_cursor.fetchall.return_value = [("Coffee", "coffee#1")]
+    mock_cursor.description = [MagicMock(), MagicMock()]
+    mock_cursor.description[0].name = "rsn"
+    mock_cursor.description[1].name = "discord_id"
+    mock_bot.conn = MagicMock()
+    mock_bot.conn.cursor.return_value = mock_cursor
+    mock_bot.check_database_connection = MagicMock(return_value=True)
+
+    result = CoffeeHouseBot.selectMany(mock_bot, "SELECT rsn, discord_id FROM member", row_factory=record_factory)
+    assert result == [("Coffee", "coffee#1")]
+    assert result[0].discord_id == "coffee#1"
+
+    mock_cursor.description[1].name = "coffee_preference"
+    with pytest.raises(ValueError, match="coffee_preference"):
+        CoffeeHouseBot.selectMany(mock_bot, "SELECT rsn, coffee_preference FROM member", row_factory=record_factory)
+    assert mock_bot._record_query.call_args[1] == {}
+
+def run_query(bot, query):
+    """Stand-in for a DB helper, so the caller of this function is the one that gets tagged."""
+    CoffeeHouseBot._record_query(bot, query, 0.0, 1)
+
+# Test that queries are tagged with the calling module
+def test_record_query_tag():
+    from util.query_stats import QueryStats
+    mock_bot = MagicMock(spec=CoffeeHouseBot)
+    mock_bot.query_stats = QueryStats()
+
+    run_query(mock_bot, "SELECT 1")
+    stat = mock_bot.query_stats.queries["SELECT ?"]
+    assert stat.tags == {__name__: 1}
+
+# Test that promotion thresholds are only rewritten when the config changes
+def test_sync_promotion_thresholds():
+    from util.promotions import REPLACE_PROMOTION_THRESHOLDS_SQL
+    mock_bot = MagicMock(spec=CoffeeHouseBot)
+
+    # Unchanged
+    mock_bot.selectMany.return_value = [(0, 14), (1, 84), (2, 182), (3, 365)]
+    assert CoffeeHouseBot.sync_promotion_thresholds(mock_bot) is False
+    mock_bot.execute_query.assert_not_called()
+
+    # Changed, so the table is replaced and every member's date recalculated in one statement
+    mock_bot.selectMany.return_value = [(0, 7), (1, 84)]
+    mock_bot.execute_query.return_value = True
+    assert CoffeeHouseBot.sync_promotion_thresholds(mock_bot) is True
+    mock_bot.execute_query.assert_called_once_with(REPLACE_PROMOTION_THRESHOLDS_SQL, ([0, 1, 2, 3], [14, 84, 182, 365]))
+
+    # The replacement failed and was rolled back
+    mock_bot.execute_query.reset_mock()
+    mock_bot.execute_query.return_value = None
+    assert CoffeeHouseBot.sync_promotion_thresholds(mock_bot) is False
+
+    # No database
+    mock_bot.execute_query.reset_mock()
+    mock_bot.selectMany.return_value = None
+    assert CoffeeHouseBot.sync_promotion_thresholds(mock_bot) is False
+    mock_bot.execute_query.assert_not_called()
@@ -0,0 +1,127 @@
+import pytest
+import asyncio
+import json
+import multiprocessing
+import sys
+import os
+from unittest.mock import MagicMock
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.cluster import ClusterClient, ClusterLauncher, cluster_path, get_cluster, plan_clusters, shard_for_guild
+
+# Test shards are split into contiguous, even ranges
+def test_plan_clusters():
+    assert plan_clusters(10, 3) == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    assert plan_clusters(4, 4) == [[0], [1], [2], [3]]
+    # More clusters than shards leaves the extra clusters out
+    assert plan_clusters(2, 5) == [[0], [1]]
+    with pytest.raises(ValueError):
+        plan_clusters(0, 1)
+
+# Test guilds are matched to the cluster running their shard
+def test_owns_guild():
+    guild_id = 81384788765712384
+    shard = shard_for_guild(guild_id, 4)
+    assert shard == (guild_id >> 22) % 4
+    assert ClusterClient(0, 2, [shard], 4, MagicMock()).owns_guild(guild_id)
+    assert not ClusterClient(1, 2, [(shard + 1) % 4], 4, MagicMock()).owns_guild(guild_id)
+
+# Test each cluster gets its own file name, and paths are unchanged without clusters
+def test_cluster_path():
+    cluster = ClusterClient(1, 2, [1], 2, MagicMock())
+    assert cluster_path("logs/bot.log", cluster) == "logs/bot.cluster-1.log"
+    assert cluster_path(".command_sync.json", cluster) == ".command_sync.cluster-1.json"
+    assert cluster_path("bot.log", None) == "bot.log"
+    assert cluster_path(None, cluster) is None
+
+# Test the launcher passes broadcasts to the other clusters, requests to all of them and replies back to the asker
+def test_launcher_routes_messages():
+    launcher = ClusterLauncher(MagicMock(), shard_count=3, cluster_count=3)
+    launcher.conns = {cluster_id: MagicMock() for cluster_id in range(3)}
+
+    launcher.route(0, {"op": "broadcast", "event": "extension", "data": {"action": "reload"}})
+    launcher.conns[0].send.assert_not_called()
+    launcher.conns[1].send.assert_called_once_with({"op": "event", "event": "extension", "data": {"action": "reload"}, "source": 0})
+
+    launcher.route(1, {"op": "request", "id": 7, "command": "stats", "data": None})
+    for conn in launcher.conns.values():
+        assert conn.send.call_args.args[0] == {"op": "request", "id": 7, "command": "stats", "data": None, "source": 1}
+
+    launcher.route(2, {"op": "reply", "id": 7, "target": 1, "data": {"guilds": 3}})
+    assert launcher.conns[1].send.call_args.args[0] == {"op": "reply", "id": 7, "cluster_id": 2, "data": {"guilds": 3}}
+
+    launcher.route(2, {"op": "ready"})
+    assert launcher.ready == {2}
+
+# Test a request gathers every cluster's reply, and a request from another cluster is answered
+@pytest.mark.asyncio
+async def test_client_request_and_answer():
+    launcher_end, cluster_end = multiprocessing.Pipe()
+    client = ClusterClient(0, 2, [0], 2, cluster_end)
+    client.add_command("stats", lambda data: {"guilds": 5})
+    client.start()
+
+    request = asyncio.create_task(client.request("stats", timeout=2))
+    sent = await asyncio.to_thread(launcher_end.recv)
+    assert sent == {"op": "request", "id": 1, "command": "stats", "data": None}
+    launcher_end.send({"op": "reply", "id": 1, "cluster_id": 1, "data": {"guilds": 2}})
+    launcher_end.send({"op": "reply", "id": 1, "cluster_id": 0, "data": {"guilds": 5}})
+    assert await request == {0: {"guilds": 5}, 1: {"guilds": 2}}
+
+    launcher_end.send({"op": "request", "id": 3, "command": "stats", "data": None, "source": 1})
+    reply = await asyncio.to_thread(launcher_end.recv)
+    assert reply == {"op": "reply", "id": 3, "target": 1, "data": {"guilds": 5}}
+    launcher_end.close()
+
+# Test a request returns the replies it has when a cluster doesn't answer
+@pytest.mark.asyncio
+async def test_client_request_timeout():
+    launcher_end, cluster_end = multiprocessing.Pipe()
+    client = ClusterClient(0, 2, [0], 2, cluster_end)
+    client.start()
+
+    request = asyncio.create_task(client.request("stats", timeout=0.2))
+    await asyncio.to_thread(launcher_end.recv)
+    launcher_end.send({"op": "reply", "id": 1, "cluster_id": 0, "data": 1})
+    assert await request == {0: 1}
+    launcher_end.close()
+
+def run_test_cluster(cluster_id, cluster_count, shard_ids, shard_count, conn):
+    """Worker for test_launcher_runs_clusters, cluster 0 asks for stats then shuts everything down."""
+    async def main():
+        client = ClusterClient(cluster_id, cluster_count, shard_ids, shard_count, conn)
+        stopped = asyncio.Event()
+        client.add_command("stats", lambda data: {"shard_ids": client.shard_ids})
+        client.on("shutdown", lambda data: stopped.set())
+        client.start()
+        client.ready()
+        if cluster_id == 0:
+            # The launcher only starts the next cluster once this one is ready
+            replies = {}
+            while len(replies) < cluster_count:
+                replies = await client.request("stats", timeout=1)
+            with open(os.environ["CLUSTER_TEST_OUTPUT"], "w") as output:
+                json.dump(replies, output)
+        else:
+            await stopped.wait()
+    asyncio.run(main())
+
+# Test the launcher starts every cluster and a clean exit from one stops them all
+def test_launcher_runs_clusters(tmp_path, monkeypatch):
+    output = tmp_path / "stats.json"
+    monkeypatch.setenv("CLUSTER_TEST_OUTPUT", str(output))
+    launcher = ClusterLauncher(run_test_cluster, shard_count=5, cluster_count=2, ready_timeout=10)
+
+    launcher.run()
+
+    assert json.loads(output.read_text()) == {"0": {"shard_ids": [0, 1, 2]}, "1": {"shard_ids": [3, 4]}}
+    assert launcher.processes == {}
+
+# Test only a real ClusterClient is used from the bot
+def test_get_cluster():
+    bot = MagicMock()
+    assert get_cluster(bot) is None
+    bot.cluster = ClusterClient(0, 1, [0], 1, MagicMock())
+    assert get_cluster(bot) is bot.cluster
@@ -0,0 +1,54 @@
+import pytest
+import datetime
+import sys
+import os
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.command_partitions import add_months, create_partition_sql, expired_partitions, months_to_create, partition_month, partition_name
+
+# Test month arithmetic across year boundaries
+def test_add_months():
+    assert add_months(datetime.date(2024, 11, 1), 1) == datetime.date(2024, 12, 1)
+    assert add_months(datetime.date(2024, 12, 1), 1) == datetime.date(2025, 1, 1)
+    assert add_months(datetime.date(2024, 1, 31), -1) == datetime.date(2023, 12, 1)
+    assert add_months(datetime.date(2024, 3, 1), -14) == datetime.date(2023, 1, 1)
+
+# Test partition names
+def test_partition_names():
+    assert partition_name(datetime.date(2024, 3, 1)) == "command_usage_2024_03"
+    assert partition_month("command_usage_2024_03") == datetime.date(2024, 3, 1)
+    assert partition_month("command_usage_daily") is None
+    assert partition_month("command_usage_default") is None
+
+# Test the statements that create a partition, moving the month's rows out of the default partition around it
+def test_create_partition_sql():
+    statements = create_partition_sql(datetime.date(2024, 12, 15)).split("; ")
+    in_month = "timestamp >= '2024-12-01' AND timestamp < '2025-01-01'"
+    assert statements == [
+        f"CREATE TEMP TABLE command_usage_moving ON COMMIT DROP AS SELECT * FROM command_usage_default WHERE {in_month}",
+        f"DELETE FROM command_usage_default WHERE {in_month}",
+        "CREATE TABLE IF NOT EXISTS command_usage_2024_12 PARTITION OF command_usage "
+        "FOR VALUES FROM ('2024-12-01') TO ('2025-01-01')",
+        "INSERT INTO command_usage SELECT * FROM command_usage_moving",
+    ]
+
+# Test which months get partitions
+def test_months_to_create():
+    assert months_to_create(datetime.date(2024, 11, 20), 2) == [
+        datetime.date(2024, 11, 1),
+        datetime.date(2024, 12, 1),
+        datetime.date(2025, 1, 1),
+    ]
+
+# Test which partitions are past the retention period
+def test_expired_partitions():
+    names = ["command_usage_2024_05", "command_usage_2023_12", "command_usage_2024_03", "command_usage_2024_04", "something_else"]
+    # Keep March to June (plus the current month)
+    assert expired_partitions(names, datetime.date(2024, 7, 10), 4) == [
+        ("command_usage_2023_12", datetime.date(2023, 12, 1)),
+    ]
+    assert [name for name, _ in expired_partitions(names, datetime.date(2024, 7, 10), 2)] == [
+        "command_usage_2023_12", "command_usage_2024_03", "command_usage_2024_04",
+    ]
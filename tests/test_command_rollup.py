@@ -0,0 +1,58 @@
+import datetime
+import pytest
+import re
+import sys
+import os
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.command_rollup import (
+    LATENCY_BUCKETS_MS, ROLLUP_SQL, STATS_SQL, USAGE_TIMEZONE, bucket_columns, bucket_percentile, summarise_stats_row, usage_now,
+)
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql")
+
+# Test that the rollup table in create-db.sql has a column for every bucket
+def test_rollup_table_columns():
+    with open(os.path.join(SQL_DIR, "create-db.sql")) as sql_file:
+        create_db = sql_file.read()
+    table = re.search(r"CREATE TABLE command_usage_daily\s*\((.*?)\);", create_db, re.DOTALL).group(1)
+    for column in bucket_columns():
+        assert f"{column} integer" in table
+    assert len(bucket_columns()) == len(LATENCY_BUCKETS_MS) + 1
+
+# Test that the queries read and write the same columns
+def test_rollup_queries():
+    for column in bucket_columns():
+        assert column in ROLLUP_SQL
+        assert f"SUM({column})" in STATS_SQL
+    assert "ON CONFLICT (day, command_name) DO UPDATE" in ROLLUP_SQL
+    assert "%(start)s" in STATS_SQL
+    # Days end at the boundary the bot passes in, not the database's CURRENT_DATE
+    assert "CURRENT_DATE" not in ROLLUP_SQL
+
+# Test the nightly job and the day boundaries use the same zone as command_usage.timestamp
+def test_usage_timezone():
+    from cogs.admin import Admin
+    assert [time.tzinfo for time in Admin.command_usage_maintenance.time] == [USAGE_TIMEZONE]
+    assert usage_now().tzinfo is None
+    assert abs(usage_now() - datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)) < datetime.timedelta(seconds=5)
+    with open(os.path.join(SQL_DIR, "create-db.sql")) as sql_file:
+        assert "DEFAULT (NOW() AT TIME ZONE 'UTC')" in sql_file.read()
+
+# Test estimating percentiles from bucket counts
+def test_bucket_percentile():
+    # 10 timings: 5 <= 100ms, 3 <= 250ms, 2 over 5000ms
+    counts = [5, 3, 0, 0, 0, 0, 2]
+    assert bucket_percentile(counts, 50) == 100
+    assert bucket_percentile(counts, 80) == 250
+    assert bucket_percentile(counts, 95, max_ms=7200.0) == 7200.0
+    # Capped at the slowest duration
+    assert bucket_percentile([3, 0, 0, 0, 0, 0, 0], 50, max_ms=40.0) == 40.0
+    assert bucket_percentile([0] * 7, 50) is None
+
+# Test turning a stats row into the command-stats row
+def test_summarise_stats_row():
+    row = ("lookup", 10, 9, 1, 0, 10, 0, 0, 0, 0, 0, 180.0)
+    assert summarise_stats_row(row) == ("lookup", 10, 9, 1, 180.0, 180.0, 180.0)
@@ -0,0 +1,118 @@
+import pytest
+import discord
+from discord import app_commands
+from unittest.mock import AsyncMock, MagicMock
+import sys
+import os
+
+# Add the parent directory to the path so we can import the bot
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot import CoffeeHouseBot
+from util.command_sync import CommandSyncState, command_tree_fingerprint, sync_scope
+
+GUILD = discord.Object(id=12345)
+
+def make_tree():
+    """Create a command tree with a couple of commands."""
+    tree = app_commands.CommandTree(discord.Client(intents=discord.Intents.none()))
+
+    @tree.command(name="ping", description="Ping the bot")
+    async def ping(interaction: discord.Interaction):
+        pass
+
+    @tree.command(name="echo", description="Echo a message")
+    async def echo(interaction: discord.Interaction, text: str):
+        pass
+
+    return tree
+
+# Test that the fingerprint is stable for the same commands
+def test_fingerprint_stable():
+    assert command_tree_fingerprint(make_tree()) == command_tree_fingerprint(make_tree())
+
+# Test that the fingerprint changes when a command changes
+def test_fingerprint_changes():
+    tree = make_tree()
+    before = command_tree_fingerprint(tree)
+
+    @tree.command(name="new-command", description="Something new")
+    async def new_command(interaction: discord.Interaction):
+        pass
+
+    assert command_tree_fingerprint(tree) != before
+
+# Test that guild commands don't affect the global fingerprint
+def test_fingerprint_scopes():
+    tree = make_tree()
+    global_before = command_tree_fingerprint(tree)
+    guild_before = command_tree_fingerprint(tree, GUILD)
+
+    @tree.command(name="guild-command", description="Guild only", guild=GUILD)
+    async def guild_command(interaction: discord.Interaction):
+        pass
+
+    assert command_tree_fingerprint(tree) == global_before
+    assert command_tree_fingerprint(tree, GUILD) != guild_before
+    assert sync_scope(None) == "global"
+    assert sync_scope(GUILD) == "guild:12345"
+
+# Test that the sync state is persisted between instances
+def test_sync_state_persisted(tmp_path):
+    path = str(tmp_path / "sync.json")
+    state = CommandSyncState(path)
+    assert state.get(1, "global") is None
+
+    state.set(1, "global", "abc")
+    assert CommandSyncState(path).get(1, "global") == "abc"
+    # Another application hasn't synced yet
+    assert CommandSyncState(path).get(2, "global") is None
+
+# Test that a corrupt state file is ignored
+def test_sync_state_corrupt_file(tmp_path):
+    path = tmp_path / "sync.json"
+    path.write_text("not json")
+    assert CommandSyncState(str(path)).get(1, "global") is None
+
+# Test that sync_app_commands only syncs when the tree has changed
+@pytest.mark.asyncio
+async def test_sync_app_commands_skips_unchanged(tmp_path):
+    mock_bot = MagicMock()
+    mock_bot.tree = make_tree()
+    mock_bot.tree.sync = AsyncMock(return_value=["ping", "echo"])
+    mock_bot.command_sync_state = CommandSyncState(str(tmp_path / "sync.json"))
+    mock_bot.application_id = 1
+
+    # First sync goes through
+    result = await CoffeeHouseBot.sync_app_commands(mock_bot)
+    assert result == ["ping", "echo"]
+    mock_bot.tree.sync.assert_called_once_with(guild=None)
+
+    # Second sync is skipped
+    result = await CoffeeHouseBot.sync_app_commands(mock_bot)
+    assert result is None
+    mock_bot.tree.sync.assert_called_once()
+
+    # Forced sync goes through
+    result = await CoffeeHouseBot.sync_app_commands(mock_bot, force=True)
+    assert result == ["ping", "echo"]
+    assert mock_bot.tree.sync.call_count == 2
+
+    # A different bot token syncs its own application
+    mock_bot.application_id = 2
+    result = await CoffeeHouseBot.sync_app_commands(mock_bot)
+    assert result == ["ping", "echo"]
+    assert mock_bot.tree.sync.call_count == 3
+
+# Test that a failed sync doesn't record the fingerprint
+@pytest.mark.asyncio
+async def test_sync_app_commands_failure(tmp_path):
+    mock_bot = MagicMock()
+    mock_bot.tree = make_tree()
+    mock_bot.tree.sync = AsyncMock(side_effect=discord.HTTPException(MagicMock(status=429), "rate limited"))
+    mock_bot.command_sync_state = CommandSyncState(str(tmp_path / "sync.json"))
+    mock_bot.application_id = 1
+
+    with pytest.raises(discord.HTTPException):
+        await CoffeeHouseBot.sync_app_commands(mock_bot)
+    assert mock_bot.command_sync_state.get(1, "global") is None
@@ -0,0 +1,129 @@
+import pytest
+import discord
+from unittest.mock import AsyncMock, MagicMock
+import sys
+import os
+
+# Add the parent directory to the path so we can import the cogs
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.base_cog import log_command
+from util.command_timing import CommandMetrics, CommandTiming, RESPONSE_METHODS, TimedInteractionResponse, current_command, time_responses, _hook_response
+from util.query_stats import QueryStats
+
+class TimedCog:
+    def __init__(self, bot):
+        self.bot = bot
+        self.query_stats = QueryStats()
+
+    @log_command
+    async def lookup(self, interaction):
+        # Queries run by the command count towards its DB time
+        self.query_stats.record("SELECT * FROM member", 25.0, rows=1)
+        await interaction.response.defer()
+        await interaction.response.send_message("done")
+
+    @log_command
+    async def broken(self, interaction):
+        raise ValueError("boom")
+
+def make_bot():
+    bot = MagicMock()
+    bot.command_metrics = CommandMetrics()
+    bot.selectOne.return_value = (7,)
+    return bot
+
+class FakeResponse:
+    """Stands in for InteractionResponse, with the same hooks installed."""
+    def __init__(self):
+        self.marked_before_sending = None
+
+    def is_done(self):
+        return False
+
+    async def defer(self):
+        # The response is marked before the request goes out
+        self.marked_before_sending = current_command.get().first_response_ms is not None
+
+    async def send_message(self, content):
+        pass
+
+    defer = _hook_response(defer, "defer")
+    send_message = _hook_response(send_message, "send")
+
+def make_interaction():
+    interaction = MagicMock()
+    interaction.channel_id = 1
+    interaction.guild_id = 2
+    interaction.user.id = 3
+    interaction.response = FakeResponse()
+    return interaction
+
+# Test that only the command's own interaction gets the timed response, discord's class is left alone
+def test_time_responses():
+    interaction = discord.Interaction.__new__(discord.Interaction)
+    time_responses(interaction)
+    timed = interaction.response
+    assert isinstance(timed, TimedInteractionResponse)
+    time_responses(interaction)
+    assert interaction.response is timed
+
+    for name in RESPONSE_METHODS:
+        assert not hasattr(getattr(discord.InteractionResponse, name), "__wrapped__")
+        assert getattr(TimedInteractionResponse, name).__wrapped__ is getattr(discord.InteractionResponse, name)
+
+    # Anything else, like a test's mock, is left as it is
+    mock = MagicMock()
+    response = mock.response
+    time_responses(mock)
+    assert mock.response is response
+
+# Test that only the first response is recorded
+def test_mark_response():
+    timing = CommandTiming("Cog.command")
+    timing.mark_response("defer")
+    first = timing.first_response_ms
+    timing.mark_response("send")
+    assert timing.first_response_type == "defer"
+    assert timing.first_response_ms == first
+
+# Test that log_command records and persists the command timings
+@pytest.mark.asyncio
+async def test_log_command_timings():
+    bot = make_bot()
+    cog = TimedCog(bot)
+    interaction = make_interaction()
+
+    await cog.lookup(interaction)
+
+    args = bot.execute_query.call_args[0][1]
+    command_name, member_id, channel_id, guild_id, duration_ms, first_response_ms, first_response_type, db_ms = args
+    assert (command_name, member_id, channel_id, guild_id) == ("lookup", 7, 1, 2)
+    assert first_response_type == "defer"
+    assert 0 <= first_response_ms <= duration_ms
+    assert interaction.response.marked_before_sending
+    assert db_ms == 25.0
+    assert current_command.get() is None
+
+    # The live metrics use the same name as command_usage
+    summary = bot.command_metrics.summary()[command_name]
+    assert summary["duration"]["count"] == 1
+    assert summary["first_response"]["count"] == 1
+    assert summary["db"]["max_ms"] == 25.0
+
+# Test that failed commands are timed too
+@pytest.mark.asyncio
+async def test_log_command_failure_timings():
+    bot = make_bot()
+    cog = TimedCog(bot)
+
+    with pytest.raises(ValueError):
+        await cog.broken(make_interaction())
+
+    args = bot.execute_query.call_args[0][1]
+    assert args[0] == "broken"
+    assert args[4] == "boom"
+    assert args[5] is not None
+    # Never responded
+    assert args[6] is None and args[7] is None
+    assert bot.command_metrics.summary()["broken"]["first_response"]["count"] == 0
@@ -0,0 +1,145 @@
+import pytest
+import json
+import re
+import sys
+import os
+from unittest.mock import MagicMock, AsyncMock
+
+import discord
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.confirmations import (
+    CLAIM_CONFIRMATION_SQL, CONFIRMATION_SQL, CREATE_CONFIRMATION_SQL, PURGE_EXPIRED_SQL,
+    ConfirmationButton, ConfirmationView, Confirmations, get_confirmations,
+)
+
+CONFIRMATION_ID = "0123456789abcdef0123456789abcdef"
+
+@pytest.fixture
+def bot():
+    bot = MagicMock()
+    bot.execute_query = MagicMock(return_value=True)
+    bot.selectOne = MagicMock(return_value=("import", 111, {"rows": [["Alpha"]]}, False))
+    bot.execute_returning = MagicMock(side_effect=lambda query, params: bot.selectOne.return_value)
+    return bot
+
+@pytest.fixture
+def interaction():
+    interaction = MagicMock(spec=discord.Interaction)
+    interaction.user = MagicMock(id=111)
+    interaction.response = MagicMock()
+    interaction.response.send_message = AsyncMock()
+    interaction.response.edit_message = AsyncMock()
+    interaction.followup = MagicMock()
+    interaction.followup.send = AsyncMock()
+    return interaction
+
+# Test creating a confirmation stores its state and gives buttons carrying its ID
+def test_create(bot):
+    confirmations = Confirmations(bot)
+    confirmations.register("import", AsyncMock())
+
+    view = confirmations.create("import", 111, {"rows": [["Alpha"]]}, ttl=60, confirm_label="Yes", cancel_label="No")
+
+    bot.execute_query.assert_any_call(PURGE_EXPIRED_SQL)
+    query, params = bot.execute_query.call_args.args
+    assert query == CREATE_CONFIRMATION_SQL
+    assert params[1:] == ("import", 111, json.dumps({"rows": [["Alpha"]]}), 60)
+    assert isinstance(view, ConfirmationView)
+    assert view.timeout is None
+    assert [item.item.custom_id for item in view.children] == [f"confirmation:{params[0]}:yes", f"confirmation:{params[0]}:no"]
+    assert [item.item.label for item in view.children] == ["Yes", "No"]
+
+# Test a single button confirmation, and that unknown kinds or DB errors don't give buttons
+def test_create_edge_cases(bot):
+    confirmations = Confirmations(bot)
+    confirmations.register("accept", AsyncMock())
+    assert len(confirmations.create("accept", 111, cancel_label=None).children) == 1
+
+    with pytest.raises(ValueError):
+        confirmations.create("unknown", 111)
+
+    bot.execute_query.return_value = None
+    assert confirmations.create("accept", 111) is None
+
+# Test answering runs the handler once, after claiming the confirmation and removing its buttons
+@pytest.mark.asyncio
+async def test_handle(bot, interaction):
+    confirmations = Confirmations(bot)
+    handler = AsyncMock()
+    confirmations.register("import", handler)
+
+    await confirmations.handle(interaction, CONFIRMATION_ID, True)
+
+    bot.selectOne.assert_called_once_with(CONFIRMATION_SQL, (CONFIRMATION_ID,))
+    bot.execute_returning.assert_called_once_with(CLAIM_CONFIRMATION_SQL, (CONFIRMATION_ID, 111))
+    interaction.response.edit_message.assert_awaited_once_with(view=None)
+    handler.assert_awaited_once_with(interaction, {"rows": [["Alpha"]]}, True)
+
+# Test other users, answered or expired confirmations, and unloaded handlers don't run anything
+@pytest.mark.asyncio
+async def test_handle_rejected(bot, interaction):
+    confirmations = Confirmations(bot)
+    handler = AsyncMock()
+    confirmations.register("import", handler)
+
+    interaction.user.id = 222
+    await confirmations.handle(interaction, CONFIRMATION_ID, True)
+    assert "Only the person who asked" in interaction.response.send_message.call_args.args[0]
+    bot.execute_returning.assert_not_called()
+
+    interaction.user.id = 111
+    bot.selectOne.return_value = None
+    await confirmations.handle(interaction, CONFIRMATION_ID, True)
+    assert "already been answered" in interaction.response.send_message.call_args.args[0]
+
+    bot.selectOne.return_value = ("import", 111, {}, True)
+    await confirmations.handle(interaction, CONFIRMATION_ID, True)
+    bot.execute_returning.assert_called_once_with(CLAIM_CONFIRMATION_SQL, (CONFIRMATION_ID, 111))
+    interaction.response.edit_message.assert_awaited_once_with(content="⏱️ Confirmation timed out.", view=None)
+
+    # Another click or cluster deleted it between the check and the claim
+    bot.execute_returning.reset_mock()
+    bot.selectOne.return_value = ("import", 111, {}, False)
+    bot.execute_returning.side_effect = None
+    bot.execute_returning.return_value = None
+    await confirmations.handle(interaction, CONFIRMATION_ID, True)
+    bot.execute_returning.assert_called_once()
+    assert "already been answered" in interaction.response.send_message.call_args.args[0]
+    interaction.response.edit_message.assert_awaited_once()
+
+    bot.execute_returning.reset_mock()
+    confirmations.unregister("import")
+    await confirmations.handle(interaction, CONFIRMATION_ID, True)
+    bot.execute_returning.assert_not_called()
+
+    handler.assert_not_called()
+
+# Test the buttons are rebuilt from a custom_id after a restart and answer through the bot's confirmations
+@pytest.mark.asyncio
+async def test_button_from_custom_id(interaction):
+    custom_id = f"confirmation:{CONFIRMATION_ID}:no"
+    match = re.fullmatch(ConfirmationButton.__discord_ui_compiled_template__, custom_id)
+    item = discord.ui.Button(label="No, Cancel", style=discord.ButtonStyle.red, custom_id=custom_id)
+
+    button = await ConfirmationButton.from_custom_id(interaction, item, match)
+
+    assert button.confirmation_id == CONFIRMATION_ID
+    assert button.confirmed is False
+    assert button.item.label == "No, Cancel"
+    assert button.custom_id == custom_id
+
+    interaction.client = MagicMock()
+    interaction.client.confirmations = Confirmations(MagicMock())
+    interaction.client.confirmations.handle = AsyncMock()
+    await button.callback(interaction)
+    interaction.client.confirmations.handle.assert_awaited_once_with(interaction, CONFIRMATION_ID, False)
+
+# Test only a real Confirmations is used from the bot
+def test_get_confirmations():
+    bot = MagicMock()
+    assert get_confirmations(bot) is None
+    bot.confirmations = Confirmations(bot)
+    assert get_confirmations(bot) is bot.confirmations
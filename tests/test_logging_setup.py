@@ -0,0 +1,89 @@
+import pytest
+import io
+import json
+import logging
+import sys
+import os
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.logging_setup import JSONFormatter, setup_logging, stop_logging
+
+@pytest.fixture
+def log_stream(monkeypatch):
+    """Set up logging into a buffer and put the root logger back afterwards."""
+    monkeypatch.delenv("LOGLEVEL", raising=False)
+    root = logging.getLogger()
+    level = root.level
+    stream = io.StringIO()
+    yield stream
+    stop_logging()
+    root.setLevel(level)
+    for name in ("test.quiet", "test.loud"):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+
+# Test that records are written as JSON lines with their extra fields
+def test_json_lines(log_stream):
+    setup_logging({"format": "json"}, stream=log_stream)
+    logging.getLogger("test.loud").info("joined %s", "Bench00001", extra={"member_id": 1})
+    stop_logging()
+
+    entry = json.loads(log_stream.getvalue().splitlines()[0])
+    assert entry["message"] == "joined Bench00001"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "test.loud"
+    assert entry["member_id"] == 1
+
+# Test that exceptions survive the trip through the queue
+def test_json_exception(log_stream):
+    setup_logging({"format": "json"}, stream=log_stream)
+    try:
+        raise ValueError("bad row")
+    except ValueError:
+        logging.getLogger("test.loud").exception("import failed")
+    stop_logging()
+
+    entry = json.loads(log_stream.getvalue().splitlines()[0])
+    assert "ValueError: bad row" in entry["exception"]
+
+# Test per-logger levels from config
+def test_per_module_levels(log_stream):
+    setup_logging({"level": "INFO", "levels": {"test.quiet": "WARNING", "test.loud": "DEBUG"}}, stream=log_stream)
+    logging.getLogger("test.quiet").info("hidden")
+    logging.getLogger("test.quiet").warning("shown warning")
+    logging.getLogger("test.loud").debug("shown debug")
+    stop_logging()
+
+    output = log_stream.getvalue()
+    assert "hidden" not in output
+    assert "shown warning" in output
+    assert "shown debug" in output
+
+# Test that LOGLEVEL overrides the configured root level
+def test_loglevel_env(log_stream, monkeypatch):
+    monkeypatch.setenv("LOGLEVEL", "WARNING")
+    setup_logging({"level": "DEBUG"}, stream=log_stream)
+    assert logging.getLogger().level == logging.WARNING
+
+# Test that setting up twice doesn't write every record twice
+def test_setup_twice(log_stream):
+    setup_logging({}, stream=io.StringIO())
+    setup_logging({}, stream=log_stream)
+    logging.getLogger("test.loud").warning("once")
+    stop_logging()
+
+    assert log_stream.getvalue().count("once") == 1
+
+# Test that arguments are only formatted when the level is enabled
+def test_lazy_formatting(log_stream):
+    class Expensive:
+        formatted = False
+        def __str__(self):
+            Expensive.formatted = True
+            return "expensive"
+    setup_logging({"level": "INFO"}, stream=log_stream)
+    logging.getLogger("test.loud").debug("value: %s", Expensive())
+    stop_logging()
+
+    assert not Expensive.formatted
@@ -0,0 +1,53 @@
+import pytest
+import asyncio
+import time
+import sys
+import os
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.loop_monitor import LoopMonitor
+
+# Test that lag under the threshold isn't counted as a stall
+def test_record_lag():
+    monitor = LoopMonitor(stall_threshold_ms=100)
+    monitor.record_lag(5.0)
+    monitor.record_lag(-1.0)
+    monitor.record_lag(150.0)
+    monitor.record_lag(6000.0)
+
+    summary = monitor.summary()
+    assert summary["lag"]["count"] == 4
+    assert summary["stalls"]["<250ms"] == 1
+    assert summary["stalls"][">=5000ms"] == 1
+    assert [stall.duration_ms for stall in summary["recent_stalls"]] == [150.0, 6000.0]
+
+# Test that only a limited number of stalls are kept
+def test_max_stalls():
+    monitor = LoopMonitor(max_stalls=3)
+    for _ in range(10):
+        monitor.record_lag(200.0)
+    assert len(monitor.stalls) == 3
+    assert sum(monitor.stall_buckets) == 10
+
+def blocking_call():
+    time.sleep(0.4)
+
+# Test that a blocking call is detected and its stack captured
+@pytest.mark.asyncio
+async def test_detects_blocking_call():
+    monitor = LoopMonitor(interval_ms=20, stall_threshold_ms=100, capture_threshold_ms=150)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.1)
+        blocking_call()
+        await asyncio.sleep(0.1)
+    finally:
+        await monitor.stop()
+
+    assert not monitor.running
+    assert len(monitor.stalls) == 1
+    stall = monitor.stalls[0]
+    assert stall.duration_ms >= 300
+    assert "blocking_call" in stall.stack
@@ -0,0 +1,128 @@
+import pytest
+import sys
+import os
+from unittest.mock import MagicMock
+
+import discord
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.member_cache import CacheProfile, MemberCacheTrimmer, cache_report, deep_sizeof, estimate_size, get_member_cache_trimmer
+
+def make_role(role_id, name):
+    role = MagicMock(spec=discord.Role)
+    role.id = role_id
+    role.name = name
+    return role
+
+def make_member(member_id, role_ids=()):
+    member = MagicMock(spec=discord.Member)
+    member.id = member_id
+    member.get_role = lambda role_id: object() if role_id in role_ids else None
+    return member
+
+def make_guild(guild_id, roles, members):
+    guild = MagicMock(spec=discord.Guild)
+    guild.id = guild_id
+    guild.roles = roles
+    guild.members = list(members)
+    guild._remove_member = MagicMock(side_effect=guild.members.remove)
+    return guild
+
+# Test the default profile turns presences and chunking off but keeps members and message content
+def test_default_profile():
+    options = CacheProfile.from_config(None).client_options()
+
+    assert options["intents"].presences is False
+    assert options["intents"].members is True
+    assert options["intents"].message_content is True
+    assert options["chunk_guilds_at_startup"] is False
+    assert options["member_cache_flags"].joined is True
+
+# Test the profile can be switched back to the old behaviour or to no member cache, and bad settings are caught
+def test_profile_from_config():
+    profile = CacheProfile.from_config({"presences": True, "member_cache": "all", "chunk_guilds_at_startup": True})
+    options = profile.client_options()
+    assert options["intents"].presences is True
+    assert options["chunk_guilds_at_startup"] is True
+
+    options = CacheProfile.from_config({"member_cache": "none", "chunk_guilds_at_startup": True}).client_options()
+    assert options["member_cache_flags"].value == 0
+    assert options["chunk_guilds_at_startup"] is False
+
+    with pytest.raises(ValueError):
+        CacheProfile.from_config({"member_cache": "some"})
+    with pytest.raises(ValueError):
+        CacheProfile.from_config({"presence": False})
+
+# Test trimming keeps members with managed roles, recently seen members and the bot, and drops the rest
+def test_trim():
+    trimmer = MemberCacheTrimmer(CacheProfile(), ["Trial Member", "Member"])
+    managed, seen, bot_user, idle = make_member(1, role_ids=[10]), make_member(2), make_member(3), make_member(4, role_ids=[99])
+    guild = make_guild(500, [make_role(10, "Member"), make_role(99, "Server Booster")], [managed, seen, bot_user, idle])
+    trimmer.seen(500, 2)
+    # Seen in another guild doesn't count
+    trimmer.seen(600, 4)
+
+    removed = trimmer.trim([guild], keep_ids=[3])
+
+    assert removed == 1
+    guild._remove_member.assert_called_once_with(idle)
+    assert guild.members == [managed, seen, bot_user]
+    assert trimmer.trimmed == 1
+
+# Test activity older than the recent window is forgotten
+def test_trim_forgets_old_activity():
+    trimmer = MemberCacheTrimmer(CacheProfile(recent_member_minutes=0))
+    member = make_member(2)
+    guild = make_guild(500, [], [member])
+    trimmer.seen(500, 2)
+    trimmer.last_seen[(500, 2)] -= 1
+
+    assert trimmer.trim([guild]) == 1
+    assert trimmer.last_seen == {}
+
+class Holder:
+    __slots__ = ("name", "tags", "guild")
+
+    def __init__(self, name, tags, guild=None):
+        self.name = name
+        self.tags = tags
+        self.guild = guild
+
+# Test sizes include what an object holds itself but not other models it points at
+def test_deep_sizeof():
+    guild = MagicMock(spec=discord.Guild)
+    guild.id = 1
+    plain = Holder("a" * 100, ["x" * 50])
+    with_guild = Holder("a" * 100, ["x" * 50], guild)
+
+    assert deep_sizeof(plain) >= sys.getsizeof("a" * 100) + sys.getsizeof("x" * 50)
+    # The guild is cached on its own, so it counts for less than leaving it as None
+    assert deep_sizeof(with_guild) == deep_sizeof(plain) - sys.getsizeof(None)
+    assert estimate_size([plain] * 1000) == deep_sizeof(plain) * 1000
+    assert estimate_size([]) == 0
+
+# Test the report covers each cache, largest first
+def test_cache_report():
+    bot = MagicMock()
+    bot.guilds = [make_guild(500, [Holder("Member", [])], [Holder("m" * 200, []) for _ in range(3)])]
+    bot.guilds[0].channels = []
+    bot.users = [Holder("u" * 100, [])]
+    bot.cached_messages = []
+    bot.emojis = []
+
+    report = cache_report(bot)
+
+    assert [usage.name for usage in report][:2] == ["members", "users"]
+    assert report[0].count == 3
+    assert report[0].bytes > report[1].bytes
+    assert {usage.name for usage in report} == {"members", "users", "messages", "channels", "roles", "emojis"}
+
+# Test only a real MemberCacheTrimmer is used from the bot
+def test_get_member_cache_trimmer():
+    bot = MagicMock()
+    assert get_member_cache_trimmer(bot) is None
+    bot.member_cache_trimmer = MemberCacheTrimmer(CacheProfile())
+    assert get_member_cache_trimmer(bot) is bot.member_cache_trimmer
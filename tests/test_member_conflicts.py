@@ -0,0 +1,48 @@
+import pytest
+import sys
+import os
+from unittest.mock import MagicMock
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.member_conflicts import CONFLICTING_MEMBERS_SQL, MemberConflict, find_conflicts
+
+@pytest.fixture
+def bot():
+    bot = MagicMock()
+    bot.selectMany = MagicMock(return_value=[
+        (1, "Alpha", 111, ["AlphaAlt"], None),
+        (2, "Bravo", 222, None, ["OldBravo", "Older"]),
+    ])
+    return bot
+
+# Test a batch is checked with one query and each row is matched back to its applicant
+def test_find_conflicts(bot):
+    conflicts = find_conflicts(bot, [("alpha", 111), ("oldbravo", 999), ("Charlie", 333), ("alphaalt", 222)])
+
+    bot.selectMany.assert_called_once()
+    query, params = bot.selectMany.call_args.args
+    assert query == CONFLICTING_MEMBERS_SQL
+    assert sorted(params["rsns"]) == ["alpha", "alphaalt", "charlie", "oldbravo"]
+    assert sorted(params["discord_ids"]) == [111, 222, 333, 999]
+
+    assert conflicts[0] == [MemberConflict(1, "Alpha", ("rsn", "discord_id_num"))]
+    assert conflicts[1] == [MemberConflict(2, "Bravo", ("previous_rsn",))]
+    assert conflicts[2] == []
+    # The name belongs to one member and the Discord account to another
+    assert conflicts[3] == [MemberConflict(1, "Alpha", ("alt_rsn",)), MemberConflict(2, "Bravo", ("discord_id_num",))]
+
+# Test the messages leaders see
+def test_describe():
+    assert MemberConflict(1, "Alpha", ("rsn", "discord_id_num")).describe("alpha", 111) == \
+        "Both RSN 'alpha' and Discord ID 111 are already registered in the clan."
+    assert MemberConflict(1, "Alpha", ("rsn",)).describe("alpha", 5) == "RSN 'alpha' is already registered in the clan."
+    assert MemberConflict(2, "Bravo", ("previous_rsn",)).describe("OldBravo", 5) == "RSN 'OldBravo' is a previous name of Bravo."
+    assert MemberConflict(1, "Alpha", ("discord_id_num",)).describe("New", 111) == \
+        "Discord ID 111 is already registered in the clan as Alpha."
+
+# Test nothing is queried without applicants
+def test_no_applicants(bot):
+    assert find_conflicts(bot, []) == []
+    bot.selectMany.assert_not_called()
@@ -0,0 +1,43 @@
+import pytest
+import datetime
+import sys
+import os
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.member_record import MembershipLevel, member_records, record_factory, record_type
+
+# Test a row is converted to a record with a field per column, _id becoming id
+def test_record_factory():
+    make = record_factory(("_id", "rsn", "membership_level", "join_date", "alt_rsn", "previous_rsn"))
+
+    record = make((7, "Coffee", 3, datetime.date(2024, 2, 29), ["Decaf", "Latte"], None))
+
+    assert record.id == 7
+    assert record.rsn == "Coffee"
+    assert record.membership_level == MembershipLevel.SENIOR
+    assert record.join_date == datetime.date(2024, 2, 29)
+    assert record.alt_rsn == ["Decaf", "Latte"]
+    assert record.previous_rsn is None
+    assert not hasattr(record, "discord_id")
+
+# Test a record is still the row, so it takes no more memory and indexes the same way
+def test_record_is_a_tuple():
+    row = ("Coffee", "coffee#1")
+    record = record_factory(("rsn", "discord_id"))(row)
+
+    assert record == row
+    assert record[1] == "coffee#1"
+    assert sys.getsizeof(record) == sys.getsizeof(row)
+
+# Test the type for a set of columns is only built once, and unknown columns are refused
+def test_record_type_cached_and_checked():
+    assert record_type(("rsn", "discord_id")) is record_type(("rsn", "discord_id"))
+    with pytest.raises(ValueError, match="coffee_preference"):
+        record_factory(("rsn", "coffee_preference"))
+
+# Test a failed query stays None
+def test_member_records_none():
+    assert member_records(None, ("rsn",)) is None
+    assert member_records([], ("rsn",)) == []
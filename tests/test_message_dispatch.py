@@ -0,0 +1,172 @@
+import pytest
+import asyncio
+import itertools
+from discord.ext import commands
+from unittest.mock import AsyncMock, MagicMock
+import sys
+import os
+
+# Add the parent directory to the path so we can import the bot
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot import CoffeeHouseBot
+from util.message_dispatch import MessageDispatcher, build_message_handlers, message_filter
+
+CONFIG = {"application_channel_id": "111"}
+
+class NoHandlerCog:
+    pass
+
+class AllMessagesCog:
+    def __init__(self):
+        self.on_message = AsyncMock()
+
+class FilteredCog:
+    def __init__(self):
+        self.seen = []
+
+    @message_filter(channels=["application_channel_id", 222], categories=["Applications"])
+    async def on_message(self, message):
+        self.seen.append(message)
+
+class ListenerCog(commands.Cog):
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        pass
+
+def make_message(channel_id=111, category="applications", content="hello"):
+    message = MagicMock()
+    message.content = content
+    message.channel.id = channel_id
+    message.channel.category.name = category
+    return message
+
+# Test that only cogs with an on_message handler are in the table
+def test_build_message_handlers():
+    handlers = build_message_handlers([NoHandlerCog(), AllMessagesCog(), FilteredCog(), ListenerCog()], CONFIG.__getitem__)
+    assert [handler.name for handler in handlers] == ["AllMessagesCog.on_message", "FilteredCog.on_message"]
+    assert handlers[0].channel_ids is None
+    assert handlers[1].channel_ids == frozenset({111, 222})
+    assert handlers[1].category_names == frozenset({"APPLICATIONS"})
+
+# Test the channel and category filters
+def test_message_filter():
+    handler = build_message_handlers([FilteredCog()], CONFIG.__getitem__)[0]
+    assert handler.accepts(make_message())
+    assert handler.accepts(make_message(channel_id=222, category="APPLICATIONS"))
+    assert not handler.accepts(make_message(channel_id=333))
+    assert not handler.accepts(make_message(category="general"))
+
+    message = make_message()
+    message.channel.category = None
+    assert not handler.accepts(message)
+
+# Test that a channel missing from the config doesn't match anything
+def test_message_filter_missing_config():
+    handler = build_message_handlers([FilteredCog()], {}.__getitem__)[0]
+    assert handler.channel_ids == frozenset({222})
+    assert not handler.accepts(make_message())
+
+def make_bot(*cogs, **dispatcher_args):
+    mock_bot = MagicMock()
+    mock_bot.command_prefix = "!"
+    mock_bot.process_commands = AsyncMock()
+    mock_bot.message_log_sample_rate = 1
+    mock_bot._message_log_counter = itertools.count()
+    mock_bot.message_dispatcher = MessageDispatcher(**dispatcher_args)
+    mock_bot.message_dispatcher.rebuild(cogs, CONFIG.__getitem__)
+    return mock_bot
+
+async def drain(dispatcher):
+    await asyncio.gather(*dispatcher._tasks)
+
+# Test that on_message only forwards non-command messages to handlers that accept them
+@pytest.mark.asyncio
+async def test_on_message_dispatch():
+    all_messages = AllMessagesCog()
+    filtered = FilteredCog()
+    mock_bot = make_bot(all_messages, filtered)
+
+    await CoffeeHouseBot.on_message(mock_bot, make_message())
+    await CoffeeHouseBot.on_message(mock_bot, make_message(channel_id=333))
+    await CoffeeHouseBot.on_message(mock_bot, make_message(content="!help"))
+    await drain(mock_bot.message_dispatcher)
+
+    assert mock_bot.process_commands.call_count == 3
+    assert all_messages.on_message.call_count == 2
+    assert len(filtered.seen) == 1
+    assert mock_bot.message_dispatcher.summary()["AllMessagesCog.on_message"]["count"] == 2
+
+# Test that an error in one handler doesn't stop the others
+@pytest.mark.asyncio
+async def test_on_message_handler_error():
+    broken = AllMessagesCog()
+    broken.on_message.side_effect = Exception("boom")
+    working = AllMessagesCog()
+    mock_bot = make_bot(broken, working)
+
+    await CoffeeHouseBot.on_message(mock_bot, make_message())
+    await drain(mock_bot.message_dispatcher)
+
+    working.on_message.assert_called_once()
+    stats = mock_bot.message_dispatcher.stats
+    assert stats["AllMessagesCog.on_message"].errors == 1
+
+class SlowCog:
+    def __init__(self, delay):
+        self.delay = delay
+        self.finished = 0
+
+    async def on_message(self, message):
+        await asyncio.sleep(self.delay)
+        self.finished += 1
+
+# Test that a slow handler times out without delaying the others
+@pytest.mark.asyncio
+async def test_handler_timeout():
+    slow = SlowCog(5)
+    fast = AllMessagesCog()
+    dispatcher = MessageDispatcher(timeout=0.05)
+    dispatcher.rebuild([slow, fast], CONFIG.__getitem__)
+
+    tasks = dispatcher.dispatch(make_message())
+    await asyncio.wait_for(asyncio.gather(*tasks), 1)
+
+    fast.on_message.assert_called_once()
+    assert slow.finished == 0
+    assert dispatcher.stats["SlowCog.on_message"].timeouts == 1
+
+# Test that handlers run concurrently, up to the concurrency limit
+@pytest.mark.asyncio
+async def test_handler_concurrency():
+    class Tracker:
+        running = 0
+        peak = 0
+
+        async def on_message(self, message):
+            Tracker.running += 1
+            Tracker.peak = max(Tracker.peak, Tracker.running)
+            await asyncio.sleep(0.01)
+            Tracker.running -= 1
+
+    dispatcher = MessageDispatcher(concurrency=2)
+    dispatcher.rebuild([Tracker()], CONFIG.__getitem__)
+    tasks = []
+    for _ in range(5):
+        tasks += dispatcher.dispatch(make_message())
+    await asyncio.gather(*tasks)
+
+    assert Tracker.peak == 2
+    assert dispatcher.stats["Tracker.on_message"].latency.count == 5
+
+# Test that closing the dispatcher cancels running handlers
+@pytest.mark.asyncio
+async def test_dispatcher_close():
+    slow = SlowCog(5)
+    dispatcher = MessageDispatcher()
+    dispatcher.rebuild([slow], CONFIG.__getitem__)
+    dispatcher.dispatch(make_message())
+    await asyncio.sleep(0)
+
+    await asyncio.wait_for(dispatcher.close(), 1)
+    assert not dispatcher._tasks
@@ -0,0 +1,38 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.metrics import LatencyHistogram, percentile
+
+# Test nearest-rank percentiles
+def test_percentile():
+    samples = list(range(1, 101))
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 95) == 95
+    assert percentile(samples, 99) == 99
+    assert percentile(samples, 100) == 100
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) is None
+
+# Test that the histogram only keeps a window of samples but counts everything
+def test_latency_histogram():
+    histogram = LatencyHistogram(window=10)
+    for elapsed in range(100):
+        histogram.record(float(elapsed))
+
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["max_ms"] == 99.0
+    assert summary["mean_ms"] == 49.5
+    # Percentiles come from the last 10 samples
+    assert summary["p50_ms"] == 94.0
+    assert len(histogram.samples) == 10
+
+# Test an empty histogram
+def test_latency_histogram_empty():
+    summary = LatencyHistogram().summary()
+    assert summary["count"] == 0
+    assert summary["p99_ms"] is None
@@ -0,0 +1,128 @@
+import pytest
+import asyncio
+import gzip
+import time
+import tracemalloc
+import sys
+import os
+from unittest.mock import AsyncMock, MagicMock
+
+# Add the parent directory to the path so we can import the cogs
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.profiler import Profiler
+from util.profiling import CProfileProfiler, SamplingProfiler, make_profiler
+
+@pytest.fixture
+def profiler_cog(mock_bot):
+    base_cog = MagicMock()
+    base_cog.check_category = AsyncMock(return_value=True)
+    mock_bot.get_cog = MagicMock(return_value=base_cog)
+    return Profiler(mock_bot)
+
+@pytest.fixture
+def mock_ctx():
+    ctx = AsyncMock()
+    ctx.author = "Owner"
+    ctx.guild.filesize_limit = 10 * 1024 * 1024
+    return ctx
+
+def busy(seconds):
+    ended = time.perf_counter() + seconds
+    while time.perf_counter() < ended:
+        sum(range(100))
+
+# Test that the sampling profiler sees the function keeping the thread busy
+def test_sampling_profiler():
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    busy(0.1)
+    profiler.stop()
+
+    assert profiler.samples > 0
+    report = profiler.report()
+    assert "busy (test_profiler.py" in report
+    assert "Collapsed stacks" in report
+
+# Test that cProfile reports the profiled calls
+def test_cprofile_profiler():
+    profiler = CProfileProfiler()
+    profiler.start()
+    busy(0.01)
+    profiler.stop()
+
+    assert "busy" in profiler.report()
+
+# Test that unknown modes are rejected
+def test_make_profiler_unknown_mode():
+    with pytest.raises(ValueError):
+        make_profiler("perf")
+
+# Test that a profile uploads its report when stopped
+@pytest.mark.asyncio
+async def test_profile_start_and_stop(profiler_cog, mock_ctx):
+    await profiler_cog.profile_start.callback(profiler_cog, mock_ctx, "sampling", 60)
+    assert profiler_cog.profiler is not None
+    assert "Started a sampling profile for 60s" in mock_ctx.send.call_args[0][0]
+
+    # Only one profile at a time
+    await profiler_cog.profile_start.callback(profiler_cog, mock_ctx, "cprofile", 60)
+    assert "already running" in mock_ctx.send.call_args[0][0]
+
+    await profiler_cog.profile_stop.callback(profiler_cog, mock_ctx)
+    assert profiler_cog.profiler is None
+    upload = mock_ctx.send.call_args[1]["file"]
+    assert upload.filename.startswith("profile-sampling-")
+
+# Test that a profile finishes on its own after the given time
+@pytest.mark.asyncio
+async def test_profile_finishes_after_seconds(profiler_cog, mock_ctx):
+    await profiler_cog.profile_start.callback(profiler_cog, mock_ctx, "cprofile", 1)
+    await asyncio.wait_for(profiler_cog.profile_task, timeout=5)
+
+    assert profiler_cog.profiler is None
+    assert mock_ctx.send.call_args[1]["file"].filename.startswith("profile-cprofile-")
+
+# Test that a profile which fails to finish on its own is logged and reported
+@pytest.mark.asyncio
+async def test_profile_finish_error(profiler_cog, mock_ctx, caplog):
+    await profiler_cog.profile_start.callback(profiler_cog, mock_ctx, "sampling", 1)
+    profiler_cog.profiler.report = MagicMock(side_effect=RuntimeError("report failed"))
+    await asyncio.wait_for(profiler_cog.profile_task, timeout=5)
+
+    assert profiler_cog.profiler is None
+    assert "report failed" in caplog.text
+    assert "couldn't be uploaded" in mock_ctx.send.call_args[0][0]
+
+# Test that reports over the upload limit are gzipped, or cut short if that isn't enough
+def test_report_file_upload_limit(profiler_cog):
+    small = profiler_cog.report_file("profile", "line\n" * 10, limit=1000)
+    assert small.filename.endswith(".txt")
+
+    repetitive = "the same line\n" * 1000
+    compressed = profiler_cog.report_file("profile", repetitive, limit=1000)
+    assert compressed.filename.endswith(".txt.gz")
+    assert gzip.decompress(compressed.fp.read()).decode() == repetitive
+
+    varied = "".join(f"{os.urandom(16).hex()}\n" for _ in range(200))
+    truncated = profiler_cog.report_file("profile", varied, limit=1000)
+    data = truncated.fp.read()
+    assert truncated.filename.endswith(".txt")
+    assert len(data) <= 1000
+    assert data.decode().startswith(varied.splitlines()[0])
+    assert data.decode().endswith("report truncated to fit Discord's upload limit\n")
+
+# Test an unknown profile mode
+@pytest.mark.asyncio
+async def test_profile_start_unknown_mode(profiler_cog, mock_ctx):
+    await profiler_cog.profile_start.callback(profiler_cog, mock_ctx, "perf", 10)
+    assert profiler_cog.profiler is None
+    assert "Unknown mode perf" in mock_ctx.send.call_args[0][0]
+
+# Test that memtop uploads a report and leaves tracemalloc off again
+@pytest.mark.asyncio
+async def test_memtop(profiler_cog, mock_ctx):
+    await profiler_cog.memtop.callback(profiler_cog, mock_ctx, 0, 10)
+
+    assert not tracemalloc.is_tracing()
+    assert mock_ctx.send.call_args[1]["file"].filename.startswith("memtop-")
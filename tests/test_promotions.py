@@ -0,0 +1,124 @@
+import pytest
+import datetime
+import sys
+import os
+from unittest.mock import MagicMock
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.promotions import PromotionSchedule, coerce_date, get_schedule
+
+TODAY = datetime.date(2025, 6, 1)
+
+def days_ago(days):
+    return TODAY - datetime.timedelta(days=days)
+
+# Test expected levels at and around each threshold
+def test_expected_level():
+    schedule = PromotionSchedule()
+    assert schedule.expected_level(days_ago(0), TODAY) == 0
+    assert schedule.expected_level(days_ago(13), TODAY) == 0
+    assert schedule.expected_level(days_ago(14), TODAY) == 1
+    assert schedule.expected_level(days_ago(84), TODAY) == 2
+    assert schedule.expected_level(days_ago(182), TODAY) == 3
+    # Tenured is granted by hand, so time alone never expects more than the auto promotion level
+    assert schedule.expected_level(days_ago(1000), TODAY) == 3
+
+# Test the next promotion date follows from the member's level, whether they're behind or ahead of their time served
+def test_due_date():
+    schedule = PromotionSchedule()
+    assert schedule.due_date(0, days_ago(13)) == days_ago(13) + datetime.timedelta(days=14)
+    # Behind: level 0 after 100 days is overdue since day 14
+    assert schedule.due_date(0, days_ago(100)) == days_ago(100) + datetime.timedelta(days=14)
+    # Ahead: promoted to level 2 by hand after 10 days
+    assert schedule.due_date(2, days_ago(10)) == days_ago(10) + datetime.timedelta(days=182)
+    assert schedule.due_date(4, days_ago(1000)) is None
+
+# Test thresholds from config
+def test_from_config():
+    schedule = PromotionSchedule.from_config({"promotion_days": [7, 30], "auto_promotion_max_level": 2})
+    assert schedule.expected_level(days_ago(30), TODAY) == 2
+    assert schedule.due_date(1, TODAY) == TODAY + datetime.timedelta(days=30)
+    assert schedule.due_date(2, TODAY) is None
+    with pytest.raises(ValueError):
+        PromotionSchedule([30, 7])
+
+# Test that the roster pass agrees with the single member methods
+def test_roster_matches_single_members():
+    schedule = PromotionSchedule()
+    join_dates = [days_ago(days) for days in range(0, 800, 7)]
+    levels = [days % 5 for days in range(len(join_dates))]
+
+    expected, due = schedule.roster(levels, join_dates, TODAY)
+
+    for level, join_date, expected_level, due_date in zip(levels, join_dates, expected, due):
+        assert expected_level == schedule.expected_level(join_date, TODAY)
+        single = schedule.due_date(level, join_date)
+        if single is None:
+            assert np.isnat(due_date)
+        else:
+            assert due_date.astype(datetime.date) == single
+
+# Test that members without a join date are left alone
+def test_roster_missing_join_date():
+    expected, due = PromotionSchedule().roster([2], [None], TODAY)
+    assert expected[0] == 2
+    assert np.isnat(due[0])
+
+# Test the promotions due report
+def test_promotions_due():
+    members = [
+        (1, "Later", "later", 0, days_ago(0)),
+        (2, "Overdue", "overdue", 1, days_ago(90)),
+        (3, "Soon", "soon", 0, days_ago(10)),
+        (4, "Tenured", "tenured", 4, days_ago(900)),
+    ]
+    due = PromotionSchedule().promotions_due(members, within_days=7, today=TODAY)
+
+    assert [promotion.rsn for promotion in due] == ["Overdue", "Soon"]
+    assert due[0].overdue and due[0].expected_level == 2
+    assert due[1].due_date == days_ago(10) + datetime.timedelta(days=14)
+    assert not due[1].overdue
+    assert PromotionSchedule().promotions_due([], today=TODAY) == []
+
+def next_promotion_dates(db):
+    rows = db.selectMany("SELECT _id, membership_level, join_date, next_promotion_date FROM member")
+    return {member_id: (level, join_date, next_date) for member_id, level, join_date, next_date in rows}
+
+# Test that member.next_promotion_date from the trigger matches getNextMemLvlDate for every member,
+# including the ones behind or ahead of their time served. Needs a Postgres the tests can create schemas in.
+@pytest.mark.skipif(not os.environ.get("COFFEEHOUSE_TEST_DSN"), reason="COFFEEHOUSE_TEST_DSN isn't set")
+def test_next_promotion_date_trigger_matches_schedule():
+    from benchmarks.clan import build_clan
+    from benchmarks.postgres_db import PostgresDB
+    from bot import CoffeeHouseBot
+
+    bot = MagicMock(spec=CoffeeHouseBot)
+    db = PostgresDB(os.environ["COFFEEHOUSE_TEST_DSN"], build_clan(500), schema="coffeehouse_test_promotions")
+    try:
+        # Promote a member by hand, the trigger recalculates their date
+        db.execute_query("UPDATE member SET membership_level = 5 WHERE _id = 1")
+        members = next_promotion_dates(db)
+        assert members
+        for level, join_date, next_date in members.values():
+            assert next_date == CoffeeHouseBot.getNextMemLvlDate(bot, level, join_date)
+    finally:
+        db.close()
+
+# Test reading dates the way they come out of the DB or config
+def test_coerce_date():
+    assert coerce_date(TODAY) == TODAY
+    assert coerce_date(datetime.datetime(2025, 6, 1, 12)) == TODAY
+    assert coerce_date("2025-06-01") == TODAY
+    assert coerce_date("June 1st") is None
+    assert coerce_date(12345) is None
+
+# Test falling back to the default schedule for bots without one
+def test_get_schedule():
+    class Bot:
+        promotion_schedule = PromotionSchedule([1, 2])
+    assert get_schedule(Bot()).promotion_days == (1, 2)
+    assert get_schedule(object()).promotion_days == (14, 84, 182, 365)
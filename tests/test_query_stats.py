@@ -0,0 +1,77 @@
+import pytest
+import io
+import logging
+import sys
+import os
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.command_timing import CommandTiming, current_command
+from util.logging_setup import setup_logging, stop_logging
+from util.query_stats import QueryStats, fingerprint_query
+
+# Test that queries differing only by values have the same fingerprint
+def test_fingerprint_query():
+    assert fingerprint_query("SELECT * FROM member WHERE rsn = %s") == "SELECT * FROM member WHERE rsn = ?"
+    assert fingerprint_query("""
+        SELECT *  FROM member -- find the member
+        WHERE rsn = 'Zezima' AND _id IN (1, 2, 3)
+    """) == "SELECT * FROM member WHERE rsn = ? AND _id IN (?...)"
+    assert fingerprint_query("SELECT * FROM member WHERE _id = 1") == fingerprint_query("SELECT * FROM member WHERE _id = 22")
+    # Numbers in names are left alone
+    assert fingerprint_query("SELECT skill_comp_pts_2 FROM t1") == "SELECT skill_comp_pts_2 FROM t1"
+
+# Test aggregating and ranking queries
+def test_query_stats_top():
+    stats = QueryStats()
+    for _ in range(3):
+        stats.record("SELECT * FROM member WHERE _id = %s", 5.0, rows=1, tag="cogs.user")
+    stats.record("SELECT * FROM member", 50.0, rows=200, tag="cogs.dev")
+    stats.record("UPDATE member SET notes = %s", 1.0, error=True)
+
+    top = stats.top()
+    assert [query["fingerprint"] for query in top] == [
+        "SELECT * FROM member",
+        "SELECT * FROM member WHERE _id = ?",
+        "UPDATE member SET notes = ?",
+    ]
+    assert top[1]["count"] == 3
+    assert top[1]["total_ms"] == 15.0
+    assert top[1]["mean_rows"] == 1.0
+    assert top[1]["tags"] == {"cogs.user": 3}
+    assert top[2]["errors"] == 1
+    assert top[2]["tags"] == {"unknown": 1}
+
+    assert stats.top(1, "count")[0]["fingerprint"] == "SELECT * FROM member WHERE _id = ?"
+
+# Test that queries run by a command are tagged with it and count towards its DB time
+def test_query_command_context():
+    stats = QueryStats()
+    timing = CommandTiming("Admin.command_stats")
+    token = current_command.set(timing)
+    try:
+        stats.record("SELECT 1", 1.5, tag="cogs.admin")
+        stats.record("SELECT 2", 2.0, tag="cogs.admin")
+    finally:
+        current_command.reset(token)
+    assert stats.top()[0]["tags"] == {"Admin.command_stats": 2}
+    assert timing.db_ms == 3.5
+
+# Test that slow queries are written to the slow query log, through the logging listener
+def test_slow_query_log(tmp_path):
+    path = tmp_path / "slow.log"
+    stats = QueryStats(slow_threshold_ms=100)
+    level = logging.getLogger().level
+    setup_logging({"files": {"discord.slow_query": str(path)}}, stream=io.StringIO())
+    try:
+        logging.getLogger("test.quiet").warning("not a query")
+        stats.record("SELECT * FROM member", 5.0)
+        stats.record("SELECT * FROM member WHERE rsn = %s", 250.0, rows=1, tag="cogs.user")
+    finally:
+        stop_logging()
+        logging.getLogger().setLevel(level)
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 1
+    assert "250.0ms rows=1 tag=cogs.user SELECT * FROM member WHERE rsn = ?" in lines[0]
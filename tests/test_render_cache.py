@@ -0,0 +1,132 @@
+import pytest
+import sys
+import os
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.render_cache import RenderCache, cache_tables, get_render_cache, render_cached, send_messages
+
+# Test a response is rendered once and then served from the cache, with hits and misses counted per command
+def test_get_or_render():
+    cache = RenderCache()
+    render = MagicMock(return_value=[{"content": "leaderboard"}])
+
+    assert cache.get_or_render("comp-leaderboard", ("skill",), ("member",), render) == [{"content": "leaderboard"}]
+    assert cache.get_or_render("comp-leaderboard", ("skill",), ("member",), render) == [{"content": "leaderboard"}]
+    cache.get_or_render("comp-leaderboard", ("boss",), ("member",), render)
+
+    assert render.call_count == 2
+    assert cache.report() == {"comp-leaderboard": {"hits": 1, "misses": 2}}
+
+# Test a failed render isn't cached
+def test_failed_render_not_cached():
+    cache = RenderCache()
+    render = MagicMock(return_value=None)
+
+    assert cache.get_or_render("yellowpages", (), ("member",), render) is None
+    assert cache.get_or_render("yellowpages", (), ("member",), render) is None
+    assert render.call_count == 2
+
+# Test a write to a table a response was built from makes it render again, and writes elsewhere don't
+def test_invalidate_query():
+    cache = RenderCache()
+    cache.put("comp-history", ("skill",), ("competition", "member"), [{"content": "old"}])
+    cache.put("yellowpages", (), ("member",), [{"content": "old"}])
+
+    # Nothing cached reads command_usage, so logging a command doesn't bump a version
+    assert cache.invalidate_query("INSERT INTO command_usage (command_name) VALUES (%s)") == set()
+    assert "command_usage" not in cache.versions
+    assert cache.invalidate_query("SELECT * FROM competition") == set()
+    assert cache.get("comp-history", ("skill",), ("competition", "member")) == [{"content": "old"}]
+
+    assert cache.invalidate_query("\n    UPDATE competition\n    SET winner_id = %s") == {"competition"}
+    assert cache.get("comp-history", ("skill",), ("competition", "member")) is None
+    assert cache.get("yellowpages", (), ("member",)) == [{"content": "old"}]
+
+    # Every statement of a multi-statement query is looked at
+    cache.put("yellowpages", (), ("member",), [{"content": "old"}])
+    assert cache.invalidate_query("DELETE FROM promotion_threshold; UPDATE member SET next_promotion_date = NULL") == {"member"}
+    assert cache.get("yellowpages", (), ("member",)) is None
+
+    # Creating and dropping tables nothing cached reads, like command_usage partitions, costs nothing either
+    assert cache.invalidate_query(
+        "CREATE TEMP TABLE command_usage_moving ON COMMIT DROP AS SELECT * FROM command_usage_default; "
+        "CREATE TABLE IF NOT EXISTS command_usage_2024_07 PARTITION OF command_usage FOR VALUES FROM ('2024-07-01') TO ('2024-08-01')"
+    ) == set()
+    assert cache.invalidate_query("DROP TABLE IF EXISTS command_usage_2024_03") == set()
+    cache.put("yellowpages", (), ("member",), [{"content": "old"}])
+    assert cache.invalidate_query("DROP TABLE member") == {"member"}
+
+    # Statements that can't be matched to a table drop everything
+    assert cache.invalidate_query("CALL refresh_everything()") is None
+    assert cache.entries == {}
+
+# Test the least recently used response is dropped when the cache is full
+def test_lru_eviction():
+    cache = RenderCache(max_entries=2)
+    cache.put("comp-history", ("skill",), ("competition",), [{"content": "skill"}])
+    cache.put("comp-history", ("boss",), ("competition",), [{"content": "boss"}])
+    cache.get("comp-history", ("skill",), ("competition",))
+    cache.put("yellowpages", (), ("member",), [{"content": "members"}])
+
+    assert cache.get("comp-history", ("boss",), ("competition",)) is None
+    assert cache.get("comp-history", ("skill",), ("competition",)) == [{"content": "skill"}]
+
+# Test responses expire after the TTL
+def test_ttl_expiry():
+    cache = RenderCache(ttl_seconds=60)
+    with patch("util.render_cache.time.monotonic", return_value=1000.0):
+        cache.put("yellowpages", (), ("member",), [{"content": "members"}])
+    with patch("util.render_cache.time.monotonic", return_value=1059.0):
+        assert cache.get("yellowpages", (), ("member",)) is not None
+    with patch("util.render_cache.time.monotonic", return_value=1060.0):
+        assert cache.get("yellowpages", (), ("member",)) is None
+    assert cache.entries == {}
+
+# Test the cache can be turned off from the config
+def test_from_config():
+    cache = RenderCache.from_config({"ttl_seconds": 0})
+    render = MagicMock(return_value=[{"content": "members"}])
+    cache.get_or_render("yellowpages", (), ("member",), render)
+    cache.get_or_render("yellowpages", (), ("member",), render)
+    assert render.call_count == 2
+    assert RenderCache.from_config(None).max_entries == 256
+
+# Test commands render every time on a bot without a cache
+def test_render_cached_without_cache():
+    render = MagicMock(return_value=[{"content": "members"}])
+    render_cached(MagicMock(), "yellowpages", (), ("member",), render)
+    render_cached(MagicMock(), "yellowpages", (), ("member",), render)
+    assert render.call_count == 2
+
+    bot = MagicMock()
+    bot.render_cache = RenderCache()
+    assert get_render_cache(bot) is bot.render_cache
+
+# Test declared tables are invalidated before anything reading them has been cached
+def test_cache_tables():
+    bot = MagicMock()
+    bot.render_cache = RenderCache()
+    cache_tables(bot, "competition", "member")
+    assert bot.render_cache.invalidate_query("UPDATE member SET rsn = %s") == {"member"}
+    # Bots without a cache are left alone
+    cache_tables(MagicMock(), "member")
+
+# Test a response is sent message by message, and a failed render gets an error
+@pytest.mark.asyncio
+async def test_send_messages():
+    interaction = MagicMock()
+    interaction.followup.send = AsyncMock()
+    embed = object()
+
+    await send_messages(interaction, [{"content": "header"}, {"embed": embed}, {"content": "private", "ephemeral": True}])
+
+    assert [call.args for call in interaction.followup.send.call_args_list] == [("header",), (), ("private",)]
+    assert interaction.followup.send.call_args_list[1].kwargs == {"embed": embed}
+    assert interaction.followup.send.call_args_list[2].kwargs == {"ephemeral": True}
+
+    interaction.followup.send.reset_mock()
+    await send_messages(interaction, None)
+    assert interaction.followup.send.call_args.kwargs == {"ephemeral": True}
@@ -0,0 +1,98 @@
+import pytest
+import asyncio
+import sys
+import os
+import time
+from unittest.mock import MagicMock, AsyncMock
+
+import discord
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.role_grants import RoleGrantQueue, get_role_grants
+
+def make_role(role_id):
+    role = MagicMock(spec=discord.Role)
+    role.id = role_id
+    return role
+
+def make_member(roles=()):
+    member = MagicMock(spec=discord.Member)
+    member.roles = list(roles)
+    member.add_roles = AsyncMock()
+    return member
+
+def rate_limited():
+    response = MagicMock(status=429, reason="Too Many Requests")
+    response.headers = {"Retry-After": "0.01"}
+    return discord.HTTPException(response, "You are being rate limited.")
+
+# Test grants after the burst are spaced out at the configured rate
+@pytest.mark.asyncio
+async def test_grants_are_paced():
+    queue = RoleGrantQueue(rate_per_second=50, burst=2)
+    role = make_role(1)
+    members = [make_member() for _ in range(5)]
+
+    started = time.monotonic()
+    results = await asyncio.gather(*(queue.submit(member, role, reason="test") for member in members))
+    elapsed = time.monotonic() - started
+
+    assert results == [True] * 5
+    for member in members:
+        member.add_roles.assert_awaited_once_with(role, reason="test")
+    # Two go out straight away, the other three wait 20ms each
+    assert elapsed >= 0.05
+    assert queue.granted == 5
+    await queue.stop()
+
+# Test members who already have the role aren't sent to Discord
+@pytest.mark.asyncio
+async def test_skips_roles_already_held():
+    queue = RoleGrantQueue()
+    member = make_member(roles=[make_role(1)])
+
+    assert await queue.grant(member, make_role(1)) is False
+    member.add_roles.assert_not_called()
+    await queue.stop()
+
+# Test a rate limited grant is retried after retry_after, and errors reach the caller
+@pytest.mark.asyncio
+async def test_rate_limit_retry_and_errors():
+    queue = RoleGrantQueue(rate_per_second=1000, max_attempts=2)
+    role = make_role(1)
+    retried = make_member()
+    retried.add_roles.side_effect = [rate_limited(), None]
+    failing = make_member()
+    failing.add_roles.side_effect = discord.Forbidden(MagicMock(status=403, reason="Forbidden"), "Missing Permissions")
+
+    results = await asyncio.gather(queue.submit(retried, role), queue.submit(failing, role), return_exceptions=True)
+
+    assert results[0] is True
+    assert retried.add_roles.await_count == 2
+    assert queue.rate_limited == 1
+    assert isinstance(results[1], discord.Forbidden)
+    # Forbidden isn't a rate limit, so it isn't retried
+    assert failing.add_roles.await_count == 1
+    await queue.stop()
+
+# Test stopping cancels grants that haven't gone out
+@pytest.mark.asyncio
+async def test_stop_cancels_queued_grants():
+    queue = RoleGrantQueue(rate_per_second=0.001, burst=1)
+    role = make_role(1)
+    first = queue.submit(make_member(), role)
+    second = queue.submit(make_member(), role)
+    await first
+
+    await queue.stop()
+
+    assert second.cancelled()
+
+# Test only a real RoleGrantQueue is used from the bot
+def test_get_role_grants():
+    bot = MagicMock()
+    assert get_role_grants(bot) is None
+    bot.role_grants = RoleGrantQueue()
+    assert get_role_grants(bot) is bot.role_grants
@@ -0,0 +1,83 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.startup import StartupReport, CogLoadTiming, plan_cog_load_stages
+
+COGS = [
+    "cogs.base_cog",
+    "cogs.cogsmanager",
+    "cogs.admin",
+    "cogs.general",
+]
+
+# Test that base_cog is loaded on its own before everything else by default
+def test_plan_default_dependencies():
+    stages = plan_cog_load_stages(COGS)
+    assert stages == [
+        ["cogs.base_cog"],
+        ["cogs.cogsmanager", "cogs.admin", "cogs.general"],
+    ]
+
+# Test explicit dependencies between cogs
+def test_plan_explicit_dependencies():
+    stages = plan_cog_load_stages(COGS, {
+        "*": ["cogs.base_cog"],
+        "cogs.admin": ["cogs.cogsmanager"],
+    })
+    assert stages == [
+        ["cogs.base_cog"],
+        ["cogs.cogsmanager", "cogs.general"],
+        ["cogs.admin"],
+    ]
+
+# Test that dependencies on cogs that aren't configured are ignored
+def test_plan_missing_dependency():
+    stages = plan_cog_load_stages(["cogs.admin", "cogs.general"], {"cogs.admin": ["cogs.not_here"]})
+    assert stages == [["cogs.admin", "cogs.general"]]
+
+# Test that a dependency cycle falls back to sequential loading
+def test_plan_dependency_cycle():
+    stages = plan_cog_load_stages(COGS, {
+        "*": ["cogs.base_cog"],
+        "cogs.admin": ["cogs.general"],
+        "cogs.general": ["cogs.admin"],
+    })
+    assert stages == [
+        ["cogs.base_cog"],
+        ["cogs.cogsmanager"],
+        ["cogs.admin"],
+        ["cogs.general"],
+    ]
+
+# Test the startup report contents
+def test_startup_report():
+    report = StartupReport()
+    report.cogs = [
+        CogLoadTiming(name="cogs.base_cog", stage=0, import_ms=5.0, setup_ms=1.0),
+        CogLoadTiming(name="cogs.dev", stage=1, import_ms=250.0, setup_ms=2.0),
+        CogLoadTiming(name="cogs.broken", stage=1, error="boom"),
+    ]
+    report.cog_load_ms = 260.0
+    report.mark_ready()
+    first_ready = report.ready_ms
+    report.mark_ready()
+
+    # Only the first on_ready counts
+    assert report.ready_ms == first_ready
+
+    data = report.to_dict()
+    assert data["cog_load_ms"] == 260.0
+    assert [cog["name"] for cog in data["cogs"]] == ["cogs.base_cog", "cogs.dev", "cogs.broken"]
+    assert data["cogs"][2]["loaded"] is False
+    assert data["cogs"][2]["error"] == "boom"
+
+    lines = report.summary_lines()
+    assert lines[0] == "Loaded 2/3 cogs in 260.0ms"
+    # Slowest cog is listed first
+    assert "cogs.dev" in lines[1]
+    assert "FAILED (boom)" in "\n".join(lines)
+    assert lines[-1].startswith("Time to ready:")
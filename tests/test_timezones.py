@@ -0,0 +1,56 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import the util modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.timezones import TimezoneMatcher, UNKNOWN_TIMEZONE, offset_zone
+
+@pytest.fixture
+def matcher():
+    return TimezoneMatcher()
+
+# Test abbreviations and names are normalised to IANA zones and cut out of the location
+@pytest.mark.parametrize("answer, expected", [
+    ("USA, EST", ("USA", "America/New_York")),
+    ("Ohio est", ("Ohio", "America/New_York")),
+    ("Texas/CST", ("Texas", "America/Chicago")),
+    ("Germany (Central European Time)", ("Germany", "Europe/Paris")),
+    ("I live in the UK and my timezone is GMT", ("I live in the UK", "Etc/GMT")),
+    ("Netherlands / europe/amsterdam", ("Netherlands", "Europe/Amsterdam")),
+    ("Sydney AEST", ("Sydney", "Australia/Sydney")),
+])
+def test_split_location(matcher, answer, expected):
+    assert matcher.split_location(answer) == expected
+
+# Test UTC/GMT offsets, which map to Etc zones with the sign inverted
+def test_offsets(matcher):
+    assert matcher.split_location("Manila UTC+8") == ("Manila", "Etc/GMT-8")
+    assert matcher.split_location("GMT -3 Brazil") == ("Brazil", "Etc/GMT+3")
+    # "UTC+8" mustn't be matched as the shorter "UTC" alias
+    assert matcher.find("UTC+8").zone == "Etc/GMT-8"
+    assert offset_zone("+", 0) == "UTC"
+    assert offset_zone("+", 15) is None
+
+# Test answers without a timezone keep the whole answer as the location
+def test_no_timezone(matcher):
+    assert matcher.split_location("Somewhere nice") == ("Somewhere nice", UNKNOWN_TIMEZONE)
+    assert matcher.split_location("Europe/Nowhere") == ("Europe/Nowhere", UNKNOWN_TIMEZONE)
+    assert matcher.find("") is None
+
+# Test the longest alias wins when one contains another
+def test_longest_alias_first():
+    matcher = TimezoneMatcher({"European Time": "Europe/Paris", "Western European Time": "Europe/Lisbon"})
+    assert matcher.find("Western European Time").zone == "Europe/Lisbon"
+
+# Test both config formats
+def test_from_config():
+    # The older list of aliases is looked up in the defaults, entries without a zone are dropped
+    matcher = TimezoneMatcher.from_config(["EST", "Made Up Time"])
+    assert matcher.aliases == {"est": "America/New_York"}
+    assert matcher.find("PST") is None
+
+    matcher = TimezoneMatcher.from_config({"Coffee Time": "America/Bogota", "Bad": "Not/AZone"})
+    assert matcher.aliases == {"coffee time": "America/Bogota"}
+    assert matcher.split_location("Colombia, coffee time") == ("Colombia", "America/Bogota")
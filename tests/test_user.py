@@ -235,6 +235,31 @@ async def test_update_profile_previous_rsn_invalid_length(mock_bot, mock_interac
     mock_bot.selectOne.assert_not_called()
     mock_bot.execute_query.assert_not_called()
 
+# Test the update_profile command with TIMEZONE field - input that isn't a timezone is rejected
+@pytest.mark.asyncio
+async def test_update_profile_timezone_invalid(mock_bot, mock_interaction):
+    user_cog = User(mock_bot)
+    mock_bot.selectOne = MagicMock()
+    mock_bot.execute_query = MagicMock()
+    
+    await user_cog.update_profile.callback(user_cog, mock_interaction, ProfileField.TIMEZONE, "somewhere sunny")
+    
+    assert "Timezone not recognised" in mock_interaction.response.send_message.call_args[0][0]
+    mock_bot.selectOne.assert_not_called()
+    mock_bot.execute_query.assert_not_called()
+
+# Test the update_profile command with TIMEZONE field - IANA zones are stored as written, not uppercased
+@pytest.mark.asyncio
+async def test_update_profile_timezone_iana(mock_bot, mock_interaction):
+    user_cog = User(mock_bot)
+    mock_bot.selectOne = MagicMock(return_value=("user_id",))
+    mock_bot.execute_query = MagicMock()
+    
+    await user_cog.update_profile.callback(user_cog, mock_interaction, ProfileField.TIMEZONE, "america/new_york")
+    
+    assert mock_bot.execute_query.call_args[0][1][1] == "America/New_York"
+    assert mock_interaction.response.send_message.call_args[1]["embed"].fields[0].value == "America/New_York"
+
 # Test the update_profile command with TIMEZONE field - valid input
 @pytest.mark.asyncio
 async def test_update_profile_timezone_valid(mock_bot, mock_interaction):
@@ -262,7 +287,7 @@ async def test_update_profile_timezone_valid(mock_bot, mock_interaction):
     # Verify that execute_query was called with the correct query
     mock_bot.execute_query.assert_called_once_with(f"""
                 UPDATE member
-                SET {ProfileField.TIMEZONE.value} = 'EST'
+                SET {ProfileField.TIMEZONE.value} = 'America/New_York'
                 WHERE discord_id_num = {mock_interaction.user.id}
             """)
     
@@ -10,6 +10,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import the UserLookup cog
 from cogs.user_lookup import UserLookup
+from util.member_record import member_records, record_factory
+from util.render_cache import RenderCache
+
+LIST_COLUMNS = ("rsn", "discord_id", "alt_rsn", "previous_rsn")
+YELLOWPAGES_COLUMNS = ("rsn", "discord_id")
 
 # Test the list_members command with members
 @pytest.mark.asyncio
@@ -18,11 +23,11 @@ async def test_list_members_with_members(mock_bot, mock_interaction):
     user_lookup_cog = UserLookup(mock_bot)
     
     # Mock the bot's selectMany method to return member data
-    mock_bot.selectMany = MagicMock(return_value=[
+    mock_bot.selectMany = MagicMock(return_value=member_records([
         ("User1", "User1#1234", ["Alt1", "Alt2"], ["Prev1"]),
         ("User2", "User2#5678", [], []),
         ("User3", None, ["Alt3"], ["Prev2", "Prev3"])
-    ])
+    ], LIST_COLUMNS))
     
     # Access the callback function directly
     callback = user_lookup_cog.list_members.callback
@@ -34,7 +39,7 @@ async def test_list_members_with_members(mock_bot, mock_interaction):
     mock_interaction.response.defer.assert_called_once()
     
     # Verify that selectMany was called with the correct query
-    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member")
+    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member", row_factory=record_factory)
     
     # Verify that followup.send was called with a formatted member list
     mock_interaction.followup.send.assert_called_once()
@@ -73,7 +78,7 @@ async def test_list_members_no_members(mock_bot, mock_interaction):
     mock_interaction.response.defer.assert_called_once()
     
     # Verify that selectMany was called with the correct query
-    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member")
+    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member", row_factory=record_factory)
     
     # Verify that followup.send was called with the correct message
     mock_interaction.followup.send.assert_called_once_with("No members found in the database.")
@@ -85,10 +90,10 @@ async def test_list_inactive_with_members(mock_bot, mock_interaction):
     user_lookup_cog = UserLookup(mock_bot)
     
     # Mock the bot's selectMany method to return member data
-    mock_bot.selectMany = MagicMock(return_value=[
+    mock_bot.selectMany = MagicMock(return_value=member_records([
         ("Inactive1", "Inactive1#1234", ["Alt1"], []),
         ("Inactive2", None, [], [])
-    ])
+    ], LIST_COLUMNS))
     
     # Access the callback function directly
     callback = user_lookup_cog.list_inactive.callback
@@ -100,7 +105,7 @@ async def test_list_inactive_with_members(mock_bot, mock_interaction):
     mock_interaction.response.defer.assert_called_once()
     
     # Verify that selectMany was called with the correct query
-    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member WHERE active=false")
+    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member WHERE active=false", row_factory=record_factory)
     
     # Verify that followup.send was called with a formatted member list
     mock_interaction.followup.send.assert_called_once()
@@ -133,7 +138,7 @@ async def test_list_inactive_no_members(mock_bot, mock_interaction):
     mock_interaction.response.defer.assert_called_once()
     
     # Verify that selectMany was called with the correct query
-    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member WHERE active=false")
+    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member WHERE active=false", row_factory=record_factory)
     
     # Verify that followup.send was called with the correct message
     mock_interaction.followup.send.assert_called_once_with("No inactive members found in the database.")
@@ -145,10 +150,10 @@ async def test_list_onleave_with_members(mock_bot, mock_interaction):
     user_lookup_cog = UserLookup(mock_bot)
     
     # Mock the bot's selectMany method to return member data
-    mock_bot.selectMany = MagicMock(return_value=[
+    mock_bot.selectMany = MagicMock(return_value=member_records([
         ("OnLeave1", "OnLeave1#1234", [], []),
         ("OnLeave2", "OnLeave2#5678", ["Alt1"], ["Prev1"])
-    ])
+    ], LIST_COLUMNS))
     
     # Access the callback function directly
     callback = user_lookup_cog.list_onleave.callback
@@ -160,7 +165,7 @@ async def test_list_onleave_with_members(mock_bot, mock_interaction):
     mock_interaction.response.defer.assert_called_once()
     
     # Verify that selectMany was called with the correct query
-    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member WHERE on_leave=true")
+    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member WHERE on_leave=true", row_factory=record_factory)
     
     # Verify that followup.send was called with a formatted member list
     mock_interaction.followup.send.assert_called_once()
@@ -193,7 +198,7 @@ async def test_list_onleave_no_members(mock_bot, mock_interaction):
     mock_interaction.response.defer.assert_called_once()
     
     # Verify that selectMany was called with the correct query
-    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member WHERE on_leave=true")
+    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id, alt_rsn, previous_rsn FROM member WHERE on_leave=true", row_factory=record_factory)
     
     # Verify that followup.send was called with the correct message
     mock_interaction.followup.send.assert_called_once_with("No members on leave found in the database.")
@@ -205,11 +210,11 @@ async def test_yellowpages_with_members(mock_bot, mock_interaction):
     user_lookup_cog = UserLookup(mock_bot)
     
     # Mock the bot's selectMany method to return member data
-    mock_bot.selectMany = MagicMock(return_value=[
+    mock_bot.selectMany = MagicMock(return_value=member_records([
         ("User1", "User1#1234"),
         ("User2", "User2#5678"),
         ("User3", None)
-    ])
+    ], YELLOWPAGES_COLUMNS))
     
     # Access the callback function directly
     callback = user_lookup_cog.yellowpages.callback
@@ -221,7 +226,7 @@ async def test_yellowpages_with_members(mock_bot, mock_interaction):
     mock_interaction.response.defer.assert_called_once()
     
     # Verify that selectMany was called with the correct query
-    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id FROM member ORDER BY rsn")
+    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id FROM member ORDER BY rsn", row_factory=record_factory)
     
     # Verify that followup.send was called with a formatted yellowpages
     mock_interaction.followup.send.assert_called_once()
@@ -263,22 +268,39 @@ async def test_yellowpages_no_members(mock_bot, mock_interaction):
     mock_interaction.response.defer.assert_called_once()
     
     # Verify that selectMany was called with the correct query
-    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id FROM member ORDER BY rsn")
+    mock_bot.selectMany.assert_called_once_with("SELECT rsn, discord_id FROM member ORDER BY rsn", row_factory=record_factory)
     
     # Verify that followup.send was called with the correct message
     mock_interaction.followup.send.assert_called_once_with("No members found in the database.")
 
+# Test the yellowpages command is answered from the render cache until the member table changes
+@pytest.mark.asyncio
+async def test_yellowpages_cached(mock_bot, mock_interaction):
+    mock_bot.render_cache = RenderCache()
+    user_lookup_cog = UserLookup(mock_bot)
+    mock_bot.selectMany = MagicMock(return_value=member_records([("User1", "User1#1234")], YELLOWPAGES_COLUMNS))
+    callback = user_lookup_cog.yellowpages.callback
+
+    await callback(user_lookup_cog, mock_interaction)
+    await callback(user_lookup_cog, mock_interaction)
+    assert mock_bot.selectMany.call_count == 1
+    assert mock_interaction.followup.send.call_args_list[0] == mock_interaction.followup.send.call_args_list[1]
+
+    mock_bot.render_cache.invalidate_query("UPDATE member SET rsn = %s WHERE _id = %s")
+    await callback(user_lookup_cog, mock_interaction)
+    assert mock_bot.selectMany.call_count == 2
+
 # Test the format_user_list method with members
 def test_format_user_list_with_members():
     # Create a UserLookup cog with a mock bot
     user_lookup_cog = UserLookup(MagicMock())
     
     # Test data
-    members = [
+    members = member_records([
         ("User1", "User1#1234", ["Alt1", "Alt2"], ["Prev1"]),
         ("User2", "User2#5678", [], []),
         ("User3", None, ["Alt3"], ["Prev2", "Prev3"])
-    ]
+    ], LIST_COLUMNS)
     
     # Call the method
     result = user_lookup_cog.format_user_list(members)
@@ -315,11 +337,11 @@ def test_format_yellowpages_with_members():
     user_lookup_cog = UserLookup(MagicMock())
     
     # Test data
-    members = [
+    members = member_records([
         ("User1", "User1#1234"),
         ("User2", "User2#5678"),
         ("User3", None)
-    ]
+    ], YELLOWPAGES_COLUMNS)
     
     # Call the method
     result = user_lookup_cog.format_yellowpages(members)
@@ -357,7 +379,7 @@ def test_split_yellowpages_with_members():
     user_lookup_cog = UserLookup(MagicMock())
     
     # Test data - create a large list to ensure splitting
-    members = [("User" + str(i), "User" + str(i) + "#1234") for i in range(1, 101)]
+    members = member_records([("User" + str(i), "User" + str(i) + "#1234") for i in range(1, 101)], YELLOWPAGES_COLUMNS)
     
     # Call the method
     chunks = user_lookup_cog.split_yellowpages(members)
@@ -393,7 +415,7 @@ def test_split_user_list_with_members():
     user_lookup_cog = UserLookup(MagicMock())
     
     # Test data - create a large list to ensure splitting
-    members = [("User" + str(i), "User" + str(i) + "#1234", [], []) for i in range(1, 101)]
+    members = member_records([("User" + str(i), "User" + str(i) + "#1234", [], []) for i in range(1, 101)], LIST_COLUMNS)
     
     # Call the method
     chunks = user_lookup_cog.split_user_list(members)
@@ -0,0 +1 @@
+# Shared helpers used by the bot and its cogs
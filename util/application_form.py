@@ -0,0 +1,82 @@
+"""
+Parsing of clan applications posted in the application channel.
+
+Applicants copy a template of questions and write their answers after each
+one. All question anchors are found in a single pass with one compiled
+alternation, and every answer is sliced out at once into an ApplicationForm.
+"""
+import dataclasses
+import re
+from typing import Dict, Mapping, Optional, Tuple
+
+# Form field -> question text, in template order. Overridden by "application_questions" in config.
+# The rules question is split in two because the rules channel link between the halves varies.
+DEFAULT_APPLICATION_QUESTIONS = {
+    "rsn": "What is your RSN?",
+    "how_found_clan": "How did you find out about the clan?",
+    "favorite_activities": "What are your favorite activities to do on Runescape?",
+    "location_timezone": "Where do you live and what timezone are you in?",
+    "play_frequency": "How often do you play?",
+    "rules_link": "Have you read our",
+    "agrees_to_rules": "and do you agree to abide by these rules?",
+    "other_clan": "Are you currently in another clan?",
+    "coffee_preference": "How do you drink your Coffee?",
+}
+
+
+@dataclasses.dataclass
+class ApplicationForm:
+    """The answers of one application, None for questions that weren't found."""
+    rsn: Optional[str] = None
+    how_found_clan: Optional[str] = None
+    favorite_activities: Optional[str] = None
+    location_timezone: Optional[str] = None
+    play_frequency: Optional[str] = None
+    rules_link: Optional[str] = None
+    agrees_to_rules: Optional[str] = None
+    other_clan: Optional[str] = None
+    coffee_preference: Optional[str] = None
+    # Question texts that weren't in the message
+    missing: Tuple[str, ...] = ()
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+
+ANSWER_FIELDS = tuple(field.name for field in dataclasses.fields(ApplicationForm) if field.name != "missing")
+
+
+class ApplicationParser:
+    """
+    Splits application messages into ApplicationForms.
+
+    Args:
+        questions: Form field -> question text, see DEFAULT_APPLICATION_QUESTIONS
+    """
+    def __init__(self, questions: Mapping[str, str] = DEFAULT_APPLICATION_QUESTIONS):
+        unknown = set(questions) - set(ANSWER_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown application fields: {', '.join(sorted(unknown))}")
+        self.questions: Dict[str, str] = dict(questions)
+        self._fields_by_question = {question: field for field, question in self.questions.items()}
+        # Longest first, so a question that starts with another one wins the alternation
+        alternatives = sorted(self._fields_by_question, key=len, reverse=True)
+        self._anchors = re.compile("|".join(re.escape(question) for question in alternatives))
+
+    def field_for(self, question: str) -> Optional[str]:
+        return self._fields_by_question.get(question)
+
+    def parse(self, content: str) -> ApplicationForm:
+        """Find every question in one pass and take the text up to the next question as its answer."""
+        anchors = list(self._anchors.finditer(content))
+        answers = {}
+        for i, anchor in enumerate(anchors):
+            field = self._fields_by_question[anchor.group()]
+            if field in answers:
+                # Only the first time a question is asked counts
+                continue
+            end = anchors[i + 1].start() if i + 1 < len(anchors) else len(content)
+            answers[field] = content[anchor.end():end].strip()
+        missing = tuple(question for field, question in self.questions.items() if field not in answers)
+        return ApplicationForm(**answers, missing=missing)
@@ -0,0 +1,202 @@
+"""
+Finding applications in the application channel that nobody has accepted yet.
+
+The scanner pages through the channel history oldest first, starting after the
+last message it scanned. That message ID is checkpointed in the DB after every
+page, so a restart resumes where the last scan stopped instead of rereading the
+whole channel. Applications from people who aren't members yet are queued in
+pending_application, where leaders can accept them in one go. Once a channel's
+backlog has been scanned, messages posted while the bot is running move the
+checkpoint as well.
+"""
+import collections
+import dataclasses
+import logging
+from typing import Callable, List, Optional, Set
+
+import discord
+
+from util.application_form import ApplicationForm
+
+log = logging.getLogger(__name__)
+
+CHECKPOINT_SQL = "SELECT last_message_id FROM application_scan_checkpoint WHERE channel_id = %s"
+
+SAVE_CHECKPOINT_SQL = """
+    INSERT INTO application_scan_checkpoint (channel_id, last_message_id, scanned_at)
+    VALUES (%s, %s, NOW())
+    ON CONFLICT (channel_id) DO UPDATE SET
+        last_message_id = GREATEST(application_scan_checkpoint.last_message_id, EXCLUDED.last_message_id),
+        scanned_at = EXCLUDED.scanned_at
+"""
+
+# Which of a page's authors are already members, so their applications were accepted already
+REGISTERED_AUTHORS_SQL = "SELECT discord_id_num FROM member WHERE discord_id_num = ANY(%s)"
+
+# Queue a page of applications in one statement, parameters are parallel arrays
+QUEUE_PENDING_SQL = """
+    INSERT INTO pending_application (message_id, channel_id, author_id, rsn, posted_at)
+    SELECT * FROM unnest(%s::bigint[], %s::bigint[], %s::bigint[], %s::varchar[], %s::timestamp[])
+    ON CONFLICT (message_id) DO NOTHING
+"""
+
+PENDING_SQL = """
+    SELECT message_id, author_id, rsn, posted_at
+    FROM pending_application
+    WHERE channel_id = %s
+    ORDER BY message_id
+"""
+
+REMOVE_PENDING_SQL = "DELETE FROM pending_application WHERE message_id = ANY(%s)"
+
+
+@dataclasses.dataclass
+class PendingApplication:
+    message_id: int
+    author_id: int
+    rsn: Optional[str]
+    posted_at: Optional[object] = None
+
+
+DEFAULT_MAX_MESSAGES = 500
+
+
+@dataclasses.dataclass
+class ScanResult:
+    scanned: int = 0
+    queued: int = 0
+
+
+class ApplicationScanner:
+    """
+    Scans an application channel's history for applications waiting to be accepted.
+
+    Args:
+        bot: Used for the DB
+        detect: Gets the ApplicationForm of a message's content, or None if it isn't an application
+        page_size: Messages between checkpoints, Discord returns history 100 messages at a time
+        max_messages: Queued messages kept in memory, older ones are fetched again when accepted
+    """
+    def __init__(self, bot, detect: Callable[[str], Optional[ApplicationForm]], page_size: int = 100,
+                 max_messages: int = DEFAULT_MAX_MESSAGES):
+        self.bot = bot
+        self.detect = detect
+        self.page_size = page_size
+        self.max_messages = max_messages
+        # Queued messages, so accepting them doesn't need a fetch_message each
+        self.messages: "collections.OrderedDict[int, discord.Message]" = collections.OrderedDict()
+        # Channels whose backlog has been scanned, so new messages can move the checkpoint
+        self.scanned_channels: Set[int] = set()
+
+    def checkpoint(self, channel_id: int) -> Optional[int]:
+        """Get the ID of the last message scanned in a channel."""
+        row = self.bot.selectOne(CHECKPOINT_SQL, (channel_id,))
+        return row[0] if row else None
+
+    async def scan(self, channel) -> ScanResult:
+        """Scan the channel's messages since the checkpoint and queue any applications found."""
+        result = ScanResult()
+        after = self.checkpoint(channel.id)
+        log.info("Scanning channel %s for applications after message %s", channel.id, after)
+        page = []
+        async for message in channel.history(limit=None, after=discord.Object(id=after) if after else None, oldest_first=True):
+            page.append(message)
+            if len(page) >= self.page_size:
+                queued = self._scan_page(channel.id, page)
+                if queued is None:
+                    # Stop rather than checkpoint past the page, the next scan retries it
+                    log.error("Couldn't queue applications in channel %s, stopping the scan", channel.id)
+                    return result
+                result.queued += queued
+                result.scanned += len(page)
+                page = []
+        if page:
+            queued = self._scan_page(channel.id, page)
+            if queued is None:
+                log.error("Couldn't queue applications in channel %s, stopping the scan", channel.id)
+                return result
+            result.queued += queued
+            result.scanned += len(page)
+        self.scanned_channels.add(channel.id)
+        log.info("Scanned %d messages in channel %s, %d new applications", result.scanned, channel.id, result.queued)
+        return result
+
+    def add(self, message: discord.Message) -> Optional[int]:
+        """
+        Queue a message as it's posted. The checkpoint only moves past it once the channel's
+        backlog has been scanned, so a restart mid-scan doesn't skip the rest of the backlog.
+        """
+        if message.channel.id in self.scanned_channels:
+            return self._scan_page(message.channel.id, [message])
+        return self.queue([message])
+
+    def _scan_page(self, channel_id: int, page: List[discord.Message]) -> Optional[int]:
+        """Queue the applications in a page of history and move the checkpoint past it, None if queueing failed."""
+        queued = self.queue(page)
+        if queued is not None:
+            self.bot.execute_query(SAVE_CHECKPOINT_SQL, (channel_id, page[-1].id))
+        return queued
+
+    def queue(self, messages: List[discord.Message]) -> Optional[int]:
+        """
+        Queue the messages that are applications from people who aren't members yet.
+
+        Returns:
+            int: How many were applications to queue, including any queued before,
+            or None if they couldn't be written to the DB
+        """
+        found = []
+        for message in messages:
+            if message.author.bot:
+                continue
+            form = self.detect(message.content)
+            if form is not None:
+                found.append((message, form))
+        if not found:
+            return 0
+
+        registered = self.bot.selectMany(REGISTERED_AUTHORS_SQL, ([message.author.id for message, _ in found],)) or []
+        registered = {row[0] for row in registered}
+        found = [(message, form) for message, form in found if message.author.id not in registered]
+        if not found:
+            return 0
+
+        inserted = self.bot.execute_query(QUEUE_PENDING_SQL, (
+            [message.id for message, _ in found],
+            [message.channel.id for message, _ in found],
+            [message.author.id for message, _ in found],
+            [form.rsn for _, form in found],
+            [message.created_at.replace(tzinfo=None) if message.created_at else None for message, _ in found],
+        ))
+        if not inserted:
+            return None
+        for message, _ in found:
+            self._keep(message)
+        return len(found)
+
+    def _keep(self, message: discord.Message):
+        """Hold on to a queued message, dropping the oldest past max_messages."""
+        self.messages[message.id] = message
+        self.messages.move_to_end(message.id)
+        while len(self.messages) > self.max_messages:
+            self.messages.popitem(last=False)
+
+    def pending(self, channel_id: int) -> List[PendingApplication]:
+        """Get the applications waiting in a channel, oldest first."""
+        return [PendingApplication(*row) for row in self.bot.selectMany(PENDING_SQL, (channel_id,)) or []]
+
+    def remove(self, message_ids: List[int]):
+        """Take applications off the queue once they've been handled."""
+        if not message_ids:
+            return
+        self.bot.execute_query(REMOVE_PENDING_SQL, (list(message_ids),))
+        for message_id in message_ids:
+            self.messages.pop(message_id, None)
+
+    async def get_message(self, channel, message_id: int) -> discord.Message:
+        """Get a queued application's message, fetching it only if it was queued before a restart."""
+        message = self.messages.get(message_id)
+        if message is None:
+            message = await channel.fetch_message(message_id)
+            self._keep(message)
+        return message
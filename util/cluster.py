@@ -0,0 +1,392 @@
+"""
+Running the bot's shards across several processes.
+
+One process can only use one core, so once the bot is in enough guilds the
+shards are split into clusters, each a worker process with its own event loop
+and DB connection running a contiguous range of shard IDs. The launcher in the
+parent process starts the clusters one after another, since Discord only lets
+a bot identify one shard at a time, and restarts any that crash.
+
+Clusters talk to each other through the launcher over a pipe each:
+- broadcast: an event for every other cluster, such as a cog being reloaded
+- request: a command every cluster answers, such as stats, with the replies
+  gathered back in the cluster that asked
+"""
+import asyncio
+import inspect
+import itertools
+import json
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+import urllib.request
+from typing import Any, Callable, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+# How long a request waits for every cluster to answer
+DEFAULT_REQUEST_TIMEOUT = 5.0
+
+# Discord's limit on how often a bot can identify a shard, when it doesn't say otherwise
+IDENTIFY_INTERVAL_SECONDS = 5.0
+
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+
+
+def plan_clusters(shard_count: int, cluster_count: int) -> List[List[int]]:
+    """
+    Split shard IDs into contiguous ranges, one per cluster, as evenly as possible.
+
+    Returns:
+        list: The shard IDs for each cluster, clusters beyond the shard count are dropped
+    """
+    if shard_count < 1 or cluster_count < 1:
+        raise ValueError("shard_count and cluster_count must be at least 1")
+    cluster_count = min(cluster_count, shard_count)
+    size, extra = divmod(shard_count, cluster_count)
+    clusters = []
+    start = 0
+    for cluster_id in range(cluster_count):
+        end = start + size + (1 if cluster_id < extra else 0)
+        clusters.append(list(range(start, end)))
+        start = end
+    return clusters
+
+
+def cluster_path(path: Optional[str], cluster: Optional["ClusterClient"]) -> Optional[str]:
+    """
+    Get the file a cluster should use for path, e.g. bot.log becomes bot.cluster-1.log for cluster 1.
+    Clusters run in separate processes, so files they each write need a name per cluster.
+    The path is unchanged when the bot isn't clustered.
+    """
+    if not path or cluster is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.cluster-{cluster.cluster_id}{extension}"
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """The shard Discord sends a guild's events to."""
+    return (guild_id >> 22) % shard_count
+
+
+def recommended_shard_count(token: str) -> int:
+    """Ask Discord how many shards the bot should run."""
+    request = urllib.request.Request(GATEWAY_BOT_URL, headers={
+        "Authorization": f"Bot {token}",
+        "User-Agent": "CoffeeHouseBot cluster launcher",
+    })
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return int(json.load(response)["shards"])
+
+
+class ClusterClient:
+    """
+    A cluster's end of the IPC pipe, kept on the bot as bot.cluster.
+
+    Messages are read on a background thread and handled on the bot's event loop, so
+    handlers can be coroutines and nothing blocks the loop waiting on the pipe.
+
+    Args:
+        cluster_id: This cluster's index
+        cluster_count: How many clusters are running, requests wait for this many replies
+        shard_ids: The shards this cluster runs
+        shard_count: Shards across all clusters
+        conn: The pipe to the launcher
+    """
+    def __init__(self, cluster_id: int, cluster_count: int, shard_ids: List[int], shard_count: int, conn):
+        self.cluster_id = cluster_id
+        self.cluster_count = cluster_count
+        self.shard_ids = list(shard_ids)
+        self.shard_count = shard_count
+        self.conn = conn
+        self.event_handlers: Dict[str, List[Callable[[Any], Any]]] = {}
+        self.command_handlers: Dict[str, Callable[[Any], Any]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+        self._request_ids = itertools.count(1)
+        self._requests: Dict[int, "_PendingRequest"] = {}
+        self._send_lock = threading.Lock()
+        # Handler tasks, kept so they aren't garbage collected before they finish
+        self._tasks = set()
+
+    @property
+    def is_primary(self) -> bool:
+        """The first cluster runs the jobs that should only run once, like syncing commands."""
+        return self.cluster_id == 0
+
+    def owns_guild(self, guild_id: int) -> bool:
+        return shard_for_guild(guild_id, self.shard_count) in self.shard_ids
+
+    def on(self, event: str, handler: Callable[[Any], Any]):
+        """Run a handler, sync or async, whenever another cluster broadcasts an event."""
+        self.event_handlers.setdefault(event, []).append(handler)
+
+    def add_command(self, name: str, handler: Callable[[Any], Any]):
+        """Answer requests for a command, the handler's return value is the reply."""
+        self.command_handlers[name] = handler
+
+    def start(self):
+        """Start reading from the launcher, call from the bot's event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._reader = threading.Thread(target=self._read, name=f"cluster-{self.cluster_id}-ipc", daemon=True)
+        self._reader.start()
+
+    def send(self, message: dict):
+        with self._send_lock:
+            self.conn.send(message)
+
+    def ready(self):
+        """Tell the launcher this cluster's shards are connected, so the next cluster can start."""
+        self.send({"op": "ready"})
+
+    def broadcast(self, event: str, data: Any = None):
+        """Send an event to every other cluster."""
+        self.send({"op": "broadcast", "event": event, "data": data})
+
+    async def request(self, command: str, data: Any = None, timeout: float = DEFAULT_REQUEST_TIMEOUT) -> Dict[int, Any]:
+        """
+        Ask every cluster, including this one, to run a command.
+
+        Returns:
+            dict: Each cluster's reply by cluster ID, clusters that didn't answer in time are left out
+        """
+        request = _PendingRequest(asyncio.get_running_loop().create_future(), self.cluster_count)
+        request_id = next(self._request_ids)
+        self._requests[request_id] = request
+        try:
+            self.send({"op": "request", "id": request_id, "command": command, "data": data})
+            await asyncio.wait_for(asyncio.shield(request.done), timeout)
+        except asyncio.TimeoutError:
+            log.warning("Only %d of %d clusters answered %s in time", len(request.replies), self.cluster_count, command)
+        finally:
+            self._requests.pop(request_id, None)
+        return dict(sorted(request.replies.items()))
+
+    def _read(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                log.warning("Lost the connection to the cluster launcher")
+                return
+            self._loop.call_soon_threadsafe(self._dispatch, message)
+
+    def _dispatch(self, message: dict):
+        op = message.get("op")
+        if op == "event":
+            for handler in self.event_handlers.get(message["event"], []):
+                self._run(handler, message.get("data"), f"{message['event']} event")
+        elif op == "request":
+            self._spawn(self._answer(message), f"cluster-request-{message['command']}")
+        elif op == "reply":
+            request = self._requests.get(message["id"])
+            if request is not None:
+                request.add(message["cluster_id"], message.get("data"))
+        elif op == "shutdown":
+            for handler in self.event_handlers.get("shutdown", []):
+                self._run(handler, None, "shutdown")
+
+    def _run(self, handler, data, name):
+        try:
+            result = handler(data)
+            if asyncio.iscoroutine(result):
+                self._spawn(result, f"cluster-{name}")
+        except Exception as e:
+            log.error("Error handling cluster %s: %s", name, e)
+
+    def _spawn(self, coro, name):
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _answer(self, message: dict):
+        handler = self.command_handlers.get(message["command"])
+        data = None
+        if handler is not None:
+            try:
+                data = handler(message.get("data"))
+                if inspect.isawaitable(data):
+                    data = await data
+            except Exception as e:
+                log.error("Error answering cluster request %s: %s", message["command"], e)
+                data = {"error": str(e)}
+        self.send({"op": "reply", "id": message["id"], "target": message["source"], "data": data})
+
+
+class _PendingRequest:
+    def __init__(self, done: asyncio.Future, expected: int):
+        self.done = done
+        self.expected = expected
+        self.replies: Dict[int, Any] = {}
+
+    def add(self, cluster_id: int, data: Any):
+        self.replies[cluster_id] = data
+        if len(self.replies) >= self.expected and not self.done.done():
+            self.done.set_result(None)
+
+
+class ClusterLauncher:
+    """
+    Starts a worker process per cluster and routes IPC messages between them.
+
+    The worker target is called as target(cluster_id, cluster_count, shard_ids, shard_count, conn)
+    in a spawned process. A cluster that exits cleanly stops the whole bot, one that crashes is
+    restarted after restart_delay seconds.
+
+    Args:
+        target: Runs the bot for one cluster
+        shard_count: Shards across all clusters
+        cluster_count: Worker processes to split them between
+        restart_delay: Seconds before restarting a crashed cluster
+        ready_timeout: Seconds to wait for a cluster to connect before starting the next one anyway
+    """
+    def __init__(self, target: Callable, shard_count: int, cluster_count: int,
+                 restart_delay: float = 5.0, ready_timeout: Optional[float] = None):
+        self.target = target
+        self.shard_count = shard_count
+        self.clusters = plan_clusters(shard_count, cluster_count)
+        self.restart_delay = restart_delay
+        # Every shard identifies one at a time, give each cluster plenty of time to get through its own
+        self.ready_timeout = ready_timeout if ready_timeout is not None else \
+            max(len(shards) for shards in self.clusters) * IDENTIFY_INTERVAL_SECONDS * 3
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.conns: Dict[int, multiprocessing.connection.Connection] = {}
+        self.ready = set()
+        self.restarts: Dict[int, float] = {}
+        self.stopping = False
+
+    @property
+    def cluster_count(self) -> int:
+        return len(self.clusters)
+
+    def start_cluster(self, cluster_id: int):
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=self.target,
+            args=(cluster_id, self.cluster_count, self.clusters[cluster_id], self.shard_count, child_conn),
+            name=f"cluster-{cluster_id}",
+        )
+        process.start()
+        child_conn.close()
+        self.processes[cluster_id] = process
+        self.conns[cluster_id] = parent_conn
+        self.ready.discard(cluster_id)
+        log.info("Started cluster %d (pid %d) with shards %d-%d", cluster_id, process.pid,
+                 self.clusters[cluster_id][0], self.clusters[cluster_id][-1])
+
+    def run(self):
+        """Run the clusters until they're stopped, blocking the calling process."""
+        log.info("Launching %d clusters for %d shards", self.cluster_count, self.shard_count)
+        waiting = list(range(self.cluster_count))
+        started_at = 0.0
+        try:
+            while waiting or self.processes:
+                # Start clusters one at a time, each once the last one is connected
+                if waiting and (not self.processes or waiting[0] - 1 in self.ready
+                                or time.monotonic() - started_at > self.ready_timeout):
+                    self.start_cluster(waiting.pop(0))
+                    started_at = time.monotonic()
+                self.poll(timeout=1.0)
+                if self.stopping:
+                    waiting = []
+        except KeyboardInterrupt:
+            log.info("Stopping clusters")
+        finally:
+            self.stop()
+
+    def poll(self, timeout: float = 1.0):
+        """Route any waiting messages, handle clusters that exited and restart any that are due."""
+        sentinels = {process.sentinel: cluster_id for cluster_id, process in self.processes.items()}
+        conns = {conn: cluster_id for cluster_id, conn in self.conns.items()}
+        for ready in multiprocessing.connection.wait(list(conns) + list(sentinels), timeout):
+            if ready in conns:
+                self._receive(conns[ready], ready)
+            elif ready in sentinels:
+                self._exited(sentinels[ready])
+
+        now = time.monotonic()
+        for cluster_id, restart_at in list(self.restarts.items()):
+            if restart_at <= now and not self.stopping:
+                del self.restarts[cluster_id]
+                self.start_cluster(cluster_id)
+
+    def _receive(self, cluster_id: int, conn):
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            # The pipe closes when the process exits, which its sentinel handles
+            self.conns.pop(cluster_id, None)
+            return
+        self.route(cluster_id, message)
+
+    def route(self, source: int, message: dict):
+        """Pass a message from a cluster on to the clusters it's for."""
+        op = message.get("op")
+        if op == "ready":
+            self.ready.add(source)
+            log.info("Cluster %d is ready", source)
+        elif op == "broadcast":
+            self._send_to([cluster_id for cluster_id in self.conns if cluster_id != source],
+                          {"op": "event", "event": message["event"], "data": message.get("data"), "source": source})
+        elif op == "request":
+            self._send_to(list(self.conns), {**message, "source": source})
+        elif op == "reply":
+            self._send_to([message["target"]], {"op": "reply", "id": message["id"], "cluster_id": source, "data": message.get("data")})
+        else:
+            log.warning("Unknown message from cluster %d: %s", source, op)
+
+    def _send_to(self, cluster_ids: List[int], message: dict):
+        for cluster_id in cluster_ids:
+            conn = self.conns.get(cluster_id)
+            if conn is None:
+                continue
+            try:
+                conn.send(message)
+            except (BrokenPipeError, OSError) as e:
+                log.warning("Couldn't send to cluster %d: %s", cluster_id, e)
+
+    def _exited(self, cluster_id: int):
+        process = self.processes.pop(cluster_id)
+        # The sentinel is ready as soon as the process ends, join it to get the exit code
+        process.join()
+        conn = self.conns.pop(cluster_id, None)
+        if conn is not None:
+            conn.close()
+        self.ready.discard(cluster_id)
+        if self.stopping:
+            return
+        if process.exitcode == 0:
+            # A clean exit means someone shut the bot down, so stop the other clusters too
+            log.info("Cluster %d shut down, stopping the other clusters", cluster_id)
+            self.stopping = True
+            self._send_to(list(self.conns), {"op": "shutdown"})
+        else:
+            log.error("Cluster %d exited with code %s, restarting in %.0fs", cluster_id, process.exitcode, self.restart_delay)
+            self.restarts[cluster_id] = time.monotonic() + self.restart_delay
+
+    def stop(self, timeout: float = 30.0):
+        """Ask every cluster to shut down, terminating any that don't in time."""
+        self.stopping = True
+        self._send_to(list(self.conns), {"op": "shutdown"})
+        deadline = time.monotonic() + timeout
+        for cluster_id, process in list(self.processes.items()):
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                log.warning("Cluster %d didn't shut down, terminating it", cluster_id)
+                process.terminate()
+                process.join()
+        self.processes.clear()
+        for conn in self.conns.values():
+            conn.close()
+        self.conns.clear()
+
+
+def get_cluster(bot) -> Optional[ClusterClient]:
+    """Get the bot's cluster client, or None if it isn't running as part of a cluster."""
+    cluster = getattr(bot, "cluster", None)
+    return cluster if isinstance(cluster, ClusterClient) else None
@@ -0,0 +1,95 @@
+"""
+Monthly partitions of command_usage.
+
+command_usage is partitioned by month on timestamp (see sql/create-db.sql). The
+Admin cog's nightly job creates partitions ahead of time and, once a month has
+been rolled up into command_usage_daily, drops partitions older than the
+retention period instead of deleting rows. Usage for a month without a
+partition lands in command_usage_default, and is moved into the month's
+partition when it's created.
+"""
+import datetime
+import re
+from typing import Iterable, List, Optional, Tuple
+
+PARTITION_PREFIX = "command_usage_"
+DEFAULT_PARTITION = "command_usage_default"
+_PARTITION_NAME = re.compile(rf"^{PARTITION_PREFIX}(\d{{4}})_(\d{{2}})$")
+
+LIST_PARTITIONS_SQL = """
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = 'command_usage'
+"""
+
+
+def month_start(day: datetime.date) -> datetime.date:
+    return day.replace(day=1)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    """Get the first day of the month `months` after the month of `month`."""
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y_%m}"
+
+
+def partition_month(name: str) -> Optional[datetime.date]:
+    """Get the month a partition holds from its name, or None if it isn't a monthly partition."""
+    match = _PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return datetime.date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def create_partition_sql(month: datetime.date) -> str:
+    """
+    Get the statements that create the partition for a month, only run them for months
+    LIST_PARTITIONS_SQL doesn't list.
+
+    Postgres won't create a partition while the default partition holds rows that belong
+    in it, so any of the month's usage is taken out of the default partition first and
+    put back through command_usage once the partition exists. execute_query runs the
+    statements in one transaction.
+    """
+    month = month_start(month)
+    in_month = f"timestamp >= '{month:%Y-%m-%d}' AND timestamp < '{add_months(month, 1):%Y-%m-%d}'"
+    return (
+        f"CREATE TEMP TABLE command_usage_moving ON COMMIT DROP AS SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}; "
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}; "
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF command_usage "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}'); "
+        f"INSERT INTO command_usage SELECT * FROM command_usage_moving"
+    )
+
+
+def months_to_create(today: datetime.date, months_ahead: int) -> List[datetime.date]:
+    """Get the current month and the next `months_ahead` months."""
+    current = month_start(today)
+    return [add_months(current, offset) for offset in range(months_ahead + 1)]
+
+
+def expired_partitions(names: Iterable[str], today: datetime.date, retention_months: int) -> List[Tuple[str, datetime.date]]:
+    """
+    Get the partitions that are entirely older than the retention period.
+
+    Args:
+        names: The partition table names
+        today: The current date
+        retention_months: How many months to keep, not counting the current one
+
+    Returns:
+        list: (name, month) for each expired partition, oldest first
+    """
+    cutoff = add_months(month_start(today), -retention_months)
+    expired = []
+    for name in names:
+        month = partition_month(name)
+        if month is not None and month < cutoff:
+            expired.append((name, month))
+    return sorted(expired, key=lambda partition: partition[1])
@@ -0,0 +1,148 @@
+"""
+Daily rollups of command_usage.
+
+A nightly job in the Admin cog sums each finished day of command_usage into
+command_usage_daily (one row per day per command, with a histogram of command
+durations). command-stats then reads the rollups plus only the raw rows that
+haven't been rolled up yet, instead of scanning the whole usage table.
+
+command_usage.timestamp is stored in UTC, so days start at UTC midnight. The
+nightly job runs at a UTC time and the day boundaries are worked out in UTC
+too, rather than from the database's or the bot host's local time.
+"""
+import datetime
+from typing import Optional, Sequence
+
+# The zone of command_usage.timestamp, and so of the days it's rolled up into
+USAGE_TIMEZONE = datetime.timezone.utc
+
+# Upper bounds of the duration histogram buckets, in milliseconds. There is one
+# more bucket for anything slower than the last bound. The columns in
+# command_usage_daily (sql/create-db.sql) must match.
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000)
+
+
+def bucket_columns():
+    """Get the command_usage_daily column names of the duration buckets."""
+    return [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + [f"gt_{LATENCY_BUCKETS_MS[-1]}ms"]
+
+
+def _bucket_filters():
+    """Get a raw command_usage aggregate for each duration bucket."""
+    filters = []
+    lower = None
+    for bound in LATENCY_BUCKETS_MS:
+        condition = f"duration_ms <= {bound}" if lower is None else f"duration_ms > {lower} AND duration_ms <= {bound}"
+        filters.append(f"COUNT(*) FILTER (WHERE {condition})")
+        lower = bound
+    filters.append(f"COUNT(*) FILTER (WHERE duration_ms > {lower})")
+    return filters
+
+
+def _raw_aggregates(indent=8):
+    return (",\n" + " " * indent).join(
+        ["COUNT(*)",
+         "COUNT(*) FILTER (WHERE success)",
+         "COUNT(*) FILTER (WHERE NOT success)"]
+        + _bucket_filters()
+        + ["MAX(duration_ms)"]
+    )
+
+
+_COLUMNS = ", ".join(["usage_count", "success_count", "failure_count"] + bucket_columns() + ["duration_max_ms"])
+
+# Roll up every finished day from %s (inclusive) up to today, %s. Days that were
+# already rolled up are recalculated, so running it more than once is harmless.
+ROLLUP_SQL = f"""
+    INSERT INTO command_usage_daily (day, command_name, {_COLUMNS})
+    SELECT
+        timestamp::date,
+        command_name,
+        {_raw_aggregates()}
+    FROM command_usage
+    WHERE timestamp >= %s AND timestamp < %s
+    GROUP BY timestamp::date, command_name
+    ON CONFLICT (day, command_name) DO UPDATE SET
+        {", ".join(f"{column} = EXCLUDED.{column}" for column in _COLUMNS.split(", "))}
+"""
+
+# Usage per command since %(start)s. Days that have been rolled up are read from
+# command_usage_daily, anything after them comes from the raw rows.
+STATS_SQL = f"""
+    WITH rolled_through AS (
+        SELECT COALESCE(MAX(day) + 1, '-infinity'::date) AS day FROM command_usage_daily
+    )
+    SELECT
+        command_name,
+        SUM(usage_count) AS usage_count,
+        SUM(success_count) AS success_count,
+        SUM(failure_count) AS failure_count,
+        {", ".join(f"SUM({column})" for column in bucket_columns())},
+        MAX(duration_max_ms)
+    FROM (
+        SELECT command_name, {_COLUMNS}
+        FROM command_usage_daily
+        WHERE day >= %(start)s::date
+        UNION ALL
+        SELECT
+            command_name,
+            {_raw_aggregates(12)}
+        FROM command_usage, rolled_through
+        WHERE timestamp >= GREATEST(%(start)s, rolled_through.day)
+        GROUP BY command_name
+    ) AS usage
+    GROUP BY command_name
+    ORDER BY usage_count DESC
+"""
+
+
+def usage_now() -> datetime.datetime:
+    """Get the current time the way command_usage.timestamp stores it, naive UTC."""
+    return datetime.datetime.now(USAGE_TIMEZONE).replace(tzinfo=None)
+
+
+def usage_today() -> datetime.date:
+    """Get today's date in USAGE_TIMEZONE."""
+    return usage_now().date()
+
+
+def bucket_percentile(counts: Sequence[int], pct: float, max_ms: Optional[float] = None) -> Optional[float]:
+    """
+    Estimate a percentile from duration bucket counts.
+
+    Args:
+        counts: The count in each bucket, in LATENCY_BUCKETS_MS order plus the overflow bucket
+        pct: The percentile to get, from 0 to 100
+        max_ms: The slowest duration, used for the overflow bucket and to cap the estimate
+
+    Returns:
+        float: The upper bound of the bucket the percentile falls in, or None if there are no timings
+    """
+    counts = [int(count or 0) for count in counts]
+    total = sum(counts)
+    if not total:
+        return None
+    target = pct / 100 * total
+    running = 0
+    for i, count in enumerate(counts):
+        running += count
+        if running >= target and count:
+            bound = LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else None
+            if bound is None:
+                return max_ms
+            return min(bound, max_ms) if max_ms is not None else bound
+    return max_ms
+
+
+def summarise_stats_row(row):
+    """
+    Turn a STATS_SQL row into (command_name, usage_count, success_count, failure_count, p50, p95, p99).
+    """
+    command_name, usage_count, success_count, failure_count = row[:4]
+    counts = row[4:4 + len(LATENCY_BUCKETS_MS) + 1]
+    max_ms = row[-1]
+    max_ms = float(max_ms) if max_ms is not None else None
+    return (
+        command_name, int(usage_count), int(success_count), int(failure_count),
+        *(bucket_percentile(counts, pct, max_ms) for pct in (50, 95, 99)),
+    )
@@ -0,0 +1,85 @@
+"""
+Command tree fingerprinting.
+
+Syncing app commands with Discord is slow and heavily rate limited, so the bot
+hashes the serialised command tree for each scope (global or a single guild)
+and only syncs a scope when its hash differs from the one saved after the last
+successful sync. Hashes are saved per application, so running the bot with
+another token doesn't skip the first sync for that application.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+import discord
+from discord import app_commands
+
+log = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+
+
+def sync_scope(guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Get the key used to store the fingerprint for a sync scope."""
+    return GLOBAL_SCOPE if guild is None else f"guild:{guild.id}"
+
+
+def command_tree_payload(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> List[Dict]:
+    """
+    Serialise the commands that would be sent to Discord for a scope.
+
+    Args:
+        tree: The command tree
+        guild: The guild to serialise commands for, or None for global commands
+
+    Returns:
+        list: The command payloads, sorted so the order commands were added in doesn't matter
+    """
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    return sorted(payload, key=lambda command: (command.get("type", 1), command["name"]))
+
+
+def command_tree_fingerprint(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Get a stable hash of the commands for a scope."""
+    serialised = json.dumps(command_tree_payload(tree, guild), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(serialised.encode("utf-8")).hexdigest()
+
+
+class CommandSyncState:
+    """
+    The fingerprints of the last successful sync for each application and scope, persisted to a local JSON file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.fingerprints = self._load()
+
+    def _load(self) -> Dict[str, str]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as state_file:
+                data = json.load(state_file)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            log.warning(f"Could not read command sync state from {self.path}: {e}")
+            return {}
+
+    @staticmethod
+    def _key(application_id: Optional[int], scope: str) -> str:
+        return f"{application_id}:{scope}"
+
+    def get(self, application_id: Optional[int], scope: str) -> Optional[str]:
+        return self.fingerprints.get(self._key(application_id, scope))
+
+    def set(self, application_id: Optional[int], scope: str, fingerprint: str):
+        """Record a successful sync and save the state."""
+        self.fingerprints[self._key(application_id, scope)] = fingerprint
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as state_file:
+                json.dump(self.fingerprints, state_file, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning(f"Could not save command sync state to {self.path}: {e}")
@@ -0,0 +1,110 @@
+"""
+Timing for slash commands run through log_command.
+
+log_command puts a CommandTiming in a contextvar for the command it runs. The
+DB helpers add their query time to it, and the command's interaction gets a
+TimedInteractionResponse that records when the command first responded to
+Discord (deferred, sent a message or opened a modal), which is what decides
+whether the user sees "interaction failed". Only the interactions log_command
+runs are timed, discord.InteractionResponse itself isn't touched.
+"""
+import contextvars
+import dataclasses
+import functools
+import time
+from typing import Dict, Optional
+
+from discord import Interaction, InteractionResponse
+
+from util.metrics import LatencyHistogram
+
+# The command currently running, set by log_command
+current_command = contextvars.ContextVar('current_command', default=None)
+
+# InteractionResponse methods that count as the first response, and what to record them as
+RESPONSE_METHODS = {
+    "defer": "defer",
+    "send_message": "send",
+    "send_modal": "modal",
+    "edit_message": "edit",
+}
+
+
+@dataclasses.dataclass
+class CommandTiming:
+    """Timings for a single command invocation."""
+    name: str
+    started: float = dataclasses.field(default_factory=time.perf_counter)
+    duration_ms: Optional[float] = None
+    first_response_ms: Optional[float] = None
+    first_response_type: Optional[str] = None
+    db_ms: float = 0.0
+
+    def mark_response(self, response_type: str):
+        """Record the first response to the interaction, later ones are ignored."""
+        if self.first_response_ms is None:
+            self.first_response_ms = (time.perf_counter() - self.started) * 1000
+            self.first_response_type = response_type
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+
+
+def _hook_response(method, response_type):
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        # Marked as the response goes out, Discord's round trip isn't part of the command's time to respond
+        timing = current_command.get()
+        if timing is not None and not self.is_done():
+            timing.mark_response(response_type)
+        return await method(self, *args, **kwargs)
+    return wrapper
+
+
+class TimedInteractionResponse(InteractionResponse):
+    """An InteractionResponse that marks the running command's first response."""
+    __slots__ = ()
+
+
+for _method_name, _response_type in RESPONSE_METHODS.items():
+    setattr(TimedInteractionResponse, _method_name, _hook_response(getattr(InteractionResponse, _method_name), _response_type))
+
+
+def time_responses(interaction):
+    """Give an interaction a TimedInteractionResponse, leaving anything that isn't a discord.Interaction alone."""
+    if not isinstance(interaction, Interaction):
+        return
+    # Interaction.response is created on first use and cached in _cs_response
+    response = getattr(interaction, "_cs_response", None)
+    if isinstance(response, TimedInteractionResponse):
+        return
+    timed = TimedInteractionResponse(interaction)
+    if response is not None:
+        timed._response_type = response._response_type
+    interaction._cs_response = timed
+
+
+class CommandMetrics:
+    """In-memory latency histograms for each command since the bot started."""
+    def __init__(self):
+        self.commands: Dict[str, Dict[str, LatencyHistogram]] = {}
+
+    def record(self, timing: CommandTiming):
+        histograms = self.commands.get(timing.name)
+        if histograms is None:
+            histograms = self.commands[timing.name] = {
+                "duration": LatencyHistogram(),
+                "first_response": LatencyHistogram(),
+                "db": LatencyHistogram(),
+            }
+        if timing.duration_ms is not None:
+            histograms["duration"].record(timing.duration_ms)
+        if timing.first_response_ms is not None:
+            histograms["first_response"].record(timing.first_response_ms)
+        histograms["db"].record(timing.db_ms)
+
+    def summary(self) -> Dict[str, Dict[str, Dict]]:
+        return {
+            name: {metric: histogram.summary() for metric, histogram in histograms.items()}
+            for name, histograms in self.commands.items()
+        }
@@ -0,0 +1,186 @@
+"""
+Yes/no confirmations that survive restarts.
+
+A confirmation's buttons carry its ID in their custom_id and everything the
+handler needs is kept in pending_confirmation, so the buttons keep working
+after the bot restarts and nothing waits in memory for the click. The buttons
+are one DynamicItem registered with the bot once, which hands the click to the
+handler registered for the confirmation's kind. Each confirmation can only be
+answered once, by the person it was sent to.
+"""
+import dataclasses
+import json
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import discord
+
+log = logging.getLogger(__name__)
+
+# Confirmations left unanswered for longer than this are dropped
+DEFAULT_TTL_SECONDS = 15 * 60
+
+CREATE_CONFIRMATION_SQL = """
+    INSERT INTO pending_confirmation (confirmation_id, kind, user_id, payload, expires_at)
+    VALUES (%s, %s, %s, %s::jsonb, NOW() + make_interval(secs => %s))
+"""
+
+# Expiry is compared in the DB so it doesn't depend on the bot's clock or timezone
+CONFIRMATION_SQL = """
+    SELECT kind, user_id, payload, expires_at < NOW() AS expired
+    FROM pending_confirmation
+    WHERE confirmation_id = %s
+"""
+
+# Deleting the row is what claims it: only one click, on any cluster, gets it back
+CLAIM_CONFIRMATION_SQL = """
+    DELETE FROM pending_confirmation
+    WHERE confirmation_id = %s AND user_id = %s
+    RETURNING kind, user_id, payload, expires_at < NOW() AS expired
+"""
+
+PURGE_EXPIRED_SQL = "DELETE FROM pending_confirmation WHERE expires_at < NOW()"
+
+# Handlers get the button interaction, with its response already used to remove the buttons,
+# the confirmation's payload, and whether it was confirmed
+ConfirmationHandler = Callable[[discord.Interaction, Any, bool], Awaitable[None]]
+
+
+@dataclasses.dataclass
+class Confirmation:
+    confirmation_id: str
+    kind: str
+    user_id: int
+    payload: Any
+    expired: bool = False
+
+
+class ConfirmationButton(discord.ui.DynamicItem[discord.ui.Button], template=r"confirmation:(?P<id>[0-9a-f]{32}):(?P<choice>yes|no)"):
+    """A confirm or cancel button, found again from its custom_id after a restart."""
+    def __init__(self, confirmation_id: str, confirmed: bool, label: Optional[str] = None, style: Optional[discord.ButtonStyle] = None):
+        super().__init__(discord.ui.Button(
+            label=label or ("Confirm" if confirmed else "Cancel"),
+            style=style or (discord.ButtonStyle.green if confirmed else discord.ButtonStyle.red),
+            custom_id=f"confirmation:{confirmation_id}:{'yes' if confirmed else 'no'}",
+        ))
+        self.confirmation_id = confirmation_id
+        self.confirmed = confirmed
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["id"], match["choice"] == "yes", item.label, item.style)
+
+    async def callback(self, interaction: discord.Interaction):
+        confirmations = get_confirmations(interaction.client)
+        if confirmations is None:
+            await interaction.response.send_message("❌ Confirmations aren't available right now.", ephemeral=True)
+            return
+        await confirmations.handle(interaction, self.confirmation_id, self.confirmed)
+
+
+class ConfirmationView(discord.ui.View):
+    """The buttons for one confirmation, leave cancel_label as None for a single button."""
+    def __init__(self, confirmation_id: str, confirm_label: str = "Confirm", cancel_label: Optional[str] = "Cancel"):
+        super().__init__(timeout=None)
+        self.confirmation_id = confirmation_id
+        self.add_item(ConfirmationButton(confirmation_id, True, confirm_label))
+        if cancel_label is not None:
+            self.add_item(ConfirmationButton(confirmation_id, False, cancel_label))
+
+
+class Confirmations:
+    """
+    Creates confirmations and routes their answers to the handler for their kind.
+
+    Args:
+        bot: Used for the DB
+    """
+    def __init__(self, bot):
+        self.bot = bot
+        self.handlers: Dict[str, ConfirmationHandler] = {}
+
+    def register(self, kind: str, handler: ConfirmationHandler):
+        """Handle answers to confirmations of a kind, cogs do this in cog_load."""
+        self.handlers[kind] = handler
+
+    def unregister(self, kind: str):
+        self.handlers.pop(kind, None)
+
+    def create(self, kind: str, user_id: int, payload: Any = None, ttl: float = DEFAULT_TTL_SECONDS,
+               confirm_label: str = "Confirm", cancel_label: Optional[str] = "Cancel") -> Optional[ConfirmationView]:
+        """
+        Store a confirmation and get the buttons to send with it.
+
+        Args:
+            kind: Which registered handler answers it
+            user_id: The only user who can answer it
+            payload: JSON serializable state handed to the handler
+            ttl: Seconds it can be answered for
+
+        Returns:
+            ConfirmationView: The buttons, or None if it couldn't be stored
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for confirmation kind '{kind}'")
+        # Old unanswered confirmations are cleared out as new ones are made
+        self.bot.execute_query(PURGE_EXPIRED_SQL)
+        confirmation_id = uuid.uuid4().hex
+        if not self.bot.execute_query(CREATE_CONFIRMATION_SQL, (confirmation_id, kind, user_id, json.dumps(payload), ttl)):
+            return None
+        return ConfirmationView(confirmation_id, confirm_label, cancel_label)
+
+    def get(self, confirmation_id: str) -> Optional[Confirmation]:
+        return self._confirmation(confirmation_id, self.bot.selectOne(CONFIRMATION_SQL, (confirmation_id,)))
+
+    def claim(self, confirmation_id: str, user_id: int) -> Optional[Confirmation]:
+        """Remove a confirmation and get it back, or None if someone else already claimed it."""
+        return self._confirmation(confirmation_id, self.bot.execute_returning(CLAIM_CONFIRMATION_SQL, (confirmation_id, user_id)))
+
+    @staticmethod
+    def _confirmation(confirmation_id: str, row) -> Optional[Confirmation]:
+        if row is None:
+            return None
+        kind, user_id, payload, expired = row
+        # psycopg2 decodes jsonb, but accept text in case the column comes back as a string
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        return Confirmation(confirmation_id, kind, user_id, payload, bool(expired))
+
+    def purge_expired(self):
+        self.bot.execute_query(PURGE_EXPIRED_SQL)
+
+    async def handle(self, interaction: discord.Interaction, confirmation_id: str, confirmed: bool):
+        """Answer a confirmation from one of its buttons."""
+        confirmation = self.get(confirmation_id)
+        if confirmation is None:
+            await interaction.response.send_message("❌ This has already been answered or has expired.", ephemeral=True)
+            return
+        if interaction.user.id != confirmation.user_id:
+            await interaction.response.send_message("❌ Only the person who asked can answer this.", ephemeral=True)
+            return
+        handler = self.handlers.get(confirmation.kind)
+        if handler is None and not confirmation.expired:
+            await interaction.response.send_message("❌ This can't be answered right now, try again shortly.", ephemeral=True)
+            return
+
+        # Only the click that deletes the row goes on, so a double click or another cluster can't run the handler twice
+        confirmation = self.claim(confirmation_id, interaction.user.id)
+        if confirmation is None:
+            await interaction.response.send_message("❌ This has already been answered or has expired.", ephemeral=True)
+            return
+        if confirmation.expired:
+            await interaction.response.edit_message(content="⏱️ Confirmation timed out.", view=None)
+            return
+        await interaction.response.edit_message(view=None)
+        try:
+            await handler(interaction, confirmation.payload, confirmed)
+        except Exception as e:
+            log.error("Error handling %s confirmation %s: %s", confirmation.kind, confirmation_id, e)
+            await interaction.followup.send(f"❌ Something went wrong: {e}", ephemeral=True)
+
+
+def get_confirmations(bot) -> Optional[Confirmations]:
+    """Get the bot's confirmations, or None if it hasn't got any."""
+    confirmations = getattr(bot, "confirmations", None)
+    return confirmations if isinstance(confirmations, Confirmations) else None
@@ -0,0 +1,146 @@
+"""
+Non-blocking, structured logging for the bot.
+
+Every log record goes onto a queue from the calling thread and a background
+listener thread does the formatting and writing, so logging never blocks the
+event loop on stdout or a file. Records can be written as JSON lines or text,
+and levels can be set per logger from config.json:
+
+    "logging": {
+        "level": "INFO",
+        "format": "json",
+        "file": "bot.log",
+        "files": {"discord.slow_query": "slow_queries.log"},
+        "levels": {"discord.gateway": "WARNING", "cogs.lotto": "DEBUG"}
+    }
+
+"files" gives a logger its own file as well, written by the same listener and
+taking only that logger's records and its children's.
+
+The LOGLEVEL environment variable still overrides the root level.
+"""
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from typing import Dict, Optional
+
+TEXT_FORMAT = '%(asctime)s %(levelname)-8s %(name)s: %(message)s'
+
+# Attributes every LogRecord has, anything else on a record was passed in `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including any `extra` fields."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on the queue with their message already merged.
+
+    The message has to be built on the calling thread, since the arguments may
+    change after the call, but the real formatting is left to the listener.
+    The stock QueueHandler formats the whole record here and throws the
+    exception away, which would lose it from JSON output.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _level(value) -> int:
+    return value if isinstance(value, int) else logging.getLevelName(str(value).upper())
+
+
+def setup_logging(settings: Optional[Dict] = None, stream=None) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue to a background listener.
+
+    Calling it again replaces the previous setup, so it is safe to call more than once.
+
+    Args:
+        settings: The "logging" section of the config, see the module docstring
+        stream: Where to write, stderr by default
+
+    Returns:
+        QueueListener: The running listener, stop it with stop_logging()
+    """
+    global _listener, _queue_handler
+    settings = settings or {}
+    stop_logging()
+
+    formatter = JSONFormatter() if settings.get('format', 'text') == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(stream or sys.stderr)]
+    if settings.get('file'):
+        handlers.append(logging.handlers.RotatingFileHandler(
+            settings['file'],
+            maxBytes=int(settings.get('file_max_bytes', 10 * 1024 * 1024)),
+            backupCount=int(settings.get('file_backups', 5)),
+            encoding='utf-8',
+        ))
+    for name, path in (settings.get('files') or {}).items():
+        if not path:
+            continue
+        handler = logging.FileHandler(path, encoding='utf-8')
+        handler.addFilter(logging.Filter(name))
+        handlers.append(handler)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _QueueHandler(log_queue)
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(_level(os.getenv('LOGLEVEL', settings.get('level', 'INFO'))))
+    for name, level in settings.get('levels', {}).items():
+        logging.getLogger(name).setLevel(_level(level))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush anything still queued and remove the queue handler."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
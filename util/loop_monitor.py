@@ -0,0 +1,142 @@
+"""
+Event loop lag monitor.
+
+A heartbeat task sleeps for a fixed interval and measures how late it wakes up,
+which is how long the loop was busy with something else. A watchdog thread
+checks the heartbeat and, if the loop has been stuck for longer than the capture
+threshold, grabs the stack of the loop thread so the blocking call can be found.
+"""
+import asyncio
+import bisect
+import collections
+import dataclasses
+import datetime
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+from util.metrics import LatencyHistogram
+
+log = logging.getLogger(__name__)
+
+# Upper bounds of the stall histogram buckets, in milliseconds
+STALL_BUCKETS_MS = (100, 250, 500, 1000, 2500, 5000)
+
+
+@dataclasses.dataclass
+class Stall:
+    """A single period where the event loop didn't get to run the heartbeat on time."""
+    at: datetime.datetime
+    duration_ms: float
+    stack: Optional[str] = None
+
+
+class LoopMonitor:
+    """
+    Measures event loop scheduling lag.
+
+    Args:
+        interval_ms: How often the heartbeat runs
+        stall_threshold_ms: Lag above this is recorded as a stall
+        capture_threshold_ms: Stalls longer than this get the loop thread's stack captured
+        max_stalls: How many recent stalls to keep
+    """
+    def __init__(self, interval_ms: float = 250, stall_threshold_ms: float = 100, capture_threshold_ms: float = 500, max_stalls: int = 20):
+        self.interval = interval_ms / 1000
+        self.stall_threshold_ms = stall_threshold_ms
+        self.capture_threshold_ms = capture_threshold_ms
+        self.lag = LatencyHistogram()
+        self.stall_buckets = [0] * (len(STALL_BUCKETS_MS) + 1)
+        self.stalls = collections.deque(maxlen=max_stalls)
+        self._task = None
+        self._watchdog = None
+        self._stopping = threading.Event()
+        self._loop_thread_id = None
+        self._beat = 0
+        self._last_beat = time.monotonic()
+        # (beat number, stack) captured by the watchdog for the stall in progress
+        self._captured = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start monitoring the running event loop."""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        """Stop the heartbeat and watchdog."""
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record_lag((loop.time() - expected) * 1000)
+
+    def record_lag(self, lag_ms: float):
+        """Record one heartbeat's lag and note a stall if it was over the threshold."""
+        lag_ms = max(0.0, lag_ms)
+        captured, self._captured = self._captured, None
+        beat = self._beat
+        self._beat += 1
+        self._last_beat = time.monotonic()
+
+        self.lag.record(lag_ms)
+        if lag_ms < self.stall_threshold_ms:
+            return
+
+        self.stall_buckets[bisect.bisect_right(STALL_BUCKETS_MS, lag_ms)] += 1
+        stack = captured[1] if captured is not None and captured[0] == beat else None
+        self.stalls.append(Stall(datetime.datetime.now(), lag_ms, stack))
+        if stack is not None:
+            log.warning(f"Event loop stalled for {lag_ms:.0f}ms, loop thread was at:\n{stack}")
+        else:
+            log.warning(f"Event loop stalled for {lag_ms:.0f}ms")
+
+    def _watch(self):
+        poll = max(self.interval, self.capture_threshold_ms / 1000) / 4
+        while not self._stopping.wait(poll):
+            stuck_ms = (time.monotonic() - self._last_beat - self.interval) * 1000
+            beat = self._beat
+            if stuck_ms >= self.capture_threshold_ms and (self._captured is None or self._captured[0] != beat):
+                self._captured = (beat, self._capture_stack())
+
+    def _capture_stack(self) -> Optional[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        return "".join(traceback.format_stack(frame))
+
+    def summary(self) -> Dict:
+        """Get the lag percentiles, stall histogram and recent stalls."""
+        labels = [f"<{bound}ms" for bound in STALL_BUCKETS_MS] + [f">={STALL_BUCKETS_MS[-1]}ms"]
+        return {
+            "running": self.running,
+            "lag": self.lag.summary(),
+            "stall_threshold_ms": self.stall_threshold_ms,
+            "stalls": dict(zip(labels, self.stall_buckets)),
+            "recent_stalls": list(self.stalls),
+        }
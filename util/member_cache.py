@@ -0,0 +1,264 @@
+"""
+Which gateway events the bot receives and what it keeps cached.
+
+No cog reads presences, but with the presences intent Discord sends every status
+and activity change of every member, and with chunking on startup every member
+of every guild is downloaded and kept. The profile in config.json turns those
+off by default:
+
+    "gateway": {
+        "presences": false,
+        "member_cache": "managed",
+        "chunk_guilds_at_startup": false,
+        "recent_member_minutes": 60,
+        "trim_interval_minutes": 10,
+        "max_messages": 1000
+    }
+
+member_cache is "all" to keep every member discord.py sees, "none" to keep none,
+or "managed" to keep members holding one of the roles the bot manages
+(discord_role_names) or seen sending a message or using a command recently.
+Anyone else is dropped from the cache every trim interval and fetched from the
+API if a command needs them.
+
+cache_report estimates the memory each of discord.py's caches is using, for the
+/cache-stats command.
+"""
+import asyncio
+import dataclasses
+import logging
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+log = logging.getLogger(__name__)
+
+MEMBER_CACHE_MODES = ("all", "managed", "none")
+
+# Objects measured per cache, the total is extrapolated from them
+SAMPLE_SIZE = 100
+
+
+@dataclasses.dataclass
+class CacheProfile:
+    presences: bool = False
+    message_content: bool = True
+    member_cache: str = "managed"
+    chunk_guilds_at_startup: bool = False
+    recent_member_minutes: float = 60
+    trim_interval_minutes: float = 10
+    max_messages: Optional[int] = 1000
+
+    @classmethod
+    def from_config(cls, settings: Optional[Dict]) -> "CacheProfile":
+        """Build the profile from the "gateway" section of the config, unset values keep the defaults."""
+        settings = dict(settings or {})
+        unknown = set(settings) - {field.name for field in dataclasses.fields(cls)}
+        if unknown:
+            raise ValueError(f"Unknown gateway settings: {', '.join(sorted(unknown))}")
+        profile = cls(**settings)
+        if profile.member_cache not in MEMBER_CACHE_MODES:
+            raise ValueError(f"member_cache must be one of {', '.join(MEMBER_CACHE_MODES)}, not '{profile.member_cache}'")
+        return profile
+
+    def intents(self) -> discord.Intents:
+        intents = discord.Intents.default()
+        intents.guilds = True
+        intents.members = True
+        intents.presences = self.presences
+        intents.message_content = self.message_content
+        return intents
+
+    def member_cache_flags(self, intents: discord.Intents) -> discord.MemberCacheFlags:
+        if self.member_cache == "none":
+            return discord.MemberCacheFlags.none()
+        return discord.MemberCacheFlags.from_intents(intents)
+
+    def client_options(self) -> Dict:
+        """Keyword arguments for the bot's constructor."""
+        intents = self.intents()
+        return {
+            "intents": intents,
+            "member_cache_flags": self.member_cache_flags(intents),
+            "chunk_guilds_at_startup": self.chunk_guilds_at_startup and self.member_cache != "none",
+            "max_messages": self.max_messages,
+        }
+
+
+class MemberCacheTrimmer:
+    """
+    Keeps the member cache down to managed and recently active members.
+
+    Args:
+        profile: How long members count as recently seen, and how often to trim
+        managed_role_names: Members with any of these roles are always kept
+    """
+    def __init__(self, profile: CacheProfile, managed_role_names: Iterable[str] = ()):
+        self.recent_seconds = profile.recent_member_minutes * 60
+        self.interval = profile.trim_interval_minutes * 60
+        self.managed_role_names = {name.lower() for name in managed_role_names}
+        # (guild ID, user ID) -> when they were last seen
+        self.last_seen: Dict[Tuple[int, int], float] = {}
+        self.trimmed = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def seen(self, guild_id: Optional[int], user_id: int):
+        """Note a member was active, so they stay cached for a while."""
+        if guild_id is not None:
+            self.last_seen[(guild_id, user_id)] = time.monotonic()
+
+    def managed_role_ids(self, guild: discord.Guild) -> List[int]:
+        return [role.id for role in guild.roles if role.name.lower() in self.managed_role_names]
+
+    def trim(self, guilds: Iterable[discord.Guild], keep_ids: Iterable[int] = ()) -> int:
+        """
+        Drop members that are neither managed nor recently seen from the guilds' caches.
+
+        Args:
+            guilds: The guilds to trim
+            keep_ids: Users to always keep, such as the bot itself
+
+        Returns:
+            int: How many members were dropped
+        """
+        now = time.monotonic()
+        # Forget activity too old to matter, so last_seen doesn't grow forever
+        self.last_seen = {key: at for key, at in self.last_seen.items() if now - at <= self.recent_seconds}
+        keep_ids = set(keep_ids)
+        removed = 0
+        for guild in guilds:
+            role_ids = self.managed_role_ids(guild)
+            for member in list(guild.members):
+                if member.id in keep_ids or (guild.id, member.id) in self.last_seen:
+                    continue
+                if any(member.get_role(role_id) is not None for role_id in role_ids):
+                    continue
+                # discord.py has no public way to evict a member, this is what it does when one leaves
+                guild._remove_member(member)
+                removed += 1
+        self.trimmed += removed
+        if removed:
+            log.info("Dropped %d inactive members from the member cache", removed)
+        return removed
+
+    def start(self, bot):
+        """Trim the bot's guilds every interval."""
+        if self.running:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._trim_every_interval(bot), name="member-cache-trim")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _trim_every_interval(self, bot):
+        await bot.wait_until_ready()
+        while True:
+            try:
+                self.trim(bot.guilds, keep_ids=[bot.user.id] if bot.user else [])
+            except Exception as e:
+                log.error("Error trimming the member cache: %s", e)
+            await asyncio.sleep(self.interval)
+
+
+@dataclasses.dataclass
+class CacheUsage:
+    name: str
+    count: int
+    bytes: int
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """
+    Bytes used by an object and everything it holds on its own.
+
+    Other discord.py models it points at, like a member's guild or user, are cached
+    separately and aren't counted, and neither is anything already seen.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+
+    attributes = []
+    for cls in type(obj).__mro__:
+        attributes.extend(getattr(cls, "__slots__", ()))
+    children = [getattr(obj, name, None) for name in attributes if not name.startswith("__")]
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+        children.extend(obj.__dict__.values())
+    for child in children:
+        if _is_shared(child):
+            continue
+        size += deep_sizeof(child, seen)
+    return size
+
+
+def _is_shared(obj) -> bool:
+    """Whether an attribute is held elsewhere: another discord.py model, the connection state or a function."""
+    if callable(obj):
+        return True
+    module = type(obj).__module__ or ""
+    return module.startswith("discord.") and (hasattr(obj, "id") or isinstance(obj, discord.state.ConnectionState)) \
+        or module.startswith("asyncio")
+
+
+def estimate_size(objects: List) -> int:
+    """Estimate the total size of a cache from a sample of its objects."""
+    if not objects:
+        return 0
+    step = max(1, len(objects) // SAMPLE_SIZE)
+    sample = objects[::step][:SAMPLE_SIZE]
+    sampled = sum(deep_sizeof(obj) for obj in sample)
+    return int(sampled * len(objects) / len(sample))
+
+
+def cache_report(bot) -> List[CacheUsage]:
+    """Estimate the memory used by each of the bot's caches, largest first."""
+    caches = {
+        "members": [member for guild in bot.guilds for member in guild.members],
+        "users": list(bot.users),
+        "messages": list(bot.cached_messages),
+        "channels": [channel for guild in bot.guilds for channel in guild.channels],
+        "roles": [role for guild in bot.guilds for role in guild.roles],
+        "emojis": list(bot.emojis),
+    }
+    report = [CacheUsage(name, len(objects), estimate_size(objects)) for name, objects in caches.items()]
+    return sorted(report, key=lambda usage: usage.bytes, reverse=True)
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """The process's resident memory, or None where /proc isn't available."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def get_member_cache_trimmer(bot) -> Optional[MemberCacheTrimmer]:
+    """Get the bot's member cache trimmer, or None if it isn't trimming."""
+    trimmer = getattr(bot, "member_cache_trimmer", None)
+    return trimmer if isinstance(trimmer, MemberCacheTrimmer) else None
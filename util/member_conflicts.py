@@ -0,0 +1,95 @@
+"""
+Checking applicants against the existing roster.
+
+An applicant clashes with a member if their RSN is the member's RSN, one of
+their alts or one of their previous names (someone re-joining under an old
+name), or if their Discord account is already registered. All of that is one
+query for any number of applicants, served by the lower(rsn) index, the
+discord_id_num unique index and a GIN index over the lowercased name arrays.
+"""
+import dataclasses
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Members holding any of %(rsns)s (lowercase) as their RSN, an alt or a previous name, or any of %(discord_ids)s.
+# member_alias_rsns is an immutable SQL function so the GIN index on it can be used, see sql/create-db.sql.
+CONFLICTING_MEMBERS_SQL = """
+    SELECT _id, rsn, discord_id_num, alt_rsn, previous_rsn
+    FROM member
+    WHERE lower(rsn) = ANY(%(rsns)s)
+    OR discord_id_num = ANY(%(discord_ids)s)
+    OR member_alias_rsns(alt_rsn, previous_rsn) && %(rsns)s::text[]
+"""
+
+RSN = "rsn"
+ALT_RSN = "alt_rsn"
+PREVIOUS_RSN = "previous_rsn"
+DISCORD_ID = "discord_id_num"
+
+
+@dataclasses.dataclass
+class MemberConflict:
+    """An existing member an applicant clashes with, and which of their fields matched."""
+    member_id: int
+    member_rsn: str
+    fields: Tuple[str, ...]
+
+    def describe(self, rsn: str, discord_id_num: int) -> str:
+        """Explain the clash to a leader."""
+        if RSN in self.fields and DISCORD_ID in self.fields:
+            return f"Both RSN '{rsn}' and Discord ID {discord_id_num} are already registered in the clan."
+        if RSN in self.fields:
+            return f"RSN '{rsn}' is already registered in the clan."
+        if ALT_RSN in self.fields:
+            return f"RSN '{rsn}' is registered as an alt of {self.member_rsn}."
+        if PREVIOUS_RSN in self.fields:
+            return f"RSN '{rsn}' is a previous name of {self.member_rsn}."
+        return f"Discord ID {discord_id_num} is already registered in the clan as {self.member_rsn}."
+
+
+def _lowered(names: Optional[Sequence[str]]) -> set:
+    return {name.lower() for name in names or [] if name}
+
+
+def find_conflicts(bot, applicants: Sequence[Tuple[str, int]]) -> List[List[MemberConflict]]:
+    """
+    Check applicants against the roster in one query.
+
+    Args:
+        bot: Used for the DB
+        applicants: (RSN, Discord ID) of each applicant
+
+    Returns:
+        list: The conflicts for each applicant, in the same order, empty for applicants who are clear
+    """
+    if not applicants:
+        return []
+    rows = bot.selectMany(CONFLICTING_MEMBERS_SQL, {
+        "rsns": list({rsn.lower() for rsn, _ in applicants}),
+        "discord_ids": list({discord_id_num for _, discord_id_num in applicants}),
+    }) or []
+
+    # The query matches the batch as a whole, work out which applicant each row belongs to
+    by_name: Dict[str, List[Tuple[int, str, str]]] = {}
+    by_discord_id: Dict[int, Tuple[int, str]] = {}
+    for member_id, rsn, discord_id_num, alt_rsn, previous_rsn in rows:
+        by_name.setdefault(rsn.lower(), []).append((member_id, rsn, RSN))
+        for name in _lowered(alt_rsn):
+            by_name.setdefault(name, []).append((member_id, rsn, ALT_RSN))
+        for name in _lowered(previous_rsn):
+            by_name.setdefault(name, []).append((member_id, rsn, PREVIOUS_RSN))
+        if discord_id_num is not None:
+            by_discord_id[discord_id_num] = (member_id, rsn)
+
+    results = []
+    for rsn, discord_id_num in applicants:
+        fields: Dict[int, List[str]] = {}
+        names = {}
+        for member_id, member_rsn, field in by_name.get(rsn.lower(), []):
+            fields.setdefault(member_id, []).append(field)
+            names[member_id] = member_rsn
+        if discord_id_num in by_discord_id:
+            member_id, member_rsn = by_discord_id[discord_id_num]
+            fields.setdefault(member_id, []).append(DISCORD_ID)
+            names[member_id] = member_rsn
+        results.append([MemberConflict(member_id, names[member_id], tuple(member_fields)) for member_id, member_fields in fields.items()])
+    return results
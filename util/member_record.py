@@ -0,0 +1,74 @@
+"""
+Typed member rows.
+
+Roster queries hand back thousands of member rows at once. Instead of indexing
+psycopg2 tuples by position, selectMany(..., row_factory=record_factory) hands
+them back as MemberRecords: namedtuples with a field for each selected column.
+A namedtuple is a tuple, so a record takes exactly the memory the row psycopg2
+fetched did and building one is a single C-level tuple copy, with no
+per-field conversion.
+
+Each set of columns gets its own MemberRecord type, built once and cached.
+"""
+import collections
+import enum
+import functools
+from typing import Callable, List, Optional, Sequence, Tuple, Type
+
+
+class MembershipLevel(enum.IntEnum):
+    """member.membership_level, in the same order as mem_level_names in config.json."""
+    TRIAL = 0
+    JUNIOR = 1
+    MEMBER = 2
+    SENIOR = 3
+    TENURED = 4
+    ESTEEMED = 5
+    MODERATOR = 6
+    CAPTAIN = 7
+    OWNER = 8
+
+
+# member column -> MemberRecord field
+COLUMNS = {
+    "_id": "id",
+    "rsn": "rsn",
+    "discord_id_num": "discord_id_num",
+    "discord_id": "discord_id",
+    "membership_level": "membership_level",
+    "join_date": "join_date",
+    "alt_rsn": "alt_rsn",
+    "previous_rsn": "previous_rsn",
+    "on_leave": "on_leave",
+    "on_leave_notes": "on_leave_notes",
+    "active": "active",
+}
+
+
+@functools.lru_cache(maxsize=64)
+def record_type(columns: Tuple[str, ...]) -> Type[tuple]:
+    """
+    Get the MemberRecord namedtuple for a query's columns.
+
+    Args:
+        columns: The query's column names, in order
+
+    Raises:
+        ValueError: If a column has no MemberRecord field
+    """
+    unknown = [column for column in columns if column not in COLUMNS]
+    if unknown:
+        raise ValueError(f"MemberRecord has no field for column(s): {', '.join(unknown)}")
+    return collections.namedtuple("MemberRecord", [COLUMNS[column] for column in columns])
+
+
+def record_factory(columns: Tuple[str, ...]) -> Callable[[Sequence], tuple]:
+    """Get the function turning a row with these columns into a MemberRecord, for selectMany's row_factory."""
+    return record_type(tuple(columns))._make
+
+
+def member_records(rows: Optional[Sequence[Sequence]], columns: Sequence[str]) -> Optional[List[tuple]]:
+    """Convert rows with the given columns, None (a failed query) stays None."""
+    if rows is None:
+        return None
+    return list(map(record_factory(tuple(columns)), rows))
@@ -0,0 +1,172 @@
+"""
+Dispatch table for forwarding non-command messages to cogs.
+
+The bot builds the table whenever a cog is added or removed, so handling a
+message is a walk over the cogs that actually have an on_message handler
+instead of a hasattr check on every cog. Each handler runs as its own task with
+a timeout, so a slow or broken cog can't hold up the others or the next message.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from util.metrics import LatencyHistogram
+
+log = logging.getLogger(__name__)
+
+
+def message_filter(channels: Iterable = None, categories: Iterable[str] = None):
+    """
+    Only forward messages from certain channels or categories to a cog's on_message handler.
+    The filter is checked before the handler is called.
+
+    Args:
+        channels: Channel IDs, or config keys that hold a channel ID (e.g. "application_channel_id")
+        categories: Category names (case insensitive)
+
+    Example:
+        @message_filter(channels=["application_channel_id"])
+        async def on_message(self, message):
+            ...
+    """
+    def decorator(func):
+        func.__message_filter__ = (
+            tuple(channels) if channels is not None else None,
+            tuple(categories) if categories is not None else None,
+        )
+        return func
+    return decorator
+
+
+class MessageHandler:
+    """A cog's on_message handler along with its channel/category filter."""
+    __slots__ = ("name", "callback", "channel_ids", "category_names")
+
+    def __init__(self, name: str, callback: Callable, channel_ids: Optional[frozenset] = None, category_names: Optional[frozenset] = None):
+        self.name = name
+        self.callback = callback
+        self.channel_ids = channel_ids
+        self.category_names = category_names
+
+    def accepts(self, message) -> bool:
+        """Check the handler's filters against a message."""
+        if self.channel_ids is not None and message.channel.id not in self.channel_ids:
+            return False
+        if self.category_names is not None:
+            category = getattr(message.channel, "category", None)
+            if category is None or category.name.upper() not in self.category_names:
+                return False
+        return True
+
+
+def build_message_handlers(cogs: Iterable, get_config_value: Callable) -> List[MessageHandler]:
+    """
+    Build the dispatch table for a set of cogs.
+
+    Handlers registered with @commands.Cog.listener() are skipped, discord.py already
+    dispatches those itself.
+
+    Args:
+        cogs: The loaded cogs
+        get_config_value: Used to look up channel IDs given as config keys
+
+    Returns:
+        list: A MessageHandler for each cog with an on_message handler
+    """
+    handlers = []
+    for cog in cogs:
+        callback = getattr(cog, "on_message", None)
+        if not callable(callback) or getattr(callback, "__cog_listener__", False):
+            continue
+
+        channels, categories = getattr(callback, "__message_filter__", (None, None))
+        channel_ids = None
+        if channels is not None:
+            channel_ids = set()
+            for channel in channels:
+                try:
+                    channel_ids.add(int(get_config_value(channel)) if isinstance(channel, str) else int(channel))
+                except (KeyError, TypeError, ValueError) as e:
+                    log.warning(f"Could not resolve channel {channel!r} for {cog.__class__.__name__}.on_message: {e}")
+            channel_ids = frozenset(channel_ids)
+        category_names = frozenset(name.upper() for name in categories) if categories is not None else None
+
+        handlers.append(MessageHandler(f"{cog.__class__.__name__}.on_message", callback, channel_ids, category_names))
+    return handlers
+
+
+class HandlerStats:
+    """Latency and failure counts for a single message handler."""
+    __slots__ = ("latency", "errors", "timeouts")
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.timeouts = 0
+
+    def summary(self) -> Dict:
+        return {**self.latency.summary(), "errors": self.errors, "timeouts": self.timeouts}
+
+
+class MessageDispatcher:
+    """
+    Runs cog on_message handlers concurrently.
+
+    Every accepted handler is started as a task, at most `concurrency` handlers run
+    at once and each one is cancelled after `timeout` seconds.
+    """
+    def __init__(self, timeout: float = 10.0, concurrency: int = 32):
+        self.timeout = timeout
+        self.handlers: List[MessageHandler] = []
+        self.stats: Dict[str, HandlerStats] = {}
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        # Strong references to running tasks so they aren't garbage collected mid-run
+        self._tasks = set()
+
+    def rebuild(self, cogs: Iterable, get_config_value: Callable):
+        """Rebuild the handler table from the loaded cogs."""
+        self.handlers = build_message_handlers(cogs, get_config_value)
+
+    def dispatch(self, message) -> List[asyncio.Task]:
+        """
+        Start a task for each handler that accepts the message.
+
+        Returns:
+            list: The started tasks
+        """
+        tasks = []
+        for handler in self.handlers:
+            if not handler.accepts(message):
+                continue
+            task = asyncio.create_task(self._run(handler, message), name=f"{handler.name}:{message.id}")
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            tasks.append(task)
+        return tasks
+
+    async def _run(self, handler: MessageHandler, message):
+        stats = self.stats.setdefault(handler.name, HandlerStats())
+        async with self._slots:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(handler.callback(message), self.timeout)
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                log.warning(f"{handler.name} timed out after {self.timeout}s on message {message.id}")
+            except Exception as e:
+                stats.errors += 1
+                log.error(f"Error in {handler.name}: {e}")
+            finally:
+                stats.latency.record((time.perf_counter() - started) * 1000)
+
+    async def close(self):
+        """Cancel any handlers that are still running."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def summary(self) -> Dict[str, Dict]:
+        """Get the stats for each handler that has run."""
+        return {name: stats.summary() for name, stats in self.stats.items()}
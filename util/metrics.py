@@ -0,0 +1,61 @@
+"""
+In-process latency metrics.
+
+Keeps a bounded window of recent samples so percentiles reflect current
+behaviour and memory use stays flat however long the bot runs.
+"""
+import collections
+import math
+from typing import Dict, Iterable, Optional
+
+
+def percentile(samples: Iterable[float], pct: float) -> Optional[float]:
+    """
+    Get a percentile of some samples using the nearest-rank method.
+
+    Args:
+        samples: The samples
+        pct: The percentile to get, from 0 to 100
+
+    Returns:
+        float: The percentile, or None if there are no samples
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class LatencyHistogram:
+    """Latency samples in milliseconds over a sliding window."""
+    def __init__(self, window: int = 1000):
+        self.samples = collections.deque(maxlen=window)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float):
+        self.samples.append(elapsed_ms)
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        return percentile(self.samples, pct)
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """Get the count, mean, p50/p95/p99 and max of the recorded samples."""
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "p50_ms": _rounded(percentile(ordered, 50)),
+            "p95_ms": _rounded(percentile(ordered, 95)),
+            "p99_ms": _rounded(percentile(ordered, 99)),
+            "max_ms": round(self.max_ms, 1) if self.count else None,
+        }
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
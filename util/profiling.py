@@ -0,0 +1,177 @@
+"""
+On-demand profilers for the running bot.
+
+Nothing here costs anything until a profile is started: the sampling profiler
+is a background thread that only exists while it runs, cProfile is only
+enabled for the length of a profile and tracemalloc is only tracing while a
+snapshot is being taken.
+"""
+import cProfile
+import collections
+import io
+import linecache
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Counter, Optional, Tuple
+
+PROFILE_MODES = ("sampling", "cprofile")
+
+Frame = Tuple[str, int, str]
+
+
+def _frame_label(frame: Frame) -> str:
+    filename, lineno, name = frame
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the event loop thread's stack from a background thread.
+
+    The loop itself isn't slowed down beyond the GIL switches the sampler
+    needs, so this is the one to use on a busy bot.
+
+    Args:
+        interval: Seconds between samples
+    """
+    mode = "sampling"
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        # Whole stacks, root first, as (filename, first line, function name)
+        self.stacks: Counter[Tuple[Frame, ...]] = collections.Counter()
+        self.started: Optional[float] = None
+        self.stopped: Optional[float] = None
+        self._thread_id: Optional[int] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sampling the calling thread, which should be the event loop's."""
+        self._thread_id = threading.get_ident()
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.stopped = time.monotonic()
+
+    def _sample(self):
+        while not self._stopping.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            del frame
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+
+    def report(self, limit: int = 30) -> str:
+        """Get the functions seen most often, on their own and including their callees, then every stack collapsed."""
+        own: Counter[Frame] = collections.Counter()
+        total: Counter[Frame] = collections.Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for frame in set(stack):
+                total[frame] += count
+
+        elapsed = (self.stopped or time.monotonic()) - (self.started or time.monotonic())
+        lines = [f"Sampling profile: {self.samples} samples over {elapsed:.1f}s every {self.interval * 1000:.0f}ms", ""]
+        for title, counts in (("Own time (top of the stack)", own), ("Total time (anywhere in the stack)", total)):
+            lines.append(title)
+            for frame, count in counts.most_common(limit):
+                lines.append(f"{count / max(self.samples, 1):>7.1%} {count:>7}  {_frame_label(frame)}")
+            lines.append("")
+        # Collapsed stacks, the input format of flamegraph.pl and speedscope
+        lines.append("Collapsed stacks")
+        for stack, count in self.stacks.most_common():
+            lines.append(f"{';'.join(frame[2] for frame in stack)} {count}")
+        return "\n".join(lines)
+
+
+class CProfileProfiler:
+    """
+    Deterministic profile of everything the event loop runs, using cProfile.
+
+    Exact call counts and times, but it slows every Python call down while
+    it is running.
+    """
+    mode = "cprofile"
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.started: Optional[float] = None
+        self.stopped: Optional[float] = None
+
+    def start(self):
+        """Start profiling the calling thread, which should be the event loop's."""
+        self.started = time.monotonic()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.stopped = time.monotonic()
+
+    def report(self, limit: int = 40) -> str:
+        elapsed = (self.stopped or time.monotonic()) - (self.started or time.monotonic())
+        stream = io.StringIO()
+        stream.write(f"cProfile: {elapsed:.1f}s\n\n")
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(limit)
+        return stream.getvalue()
+
+
+def make_profiler(mode: str):
+    """Get a profiler for one of PROFILE_MODES."""
+    if mode == "sampling":
+        return SamplingProfiler()
+    if mode == "cprofile":
+        return CProfileProfiler()
+    raise ValueError(f"Unknown profile mode {mode}, choose from {', '.join(PROFILE_MODES)}")
+
+
+def format_allocations(snapshot: tracemalloc.Snapshot, previous: Optional[tracemalloc.Snapshot] = None, limit: int = 25) -> str:
+    """
+    Get the lines allocating the most memory in a tracemalloc snapshot.
+
+    Args:
+        snapshot: The snapshot to report on
+        previous: An earlier snapshot, to also report what grew since then
+        limit: How many lines to include in each section
+    """
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    stats = snapshot.statistics("lineno")
+    total = sum(stat.size for stat in stats)
+    lines = [f"tracemalloc: {total / 1024:.1f} KiB traced in {sum(stat.count for stat in stats)} blocks", ""]
+
+    lines.append(f"Top {limit} lines by size")
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:>10.1f} KiB {stat.count:>8} blocks  {frame.filename}:{frame.lineno}")
+        source = linecache.getline(frame.filename, frame.lineno).strip()
+        if source:
+            lines.append(f"{'':>33}{source}")
+
+    if previous is not None:
+        lines.append("")
+        lines.append(f"Top {limit} lines by growth")
+        for stat in snapshot.compare_to(previous, "lineno")[:limit]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size_diff / 1024:>+10.1f} KiB {stat.count_diff:>+8} blocks  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines)
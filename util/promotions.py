@@ -0,0 +1,194 @@
+"""
+Promotion schedule for clan members.
+
+Members are promoted on time served: level N+1 is due `promotion_days[N]`
+days after they joined. A member's next promotion date therefore follows from
+the level they hold, and is in the past for a member who is behind, which is
+what makes them overdue. The member_next_promotion_date trigger stores the
+same date in member.next_promotion_date. Beyond `auto_promotion_max_level`
+promotions are still scheduled, but leaders grant them by hand, so a member
+isn't expected to hold a level above it.
+
+Single members are answered with a bisect over the thresholds, the whole
+roster in one NumPy pass.
+"""
+import bisect
+import dataclasses
+import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_PROMOTION_DAYS = (14, 84, 182, 365)
+DEFAULT_AUTO_PROMOTION_MAX_LEVEL = 3
+
+# Rows for PromotionSchedule.promotions_due, members due on or before %(until)s.
+# member.next_promotion_date is kept up to date by a trigger and this is a range scan on its index.
+PROMOTIONS_DUE_SQL = """
+    SELECT _id, rsn, discord_id, membership_level, join_date
+    FROM member
+    WHERE next_promotion_date <= %(until)s
+    AND active IS NOT FALSE
+    ORDER BY next_promotion_date
+"""
+
+PROMOTION_THRESHOLDS_SQL = "SELECT membership_level, days FROM promotion_threshold ORDER BY membership_level"
+
+# Recalculate next_promotion_date after the thresholds change, only touching the rows that move
+RECALCULATE_NEXT_PROMOTION_SQL = """
+    UPDATE member
+    SET next_promotion_date = join_date + (
+        SELECT days FROM promotion_threshold WHERE promotion_threshold.membership_level = member.membership_level
+    )
+    WHERE next_promotion_date IS DISTINCT FROM join_date + (
+        SELECT days FROM promotion_threshold WHERE promotion_threshold.membership_level = member.membership_level
+    )
+"""
+
+# Replace every threshold with the levels %s and days %s, and recalculate next_promotion_date.
+# One statement, so it's one transaction: a failure leaves the old thresholds and dates in place.
+REPLACE_PROMOTION_THRESHOLDS_SQL = """
+    DELETE FROM promotion_threshold;
+    INSERT INTO promotion_threshold (membership_level, days)
+    SELECT * FROM unnest(%s::integer[], %s::integer[]);
+""" + RECALCULATE_NEXT_PROMOTION_SQL
+
+
+def coerce_date(value) -> Optional[datetime.date]:
+    """Get a date from a date, datetime or YYYY-MM-DD string, or None if it isn't one."""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            return None
+    return None
+
+
+@dataclasses.dataclass
+class PromotionDue:
+    """A member whose next promotion falls inside a report's window, or has already passed."""
+    member_id: int
+    rsn: str
+    discord_id: Optional[str]
+    level: int
+    expected_level: int
+    due_date: datetime.date
+    overdue: bool
+
+
+class PromotionSchedule:
+    """
+    Promotion thresholds and the dates and levels that follow from them.
+
+    Args:
+        promotion_days: Days after joining each level is due, starting with level 1
+        auto_promotion_max_level: The highest level members are expected to reach on time alone
+    """
+    def __init__(self, promotion_days: Sequence[int] = DEFAULT_PROMOTION_DAYS, auto_promotion_max_level: int = DEFAULT_AUTO_PROMOTION_MAX_LEVEL):
+        if list(promotion_days) != sorted(promotion_days):
+            raise ValueError(f"promotion_days must be in increasing order, got {promotion_days}")
+        self.promotion_days = tuple(int(days) for days in promotion_days)
+        self.auto_promotion_max_level = auto_promotion_max_level
+        self._thresholds = np.array(self.promotion_days, dtype="timedelta64[D]")
+
+    @classmethod
+    def from_config(cls, configs: dict) -> "PromotionSchedule":
+        return cls(
+            configs.get("promotion_days", DEFAULT_PROMOTION_DAYS),
+            int(configs.get("auto_promotion_max_level", DEFAULT_AUTO_PROMOTION_MAX_LEVEL)),
+        )
+
+    def thresholds(self) -> List[Tuple[int, int]]:
+        """Get (membership level, days) rows for the promotion_threshold table."""
+        return list(enumerate(self.promotion_days))
+
+    @property
+    def max_scheduled_level(self) -> int:
+        """The highest level that has a promotion date."""
+        return len(self.promotion_days)
+
+    # Single members
+
+    def expected_level(self, join_date: datetime.date, today: Optional[datetime.date] = None) -> int:
+        """Get the level a member should have reached by `today` from time served alone."""
+        days = ((today or datetime.date.today()) - join_date).days
+        return min(bisect.bisect_right(self.promotion_days, days), self.auto_promotion_max_level)
+
+    def due_date(self, level: int, join_date: datetime.date) -> Optional[datetime.date]:
+        """
+        Get the date a member at `level` is due their next promotion, or None if it isn't scheduled.
+        This is the rule set_next_promotion_date in sql/create-db.sql follows.
+        """
+        if not 0 <= level < len(self.promotion_days):
+            return None
+        return join_date + datetime.timedelta(days=self.promotion_days[level])
+
+    # The whole roster
+
+    def roster(self, levels: Iterable[int], join_dates: Iterable, today: Optional[datetime.date] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Work out expected levels and due dates for many members at once.
+
+        Args:
+            levels: Each member's current level
+            join_dates: Each member's join date, None if unknown
+            today: The date to compare against, defaults to today
+
+        Returns:
+            tuple: (expected levels, due dates as datetime64[D] with NaT where no promotion is scheduled).
+            Members without a join date keep their current level as the expected one.
+        """
+        levels = np.fromiter(levels, dtype=np.int64)
+        join_dates = np.array(list(join_dates), dtype="datetime64[D]")
+        known = ~np.isnat(join_dates)
+
+        served = np.datetime64(today or datetime.date.today(), "D") - join_dates
+        passed = np.searchsorted(self._thresholds, served, side="right")
+        expected = np.where(known, np.minimum(passed, self.auto_promotion_max_level), levels)
+
+        scheduled = known & (levels >= 0) & (levels < len(self.promotion_days))
+        thresholds = self._thresholds[np.clip(levels, 0, len(self.promotion_days) - 1)]
+        due = np.where(scheduled, join_dates + thresholds, np.datetime64("NaT", "D"))
+        return expected, due
+
+    def promotions_due(self, members: Sequence[tuple], within_days: int = 7, today: Optional[datetime.date] = None) -> List[PromotionDue]:
+        """
+        Get the members due a promotion in the next `within_days` days, including any that are overdue.
+
+        Args:
+            members: (member_id, rsn, discord_id, membership_level, join_date) rows
+            within_days: How many days ahead to look
+            today: The date to report from, defaults to today
+
+        Returns:
+            list: PromotionDue for every member due, earliest first
+        """
+        if not members:
+            return []
+        today = today or datetime.date.today()
+        expected, due = self.roster((row[3] for row in members), (row[4] for row in members), today)
+        today64 = np.datetime64(today, "D")
+        selected = np.flatnonzero(~np.isnat(due) & (due <= today64 + np.timedelta64(within_days, "D")))
+        selected = selected[np.argsort(due[selected], kind="stable")]
+        return [
+            PromotionDue(
+                member_id=members[i][0],
+                rsn=members[i][1],
+                discord_id=members[i][2],
+                level=int(members[i][3]),
+                expected_level=int(expected[i]),
+                due_date=due[i].astype(datetime.date),
+                overdue=bool(due[i] < today64),
+            )
+            for i in selected
+        ]
+
+
+def get_schedule(bot) -> PromotionSchedule:
+    """Get the bot's promotion schedule, or the default one if it hasn't got one."""
+    schedule = getattr(bot, "promotion_schedule", None)
+    return schedule if isinstance(schedule, PromotionSchedule) else PromotionSchedule()
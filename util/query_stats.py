@@ -0,0 +1,118 @@
+"""
+Per-query timing for the bot's DB helpers.
+
+Queries are grouped by fingerprint (the statement with literals and parameters
+replaced by ?) so the same query with different arguments is counted together.
+Each query is tagged with the command that ran it, or the module that called
+the DB helper when it wasn't run from a command.
+"""
+import collections
+import functools
+import logging
+import re
+from typing import Dict, List, Optional
+
+from util.command_timing import current_command
+from util.metrics import LatencyHistogram
+
+log = logging.getLogger(__name__)
+slow_query_log = logging.getLogger('discord.slow_query')
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMS = re.compile(r"%\(\w+\)s|%s")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint_query(query: str) -> str:
+    """
+    Normalise a statement so queries that only differ by their values group together.
+
+    Example:
+        "SELECT * FROM member WHERE rsn = %s  AND _id IN (1, 2)" -> "SELECT * FROM member WHERE rsn = ? AND _id IN (?...)"
+    """
+    query = _COMMENTS.sub(" ", query)
+    query = _STRINGS.sub("?", query)
+    query = _PARAMS.sub("?", query)
+    query = _NUMBERS.sub("?", query)
+    query = _LISTS.sub("(?...)", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class QueryStat:
+    """Aggregated timings for a single query fingerprint."""
+    __slots__ = ("fingerprint", "latency", "rows_total", "rows_max", "errors", "tags")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.latency = LatencyHistogram()
+        self.rows_total = 0
+        self.rows_max = 0
+        self.errors = 0
+        self.tags = collections.Counter()
+
+    def summary(self) -> Dict:
+        summary = self.latency.summary()
+        return {
+            "fingerprint": self.fingerprint,
+            **summary,
+            "total_ms": round(self.latency.total_ms, 1),
+            "mean_rows": round(self.rows_total / summary["count"], 1) if summary["count"] else None,
+            "max_rows": self.rows_max,
+            "errors": self.errors,
+            "tags": dict(self.tags.most_common(3)),
+        }
+
+
+class QueryStats:
+    """
+    Query timings for the bot, grouped by fingerprint.
+
+    Args:
+        slow_threshold_ms: Queries slower than this are logged to discord.slow_query, give it
+            its own file with "files" in the logging config (see util/logging_setup.py)
+    """
+    def __init__(self, slow_threshold_ms: float = 200):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.queries: Dict[str, QueryStat] = {}
+
+    def record(self, query: str, elapsed_ms: float, rows: int = 0, tag: Optional[str] = None, error: bool = False):
+        """Record a single query execution."""
+        fingerprint = fingerprint_query(query)
+        stat = self.queries.get(fingerprint)
+        if stat is None:
+            stat = self.queries[fingerprint] = QueryStat(fingerprint)
+        command = current_command.get()
+        if command is not None:
+            # Count the query towards the running command's DB time
+            command.db_ms += elapsed_ms
+            tag = command.name
+        tag = tag or "unknown"
+
+        stat.latency.record(elapsed_ms)
+        stat.rows_total += rows
+        stat.rows_max = max(stat.rows_max, rows)
+        stat.tags[tag] += 1
+        if error:
+            stat.errors += 1
+
+        if elapsed_ms >= self.slow_threshold_ms:
+            slow_query_log.warning(f"{elapsed_ms:.1f}ms rows={rows} tag={tag} {fingerprint}")
+
+    def top(self, limit: int = 10, order_by: str = "total_ms") -> List[Dict]:
+        """
+        Get the summaries of the most expensive queries.
+
+        Args:
+            limit: How many queries to return
+            order_by: The summary field to sort by, e.g. total_ms, p95_ms, count or max_rows
+        """
+        summaries = [stat.summary() for stat in self.queries.values()]
+        summaries.sort(key=lambda summary: summary[order_by] or 0, reverse=True)
+        return summaries[:limit]
+
+    def reset(self):
+        self.queries.clear()
@@ -0,0 +1,220 @@
+"""
+Cache of rendered responses for read-only commands.
+
+Informational commands like /comp-history or /yellowpages run the same queries
+and build the same messages every time someone asks. Their rendered messages are
+cached under (command, arguments, data version), where the data version is a
+counter per table the command reads that goes up whenever the bot writes to the
+table. A write therefore makes every response built from the old data
+unreachable straight away. Responses are also dropped after ttl_seconds, which
+bounds how stale one can get after a change made outside the bot, and the least
+recently used ones are dropped past max_entries.
+
+Writes are seen by execute_query, which hands each statement to
+invalidate_query. Only the tables cached responses read are versioned, so
+writes elsewhere (like logging every command to command_usage) cost nothing.
+Clustered bots pass the invalidated tables on to the other clusters, since each
+process has its own cache. Cogs declare the tables their cached commands read
+with cache_tables when they load, so a cluster passes on writes to them even
+before it has cached anything itself.
+"""
+import collections
+import dataclasses
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 300
+
+# The table an INSERT, UPDATE, DELETE or TRUNCATE writes to, or a CREATE TABLE or DROP TABLE makes or drops
+_WRITE_TABLE = re.compile(
+    r"^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?"
+    r"|CREATE\s+(?:TEMP(?:ORARY)?\s+)?TABLE(?:\s+IF\s+NOT\s+EXISTS)?|DROP\s+TABLE(?:\s+IF\s+EXISTS)?)"
+    r"\s+(?:ONLY\s+)?(\w+)",
+    re.IGNORECASE,
+)
+_READ_ONLY = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+# A rendered response: the keyword arguments for each followup.send, in order
+Messages = List[Dict[str, Any]]
+
+
+@dataclasses.dataclass
+class RenderStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclasses.dataclass
+class _Entry:
+    messages: Messages
+    tables: Tuple[str, ...]
+    expires_at: float
+
+
+class RenderCache:
+    """
+    Rendered responses by command, arguments and the versions of the tables they read.
+
+    Args:
+        max_entries: Responses kept before the least recently used is dropped
+        ttl_seconds: How long a response is served for
+    """
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "collections.OrderedDict[Tuple, _Entry]" = collections.OrderedDict()
+        self.versions: Dict[str, int] = collections.defaultdict(int)
+        # Every table a cached response reads, writes to any other table are ignored
+        self.tables: Set[str] = set()
+        self.stats: Dict[str, RenderStats] = collections.defaultdict(RenderStats)
+
+    @classmethod
+    def from_config(cls, settings: Optional[Dict]) -> "RenderCache":
+        """Build the cache from the "render_cache" section of the config."""
+        settings = settings or {}
+        return cls(
+            max_entries=int(settings.get("max_entries", DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=float(settings.get("ttl_seconds", DEFAULT_TTL_SECONDS)),
+        )
+
+    def depends_on(self, *tables: str):
+        """Note that cached responses read these tables, so writes to them invalidate."""
+        self.tables.update(tables)
+
+    def key(self, command: str, args: Tuple[Hashable, ...], tables: Iterable[str]) -> Tuple:
+        tables = tuple(tables)
+        return (command, args, tables, tuple(self.versions[table] for table in tables))
+
+    def get(self, command: str, args: Tuple[Hashable, ...], tables: Iterable[str]) -> Optional[Messages]:
+        """Get a cached response, counting the hit or miss for the command."""
+        key = self.key(command, args, tables)
+        entry = self.entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            del self.entries[key]
+            entry = None
+        if entry is None:
+            self.stats[command].misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats[command].hits += 1
+        return entry.messages
+
+    def put(self, command: str, args: Tuple[Hashable, ...], tables: Iterable[str], messages: Messages):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        key = self.key(command, args, tables)
+        self.depends_on(*key[2])
+        self.entries[key] = _Entry(messages, key[2], time.monotonic() + self.ttl_seconds)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get_or_render(self, command: str, args: Tuple[Hashable, ...], tables: Iterable[str],
+                      render: Callable[[], Optional[Messages]]) -> Optional[Messages]:
+        """
+        Get a cached response or render and cache a new one.
+
+        Args:
+            command: The command's name
+            args: The arguments the response depends on, including the user if it mentions them
+            tables: Every table render reads
+            render: Builds the response, returning None if it couldn't (e.g. a failed query),
+                which isn't cached
+
+        Returns:
+            list: The response's messages, or None if render failed
+        """
+        tables = tuple(tables)
+        self.depends_on(*tables)
+        messages = self.get(command, args, tables)
+        if messages is None:
+            messages = render()
+            if messages is not None:
+                self.put(command, args, tables, messages)
+        return messages
+
+    def invalidate(self, *tables: str):
+        """Note that tables have changed, so nothing rendered from them is served again."""
+        tables = set(tables)
+        for table in tables:
+            self.versions[table] += 1
+        # The old entries can't be reached any more, drop them now rather than waiting for them to expire
+        for key in [key for key, entry in self.entries.items() if tables.intersection(entry.tables)]:
+            del self.entries[key]
+
+    def invalidate_all(self):
+        log.debug("Dropping every cached response")
+        self.invalidate(*{table for entry in self.entries.values() for table in entry.tables})
+
+    def invalidate_query(self, query: str) -> Optional[Set[str]]:
+        """
+        Invalidate whatever the statements run through execute_query may have changed.
+
+        Returns:
+            set: The tables cached responses read that were invalidated, empty if none
+            were written to, and None if a statement couldn't be matched to a table,
+            in which case everything was invalidated
+        """
+        changed = set()
+        for statement in query.split(";"):
+            if not statement.strip() or _READ_ONLY.match(statement):
+                continue
+            match = _WRITE_TABLE.match(statement)
+            if match is None:
+                self.invalidate_all()
+                return None
+            changed.add(match.group(1).lower())
+        changed &= self.tables
+        if changed:
+            self.invalidate(*changed)
+        return changed
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        """Hits and misses per command, for /cache-stats."""
+        return {command: dataclasses.asdict(stats) for command, stats in sorted(self.stats.items())}
+
+
+def get_render_cache(bot) -> Optional[RenderCache]:
+    """Get the bot's render cache, or None if it hasn't got one."""
+    cache = getattr(bot, "render_cache", None)
+    return cache if isinstance(cache, RenderCache) else None
+
+
+def cache_tables(bot, *tables: str):
+    """Declare tables a cog's cached commands read, if the bot has a render cache."""
+    cache = get_render_cache(bot)
+    if cache is not None:
+        cache.depends_on(*tables)
+
+
+def render_cached(bot, command: str, args: Tuple[Hashable, ...], tables: Iterable[str],
+                  render: Callable[[], Optional[Messages]]) -> Optional[Messages]:
+    """Render through the bot's cache if it has one, or render every time if it hasn't."""
+    cache = get_render_cache(bot)
+    if cache is None:
+        return render()
+    return cache.get_or_render(command, args, tables, render)
+
+
+async def send_messages(interaction, messages: Optional[Messages]):
+    """Send a rendered response as followups to a deferred interaction, or an error if it couldn't be rendered."""
+    if messages is None:
+        await interaction.followup.send("❌ Couldn't load that right now, please try again shortly.", ephemeral=True)
+        return
+    for message in messages:
+        # Content is passed positionally, like every other followup the cogs send
+        options = {name: value for name, value in message.items() if name != "content"}
+        if "content" in message:
+            await interaction.followup.send(message["content"], **options)
+        else:
+            await interaction.followup.send(**options)
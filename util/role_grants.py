@@ -0,0 +1,141 @@
+"""
+Granting Discord roles without running into the rate limits.
+
+Role changes for a guild share a rate limit bucket, so granting a role to a
+batch of members at once just queues the requests up behind 429s. Grants go
+through one worker that spaces them out with a token bucket and waits out
+retry_after if Discord still asks it to slow down.
+"""
+import asyncio
+import dataclasses
+import logging
+import time
+from typing import Optional
+
+import discord
+
+log = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class RoleGrant:
+    member: discord.Member
+    roles: tuple
+    reason: Optional[str]
+    future: asyncio.Future
+
+
+def _retry_after(error) -> Optional[float]:
+    """Get how long to wait before retrying, or None if the error isn't a rate limit."""
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    if error.status == 429:
+        headers = getattr(error.response, "headers", None) or {}
+        try:
+            return float(headers.get("Retry-After", 1.0))
+        except (TypeError, ValueError):
+            return 1.0
+    return None
+
+
+class RoleGrantQueue:
+    """
+    Grants roles one at a time at a steady rate.
+
+    Args:
+        rate_per_second: Grants per second once the burst is used up
+        burst: Grants that can go out back to back
+        max_attempts: Tries per grant when Discord rate limits it
+    """
+    def __init__(self, rate_per_second: float = 2.0, burst: int = 5, max_attempts: int = 3):
+        self.rate = rate_per_second
+        self.burst = max(1, burst)
+        self.max_attempts = max(1, max_attempts)
+        self.granted = 0
+        self.rate_limited = 0
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def submit(self, member: discord.Member, *roles, reason: Optional[str] = None) -> asyncio.Future:
+        """
+        Queue a grant. The future resolves to True once the roles are added, False if the
+        member already had them all, or to the error if adding them failed.
+        """
+        future = asyncio.get_running_loop().create_future()
+        have = {role.id for role in getattr(member, "roles", None) or []}
+        missing = tuple(role for role in roles if role.id not in have)
+        if not missing:
+            future.set_result(False)
+            return future
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._work(), name="role-grants")
+        self._queue.put_nowait(RoleGrant(member, missing, reason, future))
+        return future
+
+    async def grant(self, member: discord.Member, *roles, reason: Optional[str] = None) -> bool:
+        """Queue a grant and wait for it, see submit."""
+        return await self.submit(member, *roles, reason=reason)
+
+    async def stop(self):
+        """Stop the worker, grants still queued are cancelled."""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            self._queue.get_nowait().future.cancel()
+
+    async def _take_token(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    async def _work(self):
+        while True:
+            grant = await self._queue.get()
+            if grant.future.cancelled():
+                continue
+            try:
+                await self._apply(grant)
+                self.granted += 1
+                grant.future.set_result(True)
+            except asyncio.CancelledError:
+                grant.future.cancel()
+                raise
+            except Exception as e:
+                if not grant.future.cancelled():
+                    grant.future.set_exception(e)
+
+    async def _apply(self, grant: RoleGrant):
+        for attempt in range(1, self.max_attempts + 1):
+            await self._take_token()
+            try:
+                await grant.member.add_roles(*grant.roles, reason=grant.reason)
+                return
+            except (discord.HTTPException, discord.RateLimited) as e:
+                retry_after = _retry_after(e)
+                if retry_after is None or attempt == self.max_attempts:
+                    raise
+                self.rate_limited += 1
+                log.warning("Rate limited granting roles to %s, retrying in %.1fs", grant.member, retry_after)
+                # Nothing else can go out until the bucket resets
+                self._tokens = 0
+                await asyncio.sleep(retry_after)
+
+
+def get_role_grants(bot) -> Optional[RoleGrantQueue]:
+    """Get the bot's role grant queue, or None if it hasn't got one."""
+    queue = getattr(bot, "role_grants", None)
+    return queue if isinstance(queue, RoleGrantQueue) else None
@@ -0,0 +1,117 @@
+"""
+Startup helpers for CoffeeHouseBot.
+
+Works out the order cogs are loaded in from their declared dependencies and
+records how long each cog took to import and set up, so slow restarts can be
+tracked down.
+"""
+import dataclasses
+import time
+from typing import Dict, Iterable, List, Optional
+
+# Every cog depends on base_cog unless the config says otherwise
+DEFAULT_COG_DEPENDENCIES = {"*": ["cogs.base_cog"]}
+
+
+@dataclasses.dataclass
+class CogLoadTiming:
+    """Timing for a single cog (extension) load."""
+    name: str
+    stage: int
+    import_ms: float = 0.0
+    setup_ms: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.error is None
+
+    @property
+    def total_ms(self) -> float:
+        return self.import_ms + self.setup_ms
+
+
+@dataclasses.dataclass
+class StartupReport:
+    """Structured record of a bot start, from __init__ to the first on_ready."""
+    started: float = dataclasses.field(default_factory=time.perf_counter)
+    cogs: List[CogLoadTiming] = dataclasses.field(default_factory=list)
+    cog_load_ms: float = 0.0
+    ready_ms: Optional[float] = None
+
+    def mark_ready(self):
+        """Record the time-to-ready. Only the first call counts."""
+        if self.ready_ms is None:
+            self.ready_ms = (time.perf_counter() - self.started) * 1000
+
+    def to_dict(self) -> Dict:
+        return {
+            "cog_load_ms": round(self.cog_load_ms, 1),
+            "ready_ms": round(self.ready_ms, 1) if self.ready_ms is not None else None,
+            "cogs": [
+                {
+                    "name": timing.name,
+                    "stage": timing.stage,
+                    "import_ms": round(timing.import_ms, 1),
+                    "setup_ms": round(timing.setup_ms, 1),
+                    "loaded": timing.loaded,
+                    "error": timing.error,
+                }
+                for timing in self.cogs
+            ],
+        }
+
+    def summary_lines(self) -> List[str]:
+        """Human readable summary, slowest cogs first."""
+        lines = [f"Loaded {sum(t.loaded for t in self.cogs)}/{len(self.cogs)} cogs in {self.cog_load_ms:.1f}ms"]
+        for timing in sorted(self.cogs, key=lambda t: t.total_ms, reverse=True):
+            status = "ok" if timing.loaded else f"FAILED ({timing.error})"
+            lines.append(
+                f"  [stage {timing.stage}] {timing.name}: import {timing.import_ms:.1f}ms, "
+                f"setup {timing.setup_ms:.1f}ms - {status}"
+            )
+        if self.ready_ms is not None:
+            lines.append(f"Time to ready: {self.ready_ms:.1f}ms")
+        return lines
+
+
+def plan_cog_load_stages(cogs: Iterable[str], dependencies: Dict[str, List[str]] = None) -> List[List[str]]:
+    """
+    Group cogs into stages that can be loaded concurrently.
+
+    Args:
+        cogs: The cogs to load, in config order
+        dependencies: Map of cog -> cogs it must be loaded after. The key "*"
+            applies to every cog. Dependencies on cogs that are not being
+            loaded are ignored.
+
+    Returns:
+        list: Stages of cog names. Every cog in a stage only depends on cogs in
+        earlier stages. Cogs caught in a dependency cycle are loaded one at a
+        time, in config order, after everything else.
+    """
+    cogs = list(dict.fromkeys(cogs))
+    dependencies = DEFAULT_COG_DEPENDENCIES if dependencies is None else dependencies
+    wildcard = dependencies.get("*", [])
+
+    pending = {}
+    for cog in cogs:
+        deps = set(dependencies.get(cog, []))
+        # Cogs listed under "*" are the shared base, they don't wait on each other
+        if cog not in wildcard:
+            deps.update(wildcard)
+        pending[cog] = (deps & set(cogs)) - {cog}
+
+    stages = []
+    done = set()
+    while pending:
+        ready = [cog for cog in cogs if cog in pending and pending[cog] <= done]
+        if not ready:
+            # Dependency cycle - fall back to sequential loading
+            stages.extend([cog] for cog in cogs if cog in pending)
+            break
+        stages.append(ready)
+        done.update(ready)
+        for cog in ready:
+            del pending[cog]
+    return stages
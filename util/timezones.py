@@ -0,0 +1,144 @@
+"""
+Recognising timezones in free text, such as the location answer of an application.
+
+Abbreviations and names people write ("EST", "Pacific Time") are aliases of
+IANA zones, so members' local times can be worked out from what is stored.
+All aliases, UTC/GMT offsets and IANA names are compiled into one alternation
+and the whole answer is matched in a single scan.
+"""
+import dataclasses
+import logging
+import re
+import zoneinfo
+from typing import Iterable, Mapping, Optional, Tuple, Union
+
+log = logging.getLogger(__name__)
+
+UNKNOWN_TIMEZONE = "Unknown"
+
+DEFAULT_TIMEZONE_ALIASES = {
+    "UTC": "UTC",
+    "GMT": "Etc/GMT",
+    "EST": "America/New_York",
+    "EDT": "America/New_York",
+    "Eastern Time": "America/New_York",
+    "CST": "America/Chicago",
+    "CDT": "America/Chicago",
+    "Central Time": "America/Chicago",
+    "MST": "America/Denver",
+    "MDT": "America/Denver",
+    "Mountain Time": "America/Denver",
+    "PST": "America/Los_Angeles",
+    "PDT": "America/Los_Angeles",
+    "Pacific Time": "America/Los_Angeles",
+    "AKST": "America/Anchorage",
+    "Alaska Time": "America/Anchorage",
+    "HST": "Pacific/Honolulu",
+    "Hawaii Time": "Pacific/Honolulu",
+    "AST": "America/Halifax",
+    "Atlantic Time": "America/Halifax",
+    "WET": "Europe/Lisbon",
+    "Western European Time": "Europe/Lisbon",
+    "CET": "Europe/Paris",
+    "Central European Time": "Europe/Paris",
+    "European Time": "Europe/Paris",
+    "EET": "Europe/Helsinki",
+    "JST": "Asia/Tokyo",
+    "Japan Time": "Asia/Tokyo",
+    "AEST": "Australia/Sydney",
+    "Australian Eastern Time": "Australia/Sydney",
+    "ACST": "Australia/Adelaide",
+    "Australian Central Time": "Australia/Adelaide",
+    "AWST": "Australia/Perth",
+    "Australian Western Time": "Australia/Perth",
+}
+
+# UTC+5, GMT -3, UTC+10:00. Only whole hours have an IANA zone.
+_OFFSET_PATTERN = r"\b(?:UTC|GMT)\s*(?P<sign>[+-])\s*(?P<hours>\d{1,2})(?::?(?P<minutes>\d{2}))?(?!\d)"
+# Europe/London, America/Argentina/Buenos_Aires
+_IANA_PATTERN = r"\b(?P<iana>(?:Africa|America|Antarctica|Arctic|Asia|Atlantic|Australia|Etc|Europe|Indian|Pacific)(?:/[A-Za-z0-9_+-]+)+)"
+# Connecting words left at the end of the location once the timezone is cut out
+_TRAILING_FILLER = re.compile(r"(?:[\s,/(\-]+|\b(?:and|in|my|the|time ?zone|is|which is)\b)+$", re.IGNORECASE)
+_LEADING_FILLER = re.compile(r"^(?:[\s,/)\-]+|\b(?:and|time ?zone)\b)+", re.IGNORECASE)
+
+
+@dataclasses.dataclass(frozen=True)
+class TimezoneMatch:
+    zone: str
+    start: int
+    end: int
+
+
+def offset_zone(sign: str, hours: int) -> Optional[str]:
+    """Get the Etc zone for a whole hour UTC offset. Etc/GMT signs are inverted, UTC+5 is Etc/GMT-5."""
+    if hours == 0:
+        return "UTC"
+    if (sign == "+" and hours > 14) or (sign == "-" and hours > 12):
+        return None
+    return f"Etc/GMT{'-' if sign == '+' else '+'}{hours}"
+
+
+class TimezoneMatcher:
+    """
+    Finds the first timezone written in a piece of text.
+
+    Args:
+        aliases: Name or abbreviation -> IANA zone, matched ignoring case
+    """
+    def __init__(self, aliases: Mapping[str, str] = DEFAULT_TIMEZONE_ALIASES):
+        self._iana_names = {name.lower(): name for name in zoneinfo.available_timezones()}
+        self.aliases = {}
+        for alias, zone in aliases.items():
+            # Without tz data (no tzdata package on Windows) there's nothing to check against
+            if self._iana_names and zone.lower() not in self._iana_names:
+                log.warning("Timezone alias %s maps to unknown zone %s, ignoring it", alias, zone)
+                continue
+            self.aliases[alias.lower()] = zone
+        # Longest first, so "Central European Time" isn't matched as "European Time"
+        alternatives = sorted(self.aliases, key=len, reverse=True)
+        alias_pattern = r"\b(?P<alias>" + "|".join(re.escape(alias) for alias in alternatives) + r")\b" if alternatives else r"(?!)"
+        # Offsets come first so "UTC+5" isn't matched as the "UTC" alias
+        self._pattern = re.compile("|".join((_OFFSET_PATTERN, _IANA_PATTERN, alias_pattern)), re.IGNORECASE)
+
+    @classmethod
+    def from_config(cls, timezones: Union[Mapping[str, str], Iterable[str], None]) -> "TimezoneMatcher":
+        """
+        Build a matcher from the "timezones" config value: either alias -> IANA zone, or
+        (the older format) a list of aliases, which are looked up in DEFAULT_TIMEZONE_ALIASES.
+        """
+        if not timezones:
+            return cls()
+        if isinstance(timezones, Mapping):
+            return cls(timezones)
+        defaults = {alias.lower(): zone for alias, zone in DEFAULT_TIMEZONE_ALIASES.items()}
+        return cls({alias: defaults[alias.lower()] for alias in timezones if alias.lower() in defaults})
+
+    def _zone(self, match: re.Match) -> Optional[str]:
+        if match.group("sign"):
+            if int(match.group("minutes") or 0):
+                return None
+            return offset_zone(match.group("sign"), int(match.group("hours")))
+        if match.group("iana"):
+            return self._iana_names.get(match.group("iana").lower())
+        return self.aliases[match.group("alias").lower()]
+
+    def find(self, text: str) -> Optional[TimezoneMatch]:
+        """Get the first timezone in `text`, or None if there isn't one."""
+        for match in self._pattern.finditer(text):
+            zone = self._zone(match)
+            if zone is not None:
+                return TimezoneMatch(zone, match.start(), match.end())
+        return None
+
+    def split_location(self, answer: str) -> Tuple[str, str]:
+        """
+        Split an answer like "Ohio, EST" into the location and IANA zone. Either is
+        UNKNOWN_TIMEZONE / "Unknown" when it can't be found.
+        """
+        match = self.find(answer)
+        if match is None:
+            return answer.strip() or "Unknown", UNKNOWN_TIMEZONE
+        before = _TRAILING_FILLER.sub("", answer[:match.start])
+        after = _LEADING_FILLER.sub("", _TRAILING_FILLER.sub("", answer[match.end:]))
+        location = " ".join(part.strip() for part in (before, after) if part.strip())
+        return location or "Unknown", match.zone